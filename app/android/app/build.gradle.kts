@@ -278,9 +278,9 @@ val generateDependencyInventory by tasks.registering(Exec::class) {
     workingDir = repoRoot
     val cmd =
         if (updateFullLicensesOnBuild) {
-            "python3 ./scripts/generate_dependency_inventory.py --output ./licenses/dependency_inventory.json --licenses-output ./licenses/full_licenses.json"
+            "python3 ./scripts/generate_dependency_inventory.py --incremental --output ./licenses/dependency_inventory.json --licenses-output ./licenses/full_licenses.json"
         } else {
-            "python3 ./scripts/generate_dependency_inventory.py --output ./licenses/dependency_inventory.json"
+            "python3 ./scripts/generate_dependency_inventory.py --incremental --output ./licenses/dependency_inventory.json"
         }
     commandLine(
         "bash",
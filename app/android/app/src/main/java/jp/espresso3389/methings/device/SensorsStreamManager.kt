@@ -14,6 +14,8 @@ import android.util.Log
 import fi.iki.elonen.NanoWSD
 import org.json.JSONArray
 import org.json.JSONObject
+import java.nio.ByteBuffer
+import java.nio.ByteOrder
 import java.util.ArrayDeque
 import java.util.UUID
 import java.util.concurrent.ConcurrentHashMap
@@ -29,8 +31,51 @@ class SensorsStreamManager(private val context: Context) {
         val timestamp: String,
         val bufferMax: Int,
         val backpressureMode: String,
+        val format: String = "json",
+        val batchMs: Int = PACKED_BATCH_MS_DEFAULT,
     )
 
+    /**
+     * Pending samples of one sensor for the next packed batch (columnar: t, seq, values).
+     * Holds at most [maxCount] samples; once full, drop_old overwrites the oldest one, so the
+     * columns are a ring starting at [start].
+     */
+    private class PackedColumns(val index: Int, var dims: Int, capacity: Int, val maxCount: Int) {
+        var count = 0
+        var start = 0
+        var tNs = LongArray(capacity)
+        var seq = IntArray(capacity)
+        var values = FloatArray(capacity * dims)
+
+        fun add(t: Long, q: Long, v: FloatArray) {
+            if (count == tNs.size) {
+                // Only grows while start == 0: the ring wraps only at maxCount.
+                val cap = minOf(tNs.size * 2, maxCount)
+                tNs = tNs.copyOf(cap)
+                seq = seq.copyOf(cap)
+                values = values.copyOf(cap * dims)
+            }
+            val i = (start + count) % tNs.size
+            tNs[i] = t
+            seq[i] = q.toInt()
+            java.lang.System.arraycopy(v, 0, values, i * dims, dims)
+            count++
+        }
+
+        fun dropOldest() {
+            start = (start + 1) % tNs.size
+            count--
+        }
+
+        fun clear() {
+            count = 0
+            start = 0
+        }
+    }
+
+    /** Most recent packed sample, turned into a JSON `sample` only when asked for. */
+    private class PackedSample(val sensor: String, val tNs: Long, val seq: Long, val values: FloatArray)
+
     private data class StreamState(
         val id: String,
         val requestedSensors: List<String>,
@@ -47,8 +92,15 @@ class SensorsStreamManager(private val context: Context) {
         val buf: ArrayDeque<JSONObject>,
         val dropped: AtomicLong,
         @Volatile var lastEvent: JSONObject?,
+        @Volatile var lastPacked: PackedSample? = null,
         val listeners: MutableList<SensorEventListener>,
         val callbackThread: HandlerThread?,
+        val format: String,
+        val batchMs: Int,
+        // Packed mode only; touched exclusively on the sensor callback thread.
+        val packed: LinkedHashMap<String, PackedColumns>,
+        var callbackHandler: Handler? = null,
+        var flushTask: Runnable? = null,
     )
 
     private val streams = ConcurrentHashMap<String, StreamState>()
@@ -78,7 +130,7 @@ class SensorsStreamManager(private val context: Context) {
     fun streamStatus(streamId: String): JSONObject {
         val id = streamId.trim()
         val st = streams[id] ?: return JSONObject(mapOf("status" to "error", "error" to "stream_not_found"))
-        val last = st.lastEvent
+        val last = lastSample(st)
         return JSONObject()
             .put("status", "ok")
             .put("stream_id", st.id)
@@ -97,7 +149,21 @@ class SensorsStreamManager(private val context: Context) {
     fun latest(streamId: String): JSONObject {
         val id = streamId.trim()
         val st = streams[id] ?: return JSONObject(mapOf("status" to "error", "error" to "stream_not_found"))
-        return st.lastEvent ?: JSONObject(mapOf("status" to "error", "error" to "no_event"))
+        return lastSample(st) ?: JSONObject(mapOf("status" to "error", "error" to "no_event"))
+    }
+
+    private fun lastSample(st: StreamState): JSONObject? {
+        st.lastEvent?.let { return it }
+        val p = st.lastPacked ?: return null
+        val vals = JSONArray()
+        for (x in p.values) vals.put(x.toDouble())
+        return JSONObject()
+            .put("type", "sample")
+            .put("stream_id", st.id)
+            .put("sensor", p.sensor)
+            .put("t", p.tNs.toDouble() / 1_000_000_000.0)
+            .put("v", vals)
+            .put("seq", p.seq)
     }
 
     fun hello(streamId: String): JSONObject {
@@ -111,11 +177,22 @@ class SensorsStreamManager(private val context: Context) {
             .put("latency", st.latency)
             .put("timestamp", st.timestamp)
             .put("backpressure", JSONObject().put("mode", st.backpressureMode).put("max_queue", st.bufferMax))
+            .put("format", st.format)
+            .also {
+                if (st.format == "packed") {
+                    // Block sensor_index values refer to this list.
+                    it.put("packed_sensors", JSONArray(st.sensorMap.keys.toList()))
+                    it.put("batch_ms", st.batchMs)
+                    it.put("t_unit", "ns")
+                }
+            }
     }
 
     fun batch(streamId: String, sinceQExclusive: Long, limit: Int): JSONObject {
         val id = streamId.trim()
         val st = streams[id] ?: return JSONObject(mapOf("status" to "error", "error" to "stream_not_found"))
+        // Packed samples are only kept until the next batch is sent; there is no history to page through.
+        if (st.format == "packed") return JSONObject(mapOf("status" to "error", "error" to "batch_unavailable_for_packed"))
         val out = JSONArray()
         val lim = limit.coerceIn(1, 5000)
         synchronized(st.bufLock) {
@@ -151,6 +228,8 @@ class SensorsStreamManager(private val context: Context) {
         val timestamp = req.timestamp.trim().lowercase().let { if (it == "unix") "unix" else "mono" }
         val bufferMax = req.bufferMax.coerceIn(64, 50_000)
         val backpressureMode = req.backpressureMode.trim().lowercase().let { if (it == "drop_new") "drop_new" else "drop_old" }
+        val format = req.format.trim().lowercase().let { if (it == "packed") "packed" else "json" }
+        val batchMs = req.batchMs.coerceIn(PACKED_BATCH_MS_MIN, PACKED_BATCH_MS_MAX)
 
         val st = StreamState(
             id = id,
@@ -170,15 +249,39 @@ class SensorsStreamManager(private val context: Context) {
             lastEvent = null,
             listeners = mutableListOf(),
             callbackThread = HandlerThread("sensors-$id").apply { start() },
+            format = format,
+            batchMs = batchMs,
+            packed = LinkedHashMap(),
         )
 
         val samplingPeriodUs = (1_000_000 / rateHz.coerceAtLeast(1)).coerceIn(0, 1_000_000)
         val callbackHandler = st.callbackThread?.looper?.let { Handler(it) } ?: Handler(Looper.getMainLooper())
+        st.callbackHandler = callbackHandler
+        if (format == "packed") {
+            // Batches are built and flushed on the callback thread, so no locking is needed.
+            val initialCapacity = (rateHz * batchMs / 1000 + 16).coerceAtMost(bufferMax)
+            for ((index, key) in sensorMap.keys.withIndex()) {
+                st.packed[key] = PackedColumns(index, 0, initialCapacity, bufferMax)
+            }
+            val task = object : Runnable {
+                override fun run() {
+                    if (!st.running.get()) return
+                    flushPacked(st)
+                    callbackHandler.postDelayed(this, st.batchMs.toLong())
+                }
+            }
+            st.flushTask = task
+            callbackHandler.postDelayed(task, batchMs.toLong())
+        }
         for ((key, sensor) in sensorMap) {
             val l = object : SensorEventListener {
                 override fun onSensorChanged(event: SensorEvent) {
                     if (!st.running.get()) return
                     val q = st.seq.incrementAndGet()
+                    if (st.format == "packed") {
+                        addPacked(st, key, q, event.values)
+                        return
+                    }
                     val t = currentSeconds(st.timestamp)
                     val vals = JSONArray()
                     for (x in event.values) vals.put(x.toDouble())
@@ -235,6 +338,7 @@ class SensorsStreamManager(private val context: Context) {
             "latency" to latency,
             "timestamp" to timestamp,
             "backpressure" to backpressureMode,
+            "format" to format,
         )
     }
 
@@ -246,6 +350,7 @@ class SensorsStreamManager(private val context: Context) {
         if (m != null) {
             for (l in st.listeners) runCatching { m.unregisterListener(l) }
         }
+        st.flushTask?.let { task -> st.callbackHandler?.removeCallbacks(task) }
         runCatching { st.callbackThread?.quitSafely() }
         return mapOf("status" to "ok", "stopped" to true, "stream_id" to id)
     }
@@ -349,6 +454,97 @@ class SensorsStreamManager(private val context: Context) {
         }
     }
 
+    private fun currentNanos(mode: String): Long {
+        return if (mode == "unix") {
+            System.currentTimeMillis() * 1_000_000L
+        } else {
+            SystemClock.elapsedRealtimeNanos()
+        }
+    }
+
+    private fun addPacked(st: StreamState, key: String, q: Long, values: FloatArray) {
+        val col = st.packed[key] ?: return
+        if (col.count > 0 && col.dims != values.size) flushPacked(st)
+        if (col.count == 0 && col.dims != values.size) {
+            col.dims = values.size
+            col.values = FloatArray(col.tNs.size * col.dims)
+        }
+        val t = currentNanos(st.timestamp)
+        st.lastPacked = PackedSample(key, t, q, values.copyOf())
+        // max_queue bounds the pending samples of one sensor; seq was already taken, so drops show as gaps.
+        if (col.count >= st.bufferMax) {
+            st.dropped.incrementAndGet()
+            if (st.backpressureMode == "drop_new") return
+            col.dropOldest()
+        }
+        col.add(t, q, values)
+    }
+
+    /**
+     * Encode and send all pending samples as one binary message (little-endian):
+     *
+     *   header (16 bytes): u32 magic "SPK1", u16 block_count, u16 flags (bit0: unix timestamps),
+     *                      u32 dropped, u32 reserved
+     *   per sensor block:  u8 sensor_index, u8 dims, u16 reserved, u32 count,
+     *                      i64[count] t_ns, u32[count] seq, f32[count * dims] values,
+     *                      zero padding to a multiple of 8 bytes
+     */
+    private fun flushPacked(st: StreamState) {
+        var blocks = 0
+        var size = PACKED_HEADER_BYTES
+        for (col in st.packed.values) {
+            if (col.count == 0) continue
+            blocks++
+            size += packedBlockBytes(col)
+        }
+        if (blocks == 0) return
+        val buf = ByteBuffer.allocate(size).order(ByteOrder.LITTLE_ENDIAN)
+        buf.putInt(PACKED_MAGIC)
+        buf.putShort(blocks.toShort())
+        buf.putShort((if (st.timestamp == "unix") 1 else 0).toShort())
+        buf.putInt(st.dropped.get().toInt())
+        buf.putInt(0)
+        for (col in st.packed.values) {
+            val n = col.count
+            if (n == 0) continue
+            val start = buf.position()
+            buf.put(col.index.toByte())
+            buf.put(col.dims.toByte())
+            buf.putShort(0)
+            buf.putInt(n)
+            // The ring may wrap: [start, end of arrays) then [0, rest).
+            val head = minOf(n, col.tNs.size - col.start)
+            val rest = n - head
+            val d = col.dims
+            buf.asLongBuffer().put(col.tNs, col.start, head).put(col.tNs, 0, rest)
+            buf.position(buf.position() + n * 8)
+            buf.asIntBuffer().put(col.seq, col.start, head).put(col.seq, 0, rest)
+            buf.position(buf.position() + n * 4)
+            buf.asFloatBuffer().put(col.values, col.start * d, head * d).put(col.values, 0, rest * d)
+            buf.position(start + packedBlockBytes(col))
+            col.clear()
+        }
+        emitBinary(st, buf.array())
+    }
+
+    private fun packedBlockBytes(col: PackedColumns): Int {
+        val raw = 8 + col.count * (8 + 4 + 4 * col.dims)
+        return (raw + 7) and 7.inv()
+    }
+
+    private fun emitBinary(st: StreamState, bytes: ByteArray) {
+        val dead = ArrayList<NanoWSD.WebSocket>()
+        for (ws in st.wsClients) {
+            try {
+                if (ws.isOpen) ws.send(bytes) else dead.add(ws)
+            } catch (ex: Exception) {
+                Log.w(TAG, "emit packed send failed stream=${st.id} ex=${ex.javaClass.simpleName}:${ex.message}")
+                dead.add(ws)
+            }
+        }
+        for (ws in dead) st.wsClients.remove(ws)
+    }
+
     private fun emit(st: StreamState, obj: JSONObject) {
         val dead = ArrayList<NanoWSD.WebSocket>()
         val text = obj.toString()
@@ -365,5 +561,10 @@ class SensorsStreamManager(private val context: Context) {
 
     companion object {
         private const val TAG = "SensorsStreamManager"
+        private const val PACKED_MAGIC = 0x314B5053 // "SPK1"
+        private const val PACKED_HEADER_BYTES = 16
+        const val PACKED_BATCH_MS_DEFAULT = 50
+        const val PACKED_BATCH_MS_MIN = 5
+        const val PACKED_BATCH_MS_MAX = 1000
     }
 }
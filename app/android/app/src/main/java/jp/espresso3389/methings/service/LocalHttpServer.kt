@@ -59,6 +59,7 @@ import jp.espresso3389.methings.device.DeviceNetworkManager
 import jp.espresso3389.methings.device.SensorsStreamManager
 import jp.espresso3389.methings.device.SttManager
 import jp.espresso3389.methings.device.TtsManager
+import jp.espresso3389.methings.vision.RgbaFrame
 import jp.espresso3389.methings.vision.VisionFrameStore
 import jp.espresso3389.methings.vision.VisionImageIo
 import jp.espresso3389.methings.vision.TfliteModelManager
@@ -178,6 +179,11 @@ class LocalHttpServer(
     private val usbConnections get() = coreApi.usb.usbConnections
     private val usbDevicesByHandle get() = coreApi.usb.usbDevicesByHandle
     private val usbStreams = ConcurrentHashMap<String, UsbStreamState>()
+    private val uvcSessions = ConcurrentHashMap<String, UvcMjpegSessionState>()
+    // Handle -> session id, reserved before negotiation so two starts cannot both claim the camera.
+    private val uvcSessionHandles = ConcurrentHashMap<String, String>()
+    // Final status of the last session per handle that ended on its own (device error, EOF).
+    private val uvcEndedSessions = ConcurrentHashMap<String, JSONObject>()
     private val serialSessions get() = coreApi.serial.serialSessions
     private val serialWsByHandle = ConcurrentHashMap<String, NanoWSD.WebSocket>()
 
@@ -565,13 +571,28 @@ class LocalHttpServer(
     }
 
     override fun serveHttp(session: IHTTPSession): Response {
+        val startedNs = System.nanoTime()
+        val response = routeHttp(session)
+        // Time spent here (body read + handler), for client-side latency breakdowns. Streaming
+        // responses report the time until the stream was set up.
+        response.addHeader(
+            "Server-Timing",
+            String.format(java.util.Locale.US, "app;dur=%.2f", (System.nanoTime() - startedNs) / 1_000_000.0),
+        )
+        return response
+    }
+
+    private fun routeHttp(session: IHTTPSession): Response {
         val uri = session.uri ?: "/"
         // NanoHTTPD keeps connections alive; if we return early on a POST without consuming the body,
         // leftover bytes can corrupt the next request line (e.g. "{}POST ...").
         // Always read the POST body once up-front and reuse it across handlers.
         val contentType = (session.headers["content-type"] ?: "").lowercase()
         val isMultipart = contentType.contains("multipart/form-data")
-        val postBody: String? = if (session.method == Method.POST && !isMultipart) readBody(session) else null
+        // Raw binary uploads (e.g. RGBA frames for /vision/frame/put) read session.inputStream
+        // themselves so the payload never goes through a String.
+        val isRawBody = session.method == Method.POST && isOctetStreamBody(session) && isRawBodyRoute(uri)
+        val postBody: String? = if (session.method == Method.POST && !isMultipart && !isRawBody) readBody(session) else null
         val seg = uri.indexOf('/', 1).let { if (it < 0) uri else uri.substring(0, it) }
         return when (seg) {
             "/health" -> routeHealth(session, uri, postBody)
@@ -582,6 +603,7 @@ class LocalHttpServer(
             "/work" -> routeWork(session, uri, postBody)
             "/me" -> routeMe(session, uri, postBody)
             "/agent" -> routeAgent(session, uri, postBody)
+            "/tools" -> routeTools(session, uri, postBody)
             "/ui" -> routeUi(session, uri, postBody)
             "/permissions" -> routePermissions(session, uri, postBody)
             "/vault" -> routeVault(session, uri, postBody)
@@ -1223,6 +1245,87 @@ class LocalHttpServer(
         }
     }
 
+    private fun routeTools(session: IHTTPSession, uri: String, postBody: String?): Response {
+        return when {
+            (uri == "/tools/device_api/invoke" || uri == "/tools/device_api/invoke/") && session.method == Method.POST -> {
+                val body = try { JSONObject((postBody ?: "").ifBlank { "{}" }) } catch (_: Exception) {
+                    return jsonError(Response.Status.BAD_REQUEST, "invalid_json")
+                }
+                val args = body.optJSONObject("args") ?: body
+                val action = args.optString("action", "").trim()
+                if (action.isBlank()) return jsonError(Response.Status.BAD_REQUEST, "action_required")
+                if (action in DEVICE_API_HTTP_BLOCKED_ACTIONS) {
+                    return jsonError(Response.Status.FORBIDDEN, "command_not_allowed", deviceApiBlockedResult())
+                }
+                val payload = args.optJSONObject("payload") ?: JSONObject()
+                mapToResponse(coreApi.dispatch(action, CoreApiUtils.fromJsonPayload(payload), apiContextFromHttp(session)))
+            }
+            (uri == "/tools/device_api/batch" || uri == "/tools/device_api/batch/") && session.method == Method.POST -> {
+                val body = try { JSONObject((postBody ?: "").ifBlank { "{}" }) } catch (_: Exception) {
+                    return jsonError(Response.Status.BAD_REQUEST, "invalid_json")
+                }
+                handleDeviceApiBatch(session, body)
+            }
+            else -> notFound()
+        }
+    }
+
+    /**
+     * Runs several device_api actions in one HTTP exchange. Actions execute in order and each
+     * gets its own result entry, so a failing action does not drop the others.
+     */
+    private fun handleDeviceApiBatch(session: IHTTPSession, body: JSONObject): Response {
+        val actions = body.optJSONArray("actions") ?: return jsonError(Response.Status.BAD_REQUEST, "actions_required")
+        if (actions.length() > DEVICE_API_BATCH_MAX_ACTIONS) {
+            return jsonError(
+                Response.Status.BAD_REQUEST,
+                "too_many_actions",
+                JSONObject().put("max_actions", DEVICE_API_BATCH_MAX_ACTIONS)
+            )
+        }
+        val ctx = apiContextFromHttp(session)
+        val results = JSONArray()
+        for (i in 0 until actions.length()) {
+            val item = actions.optJSONObject(i)
+            val action = item?.optString("action", "")?.trim().orEmpty()
+            val entry = JSONObject().put("index", i).put("action", action)
+            if (action.isBlank()) {
+                results.put(entry.put("http_status", 400).put("result", JSONObject().put("error", "action_required")))
+                continue
+            }
+            if (action in DEVICE_API_HTTP_BLOCKED_ACTIONS) {
+                results.put(entry.put("http_status", 403).put("result", deviceApiBlockedResult()))
+                continue
+            }
+            val payload = item?.optJSONObject("payload") ?: JSONObject()
+            val result = coreApi.dispatch(action, CoreApiUtils.fromJsonPayload(payload), ctx)
+            // HTTP-loopback fallback actions report their own status as {status: http_error, http_status}.
+            val httpStatus = if (result["status"] == "http_error") {
+                (result["http_status"] as? Number)?.toInt() ?: 500
+            } else {
+                CoreApiUtils.httpStatusOf(result)
+            }
+            results.put(
+                entry
+                    .put("http_status", httpStatus)
+                    .put("result", CoreApiUtils.toJsonResponse(result))
+            )
+        }
+        return jsonResponse(JSONObject().put("status", "ok").put("results", results))
+    }
+
+    /**
+     * Same guard as ToolExecutor.executeDeviceApi: brain.memory.set needs an explicit user request
+     * to persist, which these generic routes cannot check, so a script must not reach it through
+     * them. POST /brain/memory stays available behind its own device.brain permission.
+     */
+    private fun deviceApiBlockedResult(): JSONObject {
+        return JSONObject()
+            .put("status", "error")
+            .put("error", "command_not_allowed")
+            .put("detail", "Persistent memory writes require an explicit user request to save/persist.")
+    }
+
     private fun routeUi(session: IHTTPSession, uri: String, postBody: String?): Response {
         return when {
             uri == "/ui/version" -> {
@@ -2409,10 +2512,74 @@ class LocalHttpServer(
                 coreApiResponse("mcu.micropython.write_file", session, postBody)
             (uri == "/mcu/micropython/soft_reset" || uri == "/mcu/micropython/soft_reset/") && session.method == Method.POST ->
                 coreApiResponse("mcu.micropython.soft_reset", session, postBody)
+            (uri == "/mcu/micropython/session/open" || uri == "/mcu/micropython/session/open/") && session.method == Method.POST ->
+                coreApiResponse("mcu.micropython.session.open", session, postBody)
+            (uri == "/mcu/micropython/session/exec" || uri == "/mcu/micropython/session/exec/") && session.method == Method.POST -> {
+                if (firstParam(session, "stream").trim() in setOf("1", "true")) serveMicroPythonSessionExecStream(session, postBody)
+                else coreApiResponse("mcu.micropython.session.exec", session, postBody)
+            }
+            (uri == "/mcu/micropython/session/close" || uri == "/mcu/micropython/session/close/") && session.method == Method.POST ->
+                coreApiResponse("mcu.micropython.session.close", session, postBody)
+            (uri == "/mcu/micropython/session/list" || uri == "/mcu/micropython/session/list/") && session.method == Method.GET ->
+                coreApiResponse("mcu.micropython.session.list", session, postBody)
             else -> notFound()
         }
     }
 
+    /**
+     * `mcu.micropython.session.exec` as NDJSON: `output` events while the board prints, a
+     * `snippet` event per finished snippet, and a final `done` line with the full result.
+     */
+    private fun serveMicroPythonSessionExecStream(session: IHTTPSession, postBody: String?): Response =
+        ndjsonStreamResponse(session, postBody, "mpy-session-exec", "micropython_session_exec_failed") { ctx, params, emit ->
+            coreApi.mcu.micropythonSessionExec(ctx, params, emit)
+        }
+
+    /** `serial.exchange.script` as NDJSON: a `result` event per command, then a final `done` line. */
+    private fun serveSerialExchangeScriptStream(session: IHTTPSession, postBody: String?): Response =
+        ndjsonStreamResponse(session, postBody, "serial-exchange-script", "serial_exchange_failed") { ctx, params, emit ->
+            coreApi.serial.exchangeScript(ctx, params, emit)
+        }
+
+    /**
+     * Runs [block] on a worker thread and streams each emitted event as one JSON line; the
+     * block's return value is sent last as `{"event": "done", ...}`.
+     */
+    private fun ndjsonStreamResponse(
+        session: IHTTPSession,
+        postBody: String?,
+        threadName: String,
+        errorCode: String,
+        block: (ApiContext, Map<String, Any?>, (Map<String, Any?>) -> Unit) -> Map<String, Any?>,
+    ): Response {
+        val ctx = apiContextFromHttp(session)
+        val params = try {
+            CoreApiUtils.fromJsonPayload(JSONObject((postBody ?: "").ifBlank { "{}" }))
+        } catch (_: Exception) {
+            return jsonError(Response.Status.BAD_REQUEST, "invalid_json")
+        }
+        val pipeOut = java.io.PipedOutputStream()
+        val pipeIn = java.io.PipedInputStream(pipeOut, 64 * 1024)
+        Thread({
+            fun line(map: Map<String, Any?>) {
+                pipeOut.write((CoreApiUtils.toJsonResponse(map).toString() + "\n").toByteArray(Charsets.UTF_8))
+                pipeOut.flush()
+            }
+            try {
+                val result = block(ctx, params) { ev -> runCatching { line(ev) } }
+                runCatching { line(mapOf("event" to "done") + result) }
+            } catch (ex: Exception) {
+                Log.e(TAG, "$threadName stream failed", ex)
+                runCatching { line(mapOf("event" to "done", "error" to errorCode, "detail" to (ex.message ?: ""))) }
+            } finally {
+                runCatching { pipeOut.close() }
+            }
+        }, threadName).start()
+        val response = newChunkedResponse(Response.Status.OK, "application/x-ndjson", pipeIn)
+        response.addHeader("Cache-Control", "no-cache")
+        return response
+    }
+
     private fun routeSerial(session: IHTTPSession, uri: String, postBody: String?): Response {
         return when {
             (uri == "/serial/ws/contract" || uri == "/serial/ws/contract/") && session.method == Method.GET ->
@@ -2433,6 +2600,10 @@ class LocalHttpServer(
                 coreApiResponse("serial.lines", session, postBody)
             (uri == "/serial/exchange" || uri == "/serial/exchange/") && session.method == Method.POST ->
                 coreApiResponse("serial.exchange", session, postBody)
+            (uri == "/serial/exchange/script" || uri == "/serial/exchange/script/") && session.method == Method.POST -> {
+                if (firstParam(session, "stream").trim() in setOf("1", "true")) serveSerialExchangeScriptStream(session, postBody)
+                else coreApiResponse("serial.exchange.script", session, postBody)
+            }
             else -> notFound()
         }
     }
@@ -2478,6 +2649,27 @@ class LocalHttpServer(
                     jsonError(Response.Status.INTERNAL_ERROR, "uvc_capture_handler_failed")
                 }
             }
+            (uri == "/uvc/mjpeg/session/start" || uri == "/uvc/mjpeg/session/start/") && session.method == Method.POST -> {
+                return try {
+                    val payload = JSONObject((postBody ?: "").ifBlank { "{}" })
+                    handleUvcMjpegSessionStart(payload)
+                } catch (ex: Exception) {
+                    Log.e(TAG, "UVC mjpeg/session/start handler failed", ex)
+                    jsonError(Response.Status.INTERNAL_ERROR, "uvc_session_start_handler_failed")
+                }
+            }
+            (uri == "/uvc/mjpeg/session/stop" || uri == "/uvc/mjpeg/session/stop/") && session.method == Method.POST -> {
+                return try {
+                    val payload = JSONObject((postBody ?: "").ifBlank { "{}" })
+                    handleUvcMjpegSessionStop(payload)
+                } catch (ex: Exception) {
+                    Log.e(TAG, "UVC mjpeg/session/stop handler failed", ex)
+                    jsonError(Response.Status.INTERNAL_ERROR, "uvc_session_stop_handler_failed")
+                }
+            }
+            (uri == "/uvc/mjpeg/session/status" || uri == "/uvc/mjpeg/session/status/") && session.method == Method.GET -> {
+                return handleUvcMjpegSessionStatus()
+            }
             (uri == "/uvc/diagnose" || uri == "/uvc/diagnose/") && session.method == Method.POST -> {
                 return try {
                     val payload = JSONObject((postBody ?: "").ifBlank { "{}" })
@@ -2513,6 +2705,7 @@ class LocalHttpServer(
             }
             (uri == "/vision/frame/put" || uri == "/vision/frame/put/") && session.method == Method.POST -> {
                 return try {
+                    if (isOctetStreamBody(session)) return handleVisionFramePutRaw(session)
                     val payload = JSONObject((postBody ?: "").ifBlank { "{}" })
                     handleVisionFramePut(payload)
                 } catch (ex: Exception) {
@@ -2558,6 +2751,7 @@ class LocalHttpServer(
             }
             (uri == "/vision/run" || uri == "/vision/run/") && session.method == Method.POST -> {
                 return try {
+                    if (isOctetStreamBody(session)) return handleVisionRunRaw(session)
                     val payload = JSONObject((postBody ?: "").ifBlank { "{}" })
                     handleVisionRun(payload)
                 } catch (ex: Exception) {
@@ -3080,7 +3274,9 @@ class LocalHttpServer(
                             .put("latency", "realtime|normal|ui (default realtime)")
                             .put("timestamp", "mono|unix (default mono)")
                             .put("backpressure", "drop_old|drop_new (default drop_old)")
-                            .put("max_queue", "64..50000 (default 4096)"))
+                            .put("max_queue", "64..50000 (default 4096)")
+                            .put("format", "json|packed (default json)")
+                            .put("batch_ms", "5..1000, packed batch window (default 50)"))
                         .put("sample_event", JSONObject()
                             .put("type", "sample")
                             .put("stream_id", "s1234abcd")
@@ -3118,6 +3314,14 @@ class LocalHttpServer(
                 handleFileWrite(postBody, forcedPath = null)
             }
             uri.startsWith("/user/write/") && session.method == Method.POST -> {
+                if (isOctetStreamBody(session)) {
+                    val p = decodePathSuffix(uri, "/user/write/")
+                    if (p == null) {
+                        drainBody(session.inputStream, (session.headers["content-length"] ?: "").trim().toLongOrNull() ?: 0L)
+                        return jsonError(Response.Status.BAD_REQUEST, "path_required")
+                    }
+                    return handleFileWriteRaw(session, p)
+                }
                 val p = decodePathSuffix(uri, "/user/write/") ?: return jsonError(Response.Status.BAD_REQUEST, "path_required")
                 handleFileWrite(postBody, forcedPath = p)
             }
@@ -3133,11 +3337,11 @@ class LocalHttpServer(
             }
             uri.startsWith("/user/file/info/") && session.method == Method.GET -> {
                 val p = decodePathSuffix(uri, "/user/file/info/") ?: return jsonError(Response.Status.BAD_REQUEST, "path_required")
-                handleFileInfoByPath(p)
+                handleFileInfoByPath(p, withSha256 = firstParam(session, "sha256").trim() in setOf("1", "true"))
             }
             uri.startsWith("/user/file/") && session.method == Method.GET -> {
                 val p = decodePathSuffix(uri, "/user/file/") ?: return jsonError(Response.Status.BAD_REQUEST, "path_required")
-                serveFileByPath(p)
+                serveFileByPath(p, rangeHeader = (session.headers["range"] ?: "").trim())
             }
             uri.startsWith("/user/www/") && session.method == Method.GET -> {
                 serveUserWww(session)
@@ -3375,7 +3579,7 @@ class LocalHttpServer(
         return listFsPath(path)
     }
 
-    private fun serveFileByPath(raw: String): Response {
+    private fun serveFileByPath(raw: String, rangeHeader: String = ""): Response {
         val ref = parseFsPathRef(raw) ?: return jsonError(Response.Status.BAD_REQUEST, "invalid_path")
         val name = ref.userFile?.name ?: raw.substringAfterLast('/')
 
@@ -3390,14 +3594,56 @@ class LocalHttpServer(
         }
         val file = ref.userFile ?: return jsonError(Response.Status.BAD_REQUEST, "path_outside_user_dir")
         if (!file.exists() || !file.isFile) return jsonError(Response.Status.NOT_FOUND, "not_found")
+        if (rangeHeader.isNotBlank()) serveFileRange(file, mime, rangeHeader)?.let { return it }
         val stream: InputStream = FileInputStream(file)
         val response = newChunkedResponse(Response.Status.OK, mime, stream)
         response.addHeader("Cache-Control", "no-cache")
         response.addHeader("X-Content-Type-Options", "nosniff")
+        response.addHeader("Accept-Ranges", "bytes")
+        return response
+    }
+
+    /**
+     * Serves a single `Range: bytes=start-[end]` (or suffix `bytes=-n`) of [file] as 206, so
+     * interrupted downloads can resume. Returns null for ranges it does not handle (multi-range),
+     * which are answered with the whole file.
+     */
+    private fun serveFileRange(file: File, mime: String, rangeHeader: String): Response? {
+        val total = file.length()
+        val m = Regex("^bytes=(\\d*)-(\\d*)$").find(rangeHeader.lowercase(Locale.US)) ?: return null
+        val (a, b) = m.destructured
+        val start: Long
+        val end: Long
+        if (a.isEmpty()) {
+            val n = b.toLongOrNull() ?: 0L
+            start = (total - n).coerceAtLeast(0L)
+            end = total - 1
+        } else {
+            start = a.toLongOrNull() ?: Long.MAX_VALUE
+            end = (b.toLongOrNull() ?: (total - 1)).coerceAtMost(total - 1)
+        }
+        if (start >= total || end < start) {
+            val res = jsonError(Response.Status.RANGE_NOT_SATISFIABLE, "range_not_satisfiable", JSONObject().put("size", total))
+            res.addHeader("Content-Range", "bytes */$total")
+            return res
+        }
+        val stream = FileInputStream(file)
+        var skipped = 0L
+        while (skipped < start) {
+            val n = stream.skip(start - skipped)
+            if (n <= 0) break
+            skipped += n
+        }
+        val length = end - start + 1
+        val response = newFixedLengthResponse(Response.Status.PARTIAL_CONTENT, mime, stream, length)
+        response.addHeader("Content-Range", "bytes $start-$end/$total")
+        response.addHeader("Accept-Ranges", "bytes")
+        response.addHeader("Cache-Control", "no-cache")
+        response.addHeader("X-Content-Type-Options", "nosniff")
         return response
     }
 
-    private fun handleFileInfoByPath(rawPath: String): Response {
+    private fun handleFileInfoByPath(rawPath: String, withSha256: Boolean = false): Response {
         val ref = parseFsPathRef(rawPath) ?: return jsonError(Response.Status.BAD_REQUEST, "invalid_path")
         val displayPath = ref.displayPath
         val fileName = ref.userFile?.name ?: rawPath.substringAfterLast('/')
@@ -3428,6 +3674,7 @@ class LocalHttpServer(
         if (!file.exists() || !file.isFile) return jsonError(Response.Status.NOT_FOUND, "not_found")
         json.put("size", file.length())
         json.put("mtime_ms", file.lastModified())
+        if (withSha256) json.put("sha256", sha256Hex(file))
 
         if (kind == "image" && ext != "svg") {
             try {
@@ -3513,6 +3760,81 @@ class LocalHttpServer(
         }
     }
 
+    /**
+     * POST /user/write/<path> with `Content-Type: application/octet-stream`: streams the body to
+     * disk in fixed-size blocks, so memory use does not depend on the file size.
+     *
+     * - `?offset=N`: write at byte N (N must not exceed the current size); the file is truncated
+     *   after the written range unless `append=1`. Without offset the file is replaced.
+     * - `?append=1`: write at the current end of the file.
+     * - `?sha256=1`: include the SHA-256 of the whole file after the write.
+     */
+    private fun handleFileWriteRaw(session: IHTTPSession, rawPath: String): Response {
+        val len = (session.headers["content-length"] ?: "").trim().toLongOrNull() ?: -1L
+        if (len < 0) {
+            val res = jsonError(Response.Status.BAD_REQUEST, "content_length_required")
+            res.addHeader("Connection", "close")
+            return res
+        }
+        val ref = parseFsPathRef(rawPath.trimStart('/'))
+        val file = ref?.userFile
+        if (ref == null || file == null) {
+            drainBody(session.inputStream, len)
+            return jsonError(Response.Status.BAD_REQUEST, if (ref == null) "invalid_path" else "path_outside_user_dir")
+        }
+        val append = firstParam(session, "append").trim() in setOf("1", "true")
+        val offsetRaw = firstParam(session, "offset").trim()
+        val current = if (file.isFile) file.length() else 0L
+        val offset = when {
+            offsetRaw.isNotEmpty() -> offsetRaw.toLongOrNull() ?: -1L
+            append -> current
+            else -> 0L
+        }
+        if (offset < 0 || offset > current) {
+            drainBody(session.inputStream, len)
+            return jsonError(Response.Status.CONFLICT, "offset_mismatch", JSONObject().put("size", current))
+        }
+        return try {
+            file.parentFile?.mkdirs()
+            var written = 0L
+            java.io.RandomAccessFile(file, "rw").use { raf ->
+                raf.seek(offset)
+                val buf = ByteArray(USER_WRITE_BLOCK_BYTES)
+                val input = session.inputStream
+                while (written < len) {
+                    val n = input.read(buf, 0, minOf(buf.size.toLong(), len - written).toInt())
+                    if (n <= 0) break
+                    raf.write(buf, 0, n)
+                    written += n
+                }
+                if (!append) raf.setLength(offset + written)
+            }
+            val out = JSONObject()
+                .put("status", if (written == len) "ok" else "partial")
+                .put("path", ref.displayPath)
+                .put("offset", offset)
+                .put("bytes_written", written)
+                .put("size", file.length())
+            if (firstParam(session, "sha256").trim() in setOf("1", "true")) out.put("sha256", sha256Hex(file))
+            jsonResponse(out)
+        } catch (ex: Exception) {
+            jsonError(Response.Status.INTERNAL_ERROR, "file_write_failed", JSONObject().put("detail", ex.message ?: ""))
+        }
+    }
+
+    private fun sha256Hex(file: File): String {
+        val md = MessageDigest.getInstance("SHA-256")
+        FileInputStream(file).use { input ->
+            val buf = ByteArray(USER_WRITE_BLOCK_BYTES)
+            while (true) {
+                val n = input.read(buf)
+                if (n <= 0) break
+                md.update(buf, 0, n)
+            }
+        }
+        return md.digest().joinToString("") { "%02x".format(it) }
+    }
+
     private fun serveUserWww(session: IHTTPSession): Response {
         val uri = session.uri ?: ""
         val raw = uri.removePrefix("/user/www/").trimStart('/')
@@ -6679,32 +7001,35 @@ class LocalHttpServer(
         }
     }
 
-    private fun handleUvcMjpegCapture(payload: JSONObject): Response {
-        val handle = payload.optString("handle", "").trim()
-        if (handle.isBlank()) return jsonError(Response.Status.BAD_REQUEST, "handle_required")
-        val conn = usbConnections[handle] ?: return jsonError(Response.Status.NOT_FOUND, "handle_not_found")
-        val dev = usbDevicesByHandle[handle] ?: return jsonError(Response.Status.NOT_FOUND, "device_not_found")
+    private class UvcMjpegNegotiation(
+        val intf: UsbInterface,
+        val ep: UsbEndpoint,
+        val transferMode: String,
+        val vsInterface: Int,
+        val frame: UvcMjpegFrame,
+        val interval100ns: Long,
+        val maxPayloadTransferSize: Long,
+    )
 
+    /**
+     * Pick an MJPEG format/frame and streaming endpoint, claim the VideoStreaming interface and run
+     * VS PROBE/COMMIT. Shared by one-shot capture and capture sessions.
+     */
+    private fun negotiateUvcMjpeg(
+        conn: UsbDeviceConnection,
+        dev: UsbDevice,
+        payload: JSONObject,
+    ): Pair<UvcMjpegNegotiation?, Response?> {
         val widthReq = payload.optInt("width", 1280).coerceIn(1, 8192)
         val heightReq = payload.optInt("height", 720).coerceIn(1, 8192)
         val fpsReq = payload.optInt("fps", 30).coerceIn(1, 120)
-        val timeoutMs = payload.optLong("timeout_ms", 12000L).coerceIn(1500L, 60000L)
-        val maxFrameBytes = payload.optInt("max_frame_bytes", 6 * 1024 * 1024).coerceIn(64 * 1024, 40 * 1024 * 1024)
-
-        // Output path under user root.
-        val userRoot = File(context.filesDir, "user").also { it.mkdirs() }
-        File(userRoot, "captures").also { it.mkdirs() }
-        val relPath = payload.optString("path", "").trim().ifBlank {
-            "captures/uvc_${System.currentTimeMillis()}.jpg"
-        }
-        val outFile = resolveUserPath(userRoot, relPath) ?: return jsonError(Response.Status.BAD_REQUEST, "invalid_path")
-        outFile.parentFile?.mkdirs()
 
         // Parse MJPEG formats/frames and pick a reasonable configuration.
-        val raw = conn.rawDescriptors ?: return jsonError(Response.Status.INTERNAL_ERROR, "raw_descriptors_unavailable")
+        val raw = conn.rawDescriptors
+            ?: return Pair(null, jsonError(Response.Status.INTERNAL_ERROR, "raw_descriptors_unavailable"))
         val frames = parseUvcMjpegFrames(raw)
         val bestFrame = pickBestUvcFrame(frames, widthReq, heightReq)
-            ?: return jsonError(Response.Status.INTERNAL_ERROR, "uvc_mjpeg_frames_not_found")
+            ?: return Pair(null, jsonError(Response.Status.INTERNAL_ERROR, "uvc_mjpeg_frames_not_found"))
 
         val vsInterface = bestFrame.vsInterface
         val interval = pickBestInterval(bestFrame, fpsReq)
@@ -6735,12 +7060,13 @@ class LocalHttpServer(
                 }
             }
         }
-        val chosen = isoPick ?: bulkPick ?: return jsonError(Response.Status.INTERNAL_ERROR, "uvc_stream_endpoint_not_found")
+        val chosen = isoPick ?: bulkPick
+            ?: return Pair(null, jsonError(Response.Status.INTERNAL_ERROR, "uvc_stream_endpoint_not_found"))
         val transferMode = if (chosen.ep.type == UsbConstants.USB_ENDPOINT_XFER_ISOC) "iso" else "bulk"
 
         // Claim + select alternate setting.
         val claimed = conn.claimInterface(chosen.intf, true)
-        if (!claimed) return jsonError(Response.Status.INTERNAL_ERROR, "claim_interface_failed")
+        if (!claimed) return Pair(null, jsonError(Response.Status.INTERNAL_ERROR, "claim_interface_failed"))
         runCatching { conn.setInterface(chosen.intf) }
 
         // Perform a minimal UVC Probe/Commit for MJPEG.
@@ -6782,7 +7108,7 @@ class LocalHttpServer(
             return Pair(rc, out)
         }
 
-        if (ctrlOut(0x01, probe) < 0) return jsonError(Response.Status.INTERNAL_ERROR, "uvc_probe_set_failed")
+        if (ctrlOut(0x01, probe) < 0) return Pair(null, jsonError(Response.Status.INTERNAL_ERROR, "uvc_probe_set_failed"))
         val (probeRc, probeCur) = ctrlIn(0x01, probe.size)
         val commitData = if (probeRc > 0) {
             // Some cameras update fields in GET_CUR (e.g. max payload size). Use that for COMMIT.
@@ -6792,7 +7118,7 @@ class LocalHttpServer(
         } else {
             probe
         }
-        if (ctrlOut(0x02, commitData) < 0) return jsonError(Response.Status.INTERNAL_ERROR, "uvc_commit_set_failed")
+        if (ctrlOut(0x02, commitData) < 0) return Pair(null, jsonError(Response.Status.INTERNAL_ERROR, "uvc_commit_set_failed"))
         val (_, commitCur) = ctrlIn(0x02, commitData.size)
 
         fun u32leFrom(arr: ByteArray, off: Int): Long? {
@@ -6807,13 +7133,29 @@ class LocalHttpServer(
         val maxPayloadFromCommit = u32leFrom(commitCur, 22) ?: u32leFrom(probeCur, 22)
         val negotiatedMaxPayloadTransferSize = (maxPayloadFromCommit ?: 0L).coerceAtLeast(0L)
 
-        val epAddr = chosen.ep.address
-        val deadline = System.currentTimeMillis() + timeoutMs
-        val frame = java.io.ByteArrayOutputStream(1024 * 256)
-        var started = false
-        var lastFid = -1
+        return Pair(
+            UvcMjpegNegotiation(
+                intf = chosen.intf,
+                ep = chosen.ep,
+                transferMode = transferMode,
+                vsInterface = vsInterface,
+                frame = bestFrame,
+                interval100ns = interval,
+                maxPayloadTransferSize = negotiatedMaxPayloadTransferSize,
+            ),
+            null
+        )
+    }
+
+    /** Rebuilds JPEG frames from UVC payloads (payload header stripped, FID/EOF/ERR followed). */
+    private class UvcMjpegAssembler(private val maxFrameBytes: Int) {
+        class Frame(val jpeg: ByteArray, val hasEoi: Boolean, val eoiAppended: Boolean)
+
+        private val frame = ByteArrayOutputStream(1024 * 256)
+        private var started = false
+        private var lastFid = -1
 
-        fun findSoi(bytes: ByteArray, off: Int, len: Int): Int {
+        private fun findSoi(bytes: ByteArray, off: Int, len: Int): Int {
             val end = (off + len - 1).coerceAtMost(bytes.size - 1)
             var j = off
             while (j + 1 <= end) {
@@ -6823,7 +7165,7 @@ class LocalHttpServer(
             return -1
         }
 
-        fun findEoi(bytes: ByteArray): Int {
+        private fun findEoi(bytes: ByteArray): Int {
             // JPEG EOI marker.
             for (i in bytes.size - 2 downTo 0) {
                 if ((bytes[i].toInt() and 0xFF) == 0xFF && (bytes[i + 1].toInt() and 0xFF) == 0xD9) return i
@@ -6831,7 +7173,7 @@ class LocalHttpServer(
             return -1
         }
 
-        fun tryFinalizeAndWrite(allowAppendEoi: Boolean): Response? {
+        private fun finalizeFrame(allowAppendEoi: Boolean): Frame? {
             if (!(started && frame.size() >= 4)) return null
             val bytes = frame.toByteArray()
             val soi = findSoi(bytes, 0, bytes.size)
@@ -6853,33 +7195,11 @@ class LocalHttpServer(
             } else {
                 return null
             }
-            return try {
-                java.io.FileOutputStream(outFile).use { it.write(final) }
-                jsonResponse(
-                    JSONObject()
-                        .put("status", "ok")
-                        .put("rel_path", relPath)
-                        .put("bytes", final.size)
-                        .put("transfer_mode", transferMode)
-                        .put("jpeg_has_eoi", hasEoi)
-                        .put("jpeg_eoi_appended", (!hasEoi && allowAppendEoi))
-                        .put("vs_interface", vsInterface)
-                        .put("format_index", bestFrame.formatIndex)
-                        .put("frame_index", bestFrame.frameIndex)
-                        .put("width", bestFrame.width)
-                        .put("height", bestFrame.height)
-                        .put("interval_100ns", interval)
-                        .put("endpoint_address", epAddr)
-                        .put("endpoint_type", chosen.ep.type)
-                        .put("interface_id", chosen.intf.id)
-                        .put("alt_setting", chosen.intf.alternateSetting)
-                )
-            } catch (ex: Exception) {
-                jsonError(Response.Status.INTERNAL_ERROR, "write_failed", JSONObject().put("detail", ex.message ?: ""))
-            }
+            return Frame(final, hasEoi, !hasEoi && allowAppendEoi)
         }
 
-        fun processUvcPayload(buf: ByteArray, off: Int, len: Int): Response? {
+        /** Feed one UVC payload (header included). Returns a frame when this payload completed one. */
+        fun feed(buf: ByteArray, off: Int, len: Int): Frame? {
             if (len < 4) return null
             val hlen = buf[off].toInt() and 0xFF
             if (hlen < 2 || hlen > len) return null
@@ -6913,24 +7233,42 @@ class LocalHttpServer(
             }
 
             if (eof) {
-                // Prefer writing a complete JPEG (EOI present). If missing EOI, append it as a fallback.
-                val r = tryFinalizeAndWrite(false) ?: tryFinalizeAndWrite(true)
-                if (r != null) return r
-                // If we still can't finalize, keep collecting until timeout or a new frame boundary.
+                // Prefer a complete JPEG (EOI present). If missing EOI, append it as a fallback.
+                val done = finalizeFrame(false) ?: finalizeFrame(true)
+                if (done != null) {
+                    frame.reset()
+                    started = false
+                    return done
+                }
+                // If we still can't finalize, keep collecting until a new frame boundary.
             }
             return null
         }
+    }
 
-        if (transferMode == "iso") {
+    /**
+     * Read UVC payloads from the negotiated streaming endpoint and pass each one to [onPayload]
+     * until it returns true, [keepGoing] returns false, or transfers fail.
+     * Returns an error code when streaming could not start at all.
+     */
+    private fun readUvcPayloads(
+        conn: UsbDeviceConnection,
+        neg: UvcMjpegNegotiation,
+        payload: JSONObject,
+        keepGoing: () -> Boolean,
+        onPayload: (ByteArray, Int, Int) -> Boolean,
+    ): String? {
+        val epAddr = neg.ep.address
+        if (neg.transferMode == "iso") {
             // Isochronous path: parse KISO blob and feed individual packets as UVC payloads.
             UsbIsoBridge.ensureLoaded()
             val fd = conn.fileDescriptor
-            if (fd < 0) return jsonError(Response.Status.INTERNAL_ERROR, "file_descriptor_unavailable")
-            val packetSize = chosen.ep.maxPacketSize.coerceAtLeast(256)
+            if (fd < 0) return "file_descriptor_unavailable"
+            val packetSize = neg.ep.maxPacketSize.coerceAtLeast(256)
             val numPackets = payload.optInt("num_packets", 48).coerceIn(8, 512)
             val isoTimeout = payload.optInt("iso_timeout_ms", 260).coerceIn(20, 6000)
 
-            while (System.currentTimeMillis() < deadline) {
+            while (keepGoing()) {
                 val blob: ByteArray = try {
                     UsbIsoBridge.isochIn(fd, epAddr, packetSize, numPackets, isoTimeout) ?: break
                 } catch (_: Exception) {
@@ -6961,8 +7299,7 @@ class LocalHttpServer(
                     if (al <= 0) continue
                     if (dataOff + al > metaLen + payloadLen) break
                     if (st == 0) {
-                        val r = processUvcPayload(blob, dataOff, al)
-                        if (r != null) return r
+                        if (onPayload(blob, dataOff, al)) return null
                     }
                     dataOff += al
                 }
@@ -6972,15 +7309,15 @@ class LocalHttpServer(
             val bulkTimeout = payload.optInt("bulk_timeout_ms", 240).coerceIn(20, 6000)
             // For UVC bulk streaming, a single bulkTransfer() may return multiple UVC payload transfers
             // concatenated. Use negotiated dwMaxPayloadTransferSize when available to split.
-            val negotiated = negotiatedMaxPayloadTransferSize.toInt().coerceIn(0, 1024 * 1024)
-            val payloadSize = payload.optInt("bulk_payload_bytes", if (negotiated > 0) negotiated else chosen.ep.maxPacketSize).coerceIn(256, 1024 * 1024)
+            val negotiated = neg.maxPayloadTransferSize.toInt().coerceIn(0, 1024 * 1024)
+            val payloadSize = payload.optInt("bulk_payload_bytes", if (negotiated > 0) negotiated else neg.ep.maxPacketSize).coerceIn(256, 1024 * 1024)
             val readSize = payload.optInt("bulk_read_size", (payloadSize * 4).coerceIn(1024, 256 * 1024)).coerceIn(1024, 1024 * 1024)
             val buf = ByteArray(readSize)
             val q: java.util.ArrayDeque<ByteArray> = java.util.ArrayDeque()
             var qBytes = 0
-            while (System.currentTimeMillis() < deadline) {
+            while (keepGoing()) {
                 val n = try {
-                    conn.bulkTransfer(chosen.ep, buf, buf.size, bulkTimeout)
+                    conn.bulkTransfer(neg.ep, buf, buf.size, bulkTimeout)
                 } catch (_: Exception) {
                     -1
                 }
@@ -6991,32 +7328,400 @@ class LocalHttpServer(
                 qBytes += chunk.size
 
                 while (qBytes >= payloadSize) {
-	                    val payloadBuf = ByteArray(payloadSize)
-	                    var off = 0
-	                    while (off < payloadSize && q.isNotEmpty()) {
-	                        val head = q.peekFirst() ?: break
-	                        val take = kotlin.math.min(payloadSize - off, head.size)
-	                        java.lang.System.arraycopy(head, 0, payloadBuf, off, take)
-	                        off += take
-	                        if (take == head.size) {
-	                            q.removeFirst()
-	                        } else {
-	                            val rest = ByteArray(head.size - take)
-	                            java.lang.System.arraycopy(head, take, rest, 0, rest.size)
-	                            q.removeFirst()
-	                            q.addFirst(rest)
-	                        }
-	                    }
+                    val payloadBuf = ByteArray(payloadSize)
+                    var off = 0
+                    while (off < payloadSize && q.isNotEmpty()) {
+                        val head = q.peekFirst() ?: break
+                        val take = kotlin.math.min(payloadSize - off, head.size)
+                        java.lang.System.arraycopy(head, 0, payloadBuf, off, take)
+                        off += take
+                        if (take == head.size) {
+                            q.removeFirst()
+                        } else {
+                            val rest = ByteArray(head.size - take)
+                            java.lang.System.arraycopy(head, take, rest, 0, rest.size)
+                            q.removeFirst()
+                            q.addFirst(rest)
+                        }
+                    }
                     qBytes -= payloadSize
-                    val r = processUvcPayload(payloadBuf, 0, payloadBuf.size)
-                    if (r != null) return r
+                    if (onPayload(payloadBuf, 0, payloadBuf.size)) return null
                 }
             }
         }
+        return null
+    }
+
+    private fun handleUvcMjpegCapture(payload: JSONObject): Response {
+        val handle = payload.optString("handle", "").trim()
+        if (handle.isBlank()) return jsonError(Response.Status.BAD_REQUEST, "handle_required")
+        val conn = usbConnections[handle] ?: return jsonError(Response.Status.NOT_FOUND, "handle_not_found")
+        val dev = usbDevicesByHandle[handle] ?: return jsonError(Response.Status.NOT_FOUND, "device_not_found")
+        uvcSessionHandles[handle]?.let {
+            return jsonError(Response.Status.CONFLICT, "uvc_session_running", JSONObject().put("session_id", it))
+        }
 
+        val timeoutMs = payload.optLong("timeout_ms", 12000L).coerceIn(1500L, 60000L)
+        val maxFrameBytes = payload.optInt("max_frame_bytes", 6 * 1024 * 1024).coerceIn(64 * 1024, 40 * 1024 * 1024)
+
+        // Output path under user root.
+        val userRoot = File(context.filesDir, "user").also { it.mkdirs() }
+        File(userRoot, "captures").also { it.mkdirs() }
+        val relPath = payload.optString("path", "").trim().ifBlank {
+            "captures/uvc_${System.currentTimeMillis()}.jpg"
+        }
+        val outFile = resolveUserPath(userRoot, relPath) ?: return jsonError(Response.Status.BAD_REQUEST, "invalid_path")
+        outFile.parentFile?.mkdirs()
+
+        val (neg, negError) = negotiateUvcMjpeg(conn, dev, payload)
+        if (neg == null) return negError ?: jsonError(Response.Status.INTERNAL_ERROR, "uvc_negotiation_failed")
+
+        val deadline = System.currentTimeMillis() + timeoutMs
+        val assembler = UvcMjpegAssembler(maxFrameBytes)
+        var result: Response? = null
+        val readError = readUvcPayloads(conn, neg, payload, { System.currentTimeMillis() < deadline }) { buf, off, len ->
+            val done = assembler.feed(buf, off, len) ?: return@readUvcPayloads false
+            result = try {
+                java.io.FileOutputStream(outFile).use { it.write(done.jpeg) }
+                jsonResponse(
+                    JSONObject()
+                        .put("status", "ok")
+                        .put("rel_path", relPath)
+                        .put("bytes", done.jpeg.size)
+                        .put("transfer_mode", neg.transferMode)
+                        .put("jpeg_has_eoi", done.hasEoi)
+                        .put("jpeg_eoi_appended", done.eoiAppended)
+                        .put("vs_interface", neg.vsInterface)
+                        .put("format_index", neg.frame.formatIndex)
+                        .put("frame_index", neg.frame.frameIndex)
+                        .put("width", neg.frame.width)
+                        .put("height", neg.frame.height)
+                        .put("interval_100ns", neg.interval100ns)
+                        .put("endpoint_address", neg.ep.address)
+                        .put("endpoint_type", neg.ep.type)
+                        .put("interface_id", neg.intf.id)
+                        .put("alt_setting", neg.intf.alternateSetting)
+                )
+            } catch (ex: Exception) {
+                jsonError(Response.Status.INTERNAL_ERROR, "write_failed", JSONObject().put("detail", ex.message ?: ""))
+            }
+            true
+        }
+        result?.let { return it }
+        if (readError != null) return jsonError(Response.Status.INTERNAL_ERROR, readError)
         return jsonError(Response.Status.INTERNAL_ERROR, "uvc_capture_timeout")
     }
 
+    /**
+     * Per-client sender with a latest-frame-only policy: a frame the client has not started
+     * receiving yet is replaced by a newer one, so a slow reader never stalls the camera loop.
+     */
+    private class UvcLatestFrameSender(
+        name: String,
+        private val write: (ByteArray) -> Unit,
+        private val closeTransport: () -> Unit,
+        private val sentCounter: java.util.concurrent.atomic.AtomicLong,
+        private val droppedCounter: java.util.concurrent.atomic.AtomicLong,
+        private val onFinished: (UvcLatestFrameSender) -> Unit,
+    ) {
+        private val latest = java.util.concurrent.atomic.AtomicReference<ByteArray?>(null)
+        private val wake = java.util.concurrent.Semaphore(0)
+        private val closed = AtomicBoolean(false)
+        private val thread = Thread { loop() }.also {
+            it.name = name
+            it.isDaemon = true
+        }
+
+        fun start() {
+            thread.start()
+        }
+
+        fun offer(frame: ByteArray) {
+            if (closed.get()) return
+            if (latest.getAndSet(frame) != null) droppedCounter.incrementAndGet()
+            wake.release()
+        }
+
+        fun close() {
+            if (closed.getAndSet(true)) return
+            wake.release()
+            runCatching { closeTransport() }
+        }
+
+        private fun loop() {
+            while (!closed.get()) {
+                val frame = latest.getAndSet(null)
+                if (frame == null) {
+                    runCatching { wake.tryAcquire(500, TimeUnit.MILLISECONDS) }
+                    continue
+                }
+                try {
+                    write(frame)
+                    sentCounter.incrementAndGet()
+                } catch (_: Exception) {
+                    close()
+                }
+            }
+            onFinished(this)
+        }
+    }
+
+    private data class UvcMjpegSessionState(
+        val id: String,
+        val handle: String,
+        val neg: UvcMjpegNegotiation,
+        val tcpPort: Int,
+        val serverSocket: ServerSocket,
+        val stop: AtomicBoolean,
+        val senders: CopyOnWriteArrayList<UvcLatestFrameSender>,
+        val wsSenders: ConcurrentHashMap<NanoWSD.WebSocket, UvcLatestFrameSender>,
+        val framesCaptured: java.util.concurrent.atomic.AtomicLong,
+        val framesSent: java.util.concurrent.atomic.AtomicLong,
+        val framesDropped: java.util.concurrent.atomic.AtomicLong,
+        val startedAtMs: Long,
+        val acceptThread: Thread,
+        val ioThread: Thread,
+    ) {
+        @Volatile var lastFrameAtMs: Long = 0L
+        @Volatile var lastFrameBytes: Int = 0
+        @Volatile var error: String = ""
+    }
+
+    private fun newUvcFrameSender(
+        st: UvcMjpegSessionState,
+        name: String,
+        write: (ByteArray) -> Unit,
+        closeTransport: () -> Unit,
+    ): UvcLatestFrameSender {
+        return UvcLatestFrameSender(name, write, closeTransport, st.framesSent, st.framesDropped) { sender ->
+            st.senders.remove(sender)
+            st.wsSenders.entries.removeIf { it.value === sender }
+        }
+    }
+
+    private fun publishUvcFrame(st: UvcMjpegSessionState, frame: UvcMjpegAssembler.Frame) {
+        // [u32le seq][u32le flags][u64le capture_unix_us] + JPEG bytes.
+        val seq = st.framesCaptured.incrementAndGet()
+        val nowMs = System.currentTimeMillis()
+        val captureUs = nowMs * 1000L
+        val msg = ByteArray(UVC_SESSION_FRAME_HEADER_BYTES + frame.jpeg.size)
+        putU32le(msg, 0, seq and 0xFFFFFFFFL)
+        putU32le(msg, 4, (if (frame.hasEoi) 0x1L else 0L) or (if (frame.eoiAppended) 0x2L else 0L))
+        putU32le(msg, 8, captureUs and 0xFFFFFFFFL)
+        putU32le(msg, 12, captureUs ushr 32)
+        java.lang.System.arraycopy(frame.jpeg, 0, msg, UVC_SESSION_FRAME_HEADER_BYTES, frame.jpeg.size)
+        st.lastFrameAtMs = nowMs
+        st.lastFrameBytes = frame.jpeg.size
+        for (s in st.senders) s.offer(msg)
+        for (s in st.wsSenders.values) s.offer(msg)
+    }
+
+    private fun uvcSessionJson(st: UvcMjpegSessionState): JSONObject {
+        val elapsedS = ((System.currentTimeMillis() - st.startedAtMs).coerceAtLeast(1L)) / 1000.0
+        return JSONObject()
+            .put("session_id", st.id)
+            .put("handle", st.handle)
+            .put("running", !st.stop.get())
+            .put("error", st.error)
+            .put("transfer_mode", st.neg.transferMode)
+            .put("vs_interface", st.neg.vsInterface)
+            .put("format_index", st.neg.frame.formatIndex)
+            .put("frame_index", st.neg.frame.frameIndex)
+            .put("width", st.neg.frame.width)
+            .put("height", st.neg.frame.height)
+            .put("interval_100ns", st.neg.interval100ns)
+            .put("tcp_host", "127.0.0.1")
+            .put("tcp_port", st.tcpPort)
+            .put("ws_path", "/ws/uvc/session/${st.id}")
+            .put("frame_type", UVC_SESSION_FRAME_TYPE)
+            .put("frame_header_bytes", UVC_SESSION_FRAME_HEADER_BYTES)
+            .put("frames_captured", st.framesCaptured.get())
+            .put("frames_sent", st.framesSent.get())
+            .put("frames_dropped", st.framesDropped.get())
+            .put("capture_fps", st.framesCaptured.get() / elapsedS)
+            .put("last_frame_at_ms", st.lastFrameAtMs)
+            .put("last_frame_bytes", st.lastFrameBytes)
+            .put("clients_tcp", st.senders.size)
+            .put("clients_ws", st.wsSenders.size)
+    }
+
+    private fun handleUvcMjpegSessionStart(payload: JSONObject): Response {
+        val handle = payload.optString("handle", "").trim()
+        if (handle.isBlank()) return jsonError(Response.Status.BAD_REQUEST, "handle_required")
+        val conn = usbConnections[handle] ?: return jsonError(Response.Status.NOT_FOUND, "handle_not_found")
+        val dev = usbDevicesByHandle[handle] ?: return jsonError(Response.Status.NOT_FOUND, "device_not_found")
+        val maxFrameBytes = payload.optInt("max_frame_bytes", 6 * 1024 * 1024).coerceIn(64 * 1024, 40 * 1024 * 1024)
+        val id = java.util.UUID.randomUUID().toString()
+        uvcSessionHandles.putIfAbsent(handle, id)?.let {
+            return jsonError(Response.Status.CONFLICT, "uvc_session_running", JSONObject().put("session_id", it))
+        }
+
+        val (neg, negError) = try {
+            negotiateUvcMjpeg(conn, dev, payload)
+        } catch (ex: Exception) {
+            Pair(null, jsonError(Response.Status.INTERNAL_ERROR, "uvc_negotiation_failed", JSONObject().put("detail", ex.message ?: "")))
+        }
+        if (neg == null) {
+            uvcSessionHandles.remove(handle, id)
+            return negError ?: jsonError(Response.Status.INTERNAL_ERROR, "uvc_negotiation_failed")
+        }
+        // The VideoStreaming interface is claimed and committed from here on: release it if the
+        // session cannot be set up.
+        var serverSocket: ServerSocket? = null
+        return try {
+            serverSocket = ServerSocket(0, 16, InetAddress.getByName("127.0.0.1"))
+            startUvcMjpegSession(id, handle, conn, neg, payload, maxFrameBytes, serverSocket)
+        } catch (ex: Exception) {
+            runCatching { serverSocket?.close() }
+            runCatching { conn.releaseInterface(neg.intf) }
+            uvcSessionHandles.remove(handle, id)
+            jsonError(Response.Status.INTERNAL_ERROR, "uvc_session_start_failed", JSONObject().put("detail", ex.message ?: ""))
+        }
+    }
+
+    private fun startUvcMjpegSession(
+        id: String,
+        handle: String,
+        conn: UsbDeviceConnection,
+        neg: UvcMjpegNegotiation,
+        payload: JSONObject,
+        maxFrameBytes: Int,
+        serverSocket: ServerSocket,
+    ): Response {
+        val stop = AtomicBoolean(false)
+        serverSocket.soTimeout = 600
+
+        val acceptThread = Thread {
+            while (!stop.get()) {
+                try {
+                    val s = serverSocket.accept()
+                    s.tcpNoDelay = true
+                    s.soTimeout = 0
+                    val st = uvcSessions[id]
+                    if (st == null) {
+                        runCatching { s.close() }
+                        continue
+                    }
+                    val out = java.io.BufferedOutputStream(s.getOutputStream(), 64 * 1024)
+                    val sender = newUvcFrameSender(
+                        st,
+                        "uvc-session-tcp-$id",
+                        { msg ->
+                            writeFrameHeader(out, UVC_SESSION_FRAME_TYPE, msg.size)
+                            out.write(msg)
+                            out.flush()
+                        },
+                        { s.close() }
+                    )
+                    st.senders.add(sender)
+                    sender.start()
+                } catch (_: java.net.SocketTimeoutException) {
+                    // loop
+                } catch (_: Exception) {
+                    if (!stop.get()) {
+                        // Something went wrong; stop accepting.
+                        stop.set(true)
+                    }
+                }
+            }
+        }.also { it.name = "uvc-session-accept-$id" }
+
+        val ioThread = Thread {
+            val assembler = UvcMjpegAssembler(maxFrameBytes)
+            val readError = try {
+                readUvcPayloads(conn, neg, payload, { !stop.get() }) { buf, off, len ->
+                    val done = assembler.feed(buf, off, len)
+                    if (done != null) {
+                        val st = uvcSessions[id]
+                        if (st != null) publishUvcFrame(st, done)
+                    }
+                    false
+                }
+            } catch (ex: Exception) {
+                ex.message ?: "uvc_session_read_failed"
+            }
+            if (!stop.get()) {
+                // Transfers stopped on their own (device gone, URB failure): tear the session down so
+                // the handle can start a new one; status and stop still report the error.
+                val st = uvcSessions.remove(id)
+                if (st != null) {
+                    st.error = readError ?: "uvc_stream_ended"
+                    uvcEndedSessions[st.handle] = closeUvcSession(st, joinIo = false)
+                } else {
+                    stop.set(true)
+                }
+            }
+        }.also { it.name = "uvc-session-io-$id" }
+
+        val state = UvcMjpegSessionState(
+            id = id,
+            handle = handle,
+            neg = neg,
+            tcpPort = serverSocket.localPort,
+            serverSocket = serverSocket,
+            stop = stop,
+            senders = CopyOnWriteArrayList(),
+            wsSenders = ConcurrentHashMap(),
+            framesCaptured = java.util.concurrent.atomic.AtomicLong(0),
+            framesSent = java.util.concurrent.atomic.AtomicLong(0),
+            framesDropped = java.util.concurrent.atomic.AtomicLong(0),
+            startedAtMs = System.currentTimeMillis(),
+            acceptThread = acceptThread,
+            ioThread = ioThread,
+        )
+        uvcEndedSessions.remove(handle)
+        uvcSessions[id] = state
+        try {
+            acceptThread.start()
+            ioThread.start()
+        } catch (ex: Exception) {
+            uvcSessions.remove(id)
+            stop.set(true)
+            throw ex
+        }
+
+        return jsonResponse(uvcSessionJson(state).put("status", "ok"))
+    }
+
+    private fun handleUvcMjpegSessionStop(payload: JSONObject): Response {
+        val id = payload.optString("session_id", "").trim()
+        if (id.isBlank()) return jsonError(Response.Status.BAD_REQUEST, "session_id_required")
+        val st = uvcSessions.remove(id)
+        if (st == null) {
+            // Already ended on its own: hand back its final status once.
+            val ended = uvcEndedSessions.entries.firstOrNull { it.value.optString("session_id") == id }
+                ?: return jsonError(Response.Status.NOT_FOUND, "session_not_found")
+            uvcEndedSessions.remove(ended.key)
+            return jsonResponse(JSONObject(ended.value.toString()).put("status", "ok").put("stopped", true))
+        }
+        val summary = closeUvcSession(st, joinIo = true)
+        return jsonResponse(summary.put("status", "ok").put("stopped", true))
+    }
+
+    /** Stops a session already removed from uvcSessions and releases everything it holds. */
+    private fun closeUvcSession(st: UvcMjpegSessionState, joinIo: Boolean): JSONObject {
+        st.stop.set(true)
+        runCatching { st.serverSocket.close() }
+        runCatching { st.acceptThread.join(800) }
+        if (joinIo) runCatching { st.ioThread.join(800) }
+        for (s in st.senders) s.close()
+        for (s in st.wsSenders.values) s.close()
+        usbConnections[st.handle]?.let { conn -> runCatching { conn.releaseInterface(st.neg.intf) } }
+        uvcSessionHandles.remove(st.handle, st.id)
+        val summary = uvcSessionJson(st)
+        st.senders.clear()
+        st.wsSenders.clear()
+        return summary
+    }
+
+    private fun handleUvcMjpegSessionStatus(): Response {
+        val arr = org.json.JSONArray()
+        uvcSessions.values.sortedBy { it.id }.forEach { st -> arr.put(uvcSessionJson(st)) }
+        val ended = org.json.JSONArray()
+        uvcEndedSessions.values.forEach { ended.put(it) }
+        return jsonResponse(JSONObject().put("status", "ok").put("items", arr).put("ended", ended))
+    }
+
     override fun openWebSocket(handshake: IHTTPSession): NanoWSD.WebSocket {
         val uri = handshake.uri ?: "/"
         val prefix = "/ws/usb/stream/"
@@ -7048,6 +7753,49 @@ class LocalHttpServer(
             }
         }
 
+        val uvcPrefix = "/ws/uvc/session/"
+        if (uri.startsWith(uvcPrefix)) {
+            val sessionId = uri.removePrefix(uvcPrefix).trim()
+            return object : NanoWSD.WebSocket(handshake) {
+                override fun onOpen() {
+                    val st = uvcSessions[sessionId]
+                    if (st == null) {
+                        runCatching { close(NanoWSD.WebSocketFrame.CloseCode.PolicyViolation, "session_not_found", false) }
+                        return
+                    }
+                    val ws = this
+                    // WS clients get one binary message per frame: [u8 type] + payload.
+                    val sender = newUvcFrameSender(
+                        st,
+                        "uvc-session-ws-$sessionId",
+                        { msg ->
+                            val out = ByteArray(1 + msg.size)
+                            out[0] = UVC_SESSION_FRAME_TYPE.toByte()
+                            java.lang.System.arraycopy(msg, 0, out, 1, msg.size)
+                            ws.send(out)
+                        },
+                        {}
+                    )
+                    st.wsSenders[this] = sender
+                    sender.start()
+                }
+
+                override fun onClose(code: NanoWSD.WebSocketFrame.CloseCode?, reason: String?, initiatedByRemote: Boolean) {
+                    uvcSessions[sessionId]?.wsSenders?.remove(this)?.close()
+                }
+
+                override fun onMessage(message: NanoWSD.WebSocketFrame?) {
+                    // Ignore; this is a server->client stream.
+                }
+
+                override fun onPong(pong: NanoWSD.WebSocketFrame?) {}
+
+                override fun onException(exception: java.io.IOException?) {
+                    uvcSessions[sessionId]?.wsSenders?.remove(this)?.close()
+                }
+            }
+        }
+
         val serialPrefix = "/ws/serial/"
         if (uri.startsWith(serialPrefix)) {
             val serialHandle = uri.removePrefix(serialPrefix).trim()
@@ -7254,6 +8002,11 @@ class LocalHttpServer(
             val timestamp = (params["timestamp"]?.firstOrNull() ?: "mono").trim()
             val backpressure = (params["backpressure"]?.firstOrNull() ?: "drop_old").trim()
             val maxQueue = (params["max_queue"]?.firstOrNull() ?: "4096").toIntOrNull()?.coerceIn(64, 50_000) ?: 4096
+            val format = (params["format"]?.firstOrNull() ?: "json").trim()
+            val batchMs = (params["batch_ms"]?.firstOrNull() ?: "")
+                .toIntOrNull()
+                ?.coerceIn(SensorsStreamManager.PACKED_BATCH_MS_MIN, SensorsStreamManager.PACKED_BATCH_MS_MAX)
+                ?: SensorsStreamManager.PACKED_BATCH_MS_DEFAULT
             val permissionId = (params["permission_id"]?.firstOrNull() ?: "").trim()
             val identityQ = (params["identity"]?.firstOrNull() ?: "").trim()
 
@@ -7293,6 +8046,8 @@ class LocalHttpServer(
                             timestamp = timestamp,
                             bufferMax = maxQueue,
                             backpressureMode = backpressure,
+                            format = format,
+                            batchMs = batchMs,
                         )
                     )
                     if (started["status"] != "ok") {
@@ -7782,17 +8537,131 @@ class LocalHttpServer(
         val w = payload.optInt("width", 0)
         val h = payload.optInt("height", 0)
         val b64 = payload.optString("rgba_b64", "")
+        val frameId = payload.optString("frame_id", "").trim()
         if (w <= 0 || h <= 0) return jsonError(Response.Status.BAD_REQUEST, "invalid_size")
         if (b64.isBlank()) return jsonError(Response.Status.BAD_REQUEST, "rgba_b64_required")
+        if (frameId.length > VISION_FRAME_ID_MAX_CHARS) return jsonError(Response.Status.BAD_REQUEST, "invalid_frame_id")
         return try {
             val frame = VisionImageIo.decodeRgbaB64(w, h, b64)
-            val id = visionFrames.put(frame)
+            val id = visionFrames.put(frame, frameId)
             jsonResponse(JSONObject().put("status", "ok").put("frame_id", id).put("stats", JSONObject(visionFrames.stats())))
         } catch (ex: Exception) {
             jsonError(Response.Status.BAD_REQUEST, "frame_put_failed", JSONObject().put("detail", ex.message ?: ""))
         }
     }
 
+    /**
+     * POST /vision/frame/put with `Content-Type: application/octet-stream`: the body is the raw
+     * RGBA8888 pixels, sizes come from headers (see [readRawRgbaFrame]). `X-Methings-Frame-Id`
+     * replaces an existing frame instead of allocating a new id.
+     */
+    private fun handleVisionFramePutRaw(session: IHTTPSession): Response {
+        val payload = visionRawPayload(session)
+        if (!ensureVisionPermission(payload)) return rejectRawBody(forbidden("permission_required"))
+        val (frame, err) = readRawRgbaFrame(session)
+        if (err != null) return err
+        val frameId = (session.headers["x-methings-frame-id"] ?: "").trim()
+        if (frameId.length > VISION_FRAME_ID_MAX_CHARS) return jsonError(Response.Status.BAD_REQUEST, "invalid_frame_id")
+        val id = visionFrames.put(frame!!, frameId)
+        return jsonResponse(JSONObject().put("status", "ok").put("frame_id", id).put("stats", JSONObject(visionFrames.stats())))
+    }
+
+    /**
+     * POST /vision/run with `Content-Type: application/octet-stream`: runs [handleVisionRun] on
+     * the raw RGBA8888 body without storing it. `X-Methings-Model` names the model;
+     * `X-Methings-Normalize` (true/false), `X-Methings-Mean` and `X-Methings-Std` ("r,g,b")
+     * are optional.
+     */
+    private fun handleVisionRunRaw(session: IHTTPSession): Response {
+        val payload = visionRawPayload(session)
+        if (!ensureVisionPermission(payload)) return rejectRawBody(forbidden("permission_required"))
+        val (frame, err) = readRawRgbaFrame(session)
+        if (err != null) return err
+        val model = payload.optString("model", "").trim()
+        if (model.isBlank()) return jsonError(Response.Status.BAD_REQUEST, "model_required")
+        return runVisionModel(model, frame!!, payload)
+    }
+
+    private fun visionRawPayload(session: IHTTPSession): JSONObject {
+        val headers = session.headers
+        val params = session.parameters
+        fun header(name: String): String = (headers[name] ?: "").trim()
+        fun floats(raw: String): org.json.JSONArray? {
+            if (raw.isBlank()) return null
+            return org.json.JSONArray().also { arr -> raw.split(',').forEach { arr.put(it.trim().toDoubleOrNull() ?: 0.0) } }
+        }
+        val payload = JSONObject()
+        val pid = header("x-methings-permission-id").ifBlank { (params["permission_id"]?.firstOrNull() ?: "").trim() }
+        if (pid.isNotBlank()) payload.put("permission_id", pid)
+        if (header("x-methings-model").isNotBlank()) payload.put("model", header("x-methings-model"))
+        if (header("x-methings-normalize").isNotBlank()) payload.put("normalize", header("x-methings-normalize").lowercase(Locale.US) != "false")
+        floats(header("x-methings-mean"))?.let { payload.put("mean", it) }
+        floats(header("x-methings-std"))?.let { payload.put("std", it) }
+        return payload
+    }
+
+    /**
+     * Reads an `application/octet-stream` RGBA8888 body directly into a frame buffer.
+     * `X-Methings-Width` / `X-Methings-Height` give the size and Content-Length must equal
+     * width * height * 4. Bodies with a bad size are drained (or the connection is closed when
+     * they are too large to drain) so the next keep-alive request starts clean.
+     */
+    private fun readRawRgbaFrame(session: IHTTPSession): Pair<RgbaFrame?, Response?> {
+        val headers = session.headers
+        val w = (headers["x-methings-width"] ?: "").trim().toIntOrNull() ?: 0
+        val h = (headers["x-methings-height"] ?: "").trim().toIntOrNull() ?: 0
+        val len = (headers["content-length"] ?: "").trim().toLongOrNull() ?: -1L
+        if (len < 0 || len > VISION_RAW_FRAME_MAX_BYTES) {
+            val res = jsonError(
+                Response.Status.BAD_REQUEST,
+                if (len < 0) "content_length_required" else "frame_too_large",
+                JSONObject().put("max_bytes", VISION_RAW_FRAME_MAX_BYTES)
+            )
+            res.addHeader("Connection", "close")
+            return Pair(null, res)
+        }
+        val expected = w.toLong() * h.toLong() * 4L
+        if (w <= 0 || h <= 0 || len != expected) {
+            drainBody(session.inputStream, len)
+            return Pair(
+                null,
+                jsonError(
+                    Response.Status.BAD_REQUEST,
+                    if (w <= 0 || h <= 0) "invalid_size" else "invalid_rgba_length",
+                    JSONObject().put("expected_bytes", expected).put("content_length", len)
+                )
+            )
+        }
+        val rgba = readExactly(session.inputStream, len.toInt())
+        if (rgba.size != len.toInt()) return Pair(null, jsonError(Response.Status.BAD_REQUEST, "body_truncated"))
+        return Pair(RgbaFrame(w, h, rgba), null)
+    }
+
+    /** Refuses a raw body without reading it; closing the connection keeps keep-alive in sync. */
+    private fun rejectRawBody(res: Response): Response {
+        res.addHeader("Connection", "close")
+        return res
+    }
+
+    private fun drainBody(input: java.io.InputStream, length: Long) {
+        val buf = ByteArray(16 * 1024)
+        var left = length
+        while (left > 0) {
+            val n = input.read(buf, 0, minOf(buf.size.toLong(), left).toInt())
+            if (n <= 0) break
+            left -= n
+        }
+    }
+
+    private fun isRawBodyRoute(uri: String): Boolean {
+        return uri.trimEnd('/') in RAW_BODY_ROUTES || RAW_BODY_PREFIXES.any { uri.startsWith(it) }
+    }
+
+    private fun isOctetStreamBody(session: IHTTPSession): Boolean {
+        val ct = (session.headers["content-type"] ?: "").trim().lowercase(Locale.US)
+        return ct.startsWith("application/octet-stream")
+    }
+
     private fun handleVisionFrameGet(payload: JSONObject): Response {
         if (!ensureVisionPermission(payload)) return forbidden("permission_required")
         val id = payload.optString("frame_id", "").trim()
@@ -7894,7 +8763,10 @@ class LocalHttpServer(
                 return jsonError(Response.Status.BAD_REQUEST, "invalid_rgba", JSONObject().put("detail", ex.message ?: ""))
             }
         } ?: return jsonError(Response.Status.NOT_FOUND, "frame_not_found")
+        return runVisionModel(model, frame, payload)
+    }
 
+    private fun runVisionModel(model: String, frame: RgbaFrame, payload: JSONObject): Response {
         val normalize = payload.optBoolean("normalize", true)
         val meanArr = payload.optJSONArray("mean")
         val stdArr = payload.optJSONArray("std")
@@ -17622,6 +18494,15 @@ class LocalHttpServer(
         private const val HOST = "127.0.0.1"
         private const val PORT = 33389
         private const val ME_SYNC_LAN_PORT = 8766
+        private const val DEVICE_API_BATCH_MAX_ACTIONS = 64
+        private val DEVICE_API_HTTP_BLOCKED_ACTIONS = setOf("brain.memory.set")
+        private const val UVC_SESSION_FRAME_TYPE = 3
+        private const val UVC_SESSION_FRAME_HEADER_BYTES = 16
+        private val RAW_BODY_ROUTES = setOf("/vision/frame/put", "/vision/run")
+        private val RAW_BODY_PREFIXES = listOf("/user/write/")
+        private const val USER_WRITE_BLOCK_BYTES = 64 * 1024
+        private const val VISION_RAW_FRAME_MAX_BYTES = 64L * 1024L * 1024L
+        private const val VISION_FRAME_ID_MAX_CHARS = 128
         private const val ME_ME_LAN_PORT = 8767
         private const val ME_ME_BLE_MAX_MESSAGE_BYTES = 1_000_000
         private const val ME_ME_BLE_PREFERRED_MAX_BYTES_DEFAULT = 512 * 1024
@@ -353,8 +353,16 @@ object ToolDefinitions {
         "mcu.micropython.exec" to ActionSpec("POST", "/mcu/micropython/exec", true),
         "mcu.micropython.write_file" to ActionSpec("POST", "/mcu/micropython/write_file", true),
         "mcu.micropython.soft_reset" to ActionSpec("POST", "/mcu/micropython/soft_reset", true),
+        "mcu.micropython.session.open" to ActionSpec("POST", "/mcu/micropython/session/open", true),
+        "mcu.micropython.session.exec" to ActionSpec("POST", "/mcu/micropython/session/exec", true),
+        "mcu.micropython.session.close" to ActionSpec("POST", "/mcu/micropython/session/close", true),
+        "mcu.micropython.session.list" to ActionSpec("GET", "/mcu/micropython/session/list", false),
         "serial.exchange" to ActionSpec("POST", "/serial/exchange", true),
+        "serial.exchange.script" to ActionSpec("POST", "/serial/exchange/script", true),
         "uvc.mjpeg.capture" to ActionSpec("POST", "/uvc/mjpeg/capture", true),
+        "uvc.mjpeg.session.start" to ActionSpec("POST", "/uvc/mjpeg/session/start", true),
+        "uvc.mjpeg.session.stop" to ActionSpec("POST", "/uvc/mjpeg/session/stop", true),
+        "uvc.mjpeg.session.status" to ActionSpec("GET", "/uvc/mjpeg/session/status", true),
         "uvc.diagnose" to ActionSpec("POST", "/uvc/diagnose", true),
         "vision.model.load" to ActionSpec("POST", "/vision/model/load", true),
         "vision.model.unload" to ActionSpec("POST", "/vision/model/unload", true),
@@ -456,8 +464,13 @@ object ToolDefinitions {
         "mcu.micropython.exec" to 120.0,
         "mcu.micropython.write_file" to 240.0,
         "mcu.micropython.soft_reset" to 30.0,
+        "mcu.micropython.session.open" to 30.0,
+        "mcu.micropython.session.exec" to 120.0,
         "serial.exchange" to 30.0,
+        "serial.exchange.script" to 300.0,
         "uvc.mjpeg.capture" to 45.0,
+        "uvc.mjpeg.session.start" to 25.0,
+        "uvc.mjpeg.session.stop" to 25.0,
         "screen.keep_on" to 12.0,
         "media.audio.play" to 120.0,
         "media.audio.status" to 20.0,
@@ -67,6 +67,7 @@ class CoreApiDispatcher(
             "serial.write" -> serial.write(ctx, params)
             "serial.lines" -> serial.lines(ctx, params)
             "serial.exchange" -> serial.exchange(ctx, params)
+            "serial.exchange.script" -> serial.exchangeScript(ctx, params)
 
             // ---- MCU ----
             "mcu.models" -> mcu.models(ctx, params)
@@ -80,6 +81,10 @@ class CoreApiDispatcher(
             "mcu.micropython.exec" -> mcu.micropythonExec(ctx, params)
             "mcu.micropython.write_file" -> mcu.micropythonWriteFile(ctx, params)
             "mcu.micropython.soft_reset" -> mcu.micropythonSoftReset(ctx, params)
+            "mcu.micropython.session.open" -> mcu.micropythonSessionOpen(ctx, params)
+            "mcu.micropython.session.exec" -> mcu.micropythonSessionExec(ctx, params)
+            "mcu.micropython.session.close" -> mcu.micropythonSessionClose(ctx, params)
+            "mcu.micropython.session.list" -> mcu.micropythonSessionList(ctx, params)
 
             // ---- Fallback (actions not yet extracted) ----
             else -> {
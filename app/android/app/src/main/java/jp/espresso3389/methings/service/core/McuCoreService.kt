@@ -39,6 +39,7 @@ private data class McuFlashSegment(
     val relPath: String,
     val offset: Int,
     val bytes: ByteArray,
+    val fileOffset: Int = 0,
 )
 
 private data class MicroPythonSessionLease(
@@ -56,6 +57,22 @@ private data class MicroPythonRawExecResult(
 
 private class MicroPythonRawPromptException(message: String) : IllegalStateException(message)
 
+/** A serial port held in raw REPL across `mcu.micropython.session.exec` calls. */
+private class MicroPythonReplSession(
+    val id: String,
+    val lease: MicroPythonSessionLease,
+    @Volatile var rawPaste: Boolean,
+    val openedAtMs: Long,
+    val idleTimeoutMs: Long,
+) {
+    @Volatile var lastUsedMs: Long = openedAtMs
+    @Volatile var execCount: Long = 0L
+    /** Execs running right now; the idle reaper leaves the session alone while this is > 0. */
+    val active = java.util.concurrent.atomic.AtomicInteger(0)
+    /** Bytes read from the port past the last delimiter, consumed by the next read. */
+    var pending: ByteArray = ByteArray(0)
+}
+
 /**
  * File-system access callbacks — provided by LocalHttpServer.
  * Keeps MCU service decoupled from the path resolution scheme.
@@ -82,6 +99,26 @@ class McuCoreService(
 ) {
     private companion object {
         const val TAG = "McuCoreService"
+        val RAW_REPL_BANNER = "raw REPL; CTRL-B to exit\r\n>".toByteArray(Charsets.US_ASCII)
+        val RAW_REPL_BANNER_TAIL = "w REPL; CTRL-B to exit\r\n>".toByteArray(Charsets.US_ASCII)
+        const val MICROPYTHON_SESSION_MAX_SNIPPETS = 64
+        const val MICROPYTHON_SESSION_IDLE_TIMEOUT_MS = 10L * 60 * 1000 // 10 minutes
+        const val MICROPYTHON_SESSION_REAP_INTERVAL_S = 30L
+        // Plain raw REPL has no flow control; pace writes like pyboard.py does.
+        const val RAW_REPL_WRITE_CHUNK = 256
+    }
+
+    private val micropythonSessions = java.util.concurrent.ConcurrentHashMap<String, MicroPythonReplSession>()
+    private val micropythonSessionReaper = java.util.concurrent.Executors.newSingleThreadScheduledExecutor { r ->
+        Thread(r, "micropython-session-reaper").apply { isDaemon = true }
+    }
+
+    init {
+        micropythonSessionReaper.scheduleWithFixedDelay({
+            try { reapIdleMicroPythonSessions() } catch (e: Exception) {
+                Log.w(TAG, "MicroPython session reaper error", e)
+            }
+        }, MICROPYTHON_SESSION_REAP_INTERVAL_S, MICROPYTHON_SESSION_REAP_INTERVAL_S, java.util.concurrent.TimeUnit.SECONDS)
     }
 
     // ---- Public API -----------------------------------------------------------
@@ -152,6 +189,8 @@ class McuCoreService(
         val reboot = params.optBoolean("reboot", true)
         val autoEnterBootloader = params.optBoolean("auto_enter_bootloader", true)
         val debug = params.optBoolean("debug", false)
+        val compress = params.optBoolean("compress", false)
+        val skipUnchanged = params.optBoolean("skip_unchanged", false)
 
         val payload = JSONObject(params.filterValues { it != null }.mapValues { (_, v) ->
             when (v) { is Map<*, *> -> JSONObject(v as Map<String, Any?>); is List<*> -> JSONArray(v); else -> v }
@@ -250,12 +289,41 @@ class McuCoreService(
                     throw ex
                 }
                 var totalBlocks = 0
+                var skippedCount = 0
+                var bytesSkipped = 0L
+                var lastSkipped = false
                 val written = mutableListOf<Map<String, Any?>>()
                 for ((idx, seg) in segments.withIndex()) {
                     val isLast = idx == segments.lastIndex
                     val segStart = System.currentTimeMillis()
+                    val md5 = md5Hex(seg.bytes)
+                    if (skipUnchanged) {
+                        // A failed MD5 query just means the segment is written as usual.
+                        val onDevice = runCatching { sessionCtx.flashMd5(seg.offset, seg.bytes.size) }.getOrNull()
+                        if (onDevice == md5) {
+                            skippedCount += 1
+                            bytesSkipped += seg.bytes.size
+                            lastSkipped = true
+                            written.add(mapOf("path" to seg.relPath, "offset" to seg.offset,
+                                "file_offset" to seg.fileOffset, "size" to seg.bytes.size, "md5" to md5,
+                                "skipped" to true, "blocks_written" to 0, "block_size" to 0))
+                            if (debug) {
+                                flashDebug?.put(JSONObject()
+                                    .put("segment_index", idx).put("path", seg.relPath).put("offset", seg.offset)
+                                    .put("ok", true).put("stage", "md5_unchanged")
+                                    .put("elapsed_ms", (System.currentTimeMillis() - segStart).coerceAtLeast(0L)))
+                            }
+                            continue
+                        }
+                    }
+                    lastSkipped = false
+                    val wireBefore = sessionCtx.bytesOnWire
                     val r = try {
-                        sessionCtx.flashImage(seg.bytes, seg.offset, reboot = reboot && isLast)
+                        if (compress) {
+                            sessionCtx.flashImageDeflated(seg.bytes, seg.offset, reboot = reboot && isLast)
+                        } else {
+                            sessionCtx.flashImage(seg.bytes, seg.offset, reboot = reboot && isLast)
+                        }
                     } catch (ex: EspFlashStageException) {
                         if (debug) {
                             flashDebug?.put(JSONObject()
@@ -277,8 +345,10 @@ class McuCoreService(
                     }
                     totalBlocks += r.blocksWritten
                     written.add(mapOf("path" to seg.relPath, "offset" to seg.offset,
-                        "size" to seg.bytes.size, "md5" to md5Hex(seg.bytes),
-                        "blocks_written" to r.blocksWritten, "block_size" to r.blockSize))
+                        "file_offset" to seg.fileOffset, "size" to seg.bytes.size, "md5" to md5,
+                        "skipped" to false, "blocks_written" to r.blocksWritten, "block_size" to r.blockSize,
+                        "compressed_size" to r.compressedSize,
+                        "wire_bytes" to (sessionCtx.bytesOnWire - wireBefore)))
                     if (debug) {
                         flashDebug?.put(JSONObject()
                             .put("segment_index", idx).put("path", seg.relPath).put("offset", seg.offset)
@@ -287,10 +357,15 @@ class McuCoreService(
                             .put("elapsed_ms", (System.currentTimeMillis() - segStart).coerceAtLeast(0L)))
                     }
                 }
+                if (reboot && lastSkipped) {
+                    runCatching { sessionCtx.setModemLines(dtr = false, rts = false) }
+                }
                 val elapsed = (System.currentTimeMillis() - t0).coerceAtLeast(0L)
                 val result = mutableMapOf<String, Any?>(
                     "status" to "ok", "model" to model, "handle" to handle,
                     "segment_count" to segments.size, "segments" to written,
+                    "compress" to compress, "segments_skipped" to skippedCount, "bytes_skipped" to bytesSkipped,
+                    "bytes_on_wire" to sessionCtx.bytesOnWire,
                     "interface_id" to selection.interfaceObj.id,
                     "in_endpoint_address" to selection.inEndpoint.address,
                     "out_endpoint_address" to selection.outEndpoint.address,
@@ -786,6 +861,152 @@ class McuCoreService(
         }
     }
 
+    // ---- MicroPython sessions ---------------------------------------------------
+
+    /**
+     * Enters raw REPL once and keeps the serial port there, so later
+     * `mcu.micropython.session.exec` calls skip the Ctrl-C/Ctrl-A handshake and prompt wait.
+     * Uses raw-paste mode (flow-controlled, no per-chunk pacing) when the firmware supports it.
+     */
+    fun micropythonSessionOpen(ctx: ApiContext, params: Map<String, Any?>): Map<String, Any?> {
+        val perm = permission.ensurePermission(ctx, params, "device.usb", "usb", "MicroPython session open")
+        if (perm is PermissionResult.Pending) return perm.response
+
+        // A session left idle on this port would otherwise still hold it.
+        reapIdleMicroPythonSessions()
+        val lease = acquireMicroPythonSession(params)
+            ?: return CoreApiUtils.error("micropython_session_failed", 500, micropythonFailureExtras(params))
+        val session = MicroPythonReplSession(
+            id = UUID.randomUUID().toString(),
+            lease = lease,
+            rawPaste = params.optBoolean("raw_paste", true),
+            openedAtMs = System.currentTimeMillis(),
+            idleTimeoutMs = params.optLong("idle_timeout_ms", MICROPYTHON_SESSION_IDLE_TIMEOUT_MS)
+                .coerceIn(10_000L, 24L * 60 * 60 * 1000),
+        )
+        return try {
+            synchronized(lease.serial.lock) {
+                enterRawRepl(session, params.optInt("settle_ms", 100).coerceIn(0, 2_000))
+                if (session.rawPaste) {
+                    // An empty program tells us whether raw-paste is available.
+                    session.rawPaste = execRawPaste(session, ByteArray(0), System.currentTimeMillis() + 3_000L, null) != null
+                }
+            }
+            micropythonSessions[session.id] = session
+            CoreApiUtils.ok(
+                "session_id" to session.id,
+                "model" to lease.model,
+                "serial_handle" to lease.serial.id,
+                "raw_paste" to session.rawPaste,
+                "idle_timeout_ms" to session.idleTimeoutMs,
+            )
+        } catch (ex: Exception) {
+            releaseMicroPythonSession(lease)
+            CoreApiUtils.error(
+                "micropython_session_open_failed",
+                500,
+                mapOf("detail" to (ex.message ?: "")) + micropythonFailureExtras(params, lease),
+            )
+        }
+    }
+
+    /**
+     * Runs `code`, or each of `snippets` in order, in an open session. With [emit], output is
+     * reported as it arrives (`output` events) and after each snippet (`snippet` events).
+     */
+    fun micropythonSessionExec(
+        ctx: ApiContext,
+        params: Map<String, Any?>,
+        emit: ((Map<String, Any?>) -> Unit)? = null,
+    ): Map<String, Any?> {
+        val perm = permission.ensurePermission(ctx, params, "device.usb", "usb", "MicroPython session exec")
+        if (perm is PermissionResult.Pending) return perm.response
+        val snippets = micropythonSnippets(params) ?: return CoreApiUtils.error("code_required")
+        if (snippets.size > MICROPYTHON_SESSION_MAX_SNIPPETS) {
+            return CoreApiUtils.error("too_many_snippets", 400, mapOf("max_snippets" to MICROPYTHON_SESSION_MAX_SNIPPETS))
+        }
+        val timeoutMs = params.optLong("timeout_ms", 10_000L).coerceIn(100L, 600_000L)
+        val stopOnError = params.optBoolean("stop_on_error", true)
+        val session = claimMicroPythonSession(params.optString("session_id").trim())
+            ?: return CoreApiUtils.error("session_not_found", 404)
+        val results = mutableListOf<Map<String, Any?>>()
+        return try {
+            if (!serial.serialSessions.containsKey(session.lease.serial.id)) {
+                micropythonSessions.remove(session.id)
+                return CoreApiUtils.error("session_closed", 410)
+            }
+            synchronized(session.lease.serial.lock) {
+                for ((i, code) in snippets.withIndex()) {
+                    val startedAt = System.currentTimeMillis()
+                    val onChunk: ((String, ByteArray) -> Unit)? = emit?.let { e ->
+                        { stream, bytes -> e(mapOf("event" to "output", "index" to i, "stream" to stream, "data" to String(bytes, Charsets.UTF_8))) }
+                    }
+                    val r = execInSession(session, code.toByteArray(Charsets.UTF_8), startedAt + timeoutMs, onChunk)
+                    val item = mapOf(
+                        "index" to i,
+                        "stdout" to String(r.stdout, Charsets.UTF_8),
+                        "stderr" to String(r.stderr, Charsets.UTF_8),
+                        "elapsed_ms" to (System.currentTimeMillis() - startedAt),
+                    )
+                    results.add(item)
+                    emit?.invoke(mapOf("event" to "snippet") + item)
+                    if (stopOnError && r.stderr.isNotEmpty()) break
+                }
+            }
+            session.lastUsedMs = System.currentTimeMillis()
+            session.execCount += results.size
+            CoreApiUtils.ok(
+                "session_id" to session.id,
+                "raw_paste" to session.rawPaste,
+                "results" to results,
+                "stdout" to (results.lastOrNull()?.get("stdout") ?: ""),
+                "stderr" to (results.lastOrNull()?.get("stderr") ?: ""),
+            )
+        } catch (ex: Exception) {
+            // Interrupt whatever is still running (e.g. after a timeout) and get back to raw REPL.
+            runCatching { synchronized(session.lease.serial.lock) { enterRawRepl(session, 100) } }
+            CoreApiUtils.error(
+                "micropython_session_exec_failed",
+                500,
+                mapOf("detail" to (ex.message ?: ""), "results" to results),
+            )
+        } finally {
+            session.lastUsedMs = System.currentTimeMillis()
+            session.active.decrementAndGet()
+        }
+    }
+
+    fun micropythonSessionClose(ctx: ApiContext, params: Map<String, Any?>): Map<String, Any?> {
+        val perm = permission.ensurePermission(ctx, params, "device.usb", "usb", "MicroPython session close")
+        if (perm is PermissionResult.Pending) return perm.response
+        val session = micropythonSessions.remove(params.optString("session_id").trim())
+            ?: return CoreApiUtils.error("session_not_found", 404)
+        closeMicroPythonSession(session)
+        return CoreApiUtils.ok(
+            "session_id" to session.id,
+            "exec_count" to session.execCount,
+            "open_ms" to (System.currentTimeMillis() - session.openedAtMs),
+        )
+    }
+
+    fun micropythonSessionList(ctx: ApiContext, params: Map<String, Any?>): Map<String, Any?> {
+        reapIdleMicroPythonSessions()
+        return CoreApiUtils.ok(
+            "sessions" to micropythonSessions.values.map {
+                mapOf(
+                    "session_id" to it.id,
+                    "serial_handle" to it.lease.serial.id,
+                    "model" to it.lease.model,
+                    "raw_paste" to it.rawPaste,
+                    "exec_count" to it.execCount,
+                    "opened_at_ms" to it.openedAtMs,
+                    "last_used_ms" to it.lastUsedMs,
+                    "idle_timeout_ms" to it.idleTimeoutMs,
+                )
+            }
+        )
+    }
+
     // ---- Internal helpers -------------------------------------------------------
 
     private fun findSerialBulkPort(dev: UsbDevice): Map<String, Any?>? {
@@ -856,14 +1077,21 @@ class McuCoreService(
         val segArr = payload.optJSONArray("segments")
         if (segArr != null && segArr.length() > 0) {
             val segments = mutableListOf<McuFlashSegment>()
+            // Optimized plans flash several slices (file_offset/length) of the same image.
+            val files = mutableMapOf<String, Pair<ByteArray, String>>()
             for (i in 0 until segArr.length()) {
                 val s = segArr.getJSONObject(i)
                 val path = s.optString("path", "").trim()
                 if (path.isBlank()) throw IllegalArgumentException("segment_path_required")
                 val offset = parseOffsetToInt(s.optString("offset", "0"))
                     ?: throw IllegalArgumentException("invalid_offset")
-                val (bytes, displayPath) = fileResolver.readPathBytes(path)
-                segments.add(McuFlashSegment(displayPath, offset, bytes))
+                val (bytes, displayPath) = files.getOrPut(path) { fileResolver.readPathBytes(path) }
+                val fileOffset = s.optInt("file_offset", 0)
+                if (fileOffset < 0 || fileOffset > bytes.size) throw IllegalArgumentException("invalid_file_offset")
+                val length = s.optInt("length", bytes.size - fileOffset)
+                if (length < 0 || fileOffset + length > bytes.size) throw IllegalArgumentException("invalid_length")
+                val slice = if (fileOffset == 0 && length == bytes.size) bytes else bytes.copyOfRange(fileOffset, fileOffset + length)
+                segments.add(McuFlashSegment(displayPath, offset, slice, fileOffset))
             }
             return segments
         }
@@ -973,6 +1201,53 @@ class McuCoreService(
         return manufacturer.contains("espressif") && product.contains("usb jtag/serial debug unit")
     }
 
+    /** Leaves raw REPL (Ctrl-B) and releases the serial lease of a session already removed from the map. */
+    private fun closeMicroPythonSession(session: MicroPythonReplSession) {
+        val st = session.lease.serial
+        if (serial.serialSessions.containsKey(st.id)) {
+            runCatching {
+                synchronized(st.lock) {
+                    // Ctrl-B: back to the friendly REPL.
+                    serial.writeSerialAll(st, byteArrayOf(0x02), 2000)
+                    serial.drainSerialInput(st, 50, 5)
+                }
+            }
+        }
+        releaseMicroPythonSession(session.lease)
+    }
+
+    /**
+     * Looks up a session and counts an exec on it in one map operation, so the idle reaper
+     * (which decides under the same per-key lock) cannot close it in between.
+     */
+    private fun claimMicroPythonSession(id: String): MicroPythonReplSession? {
+        return micropythonSessions.computeIfPresent(id) { _, s ->
+            s.active.incrementAndGet()
+            s.lastUsedMs = System.currentTimeMillis()
+            s
+        }
+    }
+
+    /** Closes sessions unused for longer than their idle timeout, and drops those whose port is gone. */
+    private fun reapIdleMicroPythonSessions() {
+        for (session in micropythonSessions.values) {
+            val portGone = !serial.serialSessions.containsKey(session.lease.serial.id)
+            var removed = false
+            micropythonSessions.computeIfPresent(session.id) { _, s ->
+                val idle = s.active.get() == 0 && System.currentTimeMillis() - s.lastUsedMs > s.idleTimeoutMs
+                if (s === session && (portGone || idle)) {
+                    removed = true
+                    null
+                } else {
+                    s
+                }
+            }
+            if (!removed || portGone) continue
+            Log.i(TAG, "Closing idle MicroPython session ${session.id}")
+            closeMicroPythonSession(session)
+        }
+    }
+
     private fun releaseMicroPythonSession(lease: MicroPythonSessionLease) {
         if (lease.ephemeral) {
             serial.serialSessions.remove(lease.serial.id)
@@ -1051,6 +1326,173 @@ class McuCoreService(
         }
     }
 
+    private fun micropythonSnippets(params: Map<String, Any?>): List<String>? {
+        val list = params["snippets"] as? List<*>
+        if (list != null) {
+            val out = list.mapNotNull { it?.toString() }.filter { it.isNotBlank() }
+            return out.ifEmpty { null }
+        }
+        return extractMicroPythonCode(params)?.let { listOf(it) }
+    }
+
+    private fun enterRawRepl(session: MicroPythonReplSession, settleMs: Int) {
+        val st = session.lease.serial
+        serial.writeSerialAll(st, byteArrayOf(0x0d, 0x03, 0x03), 2000)
+        Thread.sleep(settleMs.toLong())
+        serial.drainSerialInput(st, 50, 5)
+        session.pending = ByteArray(0)
+        serial.writeSerialAll(st, byteArrayOf(0x0d, 0x01), 2000)
+        replReadUntil(session, RAW_REPL_BANNER, System.currentTimeMillis() + 3_000L, null)
+    }
+
+    /** Runs one program in the session's raw REPL, re-entering it once if the board left it. */
+    private fun execInSession(
+        session: MicroPythonReplSession,
+        code: ByteArray,
+        deadlineMs: Long,
+        onChunk: ((String, ByteArray) -> Unit)?,
+    ): MicroPythonRawExecResult {
+        if (session.rawPaste) {
+            execRawPaste(session, code, deadlineMs, onChunk)?.let { return it }
+            // The board did not answer the raw-paste request (e.g. someone exited raw REPL).
+            enterRawRepl(session, 100)
+            return execRawPaste(session, code, deadlineMs, onChunk)
+                ?: throw MicroPythonRawPromptException("micropython_raw_paste_unavailable")
+        }
+        return execRawPlain(session, code, deadlineMs, onChunk)
+    }
+
+    /** Raw-paste exec (Ctrl-E A Ctrl-A); null when the board does not enter raw-paste mode. */
+    private fun execRawPaste(
+        session: MicroPythonReplSession,
+        code: ByteArray,
+        deadlineMs: Long,
+        onChunk: ((String, ByteArray) -> Unit)?,
+    ): MicroPythonRawExecResult? {
+        val st = session.lease.serial
+        serial.writeSerialAll(st, byteArrayOf(0x05, 'A'.code.toByte(), 0x01), 2000)
+        val ack = replReadExact(session, 2, deadlineMs)
+        if (ack[0] != 'R'.code.toByte() || ack[1] != 0x01.toByte()) {
+            if (ack[0] != 'R'.code.toByte()) {
+                // Firmware without raw-paste re-prints the raw REPL banner; anything else means
+                // the board is not in raw REPL and the caller re-enters it.
+                runCatching {
+                    replReadUntil(session, RAW_REPL_BANNER_TAIL, minOf(deadlineMs, System.currentTimeMillis() + 500L), null)
+                }
+            }
+            return null
+        }
+        val w = replReadExact(session, 2, deadlineMs)
+        val window = (w[0].toInt() and 0xFF) or ((w[1].toInt() and 0xFF) shl 8)
+        var remaining = window
+        var i = 0
+        while (i < code.size) {
+            while (remaining == 0) {
+                for (b in replReadSome(session, deadlineMs)) {
+                    when (b.toInt()) {
+                        0x01 -> remaining += window
+                        0x04 -> {
+                            // The board ended the transfer (e.g. out of memory while compiling).
+                            serial.writeSerialAll(st, byteArrayOf(0x04), 2000)
+                            return readRawExecOutput(session, deadlineMs, onChunk)
+                        }
+                    }
+                }
+            }
+            val n = minOf(remaining, code.size - i)
+            serial.writeSerialAll(st, code.copyOfRange(i, i + n), 2000)
+            remaining -= n
+            i += n
+        }
+        serial.writeSerialAll(st, byteArrayOf(0x04), 2000)
+        replReadUntil(session, byteArrayOf(0x04), deadlineMs, null)
+        return readRawExecOutput(session, deadlineMs, onChunk)
+    }
+
+    private fun execRawPlain(
+        session: MicroPythonReplSession,
+        code: ByteArray,
+        deadlineMs: Long,
+        onChunk: ((String, ByteArray) -> Unit)?,
+    ): MicroPythonRawExecResult {
+        val st = session.lease.serial
+        var i = 0
+        while (i < code.size) {
+            val n = minOf(RAW_REPL_WRITE_CHUNK, code.size - i)
+            serial.writeSerialAll(st, code.copyOfRange(i, i + n), 2000)
+            i += n
+            if (i < code.size) Thread.sleep(10)
+        }
+        serial.writeSerialAll(st, byteArrayOf(0x04), 2000)
+        replReadUntil(session, "OK".toByteArray(Charsets.US_ASCII), deadlineMs, null)
+        return readRawExecOutput(session, deadlineMs, onChunk)
+    }
+
+    /** stdout up to the first EOT, stderr up to the second, then the `>` prompt. */
+    private fun readRawExecOutput(
+        session: MicroPythonReplSession,
+        deadlineMs: Long,
+        onChunk: ((String, ByteArray) -> Unit)?,
+    ): MicroPythonRawExecResult {
+        val stdout = replReadUntil(session, byteArrayOf(0x04), deadlineMs, onChunk?.let { f -> { b: ByteArray -> f("stdout", b) } })
+        val stderr = replReadUntil(session, byteArrayOf(0x04), deadlineMs, onChunk?.let { f -> { b: ByteArray -> f("stderr", b) } })
+        replReadUntil(session, byteArrayOf('>'.code.toByte()), deadlineMs, null)
+        return MicroPythonRawExecResult(stdout, stderr, ByteArray(0))
+    }
+
+    private fun replReadSome(session: MicroPythonReplSession, deadlineMs: Long): ByteArray {
+        if (session.pending.isNotEmpty()) {
+            val out = session.pending
+            session.pending = ByteArray(0)
+            return out
+        }
+        val buf = ByteArray(4096)
+        while (true) {
+            val left = deadlineMs - System.currentTimeMillis()
+            if (left <= 0) throw IllegalStateException("micropython_session_timeout")
+            val n = try { session.lease.serial.port.read(buf, minOf(200L, left).toInt()) } catch (_: Exception) { 0 }
+            if (n > 0) return buf.copyOf(n)
+        }
+    }
+
+    private fun replReadExact(session: MicroPythonReplSession, count: Int, deadlineMs: Long): ByteArray {
+        val out = java.io.ByteArrayOutputStream(count)
+        while (out.size() < count) out.write(replReadSome(session, deadlineMs))
+        val all = out.toByteArray()
+        session.pending = all.copyOfRange(count, all.size) + session.pending
+        return all.copyOf(count)
+    }
+
+    /**
+     * Reads until [delim]; returns the bytes before it and keeps the rest for the next read.
+     * [onChunk] receives output as it arrives, holding back a possible partial delimiter.
+     */
+    private fun replReadUntil(
+        session: MicroPythonReplSession,
+        delim: ByteArray,
+        deadlineMs: Long,
+        onChunk: ((ByteArray) -> Unit)?,
+    ): ByteArray {
+        val acc = java.io.ByteArrayOutputStream()
+        var emitted = 0
+        var scanFrom = 0
+        while (true) {
+            acc.write(replReadSome(session, deadlineMs))
+            val data = acc.toByteArray()
+            val idx = indexOfBytes(data, delim, scanFrom)
+            if (idx != null) {
+                if (onChunk != null && idx > emitted) onChunk(data.copyOfRange(emitted, idx))
+                session.pending = data.copyOfRange(idx + delim.size, data.size) + session.pending
+                return data.copyOf(idx)
+            }
+            scanFrom = (data.size - delim.size + 1).coerceAtLeast(0)
+            if (onChunk != null && scanFrom > emitted) {
+                onChunk(data.copyOfRange(emitted, scanFrom))
+                emitted = scanFrom
+            }
+        }
+    }
+
     private fun shouldRetryMicroPythonRawExec(lease: MicroPythonSessionLease): Boolean {
         val handle = lease.handle ?: lease.serial.usbHandle
         val dev = usb.usbDevicesByHandle[handle] ?: return false
@@ -31,6 +31,24 @@ data class SerialSessionState(
     val lock: Any = Any(),
 )
 
+/** One command of a `serial.exchange.script` run; see [SerialCoreService.exchangeScript]. */
+private data class ExchangeStep(
+    val index: Int,
+    val send: ByteArray,
+    val sendText: String,
+    val expect: Regex?,
+    val error: Regex?,
+    val timeoutMs: Int,
+    val idleTimeoutMs: Int,
+    val maxLines: Int,
+) {
+    val lines = mutableListOf<String>()
+    var echoSeen = false
+    var sentAt = 0L
+    var activeSince = 0L
+    var lastByteAt = 0L
+}
+
 data class ReadSerialLinesResult(
     val lines: List<String>,
     val bytesRead: Int,
@@ -48,6 +66,10 @@ class SerialCoreService(
 ) {
     private companion object {
         const val TAG = "SerialCoreService"
+        const val SCRIPT_MAX_COMMANDS = 2000
+        // AT-style final result codes.
+        const val DEFAULT_EXPECT = "^(OK|ERROR|\\+CM[ES] ERROR:.*|NO CARRIER|BUSY|NO ANSWER|NO DIALTONE)$"
+        const val DEFAULT_ERROR = "^(ERROR|\\+CM[ES] ERROR:.*|NO CARRIER|BUSY|NO ANSWER|NO DIALTONE)$"
     }
 
     val serialSessions = ConcurrentHashMap<String, SerialSessionState>()
@@ -337,6 +359,226 @@ class SerialCoreService(
         }
     }
 
+    /**
+     * Runs a list of commands in one call. Each command finishes when a received line matches its
+     * `expect` regex (or `error`, or after `idle_timeout_ms` of silence when it has no `expect`),
+     * so the wall time follows the device's own response time instead of N x idle timeout. Up to
+     * `pipeline_depth` commands are written before their responses arrive; terminator lines are
+     * assigned to outstanding commands in order. [emit] receives one `result` event per command.
+     */
+    fun exchangeScript(
+        ctx: ApiContext,
+        params: Map<String, Any?>,
+        emit: ((Map<String, Any?>) -> Unit)? = null,
+    ): Map<String, Any?> {
+        val perm = permission.ensurePermission(ctx, params, "device.usb", "usb", "Serial exchange script (send+receive lines)")
+        if (perm is PermissionResult.Pending) return perm.response
+
+        val serialHandle = params.optString("serial_handle").trim()
+        if (serialHandle.isBlank()) return CoreApiUtils.error("serial_handle_required")
+        val st = serialSessions[serialHandle] ?: return CoreApiUtils.error("serial_handle_not_found", 404)
+
+        val raw = params["commands"] as? List<*> ?: return CoreApiUtils.error("commands_required")
+        if (raw.isEmpty()) return CoreApiUtils.error("commands_required")
+        if (raw.size > SCRIPT_MAX_COMMANDS) {
+            return CoreApiUtils.error("too_many_commands", 400, mapOf("max_commands" to SCRIPT_MAX_COMMANDS))
+        }
+        val lineEnding = params.optString("line_ending").let { if (it == "null") "" else it }
+        val stopOnError = params.optBoolean("stop_on_error", true)
+        val stripEcho = params.optBoolean("strip_echo", true)
+        val depth = params.optInt("pipeline_depth", 1).coerceIn(1, 32)
+        val totalTimeoutMs = params.optInt("total_timeout_ms", 120_000).coerceIn(100, 600_000)
+        val writeTimeoutMs = params.optInt("write_timeout_ms", 2000).coerceIn(100, 60_000)
+        val defaults = ExchangeDefaults(
+            expect = params.optString("expect", DEFAULT_EXPECT),
+            error = params.optString("error", DEFAULT_ERROR),
+            timeoutMs = params.optInt("timeout_ms", 5000).coerceIn(20, 600_000),
+            idleTimeoutMs = params.optInt("idle_timeout_ms", 500).coerceIn(20, 60_000),
+            maxLines = params.optInt("max_lines", 200).coerceIn(1, 5000),
+        )
+        val steps = try {
+            raw.mapIndexed { i, item -> exchangeStep(i, item, lineEnding, defaults) }
+        } catch (ex: IllegalArgumentException) {
+            return CoreApiUtils.error(ex.message ?: "invalid_command", 400)
+        }
+
+        val results = mutableListOf<Map<String, Any?>>()
+        val unsolicited = mutableListOf<String>()
+        val startedAt = System.currentTimeMillis()
+        val deadline = startedAt + totalTimeoutMs
+        var bytesRead = 0
+        var stopped = false
+        var timedOut = false
+        return try {
+            synchronized(st.lock) {
+                val outstanding = ArrayDeque<ExchangeStep>()
+                val partial = java.io.ByteArrayOutputStream()
+                val buf = ByteArray(4096)
+                var next = 0
+
+                fun finish(status: String, matched: String?) {
+                    val step = outstanding.removeFirst()
+                    val now = System.currentTimeMillis()
+                    val r = mapOf(
+                        "index" to step.index,
+                        "send" to step.sendText,
+                        "status" to status,
+                        "ok" to (status == "ok"),
+                        "lines" to step.lines.toList(),
+                        "matched" to matched,
+                        "elapsed_ms" to (now - step.sentAt),
+                    )
+                    results.add(r)
+                    emit?.invoke(mapOf("event" to "result") + r)
+                    if (status != "ok" && stopOnError) stopped = true
+                    outstanding.firstOrNull()?.let { it.activeSince = now; it.lastByteAt = now }
+                }
+
+                fun onLine(line: String) {
+                    val head = outstanding.firstOrNull()
+                    if (head == null) {
+                        unsolicited.add(line)
+                        return
+                    }
+                    if (stripEcho && !head.echoSeen && head.lines.isEmpty() &&
+                        head.sendText.isNotBlank() && line.trim() == head.sendText.trim()
+                    ) {
+                        head.echoSeen = true
+                        return
+                    }
+                    head.lines.add(line)
+                    when {
+                        head.error?.containsMatchIn(line) == true -> finish("error", line)
+                        head.expect?.containsMatchIn(line) == true -> finish("ok", line)
+                        head.lines.size >= head.maxLines -> finish("max_lines", null)
+                    }
+                }
+
+                while (true) {
+                    while (!stopped && next < steps.size && outstanding.size < depth) {
+                        val step = steps[next++]
+                        if (step.send.isNotEmpty()) writeSerialAll(st, step.send, writeTimeoutMs)
+                        val now = System.currentTimeMillis()
+                        step.sentAt = now
+                        if (outstanding.isEmpty()) {
+                            step.activeSince = now
+                            step.lastByteAt = now
+                        }
+                        outstanding.addLast(step)
+                    }
+                    val head = outstanding.firstOrNull() ?: break
+                    val now = System.currentTimeMillis()
+                    if (now >= deadline) {
+                        timedOut = true
+                        while (outstanding.isNotEmpty()) finish("timeout", null)
+                        break
+                    }
+                    if (now - head.activeSince >= head.timeoutMs) {
+                        finish("timeout", null)
+                        continue
+                    }
+                    if (head.expect == null && now - head.lastByteAt >= head.idleTimeoutMs) {
+                        finish("ok", null)
+                        continue
+                    }
+                    val wait = minOf(
+                        50L, deadline - now, head.activeSince + head.timeoutMs - now,
+                        if (head.expect == null) head.lastByteAt + head.idleTimeoutMs - now else 50L,
+                    ).coerceAtLeast(1L).toInt()
+                    val n = try { st.port.read(buf, wait) } catch (_: Exception) { 0 }
+                    if (n <= 0) {
+                        // A prompt such as "> " arrives without a line break.
+                        if (partial.size() > 0 && head.expect != null) {
+                            val text = partial.toString(Charsets.UTF_8.name()).trimEnd('\r')
+                            if (head.expect.containsMatchIn(text)) {
+                                partial.reset()
+                                onLine(text)
+                            }
+                        }
+                        continue
+                    }
+                    bytesRead += n
+                    outstanding.firstOrNull()?.lastByteAt = System.currentTimeMillis()
+                    for (i in 0 until n) {
+                        val b = buf[i]
+                        if (b == '\n'.code.toByte()) {
+                            val line = partial.toString(Charsets.UTF_8.name()).trimEnd('\r')
+                            partial.reset()
+                            if (line.isNotEmpty()) onLine(line)
+                        } else {
+                            partial.write(b.toInt())
+                        }
+                    }
+                }
+            }
+            val okCount = results.count { it["ok"] == true }
+            CoreApiUtils.ok(
+                "serial_handle" to serialHandle,
+                "results" to results,
+                "command_count" to steps.size,
+                "completed" to results.size,
+                "ok_count" to okCount,
+                "error_count" to (results.size - okCount),
+                "stopped" to (stopped && results.size < steps.size),
+                "timed_out" to timedOut,
+                "unsolicited" to unsolicited,
+                "bytes_read" to bytesRead,
+                "elapsed_ms" to (System.currentTimeMillis() - startedAt),
+            )
+        } catch (ex: Exception) {
+            CoreApiUtils.error("serial_exchange_failed", 500, mapOf("detail" to (ex.message ?: ""), "results" to results))
+        }
+    }
+
+    private data class ExchangeDefaults(
+        val expect: String,
+        val error: String,
+        val timeoutMs: Int,
+        val idleTimeoutMs: Int,
+        val maxLines: Int,
+    )
+
+    private fun exchangeStep(index: Int, item: Any?, lineEnding: String, d: ExchangeDefaults): ExchangeStep {
+        val cmd: Map<*, *> = when (item) {
+            is String -> mapOf("send" to item)
+            is Map<*, *> -> item
+            else -> throw IllegalArgumentException("invalid_command")
+        }
+        fun str(key: String): String? = cmd[key]?.toString()?.takeIf { it != "null" }
+        fun int(key: String, fallback: Int): Int = (cmd[key] as? Number)?.toInt() ?: str(key)?.toIntOrNull() ?: fallback
+        fun regex(key: String, fallback: String): Regex? {
+            // An explicit "" (or null) disables the pattern for this command.
+            val pattern = if (cmd.containsKey(key)) str(key) ?: "" else fallback
+            if (pattern.isEmpty()) return null
+            return try {
+                Regex(pattern)
+            } catch (_: Exception) {
+                throw IllegalArgumentException("invalid_${key}_regex")
+            }
+        }
+        val sendB64 = str("send_b64")?.trim().orEmpty()
+        val text = str("send").orEmpty()
+        val send = when {
+            sendB64.isNotEmpty() -> try {
+                Base64.decode(sendB64, Base64.DEFAULT)
+            } catch (_: Exception) {
+                throw IllegalArgumentException("invalid_send_b64")
+            }
+            text.isNotEmpty() -> (text + lineEnding).toByteArray(Charsets.UTF_8)
+            else -> ByteArray(0)
+        }
+        return ExchangeStep(
+            index = index,
+            send = send,
+            sendText = if (sendB64.isNotEmpty()) "" else text,
+            expect = regex("expect", d.expect),
+            error = regex("error", d.error),
+            timeoutMs = int("timeout_ms", d.timeoutMs).coerceIn(20, 600_000),
+            idleTimeoutMs = int("idle_timeout_ms", d.idleTimeoutMs).coerceIn(20, 60_000),
+            maxLines = int("max_lines", d.maxLines).coerceIn(1, 5000),
+        )
+    }
+
     // ---- Internal helpers (also used by McuCoreService) -------------------------
 
     fun sessionToMap(st: SerialSessionState): Map<String, Any?> {
@@ -9,6 +9,7 @@ import com.hoho.android.usbserial.driver.UsbSerialPort
 import com.hoho.android.usbserial.driver.UsbSerialProber
 import java.io.ByteArrayOutputStream
 import java.util.Locale
+import java.util.zip.Deflater
 import org.json.JSONArray
 import org.json.JSONObject
 
@@ -61,6 +62,7 @@ internal class EspSlipCodec {
 internal data class EspFlashResult(
     val blocksWritten: Int,
     val blockSize: Int,
+    val compressedSize: Int? = null,
 )
 
 internal class EspSyncException(
@@ -96,12 +98,19 @@ internal class EspSerialSession(
     private var serialPort: UsbSerialPort? = null
     private var serialConn: UsbDeviceConnection? = null
 
+    /** SLIP-framed bytes sent to the target so far (commands and flash data). */
+    var bytesOnWire: Long = 0L
+        private set
+
     private val cmdSync = 0x08
     private val cmdReadReg = 0x0A
     private val cmdSpiAttach = 0x0D
     private val cmdFlashBegin = 0x02
     private val cmdFlashData = 0x03
     private val cmdFlashEnd = 0x04
+    private val cmdFlashDeflBegin = 0x10
+    private val cmdFlashDeflData = 0x11
+    private val cmdSpiFlashMd5 = 0x13
     private val checksumMagic = 0xEF
     private val flashBlockSize = 0x400
 
@@ -473,6 +482,90 @@ internal class EspSerialSession(
         return EspFlashResult(blocksWritten = blocks, blockSize = flashBlockSize)
     }
 
+    /**
+     * Same as [flashImage] but sends a zlib stream with the ROM loader's FLASH_DEFL_* commands;
+     * the target inflates it while writing. Erased (0xFF) padding costs almost nothing on the wire.
+     */
+    fun flashImageDeflated(image: ByteArray, offset: Int, reboot: Boolean): EspFlashResult {
+        val compressed = zlibCompress(image)
+        val blocks = (compressed.size + flashBlockSize - 1) / flashBlockSize
+        // ROM (no stub) expects the erase size rounded up to whole write blocks.
+        val eraseSize = (image.size + flashBlockSize - 1) / flashBlockSize * flashBlockSize
+        val begin = le32(eraseSize) + le32(blocks) + le32(flashBlockSize) + le32(offset)
+        try {
+            commandChecked(cmdFlashDeflBegin, begin, checksum = 0, timeoutOverrideMs = eraseTimeoutMs(eraseSize))
+        } catch (ex: Exception) {
+            throw EspFlashStageException(ex.message ?: "flash_defl_begin_failed", "flash_defl_begin", null, 0)
+        }
+
+        var seq = 0
+        var pos = 0
+        while (pos < compressed.size) {
+            val end = minOf(compressed.size, pos + flashBlockSize)
+            val chunk = compressed.copyOfRange(pos, end)
+            val payload = le32(chunk.size) + le32(seq) + le32(0) + le32(0) + chunk
+            try {
+                commandChecked(cmdFlashDeflData, payload, checksum = checksum(chunk), timeoutOverrideMs = maxOf(timeoutMs, 10_000))
+            } catch (ex: Exception) {
+                throw EspFlashStageException(ex.message ?: "flash_defl_data_failed", "flash_defl_data", seq, seq)
+            }
+            seq += 1
+            pos = end
+        }
+
+        // As in flashImage: no FLASH_DEFL_END, which would make the ROM leave the loader.
+        if (reboot) {
+            runCatching { setModemLines(dtr = false, rts = false) }
+        }
+        return EspFlashResult(blocksWritten = blocks, blockSize = flashBlockSize, compressedSize = compressed.size)
+    }
+
+    /** MD5 of `size` bytes of flash at `offset`, computed by the target (SPI_FLASH_MD5). Lowercase hex. */
+    fun flashMd5(offset: Int, size: Int): String {
+        val payload = le32(offset) + le32(size) + le32(0) + le32(0)
+        val mb = (size + 0xFFFFF) / 0x100000
+        val response = command(cmdSpiFlashMd5, payload, checksum = 0, timeoutOverrideMs = maxOf(timeoutMs, 4000, mb * 8000))
+        val data = response.payload
+        // ROM replies with 32 ASCII hex digits, the flasher stub with 16 raw bytes; status bytes follow.
+        val digestLen = when {
+            data.size >= 34 -> 32
+            data.size >= 18 -> 16
+            else -> throw IllegalStateException("short_md5_response")
+        }
+        if ((data[digestLen].toInt() and 0xFF) != 0) {
+            throw IllegalStateException("esp_error_status_${data[digestLen + 1].toInt() and 0xFF}")
+        }
+        val digest = data.copyOfRange(0, digestLen)
+        return if (digestLen == 32) {
+            String(digest, Charsets.US_ASCII).lowercase(Locale.US)
+        } else {
+            digest.joinToString("") { String.format(Locale.US, "%02x", it.toInt() and 0xFF) }
+        }
+    }
+
+    private fun eraseTimeoutMs(size: Int): Int {
+        // esptool allows ~30 s per MB for region erase on FLASH_(DEFL_)BEGIN.
+        val mb = (size + 0xFFFFF) / 0x100000
+        return maxOf(timeoutMs, 10_000, mb * 30_000)
+    }
+
+    private fun zlibCompress(data: ByteArray): ByteArray {
+        val deflater = Deflater(Deflater.BEST_COMPRESSION)
+        try {
+            deflater.setInput(data)
+            deflater.finish()
+            val out = ByteArrayOutputStream(maxOf(64, data.size / 4))
+            val buf = ByteArray(8192)
+            while (!deflater.finished()) {
+                val n = deflater.deflate(buf)
+                out.write(buf, 0, n)
+            }
+            return out.toByteArray()
+        } finally {
+            deflater.end()
+        }
+    }
+
     private fun commandChecked(op: Int, data: ByteArray, checksum: Int, timeoutOverrideMs: Int): Int {
         val response = command(op, data, checksum, timeoutOverrideMs)
         val status = response.payload
@@ -585,6 +678,7 @@ internal class EspSerialSession(
             if (n <= 0) throw IllegalStateException("esp_write_failed")
             off += n
         }
+        bytesOnWire += framed.size
     }
 
     private fun slipEncode(payload: ByteArray): ByteArray {
@@ -13,15 +13,19 @@ class VisionFrameStore(
     private val lru = LinkedHashMap<String, Entry>(16, 0.75f, true)
     private var totalBytes: Long = 0
 
-    fun put(frame: RgbaFrame): String {
-        val id = UUID.randomUUID().toString()
+    /**
+     * Stores [frame] under a new id, or replaces the frame stored under [id] so callers can
+     * recycle a fixed set of ids instead of allocating one per frame.
+     */
+    fun put(frame: RgbaFrame, id: String? = null): String {
+        val key = id?.trim()?.ifEmpty { null } ?: UUID.randomUUID().toString()
         synchronized(lock) {
             val bytes = frame.rgba.size
-            lru[id] = Entry(frame, bytes)
+            lru.put(key, Entry(frame, bytes))?.let { totalBytes -= it.bytes.toLong() }
             totalBytes += bytes.toLong()
             evictLocked()
         }
-        return id
+        return key
     }
 
     fun get(id: String): RgbaFrame? {
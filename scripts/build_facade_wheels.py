@@ -12,11 +12,17 @@ At the moment we ship:
   real bindings are not bundled.
 
 This script intentionally avoids external build tooling (setuptools/build/wheel).
+
+Builds are content-addressed: a key over the version and the sources (paths, sizes, SHA-256) is
+stored in the wheel's zip comment, and a wheel whose key matches is left as is (`--force`
+rebuilds). Packages are built in parallel processes; output is byte-for-byte deterministic.
 """
 
 from __future__ import annotations
 
+import argparse
 import base64
+import concurrent.futures
 import csv
 import hashlib
 import os
@@ -24,17 +30,33 @@ from pathlib import Path
 import sys
 import zipfile
 
+_CHUNK = 1024 * 1024
+_KEY_PREFIX = b"methings-facade-src-sha256="
+
 
 def _norm_dist(name: str) -> str:
     # PEP 427 wheel filename normalization: replace '-' with '_'.
     return name.replace("-", "_")
 
 
-def _sha256_b64(data: bytes) -> str:
-    digest = hashlib.sha256(data).digest()
+def _b64(digest: bytes) -> str:
     return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
 
 
+def _sha256_b64(data: bytes) -> str:
+    return _b64(hashlib.sha256(data).digest())
+
+
+def _file_digest(path: Path) -> tuple[str, int]:
+    h = hashlib.sha256()
+    n = 0
+    with path.open("rb") as f:
+        while chunk := f.read(_CHUNK):
+            h.update(chunk)
+            n += len(chunk)
+    return _b64(h.digest()), n
+
+
 def _wheel_metadata(dist_name: str, version: str) -> bytes:
     # Minimal METADATA (RFC 822 style).
     # Keep it small: pip only needs Name/Version for dependency satisfaction.
@@ -59,51 +81,108 @@ def _wheel_wheel_file() -> bytes:
     return ("\n".join(lines)).encode("utf-8")
 
 
-def build_wheel(*, dist_name: str, version: str, src_root: Path, out_dir: Path) -> Path:
+def _source_files(src_root: Path) -> list[tuple[str, Path]]:
+    # Package files under src_root are stored with forward slashes.
+    return [(p.relative_to(src_root).as_posix(), p) for p in sorted(src_root.rglob("*")) if not p.is_dir()]
+
+
+def _content_key(
+    generated: list[tuple[str, bytes]], sources: list[tuple[str, Path]]
+) -> tuple[str, dict[str, tuple[str, int]]]:
+    """Key over every entry of the wheel, plus the per-source (digest, size) it was computed from."""
+    h = hashlib.sha256()
+    digests: dict[str, tuple[str, int]] = {}
+    for rel, p in sources:
+        digest, size = _file_digest(p)
+        digests[rel] = (digest, size)
+        h.update(f"{rel}\0{digest}\0{size}\n".encode("utf-8"))
+    # The generated files carry the version and the metadata layout of this script.
+    for name, data in generated:
+        h.update(f"{name}\0{_sha256_b64(data)}\n".encode("utf-8"))
+    return h.hexdigest(), digests
+
+
+def _wheel_key(path: Path) -> str:
+    try:
+        with zipfile.ZipFile(path) as z:
+            comment = z.comment
+    except (OSError, zipfile.BadZipFile):
+        return ""
+    return comment[len(_KEY_PREFIX):].decode("ascii", "replace") if comment.startswith(_KEY_PREFIX) else ""
+
+
+def _zip_info(name: str) -> zipfile.ZipInfo:
+    # Use a stable timestamp to keep wheels deterministic across builds.
+    zi = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+    zi.compress_type = zipfile.ZIP_DEFLATED
+    return zi
+
+
+def _build_wheel(
+    *, dist_name: str, version: str, src_root: Path, out_dir: Path, force: bool = False
+) -> tuple[Path, bool]:
+    """Returns `(wheel_path, built)`; `built` is False when an up-to-date wheel was kept."""
     dist_norm = _norm_dist(dist_name)
     wheel_name = f"{dist_norm}-{version}-py3-none-any.whl"
     out_path = out_dir / wheel_name
     dist_info = f"{dist_norm}-{version}.dist-info"
 
-    files: list[tuple[str, bytes]] = []
-
-    # Package files under src_root are stored with forward slashes.
-    for p in sorted(src_root.rglob("*")):
-        if p.is_dir():
-            continue
-        rel = p.relative_to(src_root).as_posix()
-        files.append((rel, p.read_bytes()))
-
-    files.append((f"{dist_info}/METADATA", _wheel_metadata(dist_name, version)))
-    files.append((f"{dist_info}/WHEEL", _wheel_wheel_file()))
-    files.append((f"{dist_info}/top_level.txt", b""))  # optional
-
-    # RECORD must exist. We can write it last with hashes/sizes for other files.
-    record_rows: list[list[str]] = []
-    for name, data in files:
-        record_rows.append([name, f"sha256={_sha256_b64(data)}", str(len(data))])
-
-    record_path = f"{dist_info}/RECORD"
-    # RECORD row for itself has empty hash/size.
-    record_rows.append([record_path, "", ""])
-    record_bytes = _render_record(record_rows)
-    files.append((record_path, record_bytes))
+    sources = _source_files(src_root)
+    generated = [
+        (f"{dist_info}/METADATA", _wheel_metadata(dist_name, version)),
+        (f"{dist_info}/WHEEL", _wheel_wheel_file()),
+        (f"{dist_info}/top_level.txt", b""),  # optional
+    ]
+    key, digests = _content_key(generated, sources)
+    if not force and out_path.exists() and _wheel_key(out_path) == key:
+        return out_path, False
 
     out_dir.mkdir(parents=True, exist_ok=True)
     tmp = out_path.with_suffix(out_path.suffix + ".tmp")
     if tmp.exists():
         tmp.unlink()
 
+    # RECORD must exist. It is written last, with hashes/sizes taken while each file is streamed in.
+    record_rows: list[list[str]] = []
     with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        # Use a stable timestamp to keep wheels deterministic-ish across builds.
-        fixed_dt = (1980, 1, 1, 0, 0, 0)
-        for name, data in files:
-            zi = zipfile.ZipInfo(name, date_time=fixed_dt)
-            zi.compress_type = zipfile.ZIP_DEFLATED
-            z.writestr(zi, data)
+        for rel, p in sources:
+            zi = _zip_info(rel)
+            zi.file_size = digests[rel][1]
+            h = hashlib.sha256()
+            n = 0
+            with p.open("rb") as src, z.open(zi, "w") as dst:
+                while chunk := src.read(_CHUNK):
+                    h.update(chunk)
+                    n += len(chunk)
+                    dst.write(chunk)
+            if (_b64(h.digest()), n) != digests[rel]:
+                raise RuntimeError(f"{p} changed during the build")
+            record_rows.append([rel, f"sha256={_b64(h.digest())}", str(n)])
+        for name, data in generated:
+            z.writestr(_zip_info(name), data)
+            record_rows.append([name, f"sha256={_sha256_b64(data)}", str(len(data))])
+        record_path = f"{dist_info}/RECORD"
+        # RECORD row for itself has empty hash/size.
+        record_rows.append([record_path, "", ""])
+        z.writestr(_zip_info(record_path), _render_record(record_rows))
+        z.comment = _KEY_PREFIX + key.encode("ascii")
 
     tmp.replace(out_path)
-    return out_path
+    return out_path, True
+
+
+def build_wheel(*, dist_name: str, version: str, src_root: Path, out_dir: Path, force: bool = False) -> Path:
+    return _build_wheel(dist_name=dist_name, version=version, src_root=src_root, out_dir=out_dir, force=force)[0]
+
+
+def _build_package(pkg: dict[str, object]) -> tuple[Path, bool]:
+    return _build_wheel(
+        dist_name=str(pkg["dist"]),
+        version=str(pkg["version"]),
+        src_root=Path(str(pkg["src"])),
+        out_dir=Path(str(pkg["out_dir"])),
+        force=bool(pkg.get("force")),
+    )
 
 
 def _render_record(rows: list[list[str]]) -> bytes:
@@ -119,9 +198,12 @@ def _render_record(rows: list[list[str]]) -> bytes:
 
 def main() -> int:
     repo = Path(__file__).resolve().parents[1]
-    out_dir = repo / "app/android/app/src/main/assets/wheels/common"
-    if len(sys.argv) >= 3 and sys.argv[1] == "--out":
-        out_dir = Path(sys.argv[2]).resolve()
+    parser = argparse.ArgumentParser(description="Build facade wheels.")
+    parser.add_argument("--out", default=str(repo / "app/android/app/src/main/assets/wheels/common"))
+    parser.add_argument("--force", action="store_true", help="Rebuild wheels even when they are up to date")
+    parser.add_argument("--jobs", type=int, default=0, help="Parallel builds (default: one per package, up to CPU count)")
+    args = parser.parse_args()
+    out_dir = Path(args.out).resolve()
 
     opencv_version = (
         os.environ.get("METHINGS_FACADE_OPENCV_PYTHON_VERSION", "").strip() or "4.12.0.88+methings1"
@@ -137,22 +219,22 @@ def main() -> int:
         },
     ]
 
-    built: list[Path] = []
     for p in pkgs:
         src = Path(p["src"])
         if not src.exists():
             raise SystemExit(f"Missing src dir: {src}")
-        built.append(
-            build_wheel(
-                dist_name=str(p["dist"]),
-                version=str(p["version"]),
-                src_root=src,
-                out_dir=out_dir,
-            )
-        )
+        p["out_dir"] = out_dir
+        p["force"] = args.force
+
+    jobs = args.jobs or min(len(pkgs), os.cpu_count() or 1)
+    if jobs <= 1:
+        results = [_build_package(p) for p in pkgs]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_build_package, pkgs))
     sys.stdout.write("Built wheels:\n")
-    for b in built:
-        sys.stdout.write(f"- {b}\n")
+    for path, built in results:
+        sys.stdout.write(f"- {path}{'' if built else ' (up to date)'}\n")
     return 0
 
 
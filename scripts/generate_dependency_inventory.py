@@ -4,9 +4,15 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
 import datetime as dt
+import hashlib
 import json
+import os
 import re
+import threading
+import time
+import urllib.error
 import urllib.request
 import zipfile
 from pathlib import Path
@@ -38,6 +44,154 @@ def parse_gradle_dependencies(repo_root: Path) -> List[Dict[str, str]]:
     return out
 
 
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME", "").strip()
+    return (Path(base) if base else Path.home() / ".cache") / "methings" / "license-fetch"
+
+
+class UrlCache:
+    """Fetched license texts, shared by all lookups of a run and persisted under `cache_dir`.
+
+    Each URL is fetched at most once per run (concurrent lookups wait for the first one).
+    On disk, `<sha256>.json` holds the status, ETag, Last-Modified and fetch time and
+    `<sha256>.body` the response body. Entries younger than `max_age_s` are used as-is, older
+    ones are revalidated with If-None-Match / If-Modified-Since, 404/410 answers are remembered
+    for `negative_ttl_s`, and a failed request falls back to the cached body. `offline` uses
+    whatever is cached and never touches the network; `cache_dir=None` keeps the per-run memo only.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | None,
+        *,
+        offline: bool = False,
+        max_age_s: float = 24 * 3600,
+        negative_ttl_s: float = 7 * 24 * 3600,
+    ):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.max_age_s = max_age_s
+        self.negative_ttl_s = negative_ttl_s
+        self._lock = threading.Lock()
+        self._memo: Dict[str, str] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self.stats: Dict[str, int] = {
+            "urls": 0, "memo": 0, "fresh": 0, "revalidated": 0, "fetched": 0, "not_found": 0, "stale": 0, "failed": 0,
+        }
+        if cache_dir is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def get(self, url: str, timeout: float = 8.0) -> str:
+        """Stripped response text of `url`, or "" when it is missing or cannot be fetched."""
+        with self._lock:
+            if url in self._memo:
+                self.stats["memo"] += 1
+                return self._memo[url]
+            ev = self._inflight.get(url)
+            owner = ev is None
+            if owner:
+                ev = self._inflight[url] = threading.Event()
+                self.stats["urls"] += 1
+        if not owner:
+            ev.wait()
+            with self._lock:
+                self.stats["memo"] += 1
+                return self._memo.get(url, "")
+        text = ""
+        try:
+            text = self._load(url, timeout)
+        finally:
+            with self._lock:
+                self._memo[url] = text
+                del self._inflight[url]
+            ev.set()
+        return text
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        assert self.cache_dir is not None
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.body"
+
+    def _read(self, url: str) -> Tuple[Dict[str, object] | None, bytes]:
+        if self.cache_dir is None:
+            return None, b""
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            body = body_path.read_bytes() if meta.get("status") == 200 else b""
+        except Exception:
+            return None, b""
+        return meta, body
+
+    def _write(self, url: str, meta: Dict[str, object], body: bytes | None) -> None:
+        if self.cache_dir is None:
+            return
+        meta_path, body_path = self._paths(url)
+        try:
+            if body is not None:
+                tmp = body_path.with_suffix(".body.tmp")
+                tmp.write_bytes(body)
+                os.replace(tmp, body_path)
+            tmp = meta_path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(dict(meta, url=url)), encoding="utf-8")
+            os.replace(tmp, meta_path)
+        except OSError:
+            pass
+
+    def _load(self, url: str, timeout: float) -> str:
+        meta, body = self._read(url)
+        now = time.time()
+        if meta is not None:
+            age = now - float(meta.get("fetched_at") or 0)
+            if meta.get("status") == 200 and (self.offline or age < self.max_age_s):
+                self._count("fresh")
+                return body.decode("utf-8", errors="ignore").strip()
+            if meta.get("status") == 404 and (self.offline or age < self.negative_ttl_s):
+                self._count("not_found")
+                return ""
+        if self.offline:
+            self._count("failed")
+            return ""
+        headers = {"User-Agent": "methings-dependency-inventory"}
+        if meta is not None and meta.get("status") == 200:
+            if meta.get("etag"):
+                headers["If-None-Match"] = str(meta["etag"])
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = str(meta["last_modified"])
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as resp:
+                raw = resp.read()
+                etag = resp.headers.get("ETag") or ""
+                last_modified = resp.headers.get("Last-Modified") or ""
+        except urllib.error.HTTPError as ex:
+            if ex.code == 304 and meta is not None:
+                self._write(url, dict(meta, fetched_at=now), None)
+                self._count("revalidated")
+                return body.decode("utf-8", errors="ignore").strip()
+            if ex.code in (404, 410):
+                self._write(url, {"status": 404, "fetched_at": now}, None)
+                self._count("not_found")
+                return ""
+            return self._stale(meta, body)
+        except Exception:
+            return self._stale(meta, body)
+        self._write(url, {"status": 200, "etag": etag, "last_modified": last_modified, "fetched_at": now}, raw)
+        self._count("fetched")
+        return raw.decode("utf-8", errors="ignore").strip()
+
+    def _stale(self, meta: Dict[str, object] | None, body: bytes) -> str:
+        if meta is not None and meta.get("status") == 200:
+            self._count("stale")
+            return body.decode("utf-8", errors="ignore").strip()
+        self._count("failed")
+        return ""
+
+
+_URL_CACHE = UrlCache(None)
 
 
 def detect_license_from_text(text: str) -> str:
@@ -59,37 +213,170 @@ def detect_license_from_text(text: str) -> str:
     return ""
 
 
-def parse_third_party(repo_root: Path) -> List[Dict[str, str]]:
+LICENSE_PREFIXES = ("license", "copying", "notice")
+
+
+class TreeScan:
+    """License candidates (files named license*/copying*/notice*) and jars under one root."""
+
+    __slots__ = ("root", "candidates", "jars", "fingerprint")
+
+    def __init__(self, root: Path, candidates: List[Path], jars: List[Path], fingerprint: str):
+        self.root = root
+        self.candidates = candidates
+        self.jars = jars
+        self.fingerprint = fingerprint
+
+
+class CandidateIndex:
+    """Walks each tree once per run and shares the result between the inventory and license stages.
+
+    The fingerprint covers every directory's mtime (files added, removed or renamed) and the
+    size and mtime of each candidate and jar (contents changed), so it changes whenever a
+    lookup over the tree could give a different answer.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._scans: Dict[Path, TreeScan] = {}
+
+    def scan(self, root: Path) -> TreeScan:
+        with self._lock:
+            cached = self._scans.get(root)
+        if cached is not None:
+            return cached
+        scan = self._walk(root)
+        with self._lock:
+            self._scans[root] = scan
+        return scan
+
+    @staticmethod
+    def _walk(root: Path) -> TreeScan:
+        if not root.is_dir():
+            return TreeScan(root, [], [], "absent")
+        h = hashlib.sha1()
+        candidates: List[Path] = []
+        jars: List[Path] = []
+        for dirpath, _dirnames, filenames in os.walk(root):
+            try:
+                h.update(f"d {os.path.relpath(dirpath, root)} {os.stat(dirpath).st_mtime_ns}\n".encode())
+            except OSError:
+                continue
+            for name in filenames:
+                n = name.lower()
+                is_candidate = n.startswith(LICENSE_PREFIXES)
+                if not is_candidate and not name.endswith(".jar"):
+                    continue
+                path = Path(dirpath, name)
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                h.update(f"f {path.relative_to(root)} {st.st_size} {st.st_mtime_ns}\n".encode())
+                (candidates if is_candidate else jars).append(path)
+        return TreeScan(root, sorted(candidates), sorted(jars), h.hexdigest())
+
+
+class InventoryState:
+    """Results of the previous run per dependency, reused while the dependency's fingerprint is unchanged.
+
+    Entries are keyed by ecosystem, name, version and source path; each holds the fingerprint
+    of its source tree (the Gradle cache directory for android-gradle) and the values derived
+    from it (`license`, `documents`). Documents fetched from the network are never stored.
+    Entries not looked up during a run are dropped on save.
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, object]] = {}
+        self._seen: Dict[str, Dict[str, object]] = {}
+        self.reused = 0
+        self.regenerated = 0
+        try:
+            obj = json.loads(path.read_text(encoding="utf-8"))
+            if obj.get("version") == self.VERSION:
+                self._entries = dict(obj.get("entries", {}))
+        except Exception:
+            pass
+
+    @staticmethod
+    def key(dep: Dict[str, str]) -> str:
+        return "|".join(str(dep.get(k, "")) for k in ("ecosystem", "name", "version", "source_path"))
+
+    def get(self, key: str, fingerprint: str, field: str) -> object | None:
+        with self._lock:
+            entry = self._seen.get(key) or self._entries.get(key)
+            if entry is None or entry.get("fingerprint") != fingerprint or field not in entry:
+                return None
+            self._seen[key] = entry
+            self.reused += 1
+            return entry[field]
+
+    def put(self, key: str, fingerprint: str, field: str, value: object) -> None:
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is None or entry.get("fingerprint") != fingerprint:
+                entry = self._seen[key] = {"fingerprint": fingerprint}
+            entry[field] = value
+            self.regenerated += 1
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": self.VERSION, "entries": self._seen}, ensure_ascii=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def default_state_path(repo_root: Path) -> Path:
+    key = hashlib.sha1(str(repo_root).encode("utf-8")).hexdigest()[:16]
+    return default_cache_dir().parent / "inventory-state" / f"{key}.json"
+
+
+def detect_tree_license(scan: TreeScan) -> str:
+    for cand in scan.candidates:
+        n = cand.name.lower()
+        if not (n.startswith("license") or n.startswith("copying")):
+            continue
+        try:
+            txt = cand.read_text(encoding="utf-8", errors="ignore")
+        except Exception:
+            continue
+        lic = detect_license_from_text(txt)
+        if lic:
+            return lic
+    return ""
+
+
+def parse_third_party(
+    repo_root: Path, index: CandidateIndex | None = None, state: InventoryState | None = None
+) -> List[Dict[str, str]]:
     third_party = repo_root / "third_party"
     if not third_party.exists():
         return []
+    index = index or CandidateIndex()
     out: List[Dict[str, str]] = []
     for p in sorted(third_party.iterdir()):
         if not p.is_dir():
             continue
-        lic = ""
-        for cand in sorted(p.rglob("*")):
-            if not cand.is_file():
-                continue
-            n = cand.name.lower()
-            if not (n.startswith("license") or n.startswith("copying")):
-                continue
-            try:
-                txt = cand.read_text(encoding="utf-8", errors="ignore")
-            except Exception:
-                continue
-            lic = detect_license_from_text(txt)
-            if lic:
-                break
-        out.append(
-            {
-                "ecosystem": "vendored-native",
-                "name": p.name,
-                "version": "",
-                "license": lic,
-                "source_path": str(p.relative_to(repo_root)),
-            }
-        )
+        dep = {
+            "ecosystem": "vendored-native",
+            "name": p.name,
+            "version": "",
+            "license": "",
+            "source_path": str(p.relative_to(repo_root)),
+        }
+        scan = index.scan(p)
+        key = InventoryState.key(dep)
+        lic = state.get(key, scan.fingerprint, "license") if state is not None else None
+        if lic is None:
+            lic = detect_tree_license(scan)
+            if state is not None:
+                state.put(key, scan.fingerprint, "license", lic)
+        dep["license"] = str(lic)
+        out.append(dep)
     return out
 
 
@@ -161,15 +448,13 @@ def is_ignored(dep: Dict[str, str], cfg: Dict[str, List[str]]) -> bool:
     return False
 
 
-def find_local_license_files(base_dir: Path) -> List[Path]:
+def find_local_license_files(base_dir: Path, index: CandidateIndex | None = None) -> List[Path]:
     if not base_dir.exists():
         return []
     out: List[Path] = []
     allowed_exts = {"", ".txt", ".md", ".markdown", ".rst"}
     skip_exts = {".cmake", ".c", ".cc", ".cpp", ".h", ".hpp", ".py", ".java", ".kt", ".js", ".ts", ".sh"}
-    for p in sorted(base_dir.rglob("*")):
-        if not p.is_file():
-            continue
+    for p in (index or CandidateIndex()).scan(base_dir).candidates:
         n = p.name.lower()
         stem = p.stem.lower()
         ext = p.suffix.lower()
@@ -206,27 +491,25 @@ def docs_from_zip_member(zf: zipfile.ZipFile, member: str, title: str) -> Dict[s
     return {"title": title, "format": fmt, "text": text}
 
 
-def docs_for_gradle(dep: Dict[str, str]) -> List[Dict[str, str]]:
+def gradle_cache_root(dep: Dict[str, str]) -> Path | None:
     name = dep.get("name", "")
     if ":" not in name:
-        return []
+        return None
     group, artifact = name.split(":", 1)
-    version = dep.get("version", "")
-    cache_root = Path.home() / ".gradle" / "caches" / "modules-2" / "files-2.1" / group / artifact / version
-    if not cache_root.exists():
+    return Path.home() / ".gradle" / "caches" / "modules-2" / "files-2.1" / group / artifact / dep.get("version", "")
+
+
+def local_docs_for_gradle(dep: Dict[str, str], index: CandidateIndex | None = None) -> List[Dict[str, str]]:
+    """License files found in the dependency's Gradle cache directory or inside its jars."""
+    cache_root = gradle_cache_root(dep)
+    if cache_root is None or not cache_root.exists():
         return []
+    scan = (index or CandidateIndex()).scan(cache_root)
     docs: List[Dict[str, str]] = []
-    local_files = []
-    for f in sorted(cache_root.rglob("*")):
-        if not f.is_file():
-            continue
-        n = f.name.lower()
-        if n.startswith("license") or n.startswith("copying") or n.startswith("notice"):
-            local_files.append(f)
-    docs.extend(docs_from_files(cache_root, local_files[:3]))
+    docs.extend(docs_from_files(cache_root, scan.candidates[:3]))
     if docs:
         return docs
-    for arc in sorted(cache_root.rglob("*.jar"))[:3]:
+    for arc in scan.jars[:3]:
         try:
             with zipfile.ZipFile(arc, "r") as zf:
                 members = [n for n in zf.namelist() if re.search(r"(^|/)(license|copying|notice)([^/]*)$", n, re.IGNORECASE)]
@@ -236,8 +519,13 @@ def docs_for_gradle(dep: Dict[str, str]) -> List[Dict[str, str]]:
                         docs.append(d)
         except Exception:
             continue
-    if docs:
-        return docs[:3]
+    return docs[:3]
+
+
+def remote_docs_for_gradle(dep: Dict[str, str]) -> List[Dict[str, str]]:
+    """Fallbacks for dependencies without a local license: the prefix map, AndroidX, GitHub."""
+    group, artifact = dep.get("name", "").split(":", 1)
+    docs: List[Dict[str, str]] = []
     mapped = docs_for_gradle_prefix_map(group)
     if mapped:
         docs.append(mapped)
@@ -264,6 +552,8 @@ def docs_for_gradle(dep: Dict[str, str]) -> List[Dict[str, str]]:
 
 
 _GRADLE_LICENSE_MAPPINGS: List[Dict[str, str]] = []
+# group_prefix -> document (None when its license_url could not be fetched), filled during a run.
+_PREFIX_DOCS: Dict[str, Dict[str, str] | None] = {}
 
 
 def docs_for_gradle_prefix_map(group: str) -> Dict[str, str] | None:
@@ -274,12 +564,15 @@ def docs_for_gradle_prefix_map(group: str) -> Dict[str, str] | None:
         src = row.get("license_url", "")
         if not src:
             continue
-        text = fetch_text_url(src)
-        if not text:
+        if prefix not in _PREFIX_DOCS:
+            text = fetch_text_url(src)
+            title = row.get("title", "").strip() or f"{prefix} LICENSE"
+            fmt = "markdown" if src.lower().endswith(".md") else "text"
+            _PREFIX_DOCS[prefix] = {"title": title, "format": fmt, "text": text} if text else None
+        doc = _PREFIX_DOCS[prefix]
+        if doc is None:
             continue
-        title = row.get("title", "").strip() or f"{prefix} LICENSE"
-        fmt = "markdown" if src.lower().endswith(".md") else "text"
-        return {"title": title, "format": fmt, "text": text}
+        return doc
     return None
 
 
@@ -291,48 +584,34 @@ def fetch_github_license(owner: str, repo: str) -> Dict[str, str] | None:
     for branch in branches:
         for name in names:
             url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{name}"
-            try:
-                with urllib.request.urlopen(url, timeout=6) as resp:
-                    if int(getattr(resp, "status", 200)) >= 400:
-                        continue
-                    raw = resp.read()
-                text = raw.decode("utf-8", errors="ignore").strip()
-                if not text:
-                    continue
-                fmt = "markdown" if name.lower().endswith(".md") else "text"
-                return {
-                    "title": f"{owner}/{repo}:{name}",
-                    "format": fmt,
-                    "text": text,
-                }
-            except Exception:
+            text = _URL_CACHE.get(url, timeout=6)
+            if not text:
                 continue
+            fmt = "markdown" if name.lower().endswith(".md") else "text"
+            return {
+                "title": f"{owner}/{repo}:{name}",
+                "format": fmt,
+                "text": text,
+            }
     return None
 
 
 def fetch_text_url(url: str) -> str:
     candidates = [url]
-    m = re.match(r"^https://github\\.com/([^/]+)/([^/]+)/blob/([^/]+)/(.*)$", url)
+    m = re.match(r"^https://github\.com/([^/]+)/([^/]+)/blob/([^/]+)/(.*)$", url)
     if m:
         owner, repo, branch, path = m.groups()
         candidates.insert(0, f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{path}")
     for u in candidates:
-        try:
-            with urllib.request.urlopen(u, timeout=8) as resp:
-                if int(getattr(resp, "status", 200)) >= 400:
-                    continue
-                raw = resp.read()
-            text = raw.decode("utf-8", errors="ignore").strip()
-            if text:
-                return text
-        except Exception:
-            continue
+        text = _URL_CACHE.get(u, timeout=8)
+        if text:
+            return text
     return ""
 
 
-def docs_for_vendored(repo_root: Path, dep: Dict[str, str]) -> List[Dict[str, str]]:
+def docs_for_vendored(repo_root: Path, dep: Dict[str, str], index: CandidateIndex | None = None) -> List[Dict[str, str]]:
     base = repo_root / dep.get("source_path", "")
-    return docs_from_files(repo_root, find_local_license_files(base))
+    return docs_from_files(repo_root, find_local_license_files(base, index))
 
 
 
@@ -355,19 +634,52 @@ def docs_from_files(root: Path, files: List[Path]) -> List[Dict[str, str]]:
     return out
 
 
-def build_full_licenses(repo_root: Path, deps: List[Dict[str, str]]) -> Dict[str, object]:
+def docs_for_dependency(
+    repo_root: Path, dep: Dict[str, str], index: CandidateIndex, state: InventoryState | None = None
+) -> List[Dict[str, str]]:
+    eco = dep.get("ecosystem", "other")
+    if eco == "vendored-native":
+        root = repo_root / dep.get("source_path", "")
+    elif eco == "android-gradle":
+        root = gradle_cache_root(dep)
+        if root is None or not root.exists():
+            return []
+    else:
+        return []
+    fingerprint = index.scan(root).fingerprint
+    key = InventoryState.key(dep)
+    cached = state.get(key, fingerprint, "documents") if state is not None else None
+    if cached is not None:
+        docs = list(cached)  # type: ignore[call-overload]
+    else:
+        docs = docs_for_vendored(repo_root, dep, index) if eco == "vendored-native" else local_docs_for_gradle(dep, index)
+        if state is not None:
+            state.put(key, fingerprint, "documents", docs)
+    # Only what the local tree yields is kept in the state. Remote fallbacks go through UrlCache,
+    # which revalidates them itself, so a failed fetch is retried on the next run.
+    if not docs and eco == "android-gradle":
+        docs = remote_docs_for_gradle(dep)
+    return docs
+
+
+def build_full_licenses(
+    repo_root: Path,
+    deps: List[Dict[str, str]],
+    jobs: int = 8,
+    index: CandidateIndex | None = None,
+    state: InventoryState | None = None,
+) -> Dict[str, object]:
     section_labels = {
         "android-gradle": "Android (Gradle)",
         "vendored-native": "Vendored Native",
     }
+    index = index or CandidateIndex()
+    # Lookups are mostly network waits (see UrlCache), so resolve dependencies concurrently.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        all_docs = list(pool.map(lambda dep: docs_for_dependency(repo_root, dep, index, state), deps))
     grouped: Dict[str, List[Dict[str, object]]] = {}
-    for dep in deps:
+    for dep, docs in zip(deps, all_docs):
         eco = dep.get("ecosystem", "other")
-        docs: List[Dict[str, str]] = []
-        if eco == "vendored-native":
-            docs = docs_for_vendored(repo_root, dep)
-        elif eco == "android-gradle":
-            docs = docs_for_gradle(dep)
         item = {
             "name": dep.get("name", ""),
             "version": dep.get("version", ""),
@@ -394,23 +706,52 @@ def build_full_licenses(repo_root: Path, deps: List[Dict[str, str]]) -> Dict[str
     }
 
 
+def same_sections(path: Path, full: Dict[str, object]) -> bool:
+    try:
+        prev = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return False
+    return prev.get("schema_version") == full["schema_version"] and prev.get("sections") == full["sections"]
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Generate dependency inventory JSON.")
     parser.add_argument("--output", required=True, help="Output inventory JSON path")
     parser.add_argument("--licenses-output", required=False, help="Output full licenses JSON path")
+    parser.add_argument("--jobs", type=int, default=8, help="Concurrent license lookups")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("METHINGS_LICENSE_CACHE_DIR", ""),
+        help="License fetch cache (default: $XDG_CACHE_HOME or ~/.cache, under methings/license-fetch)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the license fetch cache")
+    parser.add_argument("--offline", action="store_true", help="Use cached license texts only; no network access")
+    parser.add_argument("--max-age-hours", type=float, default=24.0, help="Use cached texts without revalidating for this long")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse results for dependencies whose source tree is unchanged and leave unchanged outputs untouched",
+    )
+    parser.add_argument("--state", default="", help="Incremental state file (default: next to the license fetch cache)")
     args = parser.parse_args()
 
     repo_root = Path(__file__).resolve().parent.parent
-    global _GRADLE_LICENSE_MAPPINGS
+    global _GRADLE_LICENSE_MAPPINGS, _URL_CACHE
     _GRADLE_LICENSE_MAPPINGS = read_gradle_license_map(repo_root)
+    cache_dir = None if args.no_cache else (Path(args.cache_dir).expanduser() if args.cache_dir else default_cache_dir())
+    _URL_CACHE = UrlCache(cache_dir, offline=args.offline, max_age_s=args.max_age_hours * 3600)
     output = Path(args.output).resolve()
     output.parent.mkdir(parents=True, exist_ok=True)
 
     cfg = read_ignore_config(repo_root)
+    index = CandidateIndex()
+    state = None
+    if args.incremental:
+        state = InventoryState(Path(args.state).expanduser() if args.state else default_state_path(repo_root))
 
     deps = dedupe(
         parse_gradle_dependencies(repo_root)
-        + parse_third_party(repo_root)
+        + parse_third_party(repo_root, index, state)
     )
     deps = [d for d in deps if not is_ignored(d, cfg)]
 
@@ -419,16 +760,33 @@ def main() -> int:
         "dependencies": deps,
         "ignore_config": cfg,
     }
-    output.write_text(json.dumps(data, indent=2, ensure_ascii=True) + "\n", encoding="utf-8")
-    print(f"Wrote {len(deps)} dependencies to {output}")
+    text = json.dumps(data, indent=2, ensure_ascii=True) + "\n"
+    if args.incremental and output.exists() and output.read_text(encoding="utf-8") == text:
+        print(f"Unchanged: {len(deps)} dependencies in {output}")
+    else:
+        output.write_text(text, encoding="utf-8")
+        print(f"Wrote {len(deps)} dependencies to {output}")
 
     if args.licenses_output:
         lout = Path(args.licenses_output).resolve()
         lout.parent.mkdir(parents=True, exist_ok=True)
-        full = build_full_licenses(repo_root, deps)
-        lout.write_text(json.dumps(full, indent=2, ensure_ascii=True) + "\n", encoding="utf-8")
-        print(f"Wrote full licenses to {lout}")
+        t0 = time.monotonic()
+        full = build_full_licenses(repo_root, deps, jobs=args.jobs, index=index, state=state)
+        if args.incremental and same_sections(lout, full):
+            # Keep the previous file (and its generated_at_utc) when no document changed.
+            print(f"Unchanged: full licenses in {lout}")
+        else:
+            lout.write_text(json.dumps(full, indent=2, ensure_ascii=True) + "\n", encoding="utf-8")
+            st = _URL_CACHE.stats
+            print(
+                f"Wrote full licenses to {lout} in {time.monotonic() - t0:.1f}s "
+                f"({st['urls']} URLs: {st['fresh']} cached, {st['revalidated']} revalidated, {st['fetched']} fetched, "
+                f"{st['not_found']} not found, {st['stale']} stale, {st['failed']} failed)"
+            )
 
+    if state is not None:
+        state.save()
+        print(f"Incremental: {state.reused} results reused, {state.regenerated} regenerated")
     return 0
 
 
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Overlap a slow device_api call with fast polling on one event loop using AsyncMethingsClient.
+
+Runs against a local asyncio stand-in for /tools/device_api/invoke (no device needed) and checks
+that every call succeeds, that the slow call does not block the fast ones, and that the
+client's concurrency limit is respected:
+
+    PYTHONPATH=user/lib python3 user/examples/async_client_overlap.py --polls 200 --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from methings import AsyncMethingsClient
+
+
+# Per-action latency of the stand-in (seconds).
+DELAYS = {"mcu.flash": 1.0, "usb.status": 0.005, "sensor.list": 0.005}
+
+
+class StandIn:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    return
+                headers = {}
+                for line in head.decode("latin-1").split("\r\n")[1:]:
+                    k, _, v = line.partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                body = json.loads(await reader.readexactly(int(headers.get("content-length", "0"))) or b"{}")
+                action = (body.get("args") or {}).get("action", "")
+                self.calls += 1
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                try:
+                    await asyncio.sleep(DELAYS.get(action, 0.005))
+                finally:
+                    self.in_flight -= 1
+                out = json.dumps({"status": "ok", "action": action}).encode("utf-8")
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(out)}\r\n\r\n".encode("latin-1")
+                    + out
+                )
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def run(polls: int, concurrency: int) -> int:
+    standin = StandIn()
+    server = await asyncio.start_server(standin.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        async with AsyncMethingsClient(f"http://127.0.0.1:{port}", max_concurrency=concurrency) as k:
+            t0 = time.perf_counter()
+            flash = asyncio.ensure_future(k.mcu_flash(model="esp32", handle="h1", image_path="fw.bin"))
+            fast = await asyncio.gather(*(k.usb_status() if i % 2 else k.device_api("sensor.list", {}) for i in range(polls)))
+            fast_s = time.perf_counter() - t0
+            slow = await flash
+            total_s = time.perf_counter() - t0
+            stats = k.pool_stats()
+
+    failed = [r for r in [slow, *fast] if not r.get("ok")]
+    print(f"fast calls      : {polls} in {fast_s:.3f}s ({polls / fast_s:.0f} calls/s) while mcu.flash was in flight")
+    print(f"total           : {total_s:.3f}s")
+    print(f"max in flight   : {standin.max_in_flight} (limit {concurrency})")
+    print(f"pool stats      : {json.dumps(stats)}")
+    if failed:
+        print(f"FAILED: {failed[:3]}")
+        return 1
+    if standin.max_in_flight > concurrency:
+        print("FAILED: concurrency limit exceeded")
+        return 1
+    if fast_s >= DELAYS["mcu.flash"]:
+        print("FAILED: fast calls were blocked behind mcu.flash")
+        return 1
+    return 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--polls", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=4)
+    args = ap.parse_args()
+    return asyncio.run(run(args.polls, args.concurrency))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
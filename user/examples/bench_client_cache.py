@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Agents polling read-only actions from many threads: MethingsClient with and without
+`cache=True` (TTL cache + in-flight sharing, methings.cache).
+
+`--threads` workers each call usb_status / usb_list / mcu_models in a loop for `--seconds`,
+with an occasional usb.open that must invalidate usb.status. A local HTTP stand-in (separate
+process, no device needed) answers `/tools/device_api/invoke` after `--latency-ms` and counts
+the requests that reached it:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_client_cache.py --threads 8 --seconds 3
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from methings.client import MethingsClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency_s = 0.005
+    served = 0
+    lock = threading.Lock()
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self.path == "/bench/served":
+            with _Handler.lock:
+                out = {"served": _Handler.served}
+                _Handler.served = 0
+        else:
+            time.sleep(_Handler.latency_s)
+            with _Handler.lock:
+                _Handler.served += 1
+            out = {"status": "ok", "action": body["args"]["action"], "devices": []}
+        raw = json.dumps(out).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def _serve(port_q, latency_ms: float) -> None:
+    _Handler.latency_s = latency_ms / 1000.0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port_q.put(srv.server_address[1])
+    srv.serve_forever()
+
+
+def run(k: MethingsClient, threads: int, seconds: float):
+    calls = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def worker(i: int) -> None:
+        n = loops = 0
+        while time.perf_counter() < stop:
+            k.usb_status()
+            k.usb_list()
+            k.mcu_models()
+            n += 3
+            loops += 1
+            if loops % 100 == 0:
+                k.device_api("usb.open", {"name": "/dev/bus/usb/001/002"})
+                n += 1
+        calls[i] = n
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return sum(calls)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--latency-ms", type=float, default=5.0)
+    args = ap.parse_args()
+
+    q = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_serve, args=(q, args.latency_ms), daemon=True)
+    proc.start()
+    url = f"http://127.0.0.1:{q.get(timeout=10)}"
+
+    print(f"{args.threads} threads, {args.seconds:.0f}s, stand-in latency {args.latency_ms:.0f} ms")
+    for cache in (False, True):
+        with MethingsClient(url, pool_size=args.threads, cache=cache) as k:
+            calls = run(k, args.threads, args.seconds)
+            served = k.request_json("POST", "/bench/served", {})["json"]["served"]
+            label = "cache=True " if cache else "no cache   "
+            print(f"{label}: {calls / args.seconds:9.0f} calls/s, {served / args.seconds:7.0f} requests/s reached the server")
+            if cache:
+                st = k.cache_stats()
+                print(
+                    f"             hits={st['hits']} shared={st['shared']} misses={st['misses']} "
+                    f"hit_rate={st['hit_rate']:.3f} invalidated={st['invalidated']}"
+                )
+    proc.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compare MethingsClient keep-alive pooling with the per-call urlopen path.
+
+Runs against a local HTTP/1.1 stand-in for /tools/device_api/invoke, so no device is needed:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_client_keepalive.py --calls 2000 --threads 4
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from methings import MethingsClient
+
+
+class _InvokeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffer headers + body into one write per response (flushed after each request).
+    wbufsize = 64 * 1024
+
+    def do_POST(self) -> None:
+        n = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(n) or b"{}")
+        action = (body.get("args") or {}).get("action", "")
+        out = json.dumps({"status": "ok", "action": action}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def run(client: MethingsClient, calls: int, threads: int) -> float:
+    per_thread = max(1, calls // threads)
+
+    def worker() -> None:
+        for _ in range(per_thread):
+            r = client.usb_status()
+            if not r.get("ok"):
+                raise SystemExit(f"request failed: {r}")
+
+    ts = [threading.Thread(target=worker) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return (per_thread * threads) / (time.perf_counter() - t0)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=2000)
+    ap.add_argument("--threads", type=int, default=4)
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _InvokeHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        legacy = run(MethingsClient(base, keep_alive=False), args.calls, args.threads)
+        with MethingsClient(base, pool_size=args.threads) as pooled:
+            keep_alive = run(pooled, args.calls, args.threads)
+            stats = pooled.pool_stats()
+    finally:
+        server.shutdown()
+
+    print(f"urlopen per call : {legacy:10.1f} calls/s")
+    print(f"keep-alive pool  : {keep_alive:10.1f} calls/s  ({keep_alive / legacy:.2f}x)")
+    print(f"pool stats       : {json.dumps(stats)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
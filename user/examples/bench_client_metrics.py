@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Per-action latency histograms (MethingsClient(metrics=True), methings.metrics): what they cost
+per call, and whether they point at the action behind the tail.
+
+A local HTTP stand-in (separate process, no device needed) answers `device_api` with a
+`Server-Timing` header like the app does. Most actions are fast; `camera.status` stalls for
+`--stall-ms` on `--stall-pct` % of calls. The bench first measures calls/s on a no-op action
+with metrics disabled, enabled, and enabled with a Chrome trace file (best of 5, interleaved;
+loopback timings are noisy, so the cost of `ClientMetrics.record()` is also timed in-process),
+then runs a mixed workload and prints `format_summary()`:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_client_metrics.py --calls 5000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from methings.client import MethingsClient
+from methings.metrics import ClientMetrics
+
+# action -> (base server ms, jitter ms)
+_ACTIONS = {
+    "bench.noop": (0.0, 0.0),
+    "usb.status": (0.3, 0.2),
+    "sensor.list": (0.5, 0.3),
+    "camera.status": (0.4, 0.2),
+    "ble.status": (0.6, 0.4),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    stall_s = 0.08
+    stall_p = 0.02
+    rng = random.Random(5)
+
+    def do_POST(self) -> None:
+        t0 = time.perf_counter()
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        action = (body.get("args") or body)["action"]
+        if action not in _ACTIONS:
+            out, code = b'{"status":"error","error":"unknown_action"}', 404
+        else:
+            base, jitter = _ACTIONS[action]
+            delay = (base + _Handler.rng.random() * jitter) / 1000.0
+            if action == "camera.status" and _Handler.rng.random() < _Handler.stall_p:
+                delay += _Handler.stall_s
+            if delay:
+                time.sleep(delay)
+            out, code = json.dumps({"status": "ok", "action": action}).encode(), 200
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.send_header("Server-Timing", f"app;dur={(time.perf_counter() - t0) * 1000:.2f}")
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def _serve(port_q, stall_ms: float, stall_pct: float) -> None:
+    _Handler.stall_s = stall_ms / 1000.0
+    _Handler.stall_p = stall_pct / 100.0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port_q.put(srv.server_address[1])
+    srv.serve_forever()
+
+
+def _rate(k: MethingsClient, calls: int) -> float:
+    for _ in range(200):
+        k.device_api("bench.noop", {})
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        k.device_api("bench.noop", {})
+    return calls / (time.perf_counter() - t0)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=5000)
+    ap.add_argument("--stall-ms", type=float, default=80.0)
+    ap.add_argument("--stall-pct", type=float, default=2.0)
+    args = ap.parse_args()
+
+    q = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_serve, args=(q, args.stall_ms, args.stall_pct), daemon=True)
+    proc.start()
+    url = f"http://127.0.0.1:{q.get(timeout=10)}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trace_path = os.path.join(tmp, "trace.json")
+        rates = {}
+        # Interleave the variants so drift on the machine hits them equally.
+        for _ in range(5):
+            for label, metrics in (("disabled", False), ("enabled", True), ("enabled + trace", "trace")):
+                m = ClientMetrics(trace_path=trace_path) if metrics == "trace" else metrics
+                with MethingsClient(url, metrics=m) as k:
+                    rates.setdefault(label, []).append(_rate(k, args.calls))
+                if isinstance(m, ClientMetrics):
+                    m.close()
+        base = max(rates["disabled"])
+        print(f"{args.calls} no-op device_api calls over keep-alive, best of 5:")
+        for label, rs in rates.items():
+            r = max(rs)
+            print(f"  metrics {label:<16}: {r:7.0f} calls/s  ({(1 / r - 1 / base) * 1e6:+6.1f} us/call)")
+        with open(trace_path, encoding="utf-8") as f:
+            events = json.load(f)
+        print(f"  trace file: {len(events)} Chrome trace events, e.g. {json.dumps(events[-1])[:110]}...")
+
+    m = ClientMetrics()
+    timing = {"total": 1e-3, "serialize": 1e-5, "connect": 0.0, "server": 2e-4, "wait": 3e-4, "parse": 1e-5}
+    t0 = time.perf_counter()
+    for _ in range(100_000):
+        m.record("bench.noop", t0, timing, "200")
+    print(f"  ClientMetrics.record(): {(time.perf_counter() - t0) * 10:.1f} us/call in-process")
+
+    k = MethingsClient(url, metrics=True)
+    rng = random.Random(9)
+    mixed = [a for a in _ACTIONS if a != "bench.noop"]
+    for _ in range(2000):
+        k.device_api(rng.choice(mixed), {})
+    k.device_api("bench.missing", {})
+    print(f"\nmixed workload (camera.status stalls {args.stall_ms:g} ms on {args.stall_pct:g}% of calls), times in ms:")
+    print(k.metrics.format_summary())
+    proc.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Reflashing an ESP32 over USB-serial: plain `mcu_flash` (every byte, 0xFF padding included) vs.
+methings.esp_flash.flash (padding trimmed, 4 KiB-aligned slices, FLASH_DEFL compressed writes,
+slices whose MD5 already matches on the target skipped).
+
+A local HTTP stand-in (separate process, no board needed) answers `mcu.flash` from
+`/tools/device_api/invoke` against an emulated 4 MiB flash, charging the ROM loader's costs:
+SLIP bytes at `--baud`, a turnaround per command, sector erase time and MD5 read time.
+`--time-scale` shrinks those delays and reported times are scaled back up:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_esp_flash.py --app-kib 1536
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from methings.client import MethingsClient
+from methings.esp_flash import SECTOR_BYTES, deflated_wire_bytes, flash, raw_wire_bytes
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    root = ""
+    target = bytearray()
+    bytes_per_s = 11520.0
+    turnaround_s = 0.002
+    erase_s_per_sector = 0.03
+    md5_s_per_mb = 0.3
+    scale = 1.0
+
+    def _reply(self, obj: dict) -> None:
+        out = json.dumps(obj).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        args = body.get("args") or body
+        action, p = args["action"], args.get("payload") or {}
+        if action == "mcu.flash":
+            return self._reply(self._flash(p))
+        if action == "bench.target":
+            return self._reply({"status": "ok", "md5": hashlib.md5(_Handler.target[p["offset"]:p["offset"] + p["length"]]).hexdigest()})
+        if action == "bench.fill":
+            _Handler.target[:] = bytes.fromhex(p["hex"]) * (len(_Handler.target) // (len(p["hex"]) // 2))
+            return self._reply({"status": "ok"})
+        self._reply({"status": "error", "error": "unsupported"})
+
+    def _flash(self, p: dict) -> dict:
+        segs = p.get("segments") or [{"path": p["image_path"], "offset": p.get("offset", 0x10000)}]
+        t0 = time.perf_counter()
+        cost = 0.0
+        wire_total, skipped, bytes_skipped, out = 0, 0, 0, []
+        for s in segs:
+            with open(os.path.join(_Handler.root, s["path"]), "rb") as f:
+                data = f.read()
+            fo = int(s.get("file_offset", 0))
+            data = data[fo:fo + int(s.get("length", len(data) - fo))]
+            off = int(s["offset"])
+            md5 = hashlib.md5(data).hexdigest()
+            if p.get("skip_unchanged"):
+                cost += _Handler.turnaround_s + len(data) / 1e6 * _Handler.md5_s_per_mb
+                wire_total += 42
+                if hashlib.md5(_Handler.target[off:off + len(data)]).hexdigest() == md5:
+                    skipped += 1
+                    bytes_skipped += len(data)
+                    out.append({"offset": off, "size": len(data), "skipped": True})
+                    continue
+            blocks = (len(data) + 1023) // 1024
+            if p.get("compress"):
+                comp = zlib.compress(data, 9)
+                wire = deflated_wire_bytes(comp)
+                blocks = (len(comp) + 1023) // 1024
+            else:
+                wire = raw_wire_bytes(data)
+            sectors = (len(data) + SECTOR_BYTES - 1) // SECTOR_BYTES
+            cost += wire / _Handler.bytes_per_s + (blocks + 1) * _Handler.turnaround_s + sectors * _Handler.erase_s_per_sector
+            wire_total += wire
+            _Handler.target[off:off + sectors * SECTOR_BYTES] = b"\xff" * (sectors * SECTOR_BYTES)
+            _Handler.target[off:off + len(data)] = data
+            out.append({"offset": off, "size": len(data), "skipped": False, "wire_bytes": wire})
+        time.sleep(max(0.0, cost * _Handler.scale - (time.perf_counter() - t0)))
+        return {"status": "ok", "segments": out, "segment_count": len(out), "segments_skipped": skipped,
+                "bytes_skipped": bytes_skipped, "bytes_on_wire": wire_total, "compress": bool(p.get("compress")),
+                "elapsed_ms": int(cost * 1000)}
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def _serve(port_q, root: str, baud: int, scale: float) -> None:
+    _Handler.root = root
+    _Handler.target = bytearray(b"\xff" * (4 << 20))
+    _Handler.bytes_per_s = baud / 10.0
+    _Handler.scale = scale
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port_q.put(srv.server_address[1])
+    srv.serve_forever()
+
+
+def make_image(rng: random.Random, code_bytes: int, pad_to: int) -> bytes:
+    """ESP32 app image: header + extended header, 4 segments, checksum, SHA-256, 0xFF padding."""
+    words = [bytes(rng.getrandbits(8) for _ in range(4)) for _ in range(512)]
+    out = bytearray(struct.pack("<BBBBI", 0xE9, 4, 2, 0x20, 0x400D1234))
+    out += bytes(15) + b"\x01"  # extended header, hash_appended = 1
+    for i in range(4):
+        n = code_bytes // 4 // 4 * 4
+        body = b"".join(rng.choice(words) for _ in range(n // 4))
+        out += struct.pack("<II", 0x3F400000 + i * 0x100000, len(body)) + body
+    out += bytes(15 - len(out) % 16) + b"\xef"
+    out += hashlib.sha256(out).digest()
+    return bytes(out) + b"\xff" * max(0, pad_to - len(out))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--app-kib", type=int, default=1024)
+    ap.add_argument("--pad-kib", type=int, default=1536)
+    ap.add_argument("--baud", type=int, default=115200)
+    ap.add_argument("--time-scale", type=float, default=0.02)
+    args = ap.parse_args()
+    scale = args.time_scale
+
+    rng = random.Random(7)
+    files = {
+        "fw/bootloader.bin": (0x1000, make_image(rng, 24 * 1024, 0)),
+        "fw/partition-table.bin": (0x8000, bytes(rng.getrandbits(8) for _ in range(192)) + b"\xff" * (3072 - 192)),
+        "fw/app.bin": (0x10000, make_image(rng, args.app_kib * 1024, args.pad_kib * 1024)),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for path, (_, data) in files.items():
+            os.makedirs(os.path.dirname(os.path.join(tmp, path)), exist_ok=True)
+            with open(os.path.join(tmp, path), "wb") as f:
+                f.write(data)
+        q = multiprocessing.Queue()
+        proc = multiprocessing.Process(target=_serve, args=(q, tmp, args.baud, scale), daemon=True)
+        proc.start()
+        k = MethingsClient(f"http://127.0.0.1:{q.get(timeout=10)}")
+        segments = [{"path": p, "offset": off} for p, (off, _) in files.items()]
+        images = {p: d for p, (_, d) in files.items()}
+        total = sum(len(d) for d in images.values())
+        print(f"{len(files)} segments, {total / 1024:.0f} KiB (app {args.app_kib} KiB padded to {args.pad_kib} KiB), "
+              f"{args.baud} baud (times scaled from --time-scale {scale})")
+
+        def target_ok() -> bool:
+            for path, (off, data) in files.items():
+                n = len(data.rstrip(b"\xff")) if path.endswith("app.bin") else len(data)
+                r = k.device_api("bench.target", {"offset": off, "length": n})["json"]
+                if r["md5"] != hashlib.md5(data[:n]).hexdigest():
+                    return False
+            return True
+
+        k.device_api("bench.fill", {"hex": "00a5"})
+        t0 = time.perf_counter()
+        r = k.mcu_flash(model="esp32", handle="h", segments=segments)["json"]
+        raw_s = (time.perf_counter() - t0) / scale
+        print(f"mcu_flash raw           : {raw_s:7.1f} s  wire {r['bytes_on_wire'] / 1024:7.1f} KiB  ok={target_ok()}")
+
+        def report(label: str) -> None:
+            r = flash(k, handle="h", segments=segments, images=images)
+            print(f"esp_flash {label:<14}: {r['elapsed_s'] / scale:7.1f} s  wire {r['wire_bytes'] / 1024:7.1f} KiB "
+                  f"(raw {r['raw_wire_bytes'] / 1024:.0f} KiB)  written {r['regions_written']:2d} "
+                  f"skipped {r['regions_skipped']:2d}  trimmed {r['dropped_bytes'] / 1024:.0f} KiB  ok={target_ok()}")
+
+        k.device_api("bench.fill", {"hex": "00a5"})
+        report("old firmware")
+        report("same firmware")
+        app = bytearray(images["fw/app.bin"])
+        app[300_000:300_016] = os.urandom(16)
+        images["fw/app.bin"] = bytes(app)
+        files["fw/app.bin"] = (0x10000, bytes(app))
+        with open(os.path.join(tmp, "fw/app.bin"), "wb") as f:
+            f.write(app)
+        report("16 B changed")
+        proc.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
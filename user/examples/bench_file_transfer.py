@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Moving a large file to and from the user root: one base64 `/user/write` JSON request vs.
+methings.files.upload_file / download_file (octet-stream segments, Range resume, SHA-256).
+
+A local HTTP stand-in (separate process, no device needed) implements `/user/write/<path>`,
+`/user/file/<path>` and `/user/file/info/<path>`; with `--drop-after-mb` it cuts the first
+streaming upload and download after that many bytes to show resume. Client peak memory is
+measured with tracemalloc:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_file_transfer.py --size-mb 64 --drop-after-mb 20
+"""
+import argparse
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from methings.client import MethingsClient
+from methings.files import download_file, upload_file
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    root = ""
+    drop_after = 0
+    dropped = {"write": False, "read": False}
+
+    def _reply(self, status: int, obj: dict) -> None:
+        out = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _target(self, prefix: str):
+        u = urllib.parse.urlsplit(self.path)
+        rel = urllib.parse.unquote(u.path[len(prefix):])
+        return os.path.join(_Handler.root, rel), urllib.parse.parse_qs(u.query)
+
+    def _drop(self, kind: str, done: int) -> bool:
+        if not _Handler.drop_after or _Handler.dropped[kind] or done < _Handler.drop_after:
+            return False
+        _Handler.dropped[kind] = True
+        self.close_connection = True
+        return True
+
+    def do_GET(self) -> None:
+        if self.path.startswith("/user/file/info/"):
+            p, q = self._target("/user/file/info/")
+            if not os.path.isfile(p):
+                return self._reply(404, {"error": "not_found"})
+            out = {"size": os.path.getsize(p)}
+            if q.get("sha256"):
+                h = hashlib.sha256()
+                with open(p, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        h.update(block)
+                out["sha256"] = h.hexdigest()
+            return self._reply(200, out)
+        p, _ = self._target("/user/file/")
+        total = os.path.getsize(p)
+        m = re.match(r"bytes=(\d+)-$", self.headers.get("Range", ""))
+        start = int(m.group(1)) if m else 0
+        self.send_response(206 if m else 200)
+        self.send_header("Content-Length", str(total - start))
+        if m:
+            self.send_header("Content-Range", f"bytes {start}-{total - 1}/{total}")
+        self.end_headers()
+        with open(p, "rb") as f:
+            f.seek(start)
+            sent = 0
+            for block in iter(lambda: f.read(1 << 16), b""):
+                self.wfile.write(block)
+                sent += len(block)
+                if self._drop("read", sent):
+                    return
+
+    def do_POST(self) -> None:
+        n = int(self.headers.get("Content-Length") or 0)
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            body = json.loads(self.rfile.read(n))
+            p = os.path.join(_Handler.root, body["path"])
+            data = base64.b64decode(body["data_b64"])
+            with open(p, "wb") as f:
+                f.write(data)
+            return self._reply(200, {"status": "ok", "path": body["path"], "bytes_written": len(data)})
+        p, q = self._target("/user/write/")
+        offset = int(q.get("offset", ["0"])[0])
+        current = os.path.getsize(p) if os.path.isfile(p) else 0
+        if offset > current:
+            self.rfile.read(n)
+            return self._reply(409, {"error": "offset_mismatch", "size": current})
+        written = 0
+        with open(p, "r+b" if os.path.exists(p) else "wb") as f:
+            f.seek(offset)
+            while written < n:
+                block = self.rfile.read(min(1 << 16, n - written))
+                if not block:
+                    break
+                f.write(block)
+                written += len(block)
+                if self._drop("write", offset + written):
+                    f.truncate(offset + written)
+                    return
+            f.truncate(offset + written)
+        out = {"status": "ok", "path": p, "offset": offset, "bytes_written": written, "size": os.path.getsize(p)}
+        if q.get("sha256"):
+            with open(p, "rb") as f:
+                out["sha256"] = hashlib.sha256(f.read()).hexdigest()
+        self._reply(200, out)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def _serve(port_q, root: str, drop_after: int) -> None:
+    _Handler.root = root
+    _Handler.drop_after = drop_after
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port_q.put(srv.server_address[1])
+    srv.serve_forever()
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, dt, peak
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-mb", type=int, default=64)
+    ap.add_argument("--drop-after-mb", type=int, default=0)
+    args = ap.parse_args()
+    mb = 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "user")
+        os.makedirs(root)
+        src = os.path.join(tmp, "src.bin")
+        with open(src, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(mb))
+
+        q = multiprocessing.Queue()
+        proc = multiprocessing.Process(target=_serve, args=(q, root, args.drop_after_mb * mb), daemon=True)
+        proc.start()
+        k = MethingsClient(f"http://127.0.0.1:{q.get(timeout=10)}")
+
+        def b64_write():
+            with open(src, "rb") as f:
+                data = f.read()
+            return k.request_json("POST", "/user/write", {"path": "b64.bin", "data_b64": base64.b64encode(data).decode("ascii")})
+
+        _, dt, peak = measure(b64_write)
+        print(f"{args.size_mb} MiB, stand-in server" + (f", connection dropped after {args.drop_after_mb} MiB" if args.drop_after_mb else ""))
+        print(f"base64 files.write : {args.size_mb / dt:7.1f} MiB/s, client peak {peak / mb:7.1f} MiB")
+        r, dt, peak = measure(lambda: upload_file(k, src, "stream.bin"))
+        print(f"upload_file        : {args.size_mb / dt:7.1f} MiB/s, client peak {peak / mb:7.1f} MiB (sha256 verified)")
+        r, dt, peak = measure(lambda: download_file(k, "stream.bin", os.path.join(tmp, "dl.bin")))
+        print(f"download_file      : {args.size_mb / dt:7.1f} MiB/s, client peak {peak / mb:7.1f} MiB, resumed from {r['resumed_from']} (sha256 verified)")
+        k.close()
+        proc.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Measure UVC frame reassembly from KISO isochronous blobs (methings.iso) on synthetic data.
+
+Builds 720p-sized MJPEG (or YUY2) frames, splits them into UVC payloads with 12-byte headers,
+packs them into KISO blobs like `usb.stream.start(mode="iso_in")` produces, then compares a
+per-packet struct/bytes loop with UvcFrameAssembler (the NumPy path pays off from about 96 packets
+per blob, see --packets-per-blob):
+
+    PYTHONPATH=user/lib python3 user/examples/bench_kiso_uvc.py --frames 120
+"""
+import argparse
+import struct
+import time
+from typing import List
+
+from methings.iso import KISO_MAGIC, UVC_EOF, UvcFrameAssembler, has_numpy
+
+
+def make_frames(n: int, fmt: str, width: int, height: int, jpeg_bytes: int) -> List[bytes]:
+    out = []
+    for i in range(n):
+        if fmt == "yuy2":
+            out.append(bytes([i & 0xFF]) * (width * height * 2))
+        else:
+            body = bytes([(i + k) & 0x7F for k in range(256)]) * (jpeg_bytes // 256)
+            out.append(b"\xff\xd8" + body + b"\xff\xd9")
+    return out
+
+
+def make_blobs(frames: List[bytes], packet_payload: int, packets_per_blob: int) -> List[bytes]:
+    packets = []
+    for i, frame in enumerate(frames):
+        fid = i & 1
+        for off in range(0, len(frame), packet_payload):
+            part = frame[off:off + packet_payload]
+            info = 0x80 | fid | (UVC_EOF if off + packet_payload >= len(frame) else 0)
+            packets.append(bytes([12, info]) + bytes(10) + part)
+        # Some cameras emit header-only packets between frames.
+        packets.append(bytes([12, 0x80 | fid]) + bytes(10))
+    blobs = []
+    for b in range(0, len(packets), packets_per_blob):
+        group = packets[b:b + packets_per_blob]
+        desc = b"".join(struct.pack("<ii", 0, len(p)) for p in group)
+        payload = b"".join(group)
+        blobs.append(struct.pack("<III", KISO_MAGIC, len(group), len(payload)) + desc + payload)
+    return blobs
+
+
+def naive(blobs: List[bytes]) -> int:
+    # The typical hand-written loop: unpack each descriptor, slice bytes per packet, join at EOF.
+    frames = 0
+    parts: List[bytes] = []
+    for blob in blobs:
+        _, n, _ = struct.unpack("<III", blob[:12])
+        off = 12 + n * 8
+        for i in range(n):
+            st, ln = struct.unpack("<ii", blob[12 + i * 8:20 + i * 8])
+            if ln <= 0:
+                continue
+            pkt = blob[off:off + ln]
+            off += ln
+            if st != 0 or len(pkt) < 2:
+                continue
+            parts.append(pkt[pkt[0]:])
+            if pkt[1] & UVC_EOF:
+                if len(b"".join(parts)) > 0:
+                    frames += 1
+                parts = []
+    return frames
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=120)
+    ap.add_argument("--fmt", choices=["mjpeg", "yuy2"], default="mjpeg")
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=720)
+    ap.add_argument("--jpeg-bytes", type=int, default=160 * 1024)
+    ap.add_argument("--packet-payload", type=int, default=3060)
+    ap.add_argument("--packets-per-blob", type=int, default=48)
+    args = ap.parse_args()
+
+    frames = make_frames(args.frames, args.fmt, args.width, args.height, args.jpeg_bytes)
+    blobs = make_blobs(frames, args.packet_payload, args.packets_per_blob)
+
+    t0 = time.perf_counter()
+    n_naive = naive(blobs)
+    naive_fps = n_naive / (time.perf_counter() - t0)
+
+    results = [("per-packet loop", naive_fps, n_naive)]
+    # None picks the NumPy path per blob (>= 96 packets), True forces it.
+    modes = [False, None, True] if has_numpy() else [False]
+    labels = {False: "", None: " (auto)", True: " (numpy)"}
+    for use_numpy in modes:
+        asm = UvcFrameAssembler(fmt=args.fmt, width=args.width, height=args.height, use_numpy=use_numpy)
+        t0 = time.perf_counter()
+        got = 0
+        for blob in blobs:
+            for fr in asm.feed_kiso(blob):
+                if bytes(fr.data[:2]) != frames[got][:2] or len(fr.data) != len(frames[got]):
+                    raise SystemExit(f"frame {got} mismatch")
+                got += 1
+        fps = got / (time.perf_counter() - t0)
+        results.append((f"UvcFrameAssembler{labels[use_numpy]}", fps, got))
+
+    print(f"{len(blobs)} KISO blobs, {args.frames} {args.fmt} frames of ~{len(frames[0]) // 1024} KiB")
+    for name, fps, n in results:
+        print(f"{name:28s}: {fps:8.1f} frames/s ({n} frames)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Re-deploying a MicroPython app: `mcu_micropython_write_file` for every file (fixed 768-byte
+chunks) vs. methings.micropython.deploy (board-side hashes, skip identical files, compressed
+and batched writes, adaptive chunk size).
+
+A local HTTP stand-in (separate process, no board needed) answers `/tools/device_api/invoke`
+for `mcu.micropython.exec` / `write_file` by running the code with CPython in a temp
+directory. Each exec costs `--exec-overhead-ms` (entering raw REPL and waiting for the prompt)
+plus the code bytes at `--baud`; `--time-scale` shrinks those delays and reported times are
+scaled back up:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_micropython_deploy.py --files 30 --inflate deflate
+"""
+import argparse
+import base64
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import traceback
+import types
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from methings.client import MethingsClient
+from methings.micropython import deploy
+
+
+class _DeflateIO:
+    """Minimal stand-in for MicroPython's deflate.DeflateIO (decompression only)."""
+
+    def __init__(self, stream, fmt=0, wbits=0):
+        self.stream = stream
+        self.d = zlib.decompressobj()
+
+    def read(self, n):
+        out = b""
+        while len(out) < n:
+            chunk = self.stream.read(256)
+            if not chunk:
+                out += self.d.flush()
+                break
+            out += self.d.decompress(chunk)
+        return out
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    overhead_s = 0.35
+    bytes_per_s = 11520.0
+    board_globals: dict = {}
+
+    def _reply(self, obj: dict) -> None:
+        out = json.dumps(obj).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _exec(self, code: str) -> dict:
+        time.sleep(_Handler.overhead_s + len(code) / _Handler.bytes_per_s)
+        out, err = io.StringIO(), ""
+        with contextlib.redirect_stdout(out):
+            try:
+                exec(code, _Handler.board_globals)
+            except Exception:
+                err = traceback.format_exc()
+        return {"status": "ok", "stdout": out.getvalue(), "stderr": err}
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        args = body.get("args") or body
+        action, payload = args["action"], args.get("payload") or {}
+        if action == "mcu.micropython.exec":
+            return self._reply(self._exec(payload["code"]))
+        if action == "mcu.micropython.write_file":
+            data = base64.b64decode(payload["content_b64"])
+            chunk = int(payload.get("chunk_size") or 768)
+            n = max(1, math.ceil(len(data) / chunk))
+            # One raw-REPL exec per chunk: open/append/close with the chunk as base64.
+            time.sleep(n * _Handler.overhead_s + (len(data) * 4 / 3 + n * 90) / _Handler.bytes_per_s)
+            os.makedirs(os.path.dirname(payload["path"]) or ".", exist_ok=True)
+            with open(payload["path"], "wb") as f:
+                f.write(data)
+            return self._reply({"status": "ok", "bytes_written": len(data), "chunks": n})
+        self._reply({"status": "error", "error": "unsupported"})
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def _serve(port_q, board_dir: str, overhead_s: float, bytes_per_s: float, inflate: str) -> None:
+    os.chdir(board_dir)
+    _Handler.overhead_s = overhead_s
+    _Handler.bytes_per_s = bytes_per_s
+    if inflate == "deflate":
+        sys.modules["deflate"] = types.SimpleNamespace(DeflateIO=_DeflateIO, ZLIB=1)
+    elif inflate == "zlib":
+        zlib.DecompIO = lambda stream, wbits: _DeflateIO(stream)  # type: ignore[attr-defined]
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port_q.put(srv.server_address[1])
+    srv.serve_forever()
+
+
+def make_app(n_files: int, rng: random.Random) -> dict:
+    words = ["sensor", "value", "read", "self", "return", "import", "machine", "pin", "time", "def", "if", "for"]
+    app = {}
+    for i in range(n_files):
+        lines = [f"# module {i}", "import machine, time", ""]
+        while sum(len(x) + 1 for x in lines) < 6000:
+            lines.append("    " + " ".join(rng.choice(words) for _ in range(8)) + f"  # {rng.randint(0, 999)}")
+        app[f"lib/mod{i}.py"] = "\n".join(lines).encode()
+    app["main.py"] = b"import lib.mod0\nprint('boot')\n"
+    app["assets/model.bin"] = bytes(rng.getrandbits(8) for _ in range(16 * 1024))
+    return app
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=30)
+    ap.add_argument("--baud", type=int, default=115200)
+    ap.add_argument("--exec-overhead-ms", type=float, default=350.0)
+    ap.add_argument("--inflate", choices=["deflate", "zlib", "none"], default="deflate")
+    ap.add_argument("--time-scale", type=float, default=0.1)
+    args = ap.parse_args()
+    scale = args.time_scale
+
+    rng = random.Random(3)
+    app = make_app(args.files, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        board = os.path.join(tmp, "board")
+        os.makedirs(board)
+        q = multiprocessing.Queue()
+        proc = multiprocessing.Process(
+            target=_serve,
+            args=(q, board, args.exec_overhead_ms / 1000.0 * scale, args.baud / 10.0 / scale, args.inflate),
+            daemon=True,
+        )
+        proc.start()
+        k = MethingsClient(f"http://127.0.0.1:{q.get(timeout=10)}")
+        total = sum(len(v) for v in app.values())
+        print(f"{len(app)} files, {total / 1024:.0f} KiB, {args.baud} baud, {args.exec_overhead_ms:.0f} ms per exec, "
+              f"board inflate={args.inflate} (times scaled from --time-scale {scale})")
+
+        t0 = time.perf_counter()
+        for path, data in app.items():
+            k.mcu_micropython_write_file(path=path, content_b64=base64.b64encode(data).decode(), serial_handle="s")
+        print(f"write_file every file     : {(time.perf_counter() - t0) / scale:6.1f} s")
+
+        def report(label: str) -> None:
+            r = deploy(k, app, serial_handle="s")
+            print(f"deploy {label:<19}: {r['elapsed_s'] / scale:6.1f} s  changed {r['files_changed']:3d}/{r['files']}  "
+                  f"sent {r['bytes_sent'] / 1024:6.1f} KiB  skipped {r['bytes_skipped'] / 1024:6.1f} KiB  "
+                  f"execs {r['execs']:3d}  chunks {r['chunk_sizes']}  "
+                  f"{r['throughput_bps'] * scale / 1024:6.1f} KiB/s effective")
+
+        for p in list(app):
+            os.remove(os.path.join(board, p))
+        report("fresh board")
+        report("no change")
+        app["lib/mod3.py"] = app["lib/mod3.py"].replace(b"# module 3", b"# module 3 (patched)")
+        report("one line changed")
+        proc.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Exec calls/s for a sensor-polling loop: one-shot `mcu_micropython_exec` (enter raw REPL, run,
+wait for the prompt, exit on every call) vs. methings.micropython.MicroPythonSession (raw
+REPL held open, raw-paste writes), alone and with exec_many batching; plus time to first
+streamed output for a snippet that prints over time.
+
+A local HTTP stand-in (separate process, no board needed) runs the snippets with CPython. A
+one-shot exec costs `--enter-ms` (Ctrl-C/Ctrl-A, settle, prompt idle wait) plus the code at
+`--baud`; a session exec costs only the code bytes plus `--turnaround-ms`:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_micropython_session.py --calls 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import sys
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from methings.client import MethingsClient
+from methings.micropython import MicroPythonSession
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    enter_s = 0.35
+    turnaround_s = 0.004
+    bytes_per_s = 11520.0
+    board_globals: dict = {}
+
+    def _reply(self, obj: dict) -> None:
+        out = json.dumps(obj).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _run(self, code: str, out) -> str:
+        time.sleep(_Handler.turnaround_s + len(code) / _Handler.bytes_per_s)
+        with contextlib.redirect_stdout(out):
+            try:
+                exec(code, _Handler.board_globals)
+            except Exception:
+                return traceback.format_exc()
+        return ""
+
+    def _snippets(self, payload: dict) -> list:
+        return payload.get("snippets") or [payload.get("code", "")]
+
+    def do_GET(self) -> None:
+        self.send_error(404)
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        if self.path.startswith("/mcu/micropython/session/exec"):
+            return self._stream(body)
+        args = body.get("args") or body
+        action, payload = args["action"], args.get("payload") or {}
+        if action == "mcu.micropython.exec":
+            time.sleep(_Handler.enter_s)
+            out = io.StringIO()
+            err = self._run(payload["code"], out)
+            return self._reply({"status": "ok", "stdout": out.getvalue(), "stderr": err})
+        if action == "mcu.micropython.session.open":
+            time.sleep(_Handler.enter_s)
+            return self._reply({"status": "ok", "session_id": "s1", "raw_paste": True})
+        if action == "mcu.micropython.session.exec":
+            results = []
+            for i, code in enumerate(self._snippets(payload)):
+                out = io.StringIO()
+                err = self._run(code, out)
+                results.append({"index": i, "stdout": out.getvalue(), "stderr": err})
+                if err and payload.get("stop_on_error", True):
+                    break
+            return self._reply({"status": "ok", "results": results, "stdout": results[-1]["stdout"], "stderr": results[-1]["stderr"]})
+        if action == "mcu.micropython.session.close":
+            return self._reply({"status": "ok"})
+        self._reply({"status": "error", "error": "unsupported"})
+
+    def _stream(self, payload: dict) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(obj: dict) -> None:
+            self.wfile.write(json.dumps(obj).encode() + b"\n")
+            self.wfile.flush()
+
+        class _Out(io.StringIO):
+            def __init__(self, index: int):
+                super().__init__()
+                self.index = index
+
+            def write(self, s: str) -> int:
+                if s:
+                    send({"event": "output", "index": self.index, "stream": "stdout", "data": s})
+                return super().write(s)
+
+        results = []
+        for i, code in enumerate(self._snippets(payload)):
+            out = _Out(i)
+            err = self._run(code, out)
+            item = {"index": i, "stdout": out.getvalue(), "stderr": err}
+            results.append(item)
+            send(dict(item, event="snippet"))
+        send({"event": "done", "status": "ok", "results": results})
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def _serve(port_q, enter_ms: float, turnaround_ms: float, baud: int) -> None:
+    _Handler.enter_s = enter_ms / 1000.0
+    _Handler.turnaround_s = turnaround_ms / 1000.0
+    _Handler.bytes_per_s = baud / 10.0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port_q.put(srv.server_address[1])
+    srv.serve_forever()
+
+
+POLL = "print(adc.read())"
+SETUP = "import random\nclass _Adc:\n def read(self):\n  return random.randint(0, 4095)\nadc = _Adc()\n"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=20)
+    ap.add_argument("--batch", type=int, default=10)
+    ap.add_argument("--enter-ms", type=float, default=350.0)
+    ap.add_argument("--turnaround-ms", type=float, default=4.0)
+    ap.add_argument("--baud", type=int, default=115200)
+    args = ap.parse_args()
+
+    q = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_serve, args=(q, args.enter_ms, args.turnaround_ms, args.baud), daemon=True)
+    proc.start()
+    k = MethingsClient(f"http://127.0.0.1:{q.get(timeout=10)}")
+    print(f"{args.calls} polls of {POLL!r}, raw REPL entry {args.enter_ms:.0f} ms, {args.baud} baud")
+
+    k.mcu_micropython_exec(code=SETUP, serial_handle="s")
+    t0 = time.perf_counter()
+    for _ in range(args.calls):
+        k.mcu_micropython_exec(code=POLL, serial_handle="s")
+    one_shot = args.calls / (time.perf_counter() - t0)
+    print(f"one-shot mcu_micropython_exec : {one_shot:7.1f} exec/s")
+
+    with MicroPythonSession(k, serial_handle="s") as s:
+        t0 = time.perf_counter()
+        for _ in range(args.calls):
+            s.exec(POLL)
+        per_call = args.calls / (time.perf_counter() - t0)
+        print(f"MicroPythonSession.exec       : {per_call:7.1f} exec/s  ({per_call / one_shot:.0f}x)")
+
+        t0 = time.perf_counter()
+        done = 0
+        while done < args.calls:
+            n = min(args.batch, args.calls - done)
+            s.exec_many([POLL] * n)
+            done += n
+        batched = args.calls / (time.perf_counter() - t0)
+        print(f"exec_many (batch {args.batch:<3})        : {batched:7.1f} exec/s  ({batched / one_shot:.0f}x)")
+
+        slow = "import time\nfor i in range(5):\n print(i)\n time.sleep(0.1)\n"
+        t0 = time.perf_counter()
+        first = None
+        for ev in s.stream(slow):
+            if ev["event"] == "output" and first is None:
+                first = time.perf_counter() - t0
+        total = time.perf_counter() - t0
+        print(f"stream(): first output after {first * 1000:.0f} ms, snippet done after {total * 1000:.0f} ms")
+    proc.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
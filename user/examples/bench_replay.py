@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Record-and-replay (methings.replay): what recording costs, and whether a capture replays fast
+enough and faithfully enough to profile decoders without a device.
+
+A session is recorded against the local stand-in (methings.standin, no device needed): a few
+control calls, a USB bulk stream read with `--usb-frames` frames of `--chunk-size` bytes, and
+`--sensor-msgs` packed `/ws/sensors` messages, each paced by a small per-message consumer delay
+so the capture has real timing. Then:
+
+- recording overhead: FrameReader frames/s with and without Recorder.attach() (flat out)
+- offline decode: decode_packed() straight over CaptureLog payload views (no sockets)
+- replay `speed=0`: the unmodified UsbStream / SensorStream against ReplayServer, `--loops` passes
+- replay `speed=1`: replay duration vs. recorded duration
+
+    PYTHONPATH=user/lib python3 user/examples/bench_replay.py --usb-frames 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Optional
+
+from methings.client import MethingsClient
+from methings.replay import CaptureLog, Recorder, ReplayServer
+from methings.sensors import SensorStream, decode_packed
+from methings.standin import StandinServer
+from methings.usb_stream import UsbStream
+
+
+def _read_usb(k: MethingsClient, frames: int, chunk_size: int, rec: Optional[Recorder] = None, pace_s: float = 0.0) -> float:
+    st = UsbStream(k, handle="standin", endpoint_address=0x81, chunk_size=chunk_size)
+    if rec is not None:
+        rec.attach(st)
+    with st:
+        t0 = time.perf_counter()
+        for n, _ in enumerate(st.frames(), 1):
+            if pace_s:
+                time.sleep(pace_s)
+            if n >= frames:
+                break
+        return frames / (time.perf_counter() - t0)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--usb-frames", type=int, default=2000)
+    ap.add_argument("--chunk-size", type=int, default=16384)
+    ap.add_argument("--sensor-msgs", type=int, default=400)
+    ap.add_argument("--loops", type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _record(args, tmp)
+        _replay(args, path)
+    return 0
+
+
+def _record(args: argparse.Namespace, tmp: str) -> str:
+    with StandinServer() as srv:
+        k = MethingsClient(srv.base_url)
+        plain = max(_read_usb(k, args.usb_frames * 4, args.chunk_size) for _ in range(3))
+        with Recorder(os.path.join(tmp, "overhead.mtrc")) as rec:
+            recorded = max(_read_usb(rec.client(srv.base_url), args.usb_frames * 4, args.chunk_size, rec) for _ in range(3))
+        print(f"USB {args.chunk_size} B frames, flat out: {plain:8.0f} frames/s plain, {recorded:8.0f} frames/s recorded "
+              f"({(1 / recorded - 1 / plain) * 1e6:+.1f} us/frame)")
+
+        path = os.path.join(tmp, "session.mtrc")
+        with Recorder(path) as rec:
+            rk = rec.client(srv.base_url)
+            rk.device_api("sensor.list", {})
+            rk.device_api("usb.status", {})
+            _read_usb(rk, args.usb_frames, args.chunk_size, rec, pace_s=0.0002)
+            ss = rec.attach(SensorStream(srv.base_url, sensors="a,g,m", rate_hz=1000, format="packed"))
+            ss.connect()
+            # One batch per sensor per message.
+            for n, _ in enumerate(ss.batches(), 1):
+                if n >= args.sensor_msgs * 3:
+                    break
+                time.sleep(0.0003)
+            ss.close()
+    return path
+
+
+def _replay(args: argparse.Namespace, path: str) -> None:
+    with CaptureLog(path) as log:
+        s = log.summary()
+        usb = next(c for c in s["channels"] if c["source"] == "UsbStream")
+        sen = next(c for c in s["channels"] if c["source"] == "SensorStream")
+        print(f"capture: {os.path.getsize(path) / 1e6:.1f} MB, {s['records']} records, {len(s['controls'])} distinct "
+              f"control calls, usb {usb['duration_s']:.2f} s, sensors {sen['duration_s']:.2f} s")
+        names = log.channels[sen["channel"]]["hello"]["packed_sensors"]
+        msgs = [p for _, _, p in log.frames(sen["channel"])]
+        t0 = time.perf_counter()
+        samples = 0
+        for _ in range(20):
+            for p in msgs:
+                samples += sum(b.count for b in decode_packed(p, names, use_numpy=False))
+        dt = time.perf_counter() - t0
+        print(f"offline decode_packed over CaptureLog: {len(msgs) * 20 / dt:8.0f} msgs/s, {samples / dt / 1e6:.1f} M samples/s")
+        del msgs
+
+    with ReplayServer(path, speed=0, loops=args.loops) as r:
+        k = MethingsClient(r.base_url)
+        with UsbStream(k, handle="standin", endpoint_address=0x81) as st:
+            t0 = time.perf_counter()
+            n = sum(1 for _ in st.frames())
+            dt = time.perf_counter() - t0
+        print(f"replay speed=0, {args.loops} loops: UsbStream {n / dt:8.0f} frames/s ({n * usb['bytes'] / usb['frames'] / dt / 1e6:.0f} MB/s)", end="")
+        with SensorStream(r.base_url, sensors="a,g,m", rate_hz=1000) as ss:
+            t0 = time.perf_counter()
+            n = sum(b.count for b in ss.batches())
+            dt = time.perf_counter() - t0
+        print(f", SensorStream {n / dt / 1e6:.2f} M samples/s")
+
+    with ReplayServer(path, speed=1.0) as r:
+        k = MethingsClient(r.base_url)
+        with UsbStream(k, handle="standin", endpoint_address=0x81) as st:
+            t0 = time.perf_counter()
+            n = sum(1 for _ in st.frames())
+            usb_dt = time.perf_counter() - t0
+        with SensorStream(r.base_url, sensors="a,g,m", rate_hz=1000) as ss:
+            t0 = time.perf_counter()
+            sum(1 for _ in ss.batches())
+            sen_dt = time.perf_counter() - t0
+        print(f"replay speed=1: usb {usb_dt:.2f} s (recorded {usb['duration_s']:.2f} s), "
+              f"sensors {sen_dt:.2f} s (recorded {sen['duration_s']:.2f} s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
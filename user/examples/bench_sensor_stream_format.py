@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Compare `/ws/sensors` JSON and `format=packed` throughput at 200/500/1000 Hz (a,g,m).
+
+A local WebSocket stand-in (separate process, no device needed) encodes `--seconds` of samples
+per sensor the way the server does and sends them as fast as possible; the client decodes them
+with methings.sensors.SensorStream. Reported per format/rate: bytes on the wire, stand-in encode
+CPU and client decode CPU per second of sensor data:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_sensor_stream_format.py --seconds 5
+"""
+import argparse
+import array
+import base64
+import hashlib
+import json
+import math
+import multiprocessing
+import socket
+import struct
+import sys
+import time
+import urllib.parse
+from typing import Dict, List, Tuple
+
+from methings.sensors import PACKED_MAGIC, SensorStream
+
+SENSORS = ["a", "g", "m"]
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    n = len(payload)
+    if n < 126:
+        return struct.pack("!BB", 0x80 | opcode, n) + payload
+    if n < 1 << 16:
+        return struct.pack("!BBH", 0x80 | opcode, 126, n) + payload
+    return struct.pack("!BBQ", 0x80 | opcode, 127, n) + payload
+
+
+def _samples(rate: int, seconds: float) -> List[Tuple[str, int, int, List[float]]]:
+    out = []
+    q = 0
+    for i in range(int(rate * seconds)):
+        t_ns = i * 1_000_000_000 // rate
+        for k in SENSORS:
+            q += 1
+            out.append((k, t_ns, q, [math.sin(i * 0.01), math.cos(i * 0.01), 9.8]))
+    return out
+
+
+def _encode_json(samples) -> List[bytes]:
+    return [
+        _ws_frame(0x1, json.dumps(
+            {"type": "sample", "stream_id": "s0", "sensor": k, "t": t / 1e9, "v": v, "seq": q}
+        ).encode("utf-8"))
+        for k, t, q, v in samples
+    ]
+
+
+def _encode_packed(samples, rate: int, batch_ms: int) -> List[bytes]:
+    per_batch = max(1, rate * batch_ms // 1000) * len(SENSORS)
+    out = []
+    for b in range(0, len(samples), per_batch):
+        cols: Dict[str, Tuple[array.array, array.array, array.array]] = {
+            k: (array.array("q"), array.array("I"), array.array("f")) for k in SENSORS
+        }
+        for k, t, q, v in samples[b:b + per_batch]:
+            c = cols[k]
+            c[0].append(t)
+            c[1].append(q)
+            c[2].extend(v)
+        body = [struct.pack("<IHHII", PACKED_MAGIC, len(SENSORS), 0, 0, 0)]
+        for idx, k in enumerate(SENSORS):
+            t, q, v = cols[k]
+            block = struct.pack("<BBHI", idx, 3, 0, len(t)) + t.tobytes() + q.tobytes() + v.tobytes()
+            body.append(block + bytes(-len(block) % 8))
+        out.append(_ws_frame(0x2, b"".join(body)))
+    return out
+
+
+def _serve(srv: socket.socket, seconds: float, result_q) -> None:
+    conn, _ = srv.accept()
+    srv.close()
+    f = conn.makefile("rb")
+    request = f.readline().decode("latin-1")
+    key = ""
+    while True:
+        line = f.readline().decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "sec-websocket-key":
+            key = value.strip()
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(request.split()[1]).query)
+    rate = int(query["rate_hz"][0])
+    fmt = query["format"][0]
+    batch_ms = int(query["batch_ms"][0])
+    accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+    conn.sendall(
+        f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1")
+    )
+    hello = {"type": "hello", "stream_id": "s0", "sensors": SENSORS, "rate_hz": rate, "format": fmt}
+    if fmt == "packed":
+        hello.update({"packed_sensors": SENSORS, "batch_ms": batch_ms, "t_unit": "ns"})
+    conn.sendall(_ws_frame(0x1, json.dumps(hello).encode()))
+
+    samples = _samples(rate, seconds)
+    c0 = time.process_time()
+    frames = _encode_json(samples) if fmt == "json" else _encode_packed(samples, rate, batch_ms)
+    encode_cpu = time.process_time() - c0
+    result_q.put((encode_cpu, sum(len(x) for x in frames), len(frames)))
+    for i in range(0, len(frames), 256):
+        conn.sendall(b"".join(frames[i:i + 256]))
+    conn.sendall(_ws_frame(0x8, struct.pack("!H", 1000)))
+    try:
+        conn.recv(64)
+    except OSError:
+        pass
+    conn.close()
+
+
+def run(fmt: str, rate: int, seconds: float, batch_ms: int) -> Dict[str, float]:
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(1)
+    port = srv.getsockname()[1]
+    q = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_serve, args=(srv, seconds, q), daemon=True)
+    proc.start()
+    srv.close()
+
+    st = SensorStream(f"http://127.0.0.1:{port}", sensors=SENSORS, rate_hz=rate, format=fmt, batch_ms=batch_ms)
+    st.connect()
+    c0 = time.process_time()
+    samples = 0
+    for batch in st.batches():
+        samples += batch.count
+    decode_cpu = time.process_time() - c0
+    st.close()
+    encode_cpu, wire_bytes, messages = q.get(timeout=30)
+    proc.join(5)
+    expected = int(rate * seconds) * len(SENSORS)
+    if samples != expected:
+        raise SystemExit(f"{fmt}@{rate}Hz: got {samples} samples, expected {expected}")
+    return {
+        "bytes_per_s": wire_bytes / seconds,
+        "messages_per_s": messages / seconds,
+        "encode_cpu_pct": 100.0 * encode_cpu / seconds,
+        "decode_cpu_pct": 100.0 * decode_cpu / seconds,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--batch-ms", type=int, default=50)
+    ap.add_argument("--rates", default="200,500,1000")
+    args = ap.parse_args()
+
+    print(f"sensors={','.join(SENSORS)} batch_ms={args.batch_ms} (CPU as % of one core per second of data)")
+    print(f"{'rate':>6} {'format':>7} {'KiB/s':>9} {'msgs/s':>8} {'encode%':>8} {'decode%':>8}")
+    for rate in [int(r) for r in args.rates.split(",")]:
+        for fmt in ("json", "packed"):
+            r = run(fmt, rate, args.seconds, args.batch_ms)
+            print(
+                f"{rate:>6} {fmt:>7} {r['bytes_per_s'] / 1024:>9.1f} {r['messages_per_s']:>8.0f} "
+                f"{r['encode_cpu_pct']:>8.2f} {r['decode_cpu_pct']:>8.2f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
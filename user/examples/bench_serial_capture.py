@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Capturing MCU logs: polling `mcu_serial_monitor(duration_ms=2000, max_dump_bytes=8192)` vs.
+methings.serial_capture.SerialCapture on `/ws/serial/{serial_handle}`.
+
+A local WebSocket stand-in (separate process, no device needed) plays a serial port at `--baud`
+(x `--speedup`): numbered log lines, sent every `--read-timeout-ms` as one binary frame, the way
+the server's read loop does. The capture spools to rotating files; afterwards every line number
+is checked so gaps would show up. A second run stalls the writer thread (slow disk / slow
+`on_line`) to show the back-pressure counters. Polling loses bytes by construction (8 KiB per
+2 s window plus the gap between calls), so its coverage is computed rather than measured:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_serial_capture.py --seconds 10 --speedup 4
+"""
+import argparse
+import base64
+import hashlib
+import json
+import multiprocessing
+import re
+import socket
+import struct
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+from methings.client import MethingsClient
+from methings.serial_capture import SerialCapture
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    n = len(payload)
+    if n < 126:
+        return struct.pack("!BB", 0x80 | opcode, n) + payload
+    if n < 1 << 16:
+        return struct.pack("!BBH", 0x80 | opcode, 126, n) + payload
+    return struct.pack("!BBQ", 0x80 | opcode, 127, n) + payload
+
+
+def _serve(srv: socket.socket, bytes_per_s: float, seconds: float, tick_s: float, result_q) -> None:
+    conn, _ = srv.accept()
+    srv.close()
+    f = conn.makefile("rb")
+    f.readline()
+    key = ""
+    while True:
+        line = f.readline().decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "sec-websocket-key":
+            key = value.strip()
+    accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+    conn.sendall(
+        f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1")
+    )
+    conn.sendall(_ws_frame(0x1, json.dumps({"type": "hello", "serial_handle": "s1"}).encode()))
+    pad = b"I (12345) app: sensor=0x3f temp=23.5 rssi=-61 heap=123456 " * 2
+    seq, sent, carry = 0, 0, bytearray()
+    t0 = time.monotonic()
+    next_tick = t0
+    while time.monotonic() - t0 < seconds:
+        next_tick += tick_s
+        due = int((next_tick - t0) * bytes_per_s) - sent
+        while len(carry) < due:
+            carry += b"%08d %s\n" % (seq, pad[: 20 + seq % 90])
+            seq += 1
+        chunk, carry = bytes(carry[:due]), carry[due:]
+        conn.sendall(_ws_frame(0x2, chunk))
+        sent += len(chunk)
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+    # Flush the partial last line so the line check sees complete lines only.
+    if carry:
+        conn.sendall(_ws_frame(0x2, bytes(carry)))
+        sent += len(carry)
+    result_q.put((sent, seq))
+    try:
+        conn.recv(64)
+    except OSError:
+        pass
+    conn.close()
+
+
+def run(args: argparse.Namespace, spool: str, stall_s: float) -> Dict[str, Any]:
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(1)
+    port = srv.getsockname()[1]
+    q = multiprocessing.Queue()
+    rate = args.baud / 10.0 * args.speedup
+    proc = multiprocessing.Process(target=_serve, args=(srv, rate, args.seconds, args.read_timeout_ms / 1000.0, q), daemon=True)
+    proc.start()
+    srv.close()
+
+    seen = [0]
+
+    def slow(line: bytes) -> None:
+        seen[0] += 1
+        if stall_s and seen[0] % 2000 == 0:
+            time.sleep(stall_s)
+
+    k = MethingsClient(f"http://127.0.0.1:{port}")
+    cap = SerialCapture(k, "s1", spool_dir=spool, max_file_bytes=args.file_kib * 1024, max_files=1000,
+                        on_line=slow if stall_s else None, read_timeout_ms=args.read_timeout_ms)
+    cap.start()
+    peak_pressure = 0.0
+    while True:
+        try:
+            sent, lines = q.get(timeout=0.2)
+            break
+        except Exception:
+            peak_pressure = max(peak_pressure, cap.stats()["backpressure"])
+    while cap.stats()["bytes"] < sent:
+        time.sleep(0.05)
+    st = cap.stop()
+    proc.join(5)
+
+    expect = 0
+    total = 0
+    for path in st["spool_files"]:
+        with open(path, "rb") as f:
+            data = f.read()
+        total += len(data)
+        for m in re.finditer(rb"^(\d{8}) ", data, re.M):
+            if int(m.group(1)) != expect:
+                raise SystemExit(f"gap: expected line {expect}, got {int(m.group(1))} in {path}")
+            expect += 1
+    if expect != lines or total != sent:
+        raise SystemExit(f"capture incomplete: {expect}/{lines} lines, {total}/{sent} bytes")
+    st.update(sent=sent, sent_lines=lines, peak_backpressure=peak_pressure)
+    return st
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--baud", type=int, default=921600)
+    ap.add_argument("--speedup", type=float, default=1.0)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--read-timeout-ms", type=int, default=20)
+    ap.add_argument("--file-kib", type=int, default=256)
+    args = ap.parse_args()
+
+    rate = args.baud / 10.0 * args.speedup
+    poll_window, poll_gap = 2.0, 0.15
+    poll = min(8192.0, rate * poll_window) / (rate * (poll_window + poll_gap))
+    print(f"{args.baud} baud x{args.speedup:g} = {rate / 1024:.0f} KiB/s for {args.seconds:g} s")
+    print(f"mcu_serial_monitor polling (2 s / 8 KiB, ~{poll_gap * 1000:.0f} ms between calls): <= {100 * poll:5.1f}% of bytes")
+    for label, stall in (("SerialCapture", 0.0), ("SerialCapture, writer stalls", 0.25)):
+        with tempfile.TemporaryDirectory() as tmp:
+            st = run(args, tmp, stall)
+        print(f"{label:<29}: 100.0% ({st['sent_lines']} lines, {st['sent'] / 1024:.0f} KiB, no gaps)  "
+              f"{st['bytes_per_s'] / 1024:6.1f} KiB/s  files {len(st['spool_files'])}  "
+              f"pending peak {st['pending_high_water'] / 1024:6.1f} KiB  overflow {st['overflow_bytes']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
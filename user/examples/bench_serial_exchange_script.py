@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Driving an AT modem: one `serial.exchange` call per command (each ends on `idle_timeout_ms` of
+silence) vs. one `serial.exchange.script` call (each command ends on its `OK`/`ERROR` line),
+sequential and pipelined, plus time to the first streamed result.
+
+A local HTTP stand-in (separate process, no modem needed) answers both actions against an
+emulated modem: `--baud` for the bytes, `--turnaround-ms` per host write/read poll, and a
+per-command processing time drawn from `--modem-ms`. The modem works through its input in
+order, so pipelining only hides the host side of each command. The per-command baseline is
+run for `--baseline-sample` commands and extrapolated:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_serial_exchange_script.py --commands 200
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+from methings.client import MethingsClient
+from methings.serial_script import run_script, stream_script
+
+_RESPONSES = {
+    "AT": [],
+    "ATE0": [],
+    "ATI": ["Quectel", "EG25", "Revision: EG25GGBR07A08M2G"],
+    "AT+CSQ": ["+CSQ: 21,99"],
+    "AT+CREG?": ["+CREG: 0,1"],
+    "AT+COPS?": ['+COPS: 0,0,"operator",7'],
+    "AT+CCLK?": ['+CCLK: "26/10/16,09:30:00+36"'],
+    "AT+QTEMP": ['+QTEMP: "soc",38'],
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    bytes_per_s = 11520.0
+    turnaround_s = 0.002
+    modem_s = (0.005, 0.03)
+    rng = random.Random(3)
+
+    def _reply(self, obj: dict) -> None:
+        out = json.dumps(obj).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    @classmethod
+    def _modem(cls, cmd: str) -> Tuple[List[str], float]:
+        """Response lines (final result code last) and the modem's processing time."""
+        if cmd not in _RESPONSES:
+            return ["ERROR"], cls.modem_s[0]
+        return _RESPONSES[cmd] + ["OK"], cls.rng.uniform(*cls.modem_s)
+
+    def _wire(self, data: str) -> float:
+        return len(data.encode()) / _Handler.bytes_per_s
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        if self.path.startswith("/serial/exchange/script"):
+            return self._stream(body)
+        args = body.get("args") or body
+        action, p = args["action"], args.get("payload") or {}
+        if action == "serial.exchange":
+            t0 = time.perf_counter()
+            cmd = str(p.get("send", "")).strip()
+            lines, busy = self._modem(cmd)
+            time.sleep(_Handler.turnaround_s + self._wire(p.get("send", "")) + busy
+                       + self._wire("\r\n".join(lines) + "\r\n") + int(p.get("idle_timeout_ms", 500)) / 1000.0)
+            return self._reply({"status": "ok", "lines": lines, "line_count": len(lines),
+                                "elapsed_ms": int((time.perf_counter() - t0) * 1000)})
+        if action == "serial.exchange.script":
+            return self._reply(self._script(p, None))
+        self._reply({"status": "error", "error": "unsupported"})
+
+    def _script(self, p: dict, emit) -> Dict[str, Any]:
+        """Timeline of the server's loop: writes run ahead up to pipeline_depth, the modem answers in order."""
+        depth = max(1, min(32, int(p.get("pipeline_depth", 1))))
+        ending = str(p.get("line_ending", ""))
+        cmds = [c.get("send", "") if isinstance(c, dict) else c for c in p["commands"]]
+        t0 = time.perf_counter()
+        written: List[float] = []
+        finished: List[float] = []
+        results: List[Dict[str, Any]] = []
+        modem_free = 0.0
+        for i, cmd in enumerate(cmds):
+            # The host writes command i once command i - depth has been answered.
+            ready = finished[i - depth] if i >= depth else (written[-1] if written else 0.0)
+            written.append(ready + _Handler.turnaround_s + self._wire(cmd + ending))
+            lines, busy = self._modem(cmd.strip())
+            modem_free = max(written[-1], modem_free) + busy + self._wire("\r\n".join(lines) + "\r\n")
+            finished.append(modem_free + _Handler.turnaround_s / 2)
+            time.sleep(max(0.0, finished[-1] - (time.perf_counter() - t0)))
+            status = "ok" if lines[-1] == "OK" else "error"
+            r = {"index": i, "send": cmd, "status": status, "ok": status == "ok", "lines": lines,
+                 "matched": lines[-1], "elapsed_ms": int((finished[-1] - written[-1]) * 1000)}
+            results.append(r)
+            if emit is not None:
+                emit(dict(r, event="result"))
+            if status != "ok" and p.get("stop_on_error", True):
+                break
+        ok = sum(1 for r in results if r["ok"])
+        return {"status": "ok", "results": results, "command_count": len(cmds), "completed": len(results),
+                "ok_count": ok, "error_count": len(results) - ok, "stopped": len(results) < len(cmds),
+                "timed_out": False, "unsolicited": [], "elapsed_ms": int((time.perf_counter() - t0) * 1000)}
+
+    def _stream(self, payload: dict) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(obj: dict) -> None:
+            self.wfile.write(json.dumps(obj).encode() + b"\n")
+            self.wfile.flush()
+
+        send(dict(self._script(payload, send), event="done"))
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def _serve(port_q, baud: int, turnaround_ms: float, modem_ms: Tuple[float, float]) -> None:
+    _Handler.bytes_per_s = baud / 10.0
+    _Handler.turnaround_s = turnaround_ms / 1000.0
+    _Handler.modem_s = (modem_ms[0] / 1000.0, modem_ms[1] / 1000.0)
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port_q.put(srv.server_address[1])
+    srv.serve_forever()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--commands", type=int, default=200)
+    ap.add_argument("--baseline-sample", type=int, default=20)
+    ap.add_argument("--idle-timeout-ms", type=int, default=500)
+    ap.add_argument("--baud", type=int, default=115200)
+    ap.add_argument("--turnaround-ms", type=float, default=2.0)
+    ap.add_argument("--modem-ms", type=float, nargs=2, default=(5.0, 30.0))
+    args = ap.parse_args()
+
+    q = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_serve, args=(q, args.baud, args.turnaround_ms, tuple(args.modem_ms)), daemon=True)
+    proc.start()
+    k = MethingsClient(f"http://127.0.0.1:{q.get(timeout=10)}")
+    rng = random.Random(11)
+    script = [rng.choice(sorted(_RESPONSES)) for _ in range(args.commands)]
+    print(f"{args.commands} AT commands, {args.baud} baud, modem {args.modem_ms[0]:g}-{args.modem_ms[1]:g} ms/command")
+
+    sample = script[: args.baseline_sample]
+    t0 = time.perf_counter()
+    for cmd in sample:
+        k.device_api("serial.exchange", {"serial_handle": "s1", "send": cmd + "\r", "idle_timeout_ms": args.idle_timeout_ms})
+    base = (time.perf_counter() - t0) / len(sample) * len(script)
+    print(f"serial.exchange x{len(script)} (idle {args.idle_timeout_ms} ms): {base:7.2f} s  "
+          f"(extrapolated from {len(sample)})")
+
+    for depth in (1, 4):
+        t0 = time.perf_counter()
+        results = run_script(k, "s1", script, pipeline_depth=depth, check=True)
+        dt = time.perf_counter() - t0
+        assert len(results) == len(script)
+        print(f"serial.exchange.script depth {depth}      : {dt:7.2f} s  ({base / dt:.0f}x, {len(script) / dt:.0f} cmd/s)")
+
+    t0 = time.perf_counter()
+    first = None
+    for ev in stream_script(k, "s1", script, pipeline_depth=4):
+        if ev["event"] == "result" and first is None:
+            first = time.perf_counter() - t0
+    total = time.perf_counter() - t0
+    print(f"stream_script(): first result after {first * 1000:.0f} ms, script done after {total:.2f} s")
+
+    r = run_script(k, "s1", ["AT", "AT+BOGUS", "ATI"])
+    print(f"stop_on_error: {[(x['send'], x['status']) for x in r]}")
+    proc.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Thread-per-stream vs. one StreamMux thread (methings.mux) on `--usb` concurrent USB streams plus
+a packed `/ws/sensors` stream, against the local stand-in (methings.standin, no device needed).
+
+- threads: one thread per stream, blocking FrameReader / WebSocket.recv() as in
+  usb_stream_read_one_frame.py
+- mux: all streams on one selector thread, frames counted in per-stream callbacks
+- mux + backpressure: one USB stream goes to a queue (`--queue-mb`) drained by a consumer that
+  sleeps 1 ms per frame; the other streams should keep their rate while it is throttled
+
+Reported: aggregate frames/s and MB/s, client CPU time per GB (the stand-in runs in a child
+process) and context switches of this process, over `--seconds`:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_stream_mux.py --usb 8 --seconds 3
+"""
+import argparse
+import resource
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from methings.client import MethingsClient
+from methings.mux import StreamMux
+from methings.sensors import SensorStream
+from methings.standin import StandinServer
+from methings.usb_stream import UsbStream
+from methings.ws import WebSocketClosed
+
+
+_Finish = Callable[[], Tuple[List[Dict[str, Any]], List[str]]]
+
+
+def _measure(label: str, seconds: float, run: Callable[[], _Finish]) -> None:
+    ru0 = resource.getrusage(resource.RUSAGE_SELF)
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    finish = run()
+    time.sleep(seconds)
+    stats, notes = finish()
+    dt = time.perf_counter() - t0
+    cpu = time.process_time() - cpu0
+    ru1 = resource.getrusage(resource.RUSAGE_SELF)
+    frames = sum(s["frames"] for s in stats)
+    nbytes = sum(s["bytes"] for s in stats)
+    csw = (ru1.ru_nvcsw - ru0.ru_nvcsw) + (ru1.ru_nivcsw - ru0.ru_nivcsw)
+    print(f"{label:<20}: {frames / dt:8.0f} frames/s {nbytes / dt / 1e6:7.0f} MB/s  "
+          f"cpu {cpu / max(nbytes / 1e9, 1e-9):5.2f} s/GB  {csw / dt:7.0f} ctx switches/s")
+    for line in notes:
+        print(f"  {line}")
+
+
+def _streams(k: MethingsClient, base_url: str, n: int) -> List[Any]:
+    return [UsbStream(k, handle=f"h{i}", endpoint_address=0x81) for i in range(n)] + [
+        SensorStream(base_url, sensors="a,g,m", rate_hz=1000)
+    ]
+
+
+def _threads(k: MethingsClient, base_url: str, n: int) -> _Finish:
+    stop = threading.Event()
+    streams = _streams(k, base_url, n)
+    counts: List[Dict[str, Any]] = []
+
+    def usb(st: UsbStream, c: Dict[str, Any]) -> None:
+        for _, payload in st.frames():
+            c["frames"] += 1
+            c["bytes"] += len(payload)
+            if stop.is_set():
+                return
+
+    def sensors(ss: SensorStream, c: Dict[str, Any]) -> None:
+        ss.connect()
+        try:
+            while not stop.is_set():
+                _, data = ss.ws.recv()
+                c["frames"] += 1
+                c["bytes"] += len(data)
+        except (WebSocketClosed, OSError):
+            pass
+
+    threads = []
+    for st in streams:
+        c = {"frames": 0, "bytes": 0}
+        counts.append(c)
+        target = sensors if isinstance(st, SensorStream) else usb
+        threads.append(threading.Thread(target=target, args=(st, c), daemon=True))
+    for t in threads:
+        t.start()
+
+    running = threading.active_count()
+
+    def finish() -> Tuple[List[Dict[str, Any]], List[str]]:
+        stop.set()
+        out = [dict(c) for c in counts]
+        for t in threads:
+            t.join(timeout=5)
+        for st in streams:
+            st.close()
+        return out, [f"{running} threads in this process while running"]
+
+    return finish
+
+
+def _mux(k: MethingsClient, base_url: str, n: int, queue_mb: float = 0.0) -> _Finish:
+    mux = StreamMux()
+    counts: Dict[str, List[int]] = {}
+
+    def on_frame(ch: Any, kind: int, payload: memoryview) -> None:
+        c = counts[ch.name]
+        c[0] += 1
+        c[1] += len(payload)
+
+    slow = None
+    for i, st in enumerate(_streams(k, base_url, n)):
+        if queue_mb and i == 0:
+            slow = mux.add_usb(st, name="slow", max_queued_bytes=int(queue_mb * 1024 * 1024))
+            continue
+        add = mux.add_websocket if isinstance(st, SensorStream) else mux.add_usb
+        ch = add(st, on_frame)
+        counts[ch.name] = [0, 0]
+    mux.start()
+    consumer = None
+    if slow is not None:
+        def drain() -> None:
+            for _ in slow:
+                time.sleep(0.001)
+
+        consumer = threading.Thread(target=drain, daemon=True)
+        consumer.start()
+    threads = threading.active_count()
+
+    def finish() -> Tuple[List[Dict[str, Any]], List[str]]:
+        out = [{"frames": f, "bytes": b} for f, b in counts.values()]
+        notes = [f"{threads} threads in this process while running, {mux.rounds} loop rounds"]
+        if slow is not None:
+            s = slow.stats()
+            fast = min(c.counters.snapshot()["frames_per_s"] for c in mux.channels if c.kind == "tcp" and c is not slow)
+            notes.append(f"throttled stream: {s['frames_per_s']:.0f} frames/s, queue high water "
+                         f"{s['queued_high_water'] / 1e6:.1f} MB, {s['pauses']} pauses; slowest other USB "
+                         f"stream {fast:.0f} frames/s")
+        mux.close()
+        if consumer is not None:
+            consumer.join(timeout=5)
+        return out, notes
+
+    return finish
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--usb", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--queue-mb", type=float, default=4.0)
+    args = ap.parse_args()
+
+    with StandinServer() as srv:
+        k = MethingsClient(srv.base_url)
+        print(f"{args.usb} USB streams (16 KiB frames) + 1 packed sensor stream, {args.seconds:g} s each:")
+        _measure("thread per stream", args.seconds, lambda: _threads(k, srv.base_url, args.usb))
+        _measure("StreamMux", args.seconds, lambda: _mux(k, srv.base_url, args.usb))
+        _measure("StreamMux + queue", args.seconds, lambda: _mux(k, srv.base_url, args.usb, args.queue_mb))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Deploying a bundle of many files to the user root: re-uploading everything one file at a time
+vs. methings.sync.sync_dir (manifest diff, parallel hashing, concurrent uploads of changes only).
+
+A local HTTP stand-in (separate process, no device needed) implements `/user/write/<path>`,
+`/user/list/<dir>` and `/user/file/info/<path>?sha256=1` on a temp directory, adding
+`--latency-ms` per request. The bundle is synced three times: first deploy, no change, and
+after editing `--changed` files:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_sync.py --files 2000 --changed 5
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from methings.client import MethingsClient
+from methings.sync import sync_dir
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    root = ""
+    latency_s = 0.002
+
+    def _reply(self, status: int, obj: dict) -> None:
+        out = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _target(self, prefix: str):
+        u = urllib.parse.urlsplit(self.path)
+        return os.path.join(_Handler.root, urllib.parse.unquote(u.path[len(prefix):]).lstrip("/")), u.query
+
+    def do_GET(self) -> None:
+        time.sleep(_Handler.latency_s)
+        if self.path.startswith("/user/list"):
+            p, _ = self._target("/user/list")
+            if not os.path.isdir(p):
+                return self._reply(404, {"error": "not_found"})
+            items = []
+            for name in sorted(os.listdir(p)):
+                st = os.stat(os.path.join(p, name))
+                is_dir = os.path.isdir(os.path.join(p, name))
+                items.append({"name": name, "is_dir": is_dir, "size": 0 if is_dir else st.st_size,
+                              "mtime_ms": st.st_mtime_ns // 1_000_000})
+            return self._reply(200, {"status": "ok", "items": items})
+        p, query = self._target("/user/file/info/")
+        if not os.path.isfile(p):
+            return self._reply(404, {"error": "not_found"})
+        st = os.stat(p)
+        out = {"size": st.st_size, "mtime_ms": st.st_mtime_ns // 1_000_000}
+        if "sha256=1" in query:
+            with open(p, "rb") as f:
+                out["sha256"] = hashlib.sha256(f.read()).hexdigest()
+        self._reply(200, out)
+
+    def do_POST(self) -> None:
+        time.sleep(_Handler.latency_s)
+        data = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        p, query = self._target("/user/write/")
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        with open(p, "wb") as f:
+            f.write(data)
+        out = {"status": "ok", "bytes_written": len(data), "size": len(data)}
+        if "sha256=1" in query:
+            out["sha256"] = hashlib.sha256(data).hexdigest()
+        self._reply(200, out)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def _serve(port_q, root: str, latency_ms: float) -> None:
+    _Handler.root = root
+    _Handler.latency_s = latency_ms / 1000.0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port_q.put(srv.server_address[1])
+    srv.serve_forever()
+
+
+def naive(k: MethingsClient, bundle: str, remote: str) -> float:
+    t0 = time.perf_counter()
+    for dirpath, _, names in os.walk(bundle):
+        for name in names:
+            rel = os.path.relpath(os.path.join(dirpath, name), bundle).replace(os.sep, "/")
+            with open(os.path.join(dirpath, name), "rb") as f:
+                k.request_bytes("POST", f"/user/write/{remote}/{urllib.parse.quote(rel)}", f.read())
+    return time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=2000)
+    ap.add_argument("--changed", type=int, default=5)
+    ap.add_argument("--latency-ms", type=float, default=2.0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle, device = os.path.join(tmp, "bundle"), os.path.join(tmp, "device")
+        os.makedirs(device)
+        rng = random.Random(1)
+        paths = []
+        for i in range(args.files):
+            rel = f"pkg{i % 20}/mod{i // 20 % 10}/f{i}.bin"
+            os.makedirs(os.path.dirname(os.path.join(bundle, rel)), exist_ok=True)
+            # Mostly small scripts plus a few large model files.
+            size = 8 * 1024 * 1024 if i % 500 == 0 else rng.randint(200, 40_000)
+            with open(os.path.join(bundle, rel), "wb") as f:
+                f.write(os.urandom(size))
+            paths.append(rel)
+        os.environ["XDG_CACHE_HOME"] = os.path.join(tmp, "cache")
+
+        q = multiprocessing.Queue()
+        proc = multiprocessing.Process(target=_serve, args=(q, device, args.latency_ms), daemon=True)
+        proc.start()
+        with MethingsClient(f"http://127.0.0.1:{q.get(timeout=10)}", pool_size=8) as k:
+            total_mb = sum(os.path.getsize(os.path.join(bundle, p)) for p in paths) / 1e6
+            print(f"{args.files} files, {total_mb:.1f} MB, stand-in latency {args.latency_ms:.0f} ms/request")
+            print(f"re-upload everything, one at a time : {naive(k, bundle, 'naive'):6.2f} s")
+
+            def report(label: str) -> None:
+                r = sync_dir(k, bundle, "apps/bundle", jobs=4)
+                t = r["timings_s"]
+                print(f"sync_dir {label:<27}: {t['total']:6.2f} s  uploaded {len(r['uploaded']):4d} "
+                      f"({r['bytes_uploaded'] / 1e6:6.1f} MB), hashed local {r['hashed_local']:4d} "
+                      f"remote {r['hashed_remote']:4d}")
+
+            report("first deploy")
+            report("no change")
+            for rel in rng.sample(paths, args.changed):
+                with open(os.path.join(bundle, rel), "ab") as f:
+                    f.write(b"edit")
+            report(f"{args.changed} files changed")
+        proc.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Compare methings.usb_stream.FrameReader with the recv_exact() loop from usb_stream_read_one_frame.py.
+
+A local TCP stand-in sends `u8 type + u32le length + payload` frames (bulk_in, 16 KiB by default)
+as fast as it can, so no device is needed:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_usb_stream_reader.py --frames 50000
+"""
+import argparse
+import multiprocessing
+import socket
+import struct
+import time
+
+from methings.usb_stream import FRAME_BULK_IN, FrameReader
+
+
+def _send_frames(srv: socket.socket, frames: int, chunk: int) -> None:
+    conn, _ = srv.accept()
+    srv.close()
+    # Vary the last payload byte per frame so the reader's framing can be checked.
+    frame = bytearray(struct.pack("<BI", FRAME_BULK_IN, chunk) + bytes(chunk))
+    burst = 64
+    with conn:
+        sent = 0
+        while sent < frames:
+            n = min(burst, frames - sent)
+            block = bytearray()
+            for i in range(n):
+                frame[-1] = (sent + i) & 0xFF
+                block += frame
+            conn.sendall(block)
+            sent += n
+
+
+def serve_frames(frames: int, chunk: int) -> int:
+    # The sender runs in its own process so it does not compete with the reader for the GIL.
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(1)
+    proc = multiprocessing.Process(target=_send_frames, args=(srv, frames, chunk), daemon=True)
+    proc.start()
+    port = srv.getsockname()[1]
+    srv.close()
+    return port
+
+
+def recv_exact(sock: socket.socket, n: int) -> bytes:
+    out = bytearray()
+    while len(out) < n:
+        chunk = sock.recv(n - len(out))
+        if not chunk:
+            raise EOFError("socket closed")
+        out.extend(chunk)
+    return bytes(out)
+
+
+def bench_recv_exact(frames: int, chunk: int) -> float:
+    port = serve_frames(frames, chunk)
+    t0 = time.perf_counter()
+    with socket.create_connection(("127.0.0.1", port)) as s:
+        for i in range(frames):
+            hdr = recv_exact(s, 5)
+            ln = struct.unpack("<I", hdr[1:])[0]
+            payload = recv_exact(s, ln)
+            assert payload[-1] == i & 0xFF
+    return frames / (time.perf_counter() - t0)
+
+
+def bench_frame_reader(frames: int, chunk: int) -> float:
+    port = serve_frames(frames, chunk)
+    t0 = time.perf_counter()
+    with socket.create_connection(("127.0.0.1", port)) as s:
+        reader = FrameReader(s)
+        n = 0
+        for ftype, payload in reader:
+            assert ftype == FRAME_BULK_IN and len(payload) == chunk and payload[-1] == n & 0xFF
+            n += 1
+        assert n == frames
+    return frames / (time.perf_counter() - t0)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=50000)
+    ap.add_argument("--chunk", type=int, default=16384)
+    args = ap.parse_args()
+
+    legacy = bench_recv_exact(args.frames, args.chunk)
+    ring = bench_frame_reader(args.frames, args.chunk)
+    mb = args.chunk / 1e6
+    print(f"recv_exact  : {legacy:10.0f} frames/s  {legacy * mb:8.1f} MB/s")
+    print(f"FrameReader : {ring:10.0f} frames/s  {ring * mb:8.1f} MB/s  ({ring / legacy:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Frames/s for getting RGBA8888 frames into `/vision/frame/put`: base64-in-JSON (`rgba_b64`) vs.
+the binary upload used by MethingsClient.vision_put_frame().
+
+A local HTTP stand-in (separate process, no device needed) decodes each request the way the
+server does (JSON parse + base64 decode, or a raw read of Content-Length bytes) and answers with
+a frame_id. Both paths reuse one keep-alive connection; client CPU per frame is reported too:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_vision_frame_upload.py --seconds 3
+"""
+import argparse
+import base64
+import json
+import multiprocessing
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+from methings.client import MethingsClient
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    frames = 0
+
+    def do_POST(self) -> None:
+        n = int(self.headers.get("Content-Length") or 0)
+        if (self.headers.get("Content-Type") or "").startswith("application/octet-stream"):
+            w = int(self.headers["X-Methings-Width"])
+            h = int(self.headers["X-Methings-Height"])
+            rgba = bytearray(n)
+            self.rfile.readinto(rgba)
+        else:
+            body = json.loads(self.rfile.read(n).decode("utf-8"))
+            w, h = int(body["width"]), int(body["height"])
+            rgba = bytearray(base64.b64decode(body["rgba_b64"]))
+        if len(rgba) != w * h * 4:
+            self.send_error(400)
+            return
+        _Handler.frames += 1
+        out = json.dumps({"status": "ok", "frame_id": f"f{_Handler.frames}"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def _serve(port_q) -> None:
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port_q.put(srv.server_address[1])
+    srv.serve_forever()
+
+
+def run(k: MethingsClient, mode: str, w: int, h: int, seconds: float) -> Tuple[float, float]:
+    frame = bytearray(w * h * 4)
+    frame[::7] = b"\x5a" * len(frame[::7])
+    frames = 0
+    c0 = time.process_time()
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        if mode == "base64":
+            body = {"width": w, "height": h, "rgba_b64": base64.b64encode(frame).decode("ascii")}
+            r = k.request_json("POST", "/vision/frame/put", body, timeout_s=30.0)
+        else:
+            r = k.vision_put_frame(frame, width=w, height=h, timeout_s=30.0)
+        if not r.get("ok"):
+            raise SystemExit(f"{mode} {w}x{h}: {r}")
+        frames += 1
+    wall = time.perf_counter() - t0
+    cpu = time.process_time() - c0
+    return frames / wall, 1000.0 * cpu / frames
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=3.0)
+    args = ap.parse_args()
+
+    q = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_serve, args=(q,), daemon=True)
+    proc.start()
+    port = q.get(timeout=10)
+    results: Dict[Tuple[int, int, str], Tuple[float, float]] = {}
+    with MethingsClient(f"http://127.0.0.1:{port}", identity="bench") as k:
+        print(f"{'size':>10} {'mode':>7} {'frames/s':>9} {'MB/s':>8} {'client ms/frame':>16}")
+        for w, h in RESOLUTIONS:
+            for mode in ("base64", "binary"):
+                fps, cpu_ms = results[(w, h, mode)] = run(k, mode, w, h, args.seconds)
+                print(f"{f'{w}x{h}':>10} {mode:>7} {fps:>9.1f} {fps * w * h * 4 / 1e6:>8.1f} {cpu_ms:>16.2f}")
+            speedup = results[(w, h, "binary")][0] / results[(w, h, "base64")][0]
+            print(f"{'':>10} binary/base64 frames/s: {speedup:.1f}x")
+    proc.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
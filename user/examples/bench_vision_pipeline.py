@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+End-to-end fps for a stream of 640x480 frames: the sequential put → run → delete flow of
+vision_tflite_from_image.py vs. methings.vision.Pipeline (upload overlapped with inference,
+recycled frame_ids, models run concurrently).
+
+A local HTTP stand-in (separate process, no device needed) stores frames and sleeps
+`--infer-ms` per `vision.run` to stand in for TFLite; it also reports the most frames it ever
+held at once:
+
+    PYTHONPATH=user/lib python3 user/examples/bench_vision_pipeline.py --frames 60 --models det,cls
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from methings.client import MethingsClient
+from methings.vision import Pipeline
+
+W, H = 640, 480
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    infer_s = 0.02
+    frames: dict = {}
+    peak = 0
+    lock = threading.Lock()
+    next_id = 0
+
+    def _reply(self, obj: dict) -> None:
+        out = json.dumps(obj).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_POST(self) -> None:
+        cls = _Handler
+        n = int(self.headers.get("Content-Length") or 0)
+        if self.path == "/vision/frame/put":
+            rgba = bytearray(n)
+            self.rfile.readinto(rgba)
+            with cls.lock:
+                cls.next_id += 1
+                fid = self.headers.get("X-Methings-Frame-Id") or f"frame-{cls.next_id}"
+                cls.frames[fid] = rgba
+                cls.peak = max(cls.peak, len(cls.frames))
+            return self._reply({"status": "ok", "frame_id": fid})
+        body = json.loads(self.rfile.read(n) or b"{}")
+        if self.path == "/vision/run":
+            time.sleep(cls.infer_s)
+            return self._reply({"outputs": [[0.1, 0.9]], "inference_ms": cls.infer_s * 1000})
+        if self.path == "/vision/frame/delete":
+            with cls.lock:
+                deleted = cls.frames.pop(body.get("frame_id", ""), None) is not None
+            return self._reply({"status": "ok", "deleted": deleted})
+        if self.path == "/bench/peak":
+            with cls.lock:
+                peak, cls.peak = cls.peak, len(cls.frames)
+            return self._reply({"peak": peak, "held": len(cls.frames)})
+        self.send_error(404)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def _serve(port_q, infer_ms: float) -> None:
+    _Handler.infer_s = infer_ms / 1000.0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port_q.put(srv.server_address[1])
+    srv.serve_forever()
+
+
+def sequential(k: MethingsClient, frames, models) -> float:
+    t0 = time.perf_counter()
+    for buf in frames:
+        fid = k.vision_put_frame(buf, width=W, height=H)["json"]["frame_id"]
+        for m in models:
+            k.request_json("POST", "/vision/run", {"model": m, "frame_id": fid})
+        k.request_json("POST", "/vision/frame/delete", {"frame_id": fid})
+    return len(frames) / (time.perf_counter() - t0)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=60)
+    ap.add_argument("--models", default="det,cls")
+    ap.add_argument("--infer-ms", type=float, default=20.0)
+    ap.add_argument("--slots", type=int, default=2)
+    args = ap.parse_args()
+    models = args.models.split(",")
+
+    q = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_serve, args=(q, args.infer_ms), daemon=True)
+    proc.start()
+    port = q.get(timeout=10)
+    frames = [bytearray([i % 251]) * (W * H * 4) for i in range(args.frames)]
+
+    with MethingsClient(f"http://127.0.0.1:{port}", pool_size=8) as k:
+        seq_fps = sequential(k, frames, models)
+        seq_peak = k.request_json("POST", "/bench/peak", {})["json"]["peak"]
+        with Pipeline(k, models=models, width=W, height=H, slots=args.slots) as p:
+            for _ in p.run(frames):
+                pass
+            st = p.stats()
+        peak = k.request_json("POST", "/bench/peak", {})["json"]
+
+    print(f"{args.frames} frames {W}x{H}, models={args.models}, stand-in inference {args.infer_ms:.0f} ms each")
+    print(f"sequential put/run/delete: {seq_fps:6.1f} fps, peak frames held {seq_peak}")
+    print(f"Pipeline(slots={args.slots})        : {st['fps']:6.1f} fps, peak frames held {peak['peak']}, left after close {peak['held']}")
+    print(f"  upload   p50 {st['upload']['p50_ms']:.1f} ms  p95 {st['upload']['p95_ms']:.1f} ms")
+    for m, s in st["infer"].items():
+        print(f"  run {m:<4} p50 {s['p50_ms']:.1f} ms  p95 {s['p95_ms']:.1f} ms")
+    print(f"  end2end  p50 {st['end_to_end']['p50_ms']:.1f} ms  p95 {st['end_to_end']['p95_ms']:.1f} ms")
+    proc.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
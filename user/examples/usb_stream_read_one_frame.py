@@ -3,9 +3,10 @@ import base64
 import json
 import os
 import socket
-import struct
 import urllib.request
 
+from methings.usb_stream import FrameReader
+
 
 BASE = os.environ.get("METHINGS_DEVICE_API", "http://127.0.0.1:33389").rstrip("/")
 
@@ -21,16 +22,6 @@ def post(path: str, payload: dict) -> dict:
         return json.loads(resp.read().decode("utf-8"))
 
 
-def recv_exact(sock: socket.socket, n: int) -> bytes:
-    out = bytearray()
-    while len(out) < n:
-        chunk = sock.recv(n - len(out))
-        if not chunk:
-            raise EOFError("socket closed")
-        out.extend(chunk)
-    return bytes(out)
-
-
 def main() -> int:
     # You must supply a permission_id from the app permission broker.
     permission_id = os.environ.get("METHINGS_USB_PERMISSION_ID", "").strip()
@@ -82,11 +73,13 @@ def main() -> int:
         print(f"Connecting TCP 127.0.0.1:{port} ...")
         s = socket.create_connection(("127.0.0.1", port), timeout=5)
         with s:
-            hdr = recv_exact(s, 5)
-            t = hdr[0]
-            ln = struct.unpack("<I", hdr[1:])[0]
-            payload = recv_exact(s, ln) if ln else b""
-            print(f"frame type={t} len={ln} head_b64={base64.b64encode(payload[:32]).decode('ascii')}")
+            # FrameReader parses the u8 type + u32le length framing without per-frame copies.
+            # For continuous reads with lifecycle handling, see methings.usb_stream.UsbStream.
+            frame = FrameReader(s).read_frame()
+            if frame is None:
+                raise SystemExit("stream closed before the first frame")
+            t, payload = frame
+            print(f"frame type={t} len={len(payload)} head_b64={base64.b64encode(payload[:32]).decode('ascii')}")
     finally:
         print("Stopping stream...")
         post("/usb/stream/stop", {"permission_id": permission_id, "stream_id": stream_id})
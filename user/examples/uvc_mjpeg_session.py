@@ -0,0 +1,30 @@
+from methings import MethingsClient
+from methings.uvc import UvcSession
+
+
+def main():
+    k = MethingsClient()
+
+    # Assumes you already have a usb handle for the webcam (device_api usb.open). Replace this.
+    usb_handle = ""
+    if not usb_handle:
+        print("error: set usb_handle from usb.open response")
+        return 1
+
+    # Keep the camera streaming and read 90 frames (~3 s at 30 fps); save the last one.
+    last = b""
+    with UvcSession(k, handle=usb_handle, width=1280, height=720, fps=30) as cam:
+        print(cam.info)
+        for frame in cam.frames(max_frames=90):
+            last = bytes(frame.jpeg)
+            if frame.skipped:
+                print(f"seq={frame.seq} skipped={frame.skipped}")
+        print(cam.stats())
+
+    with open("uvc_session_last.jpg", "wb") as f:
+        f.write(last)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
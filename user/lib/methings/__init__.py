@@ -1,4 +1,4 @@
+from .aio import AsyncMethingsClient
 from .client import MethingsClient
 
-__all__ = ["MethingsClient"]
-
+__all__ = ["AsyncMethingsClient", "MethingsClient"]
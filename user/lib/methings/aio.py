@@ -0,0 +1,301 @@
+import asyncio
+import collections
+import time
+import urllib.parse
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from .cache import DeviceApiCache
+from .client import _DEVICE_API_HTTP_TIMEOUT_S, _RETRY_METHODS, MethingsClient, _device_api_body, _json_result, _metric_name, _metric_status
+from .metrics import ClientMetrics, parse_server_timing
+
+
+_Stream = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+# Raised when a pooled keep-alive socket was closed by the server while idle.
+_STALE_ERRORS = (
+    asyncio.IncompleteReadError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+
+class _AsyncConnectionPool:
+    """Keep-alive HTTP/1.1 connections for one event loop (LIFO, surplus closed on release)."""
+
+    def __init__(self, host: str, port: int, *, maxsize: int):
+        self.host = host
+        self.port = int(port)
+        self.maxsize = max(1, int(maxsize))
+        self._idle: Deque[_Stream] = collections.deque()
+        self._in_use = 0
+        self._created = 0
+        self._reused = 0
+        self._stale = 0
+
+    async def acquire(self) -> Tuple[_Stream, bool]:
+        while self._idle:
+            reader, writer = self._idle.pop()
+            # EOF on an idle socket means the server closed it; drop it.
+            if reader.at_eof() or writer.is_closing():
+                self._stale += 1
+                writer.close()
+                continue
+            self._in_use += 1
+            self._reused += 1
+            return (reader, writer), True
+        self._in_use += 1
+        self._created += 1
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except BaseException:
+            self._in_use -= 1
+            raise
+        return (reader, writer), False
+
+    def release(self, stream: _Stream, *, reusable: bool) -> None:
+        self._in_use -= 1
+        if reusable and len(self._idle) < self.maxsize:
+            self._idle.append(stream)
+            return
+        stream[1].close()
+
+    def clear(self) -> List[asyncio.StreamWriter]:
+        closed = []
+        while self._idle:
+            writer = self._idle.pop()[1]
+            writer.close()
+            closed.append(writer)
+        return closed
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "maxsize": self.maxsize,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "created": self._created,
+            "reused": self._reused,
+            "stale_replaced": self._stale,
+        }
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, bytes, bool, Dict[str, str]]:
+    """Read one HTTP/1.1 response. Returns (status, body, will_close, headers); header names are lower-case."""
+    status_line = await reader.readuntil(b"\r\n")
+    parts = status_line.decode("latin-1").split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise ConnectionError(f"bad status line: {status_line!r}")
+    status = int(parts[1])
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        k, _, v = line.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    will_close = headers.get("connection", "").lower() == "close" or parts[0] == "HTTP/1.0"
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+            if size == 0:
+                # Trailers (if any) end with an empty line.
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        return status, b"".join(chunks), will_close, headers
+    if "content-length" in headers:
+        return status, await reader.readexactly(int(headers["content-length"])), will_close, headers
+    return status, await reader.read(), True, headers
+
+
+class AsyncMethingsClient(MethingsClient):
+    """
+    asyncio-native sibling of MethingsClient for running many control-plane calls on one event loop.
+
+    `request_json` and `device_api` are coroutines. The high-level helpers are inherited from
+    MethingsClient and return the `device_api` coroutine, so they are awaited the same way:
+
+        async with AsyncMethingsClient(max_concurrency=8) as k:
+            flash, usb = await asyncio.gather(k.mcu_flash(...), k.usb_list())
+
+    `max_concurrency` bounds in-flight requests (0 = unlimited); connections are kept alive and
+    reused up to `pool_size` idle sockets. Use one instance per event loop.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://127.0.0.1:33389",
+        *,
+        identity: Optional[str] = None,
+        max_concurrency: int = 16,
+        pool_size: int = 8,
+        cache: Union[bool, DeviceApiCache, None] = None,
+        metrics: Union[bool, ClientMetrics, None] = None,
+    ):
+        super().__init__(base_url, identity=identity, keep_alive=False, cache=cache, metrics=metrics)
+        parts = urllib.parse.urlsplit(self.base_url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError("AsyncMethingsClient supports plain http:// base URLs only")
+        self._path_prefix = parts.path.rstrip("/")
+        self._host_header = parts.netloc
+        self._apool = _AsyncConnectionPool(parts.hostname, parts.port or 80, maxsize=pool_size)
+        self.max_concurrency = max(0, int(max_concurrency))
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    @property
+    def pool_size(self) -> int:
+        return self._apool.maxsize
+
+    def pool_stats(self) -> Dict[str, int]:
+        return self._apool.stats()
+
+    def close(self) -> None:
+        self._apool.clear()
+
+    async def aclose(self) -> None:
+        for writer in self._apool.clear():
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def __aenter__(self) -> "AsyncMethingsClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    async def request_json(  # type: ignore[override]
+        self,
+        method: str,
+        path: str,
+        body: Optional[Dict[str, Any]] = None,
+        *,
+        timeout_s: float = 20.0,
+    ) -> Dict[str, Any]:
+        if self.metrics is not None:
+            m = method.upper()
+            return await self._timed_async(m, path, lambda: self._encode_request(body), timeout_s, _metric_name(m, path, body))
+        data, headers = self._encode_request(body)
+        return await self._send_async(method.upper(), path, data, headers, timeout_s)
+
+    async def request_bytes(  # type: ignore[override]
+        self,
+        method: str,
+        path: str,
+        data: Any,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        timeout_s: float = 20.0,
+    ) -> Dict[str, Any]:
+        if self.metrics is not None:
+            m = method.upper()
+            return await self._timed_async(m, path, lambda: self._encode_binary(data, headers), timeout_s, _metric_name(m, path, None))
+        body, hdrs = self._encode_binary(data, headers)
+        return await self._send_async(method.upper(), path, body, hdrs, timeout_s)
+
+    async def _timed_async(self, method: str, path: str, encode: Any, timeout_s: float, name: str) -> Dict[str, Any]:
+        # Time waiting for a max_concurrency slot shows up in `total` only.
+        metrics = self.metrics
+        assert metrics is not None
+        timing: Dict[str, float] = {}
+        t0 = time.perf_counter()
+        data, headers = encode()
+        timing["serialize"] = time.perf_counter() - t0
+        r = await self._send_async(method, path, data, headers, timeout_s, timing)
+        timing["total"] = time.perf_counter() - t0
+        timing["wait"] = max(0.0, timing.get("wait", 0.0) - timing.get("server", 0.0))
+        metrics.record(name, t0, timing, _metric_status(r))
+        return r
+
+    async def _send_async(
+        self,
+        method: str,
+        path: str,
+        data: Any,
+        headers: Dict[str, str],
+        timeout_s: float,
+        timing: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        if self._sem is None and self.max_concurrency:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        try:
+            if self._sem is None:
+                return await asyncio.wait_for(self._exchange(method, path, data, headers, timing), timeout_s)
+            async with self._sem:
+                return await asyncio.wait_for(self._exchange(method, path, data, headers, timing), timeout_s)
+        except asyncio.TimeoutError:
+            return {"ok": False, "status": 0, "error": "timed out"}
+        except Exception as ex:
+            return {"ok": False, "status": 0, "error": str(ex)}
+
+    async def _exchange(
+        self,
+        method: str,
+        path: str,
+        data: Any,
+        headers: Dict[str, str],
+        timing: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        lines = [f"{method} {self._path_prefix + path} HTTP/1.1", f"Host: {self._host_header}"]
+        lines.extend(f"{k}: {v}" for k, v in headers.items())
+        lines.append(f"Content-Length: {len(data) if data else 0}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        for attempt in range(2):
+            t0 = time.perf_counter()
+            stream, reused = await self._apool.acquire()
+            t1 = time.perf_counter()
+            if timing is not None and not reused:
+                timing["connect"] = timing.get("connect", 0.0) + (t1 - t0)
+            reader, writer = stream
+            sent = False
+            try:
+                if isinstance(data, memoryview):
+                    # Binary bodies go out as-is (no concatenation copy).
+                    writer.write(head)
+                    writer.write(data)
+                else:
+                    writer.write(head + data if data else head)
+                await writer.drain()
+                sent = True
+                status, raw, will_close, resp_headers = await _read_response(reader)
+            except _STALE_ERRORS:
+                self._apool.release(stream, reusable=False)
+                # Same rule as MethingsClient: a request that went out is only repeated if idempotent.
+                if reused and attempt == 0 and (not sent or method in _RETRY_METHODS):
+                    continue
+                raise
+            except BaseException:
+                # Includes cancellation by wait_for: the socket may hold a half-read response.
+                self._apool.release(stream, reusable=False)
+                raise
+            self._apool.release(stream, reusable=not will_close)
+            if timing is None:
+                return _json_result(status, raw)
+            t2 = time.perf_counter()
+            timing["wait"] = t2 - t1
+            timing["server"] = parse_server_timing(resp_headers.get("server-timing"))
+            r = _json_result(status, raw)
+            timing["parse"] = time.perf_counter() - t2
+            return r
+        raise ConnectionError("unreachable")
+
+    async def device_api(  # type: ignore[override]
+        self,
+        action: str,
+        payload: Dict[str, Any],
+        *,
+        detail: str = "",
+        timeout_s: Optional[float] = None,
+        http_timeout_s: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        body = _device_api_body(action, payload, detail, timeout_s)
+        wait_s = _DEVICE_API_HTTP_TIMEOUT_S if http_timeout_s is None else float(http_timeout_s)
+        if self.cache is not None:
+            return await self.cache.acall(
+                action, payload, lambda: self.request_json("POST", "/tools/device_api/invoke", body, timeout_s=wait_s)
+            )
+        return await self.request_json("POST", "/tools/device_api/invoke", body, timeout_s=wait_s)
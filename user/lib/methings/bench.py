@@ -0,0 +1,398 @@
+"""
+Repeatable client-library benchmarks against a device or the local stand-in (methings.standin).
+
+Scenarios (each case runs for `duration_s`):
+
+- `device_api`: calls/s and latency p50/p95/p99 of one action at several concurrency levels
+  (threads sharing one MethingsClient with a pool of that size)
+- `usb_stream`: MB/s and frames/s through methings.usb_stream.UsbStream per `chunk_size`
+- `sensors`: samples/s and messages/s through methings.sensors.SensorStream per rate/format
+  (the stand-in sends back to back, so this is the client's decode ceiling; on a device it is
+  bounded by `rate_hz`)
+- `vision`: frames/s and end-to-end latency of methings.vision.Pipeline (frame put + run) per
+  pipeline depth
+
+Results are written as JSON (`{schema, created, target, host, library, results: [{scenario,
+params, metrics, primary}]}`); `compare()` matches cases by scenario and params against an
+earlier file and flags drops of the primary metric beyond a tolerance.
+
+CLI: `python -m methings.bench --standin --out bench.json [--compare baseline.json]`
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from .client import MethingsClient
+from .metrics import LatencyHistogram
+from .sensors import SensorStream
+from .standin import StandinServer
+from .usb_stream import UsbStream
+from .vision import Pipeline
+
+SCHEMA_VERSION = 1
+SCENARIOS = ("device_api", "usb_stream", "sensors", "vision")
+
+
+class BenchSkipped(Exception):
+    """A scenario cannot run against this target (e.g. no USB handle given for a device)."""
+
+
+def _result(scenario: str, params: Dict[str, Any], metrics: Dict[str, Any], primary: str) -> Dict[str, Any]:
+    return {"scenario": scenario, "params": params, "metrics": metrics, "primary": primary}
+
+
+# -------- scenarios --------
+def bench_device_api(
+    base_url: str,
+    *,
+    concurrency: int,
+    duration_s: float,
+    action: str = "sensor.list",
+    payload: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    concurrency = max(1, int(concurrency))
+    payload = dict(payload or {})
+    hists = [LatencyHistogram() for _ in range(concurrency)]
+    errors = [0] * concurrency
+    start = threading.Barrier(concurrency + 1)
+    with MethingsClient(base_url, pool_size=concurrency) as k:
+        k.device_api(action, payload)  # warm one connection and fail fast on a bad action
+
+        def worker(i: int) -> None:
+            hist = hists[i]
+            start.wait()
+            deadline = time.perf_counter() + duration_s
+            while True:
+                t0 = time.perf_counter()
+                if t0 >= deadline:
+                    return
+                r = k.device_api(action, payload)
+                hist.record(time.perf_counter() - t0)
+                if not r.get("ok"):
+                    errors[i] += 1
+
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+        for t in threads:
+            t.start()
+        start.wait()
+        t0 = time.perf_counter()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+    total = LatencyHistogram()
+    for h in hists:
+        total.merge(h)
+    snap = total.snapshot()
+    return _result(
+        "device_api",
+        {"action": action, "concurrency": concurrency},
+        {
+            "calls": total.count,
+            "errors": sum(errors),
+            "calls_per_s": total.count / elapsed,
+            "latency_ms": {k: v for k, v in snap.items() if k != "count"},
+        },
+        "calls_per_s",
+    )
+
+
+def bench_usb_stream(
+    base_url: str,
+    *,
+    chunk_size: int,
+    duration_s: float,
+    handle: str = "standin",
+    endpoint_address: int = 0x81,
+    mode: str = "bulk_in",
+) -> Dict[str, Any]:
+    with MethingsClient(base_url) as k:
+        st = UsbStream(k, handle=handle, endpoint_address=endpoint_address, mode=mode, chunk_size=chunk_size)
+        try:
+            reader = st.connect()
+            # The clock starts at the first frame so stream setup is not counted.
+            first = reader.read_frame()
+            if first is None:
+                raise BenchSkipped("usb stream closed before the first frame")
+            t0 = time.perf_counter()
+            deadline = t0 + duration_s
+            frames = nbytes = 0
+            while True:
+                fr = reader.read_frame()
+                if fr is None:
+                    break
+                frames += 1
+                nbytes += len(fr[1])
+                if not frames % 64 and time.perf_counter() >= deadline:
+                    break
+            elapsed = time.perf_counter() - t0
+        finally:
+            st.close()
+    return _result(
+        "usb_stream",
+        {"chunk_size": int(chunk_size), "mode": mode},
+        {"frames": frames, "bytes": nbytes, "mb_per_s": nbytes / elapsed / 1e6, "frames_per_s": frames / elapsed},
+        "mb_per_s",
+    )
+
+
+def bench_sensors(
+    base_url: str,
+    *,
+    rate_hz: int,
+    duration_s: float,
+    format: str = "packed",
+    sensors: str = "a,g,m",
+    batch_ms: int = 50,
+) -> Dict[str, Any]:
+    st = SensorStream(base_url, sensors=sensors, rate_hz=rate_hz, format=format, batch_ms=batch_ms)
+    st.connect()
+    samples = batches = 0
+    try:
+        t0 = time.perf_counter()
+        deadline = t0 + duration_s
+        for batch in st.batches():
+            samples += batch.count
+            batches += 1
+            if time.perf_counter() >= deadline:
+                break
+        elapsed = time.perf_counter() - t0
+    finally:
+        st.close()
+    return _result(
+        "sensors",
+        {"rate_hz": int(rate_hz), "format": format, "sensors": sensors, "batch_ms": int(batch_ms)},
+        {"samples": samples, "samples_per_s": samples / elapsed, "batches_per_s": batches / elapsed},
+        "samples_per_s",
+    )
+
+
+def bench_vision(
+    base_url: str,
+    *,
+    slots: int,
+    duration_s: float,
+    model: str = "bench",
+    width: int = 640,
+    height: int = 480,
+) -> Dict[str, Any]:
+    frame = bytes(width * height * 4)
+
+    def frames() -> Iterator[bytes]:
+        deadline = time.perf_counter() + duration_s
+        while time.perf_counter() < deadline:
+            yield frame
+
+    with MethingsClient(base_url, pool_size=max(4, slots * 2)) as k:
+        with Pipeline(k, models=[model], width=width, height=height, slots=slots) as p:
+            for _ in p.run(frames()):
+                pass
+            stats = p.stats()
+    return _result(
+        "vision",
+        {"model": model, "width": int(width), "height": int(height), "slots": int(slots)},
+        {
+            "frames": stats["frames"],
+            "fps": stats["fps"],
+            "mb_per_s": stats["fps"] * len(frame) / 1e6,
+            "upload_ms": stats["upload"],
+            "end_to_end_ms": stats["end_to_end"],
+        },
+        "fps",
+    )
+
+
+# -------- suite --------
+def _library_fingerprint() -> str:
+    """SHA-256 (first 12 hex digits) over this package's sources, to tell client builds apart."""
+    h = hashlib.sha256()
+    root = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(root)):
+        if name.endswith(".py"):
+            with open(os.path.join(root, name), "rb") as f:
+                h.update(name.encode() + b"\0" + f.read())
+    return h.hexdigest()[:12]
+
+
+def run_suite(
+    base_url: str,
+    cases: Sequence[Callable[[], Dict[str, Any]]],
+    *,
+    target: str,
+    standin: Optional[Dict[str, Any]] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    for case in cases:
+        try:
+            r = case()
+        except BenchSkipped as ex:
+            r = {"scenario": getattr(case, "scenario", "?"), "params": getattr(case, "params", {}), "skipped": str(ex)}
+        results.append(r)
+        if on_result is not None:
+            on_result(r)
+    return {
+        "schema": SCHEMA_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "target": target,
+        "base_url": base_url,
+        "standin": standin,
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+        "library": {"fingerprint": _library_fingerprint()},
+        "results": results,
+    }
+
+
+def _case_key(r: Dict[str, Any]) -> str:
+    return r["scenario"] + " " + json.dumps(r.get("params") or {}, sort_keys=True)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], *, tolerance_pct: float = 10.0) -> List[Dict[str, Any]]:
+    """
+    Per case present in both runs: `{case, primary, baseline, current, change_pct, regressed}`.
+    All primary metrics are higher-is-better; a case regresses when it drops by more than
+    `tolerance_pct`.
+    """
+    old = {_case_key(r): r for r in baseline.get("results") or [] if "metrics" in r}
+    out: List[Dict[str, Any]] = []
+    for r in current.get("results") or []:
+        prev = old.get(_case_key(r))
+        if prev is None or "metrics" not in r:
+            continue
+        key = r["primary"]
+        a, b = float(prev["metrics"][key]), float(r["metrics"][key])
+        change = (b - a) / a * 100.0 if a else 0.0
+        out.append({"case": _case_key(r), "primary": key, "baseline": a, "current": b,
+                    "change_pct": change, "regressed": change < -tolerance_pct})
+    return out
+
+
+def _format(r: Dict[str, Any]) -> str:
+    params = " ".join(f"{k}={v}" for k, v in (r.get("params") or {}).items())
+    if "skipped" in r:
+        return f"{r['scenario']:<11} {params:<52} skipped: {r['skipped']}"
+    m = r["metrics"]
+    extra = ""
+    if r["scenario"] == "device_api":
+        lat = m["latency_ms"]
+        extra = f"  p50 {lat['p50_ms']:.2f} p95 {lat['p95_ms']:.2f} p99 {lat['p99_ms']:.2f} ms  errors {m['errors']}"
+    elif r["scenario"] == "usb_stream":
+        extra = f"  {m['frames_per_s']:.0f} frames/s"
+    elif r["scenario"] == "sensors":
+        extra = f"  {m['batches_per_s']:.0f} batches/s"
+    elif r["scenario"] == "vision":
+        extra = f"  e2e p50 {m['end_to_end_ms'].get('p50_ms', 0):.1f} ms  {m['mb_per_s']:.0f} MB/s up"
+    return f"{r['scenario']:<11} {params:<52} {m[r['primary']]:>12.1f} {r['primary']}{extra}"
+
+
+def _ints(text: str) -> List[int]:
+    return [int(x, 0) for x in text.split(",") if x.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m methings.bench", description="Client-library benchmarks.")
+    ap.add_argument("--standin", action="store_true", help="run against a local stand-in server (methings.standin)")
+    ap.add_argument("--base-url", default=os.environ.get("METHINGS_BASE_URL", "http://127.0.0.1:33389"))
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--duration", type=float, default=3.0, help="seconds per case")
+    ap.add_argument("--action", default="sensor.list", help="device_api action to call")
+    ap.add_argument("--concurrency", default="1,4,16")
+    ap.add_argument("--chunk-sizes", default="4096,16384,65536")
+    ap.add_argument("--usb-handle", default="", help="USB handle for usb_stream on a device")
+    ap.add_argument("--usb-endpoint", type=lambda s: int(s, 0), default=0x81)
+    ap.add_argument("--sensor-rates", default="200,1000")
+    ap.add_argument("--sensor-formats", default="packed,json")
+    ap.add_argument("--vision-model", default="", help="loaded model name for vision on a device")
+    ap.add_argument("--vision-size", default="640x480")
+    ap.add_argument("--vision-slots", default="1,2")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="stand-in: added per device_api call")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="stand-in: random extra per device_api call")
+    ap.add_argument("--infer-ms", type=float, default=5.0, help="stand-in: time per vision run")
+    ap.add_argument("--out", default="", help="write results JSON here")
+    ap.add_argument("--compare", default="", help="earlier results JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=10.0, help="allowed drop in %% before --compare fails")
+    args = ap.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = sorted(set(scenarios) - set(SCENARIOS))
+    if unknown:
+        ap.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    srv: Optional[StandinServer] = None
+    if args.standin:
+        srv = StandinServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, infer_ms=args.infer_ms)
+        base_url = srv.start()
+    else:
+        base_url = args.base_url.rstrip("/")
+    dur = args.duration
+    w, _, h = args.vision_size.partition("x")
+
+    def case(scenario: str, params: Dict[str, Any], fn: Callable[[], Dict[str, Any]]) -> Callable[[], Dict[str, Any]]:
+        fn.scenario, fn.params = scenario, params  # type: ignore[attr-defined]
+        return fn
+
+    def skip(reason: str) -> Callable[[], Dict[str, Any]]:
+        def fn() -> Dict[str, Any]:
+            raise BenchSkipped(reason)
+        return fn
+
+    cases: List[Callable[[], Dict[str, Any]]] = []
+    if "device_api" in scenarios:
+        for c in _ints(args.concurrency):
+            cases.append(case("device_api", {"action": args.action, "concurrency": c},
+                              lambda c=c: bench_device_api(base_url, concurrency=c, duration_s=dur, action=args.action)))
+    if "usb_stream" in scenarios:
+        for cs in _ints(args.chunk_sizes):
+            params = {"chunk_size": cs, "mode": "bulk_in"}
+            if srv is None and not args.usb_handle:
+                cases.append(case("usb_stream", params, skip("needs --usb-handle on a device")))
+                continue
+            cases.append(case("usb_stream", params, lambda cs=cs: bench_usb_stream(
+                base_url, chunk_size=cs, duration_s=dur, handle=args.usb_handle or "standin",
+                endpoint_address=args.usb_endpoint)))
+    if "sensors" in scenarios:
+        for fmt in [f.strip() for f in args.sensor_formats.split(",") if f.strip()]:
+            for rate in _ints(args.sensor_rates):
+                cases.append(case("sensors", {"rate_hz": rate, "format": fmt},
+                                  lambda rate=rate, fmt=fmt: bench_sensors(base_url, rate_hz=rate, duration_s=dur, format=fmt)))
+    if "vision" in scenarios:
+        for slots in _ints(args.vision_slots):
+            params = {"slots": slots}
+            if srv is None and not args.vision_model:
+                cases.append(case("vision", params, skip("needs --vision-model on a device")))
+                continue
+            cases.append(case("vision", params, lambda slots=slots: bench_vision(
+                base_url, slots=slots, duration_s=dur, model=args.vision_model or "bench", width=int(w), height=int(h))))
+
+    try:
+        report = run_suite(base_url, cases, target="standin" if srv else base_url,
+                           standin=dict(srv.config) if srv else None, on_result=lambda r: print(_format(r), flush=True))
+    finally:
+        if srv is not None:
+            srv.stop()
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if not args.compare:
+        return 0
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(baseline, report, tolerance_pct=args.tolerance)
+    print(f"\ncompared with {args.compare} (library {baseline.get('library', {}).get('fingerprint')} -> "
+          f"{report['library']['fingerprint']}):")
+    for row in rows:
+        flag = "  REGRESSED" if row["regressed"] else ""
+        print(f"  {row['case']:<70} {row['baseline']:>12.1f} -> {row['current']:>12.1f} {row['primary']} "
+              f"({row['change_pct']:+.1f}%){flag}")
+    return 1 if any(row["regressed"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
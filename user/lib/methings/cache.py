@@ -0,0 +1,234 @@
+"""
+Opt-in response cache for read-only device_api actions (MethingsClient(cache=True)).
+
+Only actions listed in `ttls` are cached, keyed by `(action, payload)`; entries expire after
+the action's TTL and the least recently used ones are evicted beyond `maxsize`. Concurrent
+callers asking for the same key share one in-flight request. Any other action invalidates the
+cached reads it may affect (`invalidates`, matched by action prefix), e.g. `usb.open` drops
+`usb.status`. Only results the device answered with `"status": "ok"` are stored (an HTTP 200
+can still carry e.g. `permission_required`), and each caller gets its own copy.
+"""
+import asyncio
+import collections
+import copy
+import json
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+
+# Seconds a result stays fresh. Lists of attached hardware change rarely; status reads are
+# kept short so agents polling for a state change still see it promptly.
+DEFAULT_TTLS: Dict[str, float] = {
+    "usb.list": 2.0,
+    "usb.status": 1.0,
+    "usb.stream.status": 1.0,
+    "mcu.models": 300.0,
+    "sensor.list": 30.0,
+    "camera.list": 10.0,
+    "camera.status": 1.0,
+    "ble.status": 2.0,
+    "sensor.stream.status": 1.0,
+    "uvc.mjpeg.session.status": 1.0,
+}
+
+# Action prefix → cached actions whose results it may change.
+DEFAULT_INVALIDATES: Dict[str, Tuple[str, ...]] = {
+    "usb.": ("usb.list", "usb.status", "usb.stream.status"),
+    "mcu.": ("usb.status",),
+    "serial.": ("usb.status",),
+    "uvc.": ("usb.status", "uvc.mjpeg.session.status"),
+    "camera.": ("camera.status",),
+    "ble.": ("ble.status",),
+    "sensor.stream.": ("sensor.stream.status",),
+}
+
+_Key = Tuple[str, str]
+
+
+def _succeeded(result: Dict[str, Any]) -> bool:
+    j = result.get("json")
+    return bool(result.get("ok")) and isinstance(j, dict) and j.get("status") == "ok"
+
+
+class _Pending:
+    __slots__ = ("event", "result")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+
+
+class DeviceApiCache:
+    def __init__(
+        self,
+        ttls: Optional[Mapping[str, float]] = None,
+        *,
+        maxsize: int = 256,
+        invalidates: Optional[Mapping[str, Iterable[str]]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttls: Dict[str, float] = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.maxsize = max(1, int(maxsize))
+        self.invalidates: Dict[str, Tuple[str, ...]] = {
+            p: tuple(a) for p, a in (DEFAULT_INVALIDATES if invalidates is None else invalidates).items()
+        }
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "collections.OrderedDict[_Key, Tuple[float, Dict[str, Any]]]" = collections.OrderedDict()
+        self._inflight: Dict[_Key, _Pending] = {}
+        self._ainflight: Dict[_Key, "asyncio.Future[Dict[str, Any]]"] = {}
+        # Bumped by invalidate(); a read that started before the bump is not stored.
+        self._generation: Dict[str, int] = collections.defaultdict(int)
+        self._hits = 0
+        self._misses = 0
+        self._shared = 0
+        self._expired = 0
+        self._evicted = 0
+        self._invalidated = 0
+
+    def cacheable(self, action: str) -> bool:
+        return self.ttls.get(action, 0.0) > 0
+
+    @staticmethod
+    def key(action: str, payload: Dict[str, Any]) -> _Key:
+        return action, json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+
+    def _lookup(self, key: _Key) -> Optional[Dict[str, Any]]:
+        # Caller holds the lock.
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, result = entry
+        if self._clock() >= expires:
+            del self._entries[key]
+            self._expired += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return result
+
+    def _store(self, key: _Key, generation: int, result: Dict[str, Any]) -> None:
+        # Caller holds the lock.
+        if not _succeeded(result) or self._generation[key[0]] != generation:
+            return
+        self._entries[key] = (self._clock() + self.ttls[key[0]], result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._evicted += 1
+
+    def call(self, action: str, payload: Dict[str, Any], fetch: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return a cached result for a cacheable action, or run `fetch` (once per key at a time)."""
+        if not self.cacheable(action):
+            try:
+                return fetch()
+            finally:
+                self.invalidate_for(action)
+        key = self.key(action, payload)
+        with self._lock:
+            hit = self._lookup(key)
+            if hit is not None:
+                return copy.deepcopy(hit)
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[key] = _Pending()
+                self._misses += 1
+            else:
+                self._shared += 1
+            generation = self._generation[action]
+        assert pending is not None
+        if not leader:
+            pending.event.wait()
+            return copy.deepcopy(pending.result or {"ok": False, "status": 0, "error": "shared_request_failed"})
+        result: Optional[Dict[str, Any]] = None
+        try:
+            result = fetch()
+            return copy.deepcopy(result)
+        finally:
+            with self._lock:
+                if result is not None:
+                    self._store(key, generation, result)
+                self._inflight.pop(key, None)
+            pending.result = result
+            pending.event.set()
+
+    async def acall(
+        self, action: str, payload: Dict[str, Any], fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """asyncio counterpart of call(); in-flight sharing is per event loop."""
+        if not self.cacheable(action):
+            try:
+                return await fetch()
+            finally:
+                self.invalidate_for(action)
+        key = self.key(action, payload)
+        with self._lock:
+            hit = self._lookup(key)
+            if hit is not None:
+                return copy.deepcopy(hit)
+            fut = self._ainflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._ainflight[key] = asyncio.get_running_loop().create_future()
+                self._misses += 1
+            else:
+                self._shared += 1
+            generation = self._generation[action]
+        assert fut is not None
+        if not leader:
+            # shield: a cancelled follower must not cancel the leader's request.
+            return copy.deepcopy(await asyncio.shield(fut))
+        result: Optional[Dict[str, Any]] = None
+        try:
+            result = await fetch()
+            return copy.deepcopy(result)
+        finally:
+            with self._lock:
+                if result is not None:
+                    self._store(key, generation, result)
+                self._ainflight.pop(key, None)
+            fut.set_result(result or {"ok": False, "status": 0, "error": "shared_request_failed"})
+
+    def invalidate_for(self, action: str) -> int:
+        """Drop cached reads that `action` may have changed. Returns the number of entries removed."""
+        targets = set()
+        for prefix, actions in self.invalidates.items():
+            if action.startswith(prefix):
+                targets.update(actions)
+        return self.invalidate(*targets) if targets else 0
+
+    def invalidate(self, *actions: str) -> int:
+        """Drop all entries for `actions` (every entry when none are given)."""
+        with self._lock:
+            if actions:
+                names = set(actions)
+                keys = [k for k in self._entries if k[0] in names]
+            else:
+                names = set(self._generation) | {k[0] for k in self._entries}
+                keys = list(self._entries)
+            for name in names:
+                self._generation[name] += 1
+            for k in keys:
+                del self._entries[k]
+            self._invalidated += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses + self._shared
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self._hits,
+                "misses": self._misses,
+                "shared": self._shared,
+                "hit_rate": (self._hits + self._shared) / lookups if lookups else 0.0,
+                "expired": self._expired,
+                "evicted": self._evicted,
+                "invalidated": self._invalidated,
+            }
@@ -1,8 +1,187 @@
+import collections
+import http.client
 import json
 import os
+import select
+import socket
+import threading
+import time
+import urllib.parse
 import urllib.request
 import urllib.error
-from typing import Any, Dict, Optional
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from .cache import DeviceApiCache
+from .metrics import ClientMetrics, parse_server_timing
+
+
+# Errors raised when a pooled keep-alive socket was closed by the server while idle.
+# A request that fails this way on a reused connection is retried once on a fresh one, but only
+# if it was not fully sent or its method is idempotent: a reset after a POST device_api action
+# went out may come after the server ran it (mcu.flash, serial.write, ...).
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+_RETRY_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+# HTTP wait for one device_api invoke unless the caller passes http_timeout_s.
+_DEVICE_API_HTTP_TIMEOUT_S = 60.0
+
+
+class _KeepAliveConnection(http.client.HTTPConnection):
+    def connect(self) -> None:
+        super().connect()
+        # Small request/response exchanges on a reused socket otherwise stall on Nagle + delayed ACK.
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class _ConnectionPool:
+    """
+    Thread-safe pool of HTTP/1.1 keep-alive connections to a single host.
+
+    Idle connections are kept LIFO (most recently used first) up to `maxsize`; callers that
+    find the pool empty get a new connection instead of blocking, and surplus connections are
+    closed on release. Idle sockets that the server has closed (or that idled longer than
+    `idle_timeout_s`) are detected on checkout and replaced.
+    """
+
+    def __init__(self, host: str, port: int, *, maxsize: int = 4, idle_timeout_s: float = 30.0):
+        self.host = host
+        self.port = int(port)
+        self.maxsize = max(1, int(maxsize))
+        self.idle_timeout_s = float(idle_timeout_s)
+        self._lock = threading.Lock()
+        self._idle: Deque[Tuple[http.client.HTTPConnection, float]] = collections.deque()
+        self._in_use = 0
+        self._created = 0
+        self._reused = 0
+        self._stale = 0
+
+    def acquire(self, timeout_s: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """Return `(conn, reused)`; `reused` is False for a newly created connection."""
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                conn, last_used = self._idle.pop()
+                if now - last_used > self.idle_timeout_s or _socket_is_dead(conn):
+                    self._stale += 1
+                    conn.close()
+                    continue
+                self._in_use += 1
+                self._reused += 1
+                break
+            else:
+                conn = None
+                self._in_use += 1
+                self._created += 1
+        if conn is None:
+            conn = _KeepAliveConnection(self.host, self.port, timeout=timeout_s)
+            return conn, False
+        conn.timeout = timeout_s
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout_s)
+        return conn, True
+
+    def release(self, conn: http.client.HTTPConnection, *, reusable: bool) -> None:
+        with self._lock:
+            self._in_use -= 1
+            if reusable and len(self._idle) < self.maxsize:
+                self._idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def clear(self) -> None:
+        """Close all idle connections; checked-out connections return to the pool as usual."""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            conn.close()
+
+    @property
+    def size(self) -> int:
+        """Number of idle connections currently held by the pool."""
+        with self._lock:
+            return len(self._idle)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "maxsize": self.maxsize,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "created": self._created,
+                "reused": self._reused,
+                "stale_replaced": self._stale,
+            }
+
+
+def _socket_is_dead(conn: http.client.HTTPConnection) -> bool:
+    # An idle keep-alive socket should have nothing to read. Readable means the peer sent
+    # EOF (closed) or unexpected bytes; either way the connection cannot be reused.
+    sock = conn.sock
+    if sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+def _json_result(status: int, raw_bytes: bytes) -> Dict[str, Any]:
+    # Same result shape as the urlopen path: 2xx -> ok/json, HTTP errors -> ok=False with the error body.
+    raw = raw_bytes.decode("utf-8", errors="replace")
+    if 200 <= status < 300:
+        try:
+            return {"ok": True, "status": status, "json": json.loads(raw) if raw else {}}
+        except Exception as ex:
+            return {"ok": False, "status": 0, "error": str(ex)}
+    try:
+        j = json.loads(raw) if raw else {}
+    except Exception:
+        j = {"raw": raw}
+    return {"ok": False, "status": int(status), "json": j}
+
+
+def _device_api_body(action: str, payload: Dict[str, Any], detail: str, timeout_s: Optional[float]) -> Dict[str, Any]:
+    args: Dict[str, Any] = {"action": action, "payload": payload}
+    if detail:
+        args["detail"] = detail
+    if timeout_s is not None:
+        args["timeout_s"] = float(timeout_s)
+    return {"args": args}
+
+
+def _metric_name(method: str, path: str, body: Any) -> str:
+    # device_api calls are recorded under their action; everything else under "METHOD /path".
+    if path == "/tools/device_api/invoke" and isinstance(body, dict):
+        action = (body.get("args") or body).get("action")
+        if action:
+            return str(action)
+    return f"{method} {path.split('?', 1)[0]}"
+
+
+def _metric_status(result: Dict[str, Any]) -> str:
+    status = int(result.get("status") or 0)
+    if not status:
+        return "error"
+    j = result.get("json")
+    # device_api reports permission prompts and action failures in the body of a 2xx response.
+    if 200 <= status < 300 and isinstance(j, dict) and j.get("status") not in (None, "ok"):
+        return str(j.get("status"))
+    return str(status)
+
+
+def _vision_headers(width: int, height: int, permission_id: str) -> Dict[str, str]:
+    headers = {"X-Methings-Width": str(int(width)), "X-Methings-Height": str(int(height))}
+    if permission_id:
+        headers["X-Methings-Permission-Id"] = str(permission_id).strip()
+    return headers
 
 
 class MethingsClient:
@@ -13,7 +192,16 @@ class MethingsClient:
     New code can also use <user_dir>/lib/methings (wrapper).
     """
 
-    def __init__(self, base_url: str = "http://127.0.0.1:33389", *, identity: Optional[str] = None):
+    def __init__(
+        self,
+        base_url: str = "http://127.0.0.1:33389",
+        *,
+        identity: Optional[str] = None,
+        keep_alive: bool = True,
+        pool_size: int = 4,
+        cache: Union[bool, DeviceApiCache, None] = None,
+        metrics: Union[bool, ClientMetrics, None] = None,
+    ):
         self.base_url = base_url.rstrip("/")
         # methings-only.
         self.identity = (
@@ -22,6 +210,50 @@ class MethingsClient:
             or os.environ.get("METHINGS_SESSION_ID")
             or ""
         ).strip()
+        # Reuse HTTP/1.1 connections across calls (plain http only). keep_alive=False restores
+        # the one-connection-per-call urlopen path.
+        self._pool: Optional[_ConnectionPool] = None
+        self._path_prefix = ""
+        # Cleared after the server answers /tools/device_api/batch with 404 (older builds).
+        self._batch_supported = True
+        # Opt-in cache for read-only actions: cache=True uses the default TTLs (methings.cache).
+        self.cache: Optional[DeviceApiCache] = DeviceApiCache() if cache is True else (cache or None)
+        # Opt-in latency histograms / trace spans (methings.metrics). None follows the
+        # METHINGS_METRICS / METHINGS_TRACE environment variables; False disables it outright.
+        if metrics is None:
+            self.metrics: Optional[ClientMetrics] = ClientMetrics.from_env()
+        else:
+            self.metrics = ClientMetrics() if metrics is True else (metrics or None)
+        parts = urllib.parse.urlsplit(self.base_url)
+        if keep_alive and parts.scheme == "http" and parts.hostname:
+            self._pool = _ConnectionPool(parts.hostname, parts.port or 80, maxsize=pool_size)
+            self._path_prefix = parts.path.rstrip("/")
+
+    @property
+    def pool_size(self) -> int:
+        """Maximum number of idle keep-alive connections kept (0 when pooling is disabled)."""
+        return self._pool.maxsize if self._pool is not None else 0
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Connection pool counters: maxsize, idle, in_use, created, reused, stale_replaced."""
+        if self._pool is None:
+            return {"maxsize": 0, "idle": 0, "in_use": 0, "created": 0, "reused": 0, "stale_replaced": 0}
+        return self._pool.stats()
+
+    def metrics_summary(self) -> Dict[str, Dict[str, Any]]:
+        """p50/p95/p99 per action and phase (see methings.metrics); {} when metrics are disabled."""
+        return self.metrics.summary() if self.metrics is not None else {}
+
+    def close(self) -> None:
+        """Close idle pooled connections. The client stays usable (new connections are opened)."""
+        if self._pool is not None:
+            self._pool.clear()
+
+    def __enter__(self) -> "MethingsClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
 
     def request_json(
         self,
@@ -31,21 +263,84 @@ class MethingsClient:
         *,
         timeout_s: float = 20.0,
     ) -> Dict[str, Any]:
-        data = None
-        headers = {"Accept": "application/json"}
-        if body is not None:
-            data = json.dumps(body).encode("utf-8")
-            headers["Content-Type"] = "application/json; charset=utf-8"
-        if self.identity:
-            # methings-only.
-            headers["X-Methings-Identity"] = self.identity
-        req = urllib.request.Request(self.base_url + path, data=data, method=method.upper(), headers=headers)
+        if self.metrics is not None:
+            m = method.upper()
+            return self._timed(m, path, lambda: self._encode_request(body), float(timeout_s), _metric_name(m, path, body))
+        data, headers = self._encode_request(body)
+        return self._send(method.upper(), path, data, headers, float(timeout_s))
+
+    def request_bytes(
+        self,
+        method: str,
+        path: str,
+        data: Any,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        timeout_s: float = 20.0,
+    ) -> Dict[str, Any]:
+        """
+        Send a raw `application/octet-stream` body and decode the JSON response.
+
+        `data` may be any C-contiguous buffer (bytes, bytearray, memoryview, array, NumPy array);
+        it is handed to the socket as a memoryview, without copying.
+        """
+        if self.metrics is not None:
+            m = method.upper()
+            return self._timed(m, path, lambda: self._encode_binary(data, headers), float(timeout_s), _metric_name(m, path, None))
+        body, hdrs = self._encode_binary(data, headers)
+        return self._send(method.upper(), path, body, hdrs, float(timeout_s))
+
+    def _timed(self, method: str, path: str, encode: Any, timeout_s: float, name: str) -> Dict[str, Any]:
+        metrics = self.metrics
+        assert metrics is not None
+        timing: Dict[str, float] = {}
+        t0 = time.perf_counter()
+        data, headers = encode()
+        timing["serialize"] = time.perf_counter() - t0
+        r = self._send(method, path, data, headers, timeout_s, timing)
+        timing["total"] = time.perf_counter() - t0
+        timing["wait"] = max(0.0, timing.get("wait", 0.0) - timing.get("server", 0.0))
+        metrics.record(name, t0, timing, _metric_status(r))
+        return r
+
+    def _encode_binary(self, data: Any, headers: Optional[Dict[str, str]]) -> Tuple[memoryview, Dict[str, str]]:
+        mv = data if isinstance(data, memoryview) else memoryview(data)
+        if not mv.c_contiguous:
+            raise ValueError("buffer must be C-contiguous")
+        _, hdrs = self._encode_request(None)
+        hdrs["Content-Type"] = "application/octet-stream"
+        hdrs.update(headers or {})
+        return (mv if mv.format == "B" and mv.ndim == 1 else mv.cast("B")), hdrs
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        data: Any,
+        headers: Dict[str, str],
+        timeout_s: float,
+        timing: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        if self._pool is not None:
+            return self._request_pooled(method, path, data, headers, timeout_s, timing)
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        t0 = time.perf_counter()
         try:
-            with urllib.request.urlopen(req, timeout=float(timeout_s)) as resp:
+            with urllib.request.urlopen(req, timeout=timeout_s) as resp:
                 raw = resp.read().decode("utf-8", errors="replace")
+                if timing is not None:
+                    t1 = time.perf_counter()
+                    timing["wait"] = t1 - t0
+                    timing["server"] = parse_server_timing(resp.headers.get("Server-Timing"))
+                    j = json.loads(raw) if raw else {}
+                    timing["parse"] = time.perf_counter() - t1
+                    return {"ok": True, "status": resp.status, "json": j}
                 return {"ok": True, "status": resp.status, "json": json.loads(raw) if raw else {}}
         except urllib.error.HTTPError as ex:
             raw = ex.read().decode("utf-8", errors="replace")
+            if timing is not None:
+                timing["wait"] = time.perf_counter() - t0
+                timing["server"] = parse_server_timing(ex.headers.get("Server-Timing"))
             try:
                 j = json.loads(raw) if raw else {}
             except Exception:
@@ -54,14 +349,102 @@ class MethingsClient:
         except Exception as ex:
             return {"ok": False, "status": 0, "error": str(ex)}
 
+    def _encode_request(self, body: Optional[Dict[str, Any]]) -> Tuple[Optional[bytes], Dict[str, str]]:
+        data = None
+        headers = {"Accept": "application/json"}
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json; charset=utf-8"
+        if self.identity:
+            # methings-only.
+            headers["X-Methings-Identity"] = self.identity
+        return data, headers
+
+    def _request_pooled(
+        self,
+        method: str,
+        path: str,
+        data: Any,
+        headers: Dict[str, str],
+        timeout_s: float,
+        timing: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        pool = self._pool
+        assert pool is not None
+        try:
+            for attempt in range(2):
+                conn, reused = pool.acquire(timeout_s)
+                sent = False
+                try:
+                    if timing is not None:
+                        t0 = time.perf_counter()
+                        if conn.sock is None:
+                            conn.connect()
+                        t1 = time.perf_counter()
+                        timing["connect"] = timing.get("connect", 0.0) + (t1 - t0)
+                    conn.request(method, self._path_prefix + path, body=data, headers=headers)
+                    sent = True
+                    resp = conn.getresponse()
+                    raw_bytes = resp.read()
+                    if timing is not None:
+                        timing["wait"] = time.perf_counter() - t1
+                        timing["server"] = parse_server_timing(resp.getheader("Server-Timing"))
+                except _STALE_ERRORS:
+                    pool.release(conn, reusable=False)
+                    if reused and attempt == 0 and (not sent or method in _RETRY_METHODS):
+                        continue
+                    raise
+                except BaseException:
+                    pool.release(conn, reusable=False)
+                    raise
+                pool.release(conn, reusable=not resp.will_close)
+                break
+        except Exception as ex:
+            return {"ok": False, "status": 0, "error": str(ex)}
+        if timing is not None:
+            t0 = time.perf_counter()
+            r = _json_result(resp.status, raw_bytes)
+            timing["parse"] = time.perf_counter() - t0
+            return r
+        return _json_result(resp.status, raw_bytes)
+
     # -------- device_api convenience --------
-    def device_api(self, action: str, payload: Dict[str, Any], *, detail: str = "", timeout_s: Optional[float] = None) -> Dict[str, Any]:
-        args: Dict[str, Any] = {"action": action, "payload": payload}
-        if detail:
-            args["detail"] = detail
-        if timeout_s is not None:
-            args["timeout_s"] = float(timeout_s)
-        return self.request_json("POST", "/tools/device_api/invoke", {"args": args}, timeout_s=60.0)
+    def device_api(
+        self,
+        action: str,
+        payload: Dict[str, Any],
+        *,
+        detail: str = "",
+        timeout_s: Optional[float] = None,
+        http_timeout_s: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Invoke one device_api action; `http_timeout_s` overrides the 60 s HTTP wait for long-running actions."""
+        body = _device_api_body(action, payload, detail, timeout_s)
+        wait_s = _DEVICE_API_HTTP_TIMEOUT_S if http_timeout_s is None else float(http_timeout_s)
+        if self.cache is not None:
+            return self.cache.call(action, payload, lambda: self.request_json("POST", "/tools/device_api/invoke", body, timeout_s=wait_s))
+        return self.request_json("POST", "/tools/device_api/invoke", body, timeout_s=wait_s)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Counters of the device_api cache (hits, misses, shared, hit_rate, ...); {} when disabled."""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def batch(self, *, timeout_s: float = 60.0) -> "DeviceApiBatch":
+        """
+        Queue device_api calls and send them in one round-trip (POST /tools/device_api/batch).
+
+            with k.batch() as b:
+                usb = b.usb_list()
+                models = b.mcu_models()
+                cams = b.device_api("camera.list", {})
+            usb.result, models.result, cams.result
+
+        Inside the block the helpers return BatchCall placeholders; each `.result` has the same
+        shape as the corresponding `device_api()` return value, so one failed action does not
+        affect the others. Actions run in order on the server. If the server has no batch route,
+        the calls are sent one by one over the kept-alive connection instead.
+        """
+        return DeviceApiBatch(self, timeout_s=timeout_s)
 
     # -------- high-level helpers --------
     def camera_capture(self, *, lens: str = "back", path: str = "captures/latest.jpg") -> Dict[str, Any]:
@@ -118,6 +501,8 @@ class MethingsClient:
         interface_id: Optional[int] = None,
         in_endpoint_address: Optional[int] = None,
         out_endpoint_address: Optional[int] = None,
+        compress: bool = False,
+        skip_unchanged: bool = False,
     ) -> Dict[str, Any]:
         payload: Dict[str, Any] = {
             "model": str(model).strip().lower(),
@@ -138,6 +523,10 @@ class MethingsClient:
             payload["in_endpoint_address"] = int(in_endpoint_address)
         if out_endpoint_address is not None:
             payload["out_endpoint_address"] = int(out_endpoint_address)
+        if compress:
+            payload["compress"] = True
+        if skip_unchanged:
+            payload["skip_unchanged"] = True
         return self.device_api("mcu.flash", payload, detail=f"MCU flash ({payload['model']})")
 
     def mcu_reset(
@@ -180,6 +569,42 @@ class MethingsClient:
         }
         return self.device_api("mcu.serial_monitor", payload, detail=f"MCU serial monitor ({payload['model']})")
 
+    def serial_exchange_script(
+        self,
+        *,
+        serial_handle: str,
+        commands: list,
+        line_ending: str = "",
+        expect: Optional[str] = None,
+        error: Optional[str] = None,
+        timeout_ms: int = 5000,
+        idle_timeout_ms: int = 500,
+        stop_on_error: bool = True,
+        strip_echo: bool = True,
+        pipeline_depth: int = 1,
+        total_timeout_ms: int = 120000,
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "serial_handle": str(serial_handle).strip(),
+            "commands": list(commands),
+            "line_ending": str(line_ending),
+            "timeout_ms": int(timeout_ms),
+            "idle_timeout_ms": int(idle_timeout_ms),
+            "stop_on_error": bool(stop_on_error),
+            "strip_echo": bool(strip_echo),
+            "pipeline_depth": int(pipeline_depth),
+            "total_timeout_ms": int(total_timeout_ms),
+        }
+        if expect is not None:
+            payload["expect"] = str(expect)
+        if error is not None:
+            payload["error"] = str(error)
+        # The whole script runs in one call, so the HTTP wait follows total_timeout_ms.
+        wait_s = max(_DEVICE_API_HTTP_TIMEOUT_S, total_timeout_ms / 1000.0 + 10.0)
+        return self.device_api(
+            "serial.exchange.script", payload, detail="Serial exchange script", timeout_s=wait_s, http_timeout_s=wait_s
+        )
+
     def mcu_micropython_exec(
         self,
         *,
@@ -262,6 +687,55 @@ class MethingsClient:
             payload["handle"] = str(handle).strip()
         return self.device_api("mcu.micropython.soft_reset", payload, detail="MCU MicroPython soft reset")
 
+    def mcu_micropython_session_open(
+        self,
+        *,
+        model: str = "esp32",
+        serial_handle: str = "",
+        handle: str = "",
+        port_index: int = 0,
+        baud_rate: int = 115200,
+        raw_paste: bool = True,
+        idle_timeout_ms: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "model": str(model).strip().lower(),
+            "port_index": int(port_index),
+            "baud_rate": int(baud_rate),
+            "raw_paste": bool(raw_paste),
+        }
+        if idle_timeout_ms is not None:
+            payload["idle_timeout_ms"] = int(idle_timeout_ms)
+        if serial_handle:
+            payload["serial_handle"] = str(serial_handle).strip()
+        if handle:
+            payload["handle"] = str(handle).strip()
+        return self.device_api("mcu.micropython.session.open", payload, detail="MCU MicroPython session open")
+
+    def mcu_micropython_session_exec(
+        self,
+        *,
+        session_id: str,
+        code: str = "",
+        snippets: Optional[List[str]] = None,
+        stop_on_error: bool = True,
+        timeout_ms: int = 10000,
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "session_id": str(session_id).strip(),
+            "stop_on_error": bool(stop_on_error),
+            "timeout_ms": int(timeout_ms),
+        }
+        if snippets is not None:
+            payload["snippets"] = [str(c) for c in snippets]
+        else:
+            payload["code"] = str(code)
+        return self.device_api("mcu.micropython.session.exec", payload, detail="MCU MicroPython session exec")
+
+    def mcu_micropython_session_close(self, *, session_id: str) -> Dict[str, Any]:
+        payload = {"session_id": str(session_id).strip()}
+        return self.device_api("mcu.micropython.session.close", payload, detail="MCU MicroPython session close")
+
     def stt_record(self, *, locale: str = "", partial: bool = True, max_results: int = 5) -> Dict[str, Any]:
         payload: Dict[str, Any] = {}
         if locale:
@@ -270,6 +744,51 @@ class MethingsClient:
         payload["max_results"] = int(max_results)
         return self.device_api("stt.record", payload, detail="STT one-shot record")
 
+    def vision_put_frame(
+        self,
+        buffer: Any,
+        *,
+        width: int,
+        height: int,
+        frame_id: str = "",
+        permission_id: str = "",
+        timeout_s: float = 20.0,
+    ) -> Dict[str, Any]:
+        """
+        Store a raw RGBA8888 frame (`width * height * 4` bytes) and return its `frame_id`.
+
+        Same result as the `vision.frame.put` action, but the pixels go out as the request body
+        (POST /vision/frame/put, application/octet-stream) straight from `buffer` instead of
+        being base64-encoded into JSON. Passing `frame_id` replaces that frame in place.
+        """
+        headers = _vision_headers(width, height, permission_id)
+        if frame_id:
+            headers["X-Methings-Frame-Id"] = str(frame_id).strip()
+        return self.request_bytes("POST", "/vision/frame/put", buffer, headers=headers, timeout_s=timeout_s)
+
+    def vision_run_frame(
+        self,
+        buffer: Any,
+        *,
+        model: str,
+        width: int,
+        height: int,
+        normalize: bool = True,
+        mean: Optional[List[float]] = None,
+        std: Optional[List[float]] = None,
+        permission_id: str = "",
+        timeout_s: float = 75.0,
+    ) -> Dict[str, Any]:
+        """Run `model` on a raw RGBA8888 frame sent as binary (the frame is not stored)."""
+        headers = _vision_headers(width, height, permission_id)
+        headers["X-Methings-Model"] = str(model).strip()
+        headers["X-Methings-Normalize"] = "true" if normalize else "false"
+        if mean is not None:
+            headers["X-Methings-Mean"] = ",".join(str(float(x)) for x in mean)
+        if std is not None:
+            headers["X-Methings-Std"] = ",".join(str(float(x)) for x in std)
+        return self.request_bytes("POST", "/vision/run", buffer, headers=headers, timeout_s=timeout_s)
+
     def uvc_mjpeg_capture(
         self,
         *,
@@ -295,3 +814,194 @@ class MethingsClient:
             detail="UVC MJPEG capture",
             timeout_s=max(20.0, timeout_ms / 1000.0 + 10.0),
         )
+
+    def uvc_mjpeg_session_start(
+        self,
+        *,
+        handle: str,
+        width: int = 1280,
+        height: int = 720,
+        fps: int = 30,
+        max_frame_bytes: int = 0,
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "handle": handle,
+            "width": int(width),
+            "height": int(height),
+            "fps": int(fps),
+        }
+        if max_frame_bytes > 0:
+            payload["max_frame_bytes"] = int(max_frame_bytes)
+        return self.device_api("uvc.mjpeg.session.start", payload, detail="UVC MJPEG session start")
+
+    def uvc_mjpeg_session_stop(self, *, session_id: str) -> Dict[str, Any]:
+        return self.device_api(
+            "uvc.mjpeg.session.stop", {"session_id": str(session_id).strip()}, detail="UVC MJPEG session stop"
+        )
+
+
+class BatchCall:
+    """Placeholder for one queued batch action; `result` is filled in when the batch is sent."""
+
+    __slots__ = ("action", "payload", "detail", "timeout_s", "http_timeout_s", "_result")
+
+    def __init__(
+        self,
+        action: str,
+        payload: Dict[str, Any],
+        detail: str,
+        timeout_s: Optional[float],
+        http_timeout_s: Optional[float] = None,
+    ):
+        self.action = action
+        self.payload = payload
+        self.detail = detail
+        self.timeout_s = timeout_s
+        self.http_timeout_s = http_timeout_s
+        self._result: Optional[Dict[str, Any]] = None
+
+    @property
+    def done(self) -> bool:
+        return self._result is not None
+
+    @property
+    def result(self) -> Dict[str, Any]:
+        if self._result is None:
+            raise RuntimeError(f"batch not sent yet ({self.action})")
+        return self._result
+
+    def __repr__(self) -> str:
+        return f"BatchCall({self.action!r}, done={self.done})"
+
+
+class DeviceApiBatch(MethingsClient):
+    """
+    Collects device_api calls for MethingsClient.batch().
+
+    Subclasses MethingsClient so every high-level helper can be queued; `device_api` records the
+    call and returns a BatchCall. Other attributes (base_url, identity, cache, the connection
+    pool) are the parent client's. Raw requests (`request_json` / `request_bytes`, e.g. the
+    binary vision helpers) cannot be queued and raise instead of running ahead of the queued
+    calls. Works as `with` for MethingsClient and `async with` for AsyncMethingsClient.
+    """
+
+    def __init__(self, client: MethingsClient, *, timeout_s: float = 60.0):
+        # No MethingsClient.__init__: the batch sends through the parent's pooled connection.
+        self._client = client
+        self._timeout_s = float(timeout_s)
+        self.calls: List[BatchCall] = []
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_client":
+            raise AttributeError(name)
+        return getattr(self._client, name)
+
+    def device_api(  # type: ignore[override]
+        self,
+        action: str,
+        payload: Dict[str, Any],
+        *,
+        detail: str = "",
+        timeout_s: Optional[float] = None,
+        http_timeout_s: Optional[float] = None,
+    ) -> BatchCall:
+        call = BatchCall(action, payload, detail, timeout_s, http_timeout_s)
+        self.calls.append(call)
+        return call
+
+    def request_json(self, method: str, path: str, body: Optional[Dict[str, Any]] = None, *, timeout_s: float = 20.0) -> Dict[str, Any]:
+        raise RuntimeError(f"{method} {path} cannot be batched; call it on the client outside batch()")
+
+    def request_bytes(self, method: str, path: str, data: Any, *, headers: Optional[Dict[str, str]] = None, timeout_s: float = 20.0) -> Dict[str, Any]:
+        raise RuntimeError(f"{method} {path} cannot be batched; call it on the client outside batch()")
+
+    def close(self) -> None:
+        pass
+
+    def batch(self, *, timeout_s: float = 60.0) -> "DeviceApiBatch":
+        return self
+
+    @staticmethod
+    def _request_body(calls: List[BatchCall]) -> Dict[str, Any]:
+        return {"actions": [_device_api_body(c.action, c.payload, c.detail, c.timeout_s)["args"] for c in calls]}
+
+    def _wait_s(self, calls: List[BatchCall]) -> float:
+        # The server runs the actions one after another, so long-running ones extend the wait.
+        return self._timeout_s + sum(c.http_timeout_s for c in calls if c.http_timeout_s is not None)
+
+    @staticmethod
+    def _apply(calls: List[BatchCall], resp: Dict[str, Any]) -> bool:
+        """Fill results from a batch response. Returns False when the server lacks the route."""
+        if resp.get("status") in (404, 405):
+            return False
+        if not resp.get("ok"):
+            for c in calls:
+                c._result = dict(resp)
+            return True
+        items = (resp.get("json") or {}).get("results") or []
+        by_index = {int(it.get("index", -1)): it for it in items if isinstance(it, dict)}
+        for i, c in enumerate(calls):
+            it = by_index.get(i)
+            if it is None:
+                c._result = {"ok": False, "status": 0, "error": "missing_batch_result"}
+                continue
+            status = int(it.get("http_status") or 0)
+            c._result = {"ok": 200 <= status < 300, "status": status, "json": it.get("result") or {}}
+        return True
+
+    def flush(self) -> List[BatchCall]:
+        """Send all queued calls (idempotent for already sent calls)."""
+        pending = [c for c in self.calls if not c.done]
+        if not pending:
+            return self.calls
+        client = self._client
+        if client._batch_supported:
+            resp = client.request_json("POST", "/tools/device_api/batch", self._request_body(pending), timeout_s=self._wait_s(pending))
+            if self._apply(pending, resp):
+                self._invalidate(pending)
+                return self.calls
+            client._batch_supported = False
+        for c in pending:
+            c._result = client.device_api(
+                c.action, c.payload, detail=c.detail, timeout_s=c.timeout_s, http_timeout_s=c.http_timeout_s
+            )
+        return self.calls
+
+    def _invalidate(self, calls: List[BatchCall]) -> None:
+        # Batched actions bypass the client cache, but their side effects must still clear it.
+        cache = self._client.cache
+        if cache is not None:
+            for c in calls:
+                cache.invalidate_for(c.action)
+
+    async def aflush(self) -> List[BatchCall]:
+        """Async counterpart of flush() for AsyncMethingsClient."""
+        pending = [c for c in self.calls if not c.done]
+        if not pending:
+            return self.calls
+        client = self._client
+        if client._batch_supported:
+            resp = await client.request_json("POST", "/tools/device_api/batch", self._request_body(pending), timeout_s=self._wait_s(pending))  # type: ignore[misc]
+            if self._apply(pending, resp):
+                self._invalidate(pending)
+                return self.calls
+            client._batch_supported = False
+        for c in pending:
+            c._result = await client.device_api(  # type: ignore[misc]
+                c.action, c.payload, detail=c.detail, timeout_s=c.timeout_s, http_timeout_s=c.http_timeout_s
+            )
+        return self.calls
+
+    def __enter__(self) -> "DeviceApiBatch":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            self.flush()
+
+    async def __aenter__(self) -> "DeviceApiBatch":
+        return self
+
+    async def __aexit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            await self.aflush()
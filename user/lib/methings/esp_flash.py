@@ -0,0 +1,309 @@
+"""
+Client-side ESP flash image optimizer for `mcu.flash` (see user/docs/api/mcu.md).
+
+`mcu.flash` writes every segment byte for byte, including the large 0xFF runs of padded ESP
+images, and rewrites regions that already hold the same data. optimize() turns a segment list
+(`mcu.flash.plan` output or `[{path, offset}]`) into sector-aligned slices of the same files:
+
+- ESP app/bootloader images (magic 0xE9) are parsed; 0xFF padding after the image's own end
+  (header, segments, checksum and appended SHA-256) is dropped
+- erased runs of whole 4 KiB sectors become separate slices, data is cut into `region_bytes`
+  slices, so an unchanged or already-erased slice can be skipped on its own
+- with `compress`, slices go through the ROM loader's FLASH_DEFL_* (zlib) commands; with
+  `skip_unchanged`, the device asks the target for each slice's MD5 first and skips matches
+
+flash() runs mcu.flash.plan (optional), optimize() and mcu.flash in one call and reports
+bytes on the wire next to the raw path's:
+
+    k = MethingsClient()
+    r = flash(k, handle=usb_handle, plan_path="build/flasher_args.json")
+    print(r["wire_bytes"], r["raw_wire_bytes"], r["regions_skipped"], r["elapsed_s"])
+"""
+import hashlib
+import os
+import posixpath
+import struct
+import tempfile
+import time
+import zlib
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Union
+
+from .client import MethingsClient
+from .files import download_file
+
+
+ESP_IMAGE_MAGIC = 0xE9
+SECTOR_BYTES = 0x1000
+# ROM loader FLASH_DATA / FLASH_DEFL_DATA block size (see EspSerialSession).
+FLASH_BLOCK_BYTES = 0x400
+DEFAULT_REGION_BYTES = 0x10000
+
+# magic, segment count, SPI mode, size/freq, entry; then the 16-byte extended header.
+_IMAGE_HEADER = struct.Struct("<BBBBI")
+_EXTENDED_HEADER_BYTES = 16
+_SEGMENT_HEADER = struct.Struct("<II")
+_MAX_SEGMENTS = 16
+# 8-byte command header + 16-byte data header + 2 SLIP delimiters.
+_FRAME_OVERHEAD = 8 + 16 + 2
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class FlashImageError(ValueError):
+    pass
+
+
+class EspImage(NamedTuple):
+    """Parsed ESP image header. `length` covers segments, checksum and the appended SHA-256."""
+
+    entry: int
+    flash_mode: int
+    flash_size_freq: int
+    chip_id: int
+    segments: List[Dict[str, int]]
+    hash_appended: bool
+    length: int
+
+
+class Region(NamedTuple):
+    """One sector-aligned slice of a segment file. `erased` slices contain only 0xFF."""
+
+    flash_offset: int
+    file_offset: int
+    length: int
+    erased: bool
+
+
+def parse_image(data: Buffer) -> EspImage:
+    """Parse an ESP32-family app or bootloader image. Raises FlashImageError if `data` is not one."""
+    mv = memoryview(data)
+    header_len = _IMAGE_HEADER.size + _EXTENDED_HEADER_BYTES
+    if len(mv) < header_len:
+        raise FlashImageError("image_truncated_header")
+    magic, count, mode, size_freq, entry = _IMAGE_HEADER.unpack_from(mv, 0)
+    if magic != ESP_IMAGE_MAGIC:
+        raise FlashImageError("image_bad_magic")
+    if count == 0 or count > _MAX_SEGMENTS:
+        raise FlashImageError("image_bad_segment_count")
+    chip_id = struct.unpack_from("<H", mv, 12)[0]
+    hash_appended = mv[header_len - 1] == 1
+    pos = header_len
+    segments = []
+    for _ in range(count):
+        if pos + _SEGMENT_HEADER.size > len(mv):
+            raise FlashImageError("image_truncated_segment")
+        load_addr, length = _SEGMENT_HEADER.unpack_from(mv, pos)
+        pos += _SEGMENT_HEADER.size
+        if pos + length > len(mv):
+            raise FlashImageError("image_truncated_segment")
+        segments.append({"load_addr": load_addr, "file_offset": pos, "length": length})
+        pos += length
+    # Zero padding up to a 16-byte boundary, the last byte of which is the checksum.
+    end = pos + 16 - pos % 16
+    if hash_appended:
+        end += 32
+    if end > len(mv):
+        raise FlashImageError("image_truncated_checksum")
+    return EspImage(entry, mode, size_freq, chip_id, segments, hash_appended, end)
+
+
+def _is_erased(mv: memoryview) -> bool:
+    return mv.tobytes().strip(b"\xff") == b""
+
+
+def split_regions(
+    data: Buffer,
+    flash_offset: int,
+    *,
+    end: Optional[int] = None,
+    region_bytes: int = DEFAULT_REGION_BYTES,
+) -> List[Region]:
+    """
+    Cut `data[:end]` (written at `flash_offset`) into slices on 4 KiB flash sector boundaries:
+    runs of fully erased sectors become one `erased` slice, data is cut every `region_bytes`.
+    Slices never share a sector, so skipping one cannot disturb its neighbours.
+    """
+    mv = memoryview(data)
+    end = len(mv) if end is None else min(end, len(mv))
+    if end <= 0:
+        return []
+    if flash_offset % SECTOR_BYTES:
+        return [Region(flash_offset, 0, end, _is_erased(mv[:end]))]
+    region_bytes = max(SECTOR_BYTES, region_bytes // SECTOR_BYTES * SECTOR_BYTES)
+    regions: List[Region] = []
+    start, start_erased = 0, _is_erased(mv[:min(SECTOR_BYTES, end)])
+    pos = 0
+    while pos < end:
+        nxt = min(pos + SECTOR_BYTES, end)
+        erased = _is_erased(mv[pos:nxt])
+        if erased != start_erased or (not erased and pos - start >= region_bytes):
+            regions.append(Region(flash_offset + start, start, pos - start, start_erased))
+            start, start_erased = pos, erased
+        pos = nxt
+    regions.append(Region(flash_offset + start, start, end - start, start_erased))
+    return regions
+
+
+def _slip_len(payload: Buffer) -> int:
+    b = bytes(payload)
+    return len(b) + b.count(b"\xc0") + b.count(b"\xdb")
+
+
+def raw_wire_bytes(data: Buffer) -> int:
+    """Bytes mcu.flash sends for `data` without compression (FLASH_BEGIN + 0xFF-padded blocks)."""
+    mv = memoryview(data)
+    total = _FRAME_OVERHEAD
+    for pos in range(0, len(mv), FLASH_BLOCK_BYTES):
+        block = mv[pos:pos + FLASH_BLOCK_BYTES].tobytes()
+        block += b"\xff" * (FLASH_BLOCK_BYTES - len(block))
+        total += _FRAME_OVERHEAD + _slip_len(block)
+    return total
+
+
+def deflated_wire_bytes(compressed: Buffer) -> int:
+    """Bytes mcu.flash sends for an already zlib-compressed slice (FLASH_DEFL_BEGIN + blocks)."""
+    mv = memoryview(compressed)
+    total = _FRAME_OVERHEAD
+    for pos in range(0, len(mv), FLASH_BLOCK_BYTES):
+        total += _FRAME_OVERHEAD + _slip_len(mv[pos:pos + FLASH_BLOCK_BYTES])
+    return total
+
+
+def _offset(value: Any) -> int:
+    # mcu.flash accepts "0x10000" as well as 65536.
+    return int(value, 0) if isinstance(value, str) else int(value)
+
+
+def optimize(
+    segments: Sequence[Mapping[str, Any]],
+    images: Mapping[str, Buffer],
+    *,
+    compress: bool = True,
+    trim_padding: bool = True,
+    region_bytes: int = DEFAULT_REGION_BYTES,
+) -> Dict[str, Any]:
+    """
+    Turn `[{path, offset}]` into mcu.flash segments `[{path, offset, file_offset, length}]`.
+
+    `images` maps each path to its bytes. Returns `segments` (for mcu.flash), `regions` (with
+    `md5`, `erased` and `wire_bytes` per slice), `raw_wire_bytes` for flashing the files as-is,
+    `wire_bytes` for writing every slice (before any MD5 skip) and `dropped_bytes` of padding.
+    """
+    out: List[Dict[str, Any]] = []
+    regions: List[Dict[str, Any]] = []
+    raw_total = planned = dropped = 0
+    for seg in segments:
+        path = str(seg["path"])
+        offset = _offset(seg.get("offset", 0))
+        data = memoryview(images[path])
+        raw_total += raw_wire_bytes(data)
+        end = len(data)
+        image: Optional[EspImage] = None
+        if trim_padding and len(data) and data[0] == ESP_IMAGE_MAGIC:
+            try:
+                image = parse_image(data)
+            except FlashImageError:
+                image = None
+            if image is not None and _is_erased(data[image.length:]):
+                end = image.length
+        dropped += len(data) - end
+        for r in split_regions(data, offset, end=end, region_bytes=region_bytes):
+            piece = data[r.file_offset:r.file_offset + r.length]
+            wire = deflated_wire_bytes(zlib.compress(piece, 9)) if compress else raw_wire_bytes(piece)
+            planned += wire
+            out.append({"path": path, "offset": r.flash_offset, "file_offset": r.file_offset, "length": r.length})
+            regions.append({
+                "path": path, "offset": r.flash_offset, "file_offset": r.file_offset, "length": r.length,
+                "erased": r.erased, "md5": hashlib.md5(piece).hexdigest(), "wire_bytes": wire,
+                "image": image is not None,
+            })
+    return {
+        "segments": out,
+        "regions": regions,
+        "raw_wire_bytes": raw_total,
+        "wire_bytes": planned,
+        "dropped_bytes": dropped,
+    }
+
+
+def _load_images(
+    client: MethingsClient, paths: Sequence[str], local_root: Optional[str]
+) -> Dict[str, bytes]:
+    images: Dict[str, bytes] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, path in enumerate(dict.fromkeys(paths)):
+            if local_root is not None:
+                src = os.path.join(local_root, path)
+            else:
+                src = os.path.join(tmp, str(i))
+                download_file(client, path, src, resume=False)
+            with open(src, "rb") as f:
+                images[path] = f.read()
+    return images
+
+
+def flash(
+    client: MethingsClient,
+    *,
+    handle: str,
+    model: str = "esp32",
+    plan_path: str = "",
+    segments: Optional[Sequence[Mapping[str, Any]]] = None,
+    image_path: str = "",
+    offset: int = 0x10000,
+    images: Optional[Mapping[str, Buffer]] = None,
+    local_root: Optional[str] = None,
+    compress: bool = True,
+    skip_unchanged: bool = True,
+    trim_padding: bool = True,
+    region_bytes: int = DEFAULT_REGION_BYTES,
+    reboot: bool = True,
+    auto_enter_bootloader: bool = True,
+    timeout_ms: int = 2000,
+) -> Dict[str, Any]:
+    """
+    Flash `plan_path` (flasher_args.json), `segments` or `image_path` through optimize().
+
+    Segment paths are relative to the user root, as for mcu.flash; their bytes come from
+    `images`, from `local_root` on this machine, or are downloaded from the device. Returns the
+    mcu.flash response plus `wire_bytes` (as counted by the device), `raw_wire_bytes`,
+    `regions_written`, `regions_skipped`, `bytes_skipped`, `dropped_bytes` and `elapsed_s`.
+    """
+    t0 = time.perf_counter()
+    if plan_path:
+        plan = client.mcu_flash_plan(plan_path=plan_path, model=model)
+        body = plan.get("json") or {}
+        if not plan.get("ok") or body.get("status") == "error":
+            return dict(plan, ok=False)
+        if body.get("missing"):
+            return {"ok": False, "error": "plan_missing_files", "missing": body["missing"]}
+        # Plan paths are relative to the plan file; mcu.flash resolves them from the user root.
+        base = posixpath.dirname(plan_path)
+        segments = [{"path": posixpath.join(base, s["path"]), "offset": s["offset"]} for s in body.get("segments") or []]
+    elif segments is None:
+        if not image_path:
+            raise ValueError("plan_path, segments or image_path is required")
+        segments = [{"path": image_path, "offset": offset}]
+    if images is None:
+        images = _load_images(client, [str(s["path"]) for s in segments], local_root)
+    plan_opt = optimize(segments, images, compress=compress, trim_padding=trim_padding, region_bytes=region_bytes)
+
+    r = client.mcu_flash(
+        model=model, handle=handle, segments=plan_opt["segments"], reboot=reboot,
+        auto_enter_bootloader=auto_enter_bootloader, timeout_ms=timeout_ms,
+        compress=compress, skip_unchanged=skip_unchanged,
+    )
+    body = r.get("json") or {}
+    written = [s for s in body.get("segments") or [] if not s.get("skipped")]
+    return dict(
+        r,
+        ok=bool(r.get("ok")) and body.get("status") == "ok",
+        wire_bytes=int(body.get("bytes_on_wire") or 0),
+        raw_wire_bytes=plan_opt["raw_wire_bytes"],
+        regions=plan_opt["regions"],
+        regions_written=len(written),
+        regions_skipped=int(body.get("segments_skipped") or 0),
+        bytes_skipped=int(body.get("bytes_skipped") or 0),
+        dropped_bytes=plan_opt["dropped_bytes"],
+        elapsed_s=time.perf_counter() - t0,
+    )
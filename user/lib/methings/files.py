@@ -0,0 +1,319 @@
+"""
+Streaming, resumable file transfer for the user root (`/user/write/<path>`, `/user/file/<path>`).
+
+Uploads go out as `application/octet-stream` in segments of `segment_bytes`, each written by the
+server at `?offset=`; downloads use `Range: bytes=N-` into `<local>.part`, renamed once verified.
+Data is read and hashed in fixed-size blocks, so memory stays constant regardless of file size.
+Interrupted transfers pick up where the remote (upload, once its SHA-256 matches the local
+prefix) or `.part` file (download) left off, and the result is checked against SHA-256
+(`/user/file/info/<path>?sha256=1`).
+
+    k = MethingsClient()
+    upload_file(k, "recordings/run1.wav", "uploads/run1.wav")
+    download_file(k, "models/model.tflite", "/tmp/model.tflite")
+"""
+import hashlib
+import http.client
+import json
+import mmap
+import os
+import urllib.parse
+from typing import Any, BinaryIO, Callable, Dict, Optional, Union
+
+from .client import MethingsClient, _KeepAliveConnection, _STALE_ERRORS
+
+
+DEFAULT_BLOCK_BYTES = 256 * 1024
+DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+
+# Transient failures worth resuming after (connection drops, timeouts).
+_RETRY_ERRORS = _STALE_ERRORS + (OSError, http.client.IncompleteRead)
+
+Progress = Callable[[int, int], None]
+
+
+class FileTransferError(RuntimeError):
+    def __init__(self, message: str, response: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.response = response or {}
+
+
+class _Segment:
+    """File-like view of the next `length` bytes of `f`, hashed as http.client reads them."""
+
+    def __init__(self, f: Any, length: int, digest: Any, on_read: Optional[Callable[[int], None]]):
+        self.f = f
+        self.length = length
+        self.left = length
+        self.digest = digest
+        self.on_read = on_read
+
+    def read(self, n: int = -1) -> bytes:
+        if self.left <= 0:
+            return b""
+        n = self.left if n is None or n < 0 else min(n, self.left)
+        data = self.f.read(n)
+        if not data:
+            raise FileTransferError("local file shrank during transfer")
+        self.left -= len(data)
+        self.digest.update(data)
+        if self.on_read is not None:
+            self.on_read(self.length - self.left)
+        return data
+
+
+class _Transfer:
+    def __init__(self, client: MethingsClient, timeout_s: float, block_bytes: int):
+        parts = urllib.parse.urlsplit(client.base_url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError("file transfer supports plain http:// base URLs only")
+        self.client = client
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.timeout_s = float(timeout_s)
+        self.block_bytes = int(block_bytes)
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def headers(self, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        h = {"Accept": "application/json"}
+        if self.client.identity:
+            h["X-Methings-Identity"] = self.client.identity
+        h.update(extra or {})
+        return h
+
+    def request(self, method: str, path: str, body: Any = None, headers: Optional[Dict[str, str]] = None) -> http.client.HTTPResponse:
+        if self.conn is None:
+            self.conn = _KeepAliveConnection(self.host, self.port, timeout=self.timeout_s, blocksize=self.block_bytes)
+        try:
+            self.conn.request(method, self.prefix + path, body=body, headers=self.headers(headers))
+            return self.conn.getresponse()
+        except BaseException:
+            self.close()
+            raise
+
+    def json(self, resp: http.client.HTTPResponse) -> Dict[str, Any]:
+        raw = resp.read()
+        if resp.will_close:
+            self.close()
+        try:
+            return json.loads(raw.decode("utf-8")) if raw else {}
+        except ValueError:
+            return {"raw": raw[:200].decode("utf-8", "replace")}
+
+    def info(self, remote: str, *, sha256: bool = False) -> Optional[Dict[str, Any]]:
+        """`/user/file/info/<path>` JSON, or None when the remote file does not exist."""
+        resp = self.request("GET", f"/user/file/info/{_quote(remote)}" + ("?sha256=1" if sha256 else ""))
+        out = self.json(resp)
+        if resp.status == 404:
+            return None
+        if resp.status != 200:
+            raise FileTransferError(f"file info failed ({resp.status}): {out}", out)
+        return out
+
+    def close(self) -> None:
+        conn, self.conn = self.conn, None
+        if conn is not None:
+            conn.close()
+
+
+def _quote(remote: str) -> str:
+    return urllib.parse.quote(remote.strip().lstrip("/"), safe="/")
+
+
+def _hash_prefix(f: Any, length: int, block_bytes: int) -> Any:
+    """SHA-256 state after the first `length` bytes of `f` (read in blocks; works for mmap)."""
+    digest = hashlib.sha256()
+    f.seek(0)
+    left = length
+    while left > 0:
+        data = f.read(min(block_bytes, left))
+        if not data:
+            raise FileTransferError("local file shrank during transfer")
+        digest.update(data)
+        left -= len(data)
+    return digest
+
+
+def upload_file(
+    client: MethingsClient,
+    source: Union[str, os.PathLike, BinaryIO, mmap.mmap],
+    remote: str,
+    *,
+    resume: bool = True,
+    verify: bool = True,
+    segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+    block_bytes: int = DEFAULT_BLOCK_BYTES,
+    retries: int = 3,
+    timeout_s: float = 60.0,
+    progress: Optional[Progress] = None,
+) -> Dict[str, Any]:
+    """
+    Stream `source` (a path, a binary file object or an mmap) to `remote` under the user root.
+
+    With `resume`, an existing remote file no larger than the source is continued only if its
+    SHA-256 equals that of the same-length local prefix; any other remote file is overwritten
+    from zero. A final SHA-256 mismatch after a resumed upload restarts it from zero once.
+    Returns `{path, size, sha256, resumed_from}`.
+    """
+    own = isinstance(source, (str, os.PathLike))
+    f: Any = open(source, "rb") if own else source
+    try:
+        f.seek(0, os.SEEK_END)
+        total = f.tell()
+        t = _Transfer(client, timeout_s, block_bytes)
+        try:
+            start = 0
+            prefix = None
+            if resume:
+                info = t.info(remote, sha256=True)
+                remote_size = int(info.get("size") or 0) if info else 0
+                if 0 < remote_size <= total and info and info.get("sha256"):
+                    # Only a byte-identical prefix is an earlier partial upload of this source.
+                    prefix = _hash_prefix(f, remote_size, t.block_bytes)
+                    if prefix.hexdigest() == info["sha256"]:
+                        start = remote_size
+                    else:
+                        prefix = None
+            result = _upload_from(t, f, total, remote, start, segment_bytes, retries, verify, progress, prefix)
+            if verify and result["sha256"] != result["remote_sha256"]:
+                if start == 0:
+                    raise FileTransferError("sha256 mismatch after upload", result)
+                # The remote file changed while it was being resumed: upload everything again.
+                result = _upload_from(t, f, total, remote, 0, segment_bytes, retries, verify, progress)
+                if result["sha256"] != result["remote_sha256"]:
+                    raise FileTransferError("sha256 mismatch after upload", result)
+            return {"path": result["path"], "size": total, "sha256": result["sha256"], "resumed_from": start}
+        finally:
+            t.close()
+    finally:
+        if own:
+            f.close()
+
+
+def _upload_from(
+    t: _Transfer,
+    f: Any,
+    total: int,
+    remote: str,
+    start: int,
+    segment_bytes: int,
+    retries: int,
+    verify: bool,
+    progress: Optional[Progress],
+    prefix: Any = None,
+) -> Dict[str, Any]:
+    sent = start
+    digest = prefix if prefix is not None else _hash_prefix(f, sent, t.block_bytes)
+    failures = 0
+    while True:
+        n = min(int(segment_bytes), total - sent)
+        last = sent + n >= total
+        f.seek(sent)
+        on_read = (lambda k, base=sent: progress(base + k, total)) if progress is not None else None
+        body = _Segment(f, n, digest.copy(), on_read)
+        query = f"offset={sent}" + ("&sha256=1" if last and verify else "")
+        try:
+            resp = t.request(
+                "POST",
+                f"/user/write/{_quote(remote)}?{query}",
+                body=body,
+                headers={"Content-Type": "application/octet-stream", "Content-Length": str(n)},
+            )
+            out = t.json(resp)
+        except _RETRY_ERRORS:
+            failures += 1
+            if failures > retries:
+                raise
+            # Continue from whatever the server actually stored.
+            info = t.info(remote)
+            out = {"size": int(info.get("size") or 0) if info else 0}
+            resp = None
+        if resp is None or resp.status == 409:
+            # Interrupted, or the remote size changed under us (409 offset_mismatch): resync.
+            stored = int(out.get("size") or 0)
+            if stored > total:
+                raise FileTransferError("remote file is larger than the source", out)
+            sent = stored
+            digest = _hash_prefix(f, sent, t.block_bytes)
+            continue
+        if resp.status != 200 or int(out.get("bytes_written") or 0) != n:
+            raise FileTransferError(f"upload failed ({resp.status}): {out}", out)
+        digest = body.digest
+        sent += n
+        if last:
+            out["sha256"], out["remote_sha256"] = digest.hexdigest(), str(out.get("sha256") or "")
+            out["path"] = out.get("path") or remote
+            return out
+
+
+def download_file(
+    client: MethingsClient,
+    remote: str,
+    dest: Union[str, os.PathLike],
+    *,
+    resume: bool = True,
+    verify: bool = True,
+    block_bytes: int = DEFAULT_BLOCK_BYTES,
+    retries: int = 3,
+    timeout_s: float = 60.0,
+    progress: Optional[Progress] = None,
+) -> Dict[str, Any]:
+    """
+    Stream `remote` to `dest` via `<dest>.part` (kept on failure and resumed with a Range request
+    next time). Returns `{path, size, sha256, resumed_from}`.
+    """
+    dest = os.fspath(dest)
+    part = dest + ".part"
+    t = _Transfer(client, timeout_s, block_bytes)
+    try:
+        info = t.info(remote, sha256=verify)
+        if info is None:
+            raise FileTransferError(f"remote file not found: {remote}")
+        total = int(info.get("size") or 0)
+        have = os.path.getsize(part) if resume and os.path.exists(part) else 0
+        if have > total:
+            have = 0
+        resumed_from = have
+        view = memoryview(bytearray(block_bytes))
+        failures = 0
+        with open(part, "r+b" if have else "wb") as f:
+            digest = _hash_prefix(f, have, block_bytes)
+            f.truncate(have)
+            f.seek(have)
+            while have < total:
+                try:
+                    resp = t.request("GET", f"/user/file/{_quote(remote)}", headers={"Range": f"bytes={have}-"})
+                    if resp.status not in (200, 206):
+                        raise FileTransferError(f"download failed ({resp.status}): {t.json(resp)}")
+                    if resp.status == 200 and have:
+                        # Server ignored the range: start over.
+                        f.seek(0)
+                        f.truncate(0)
+                        digest = hashlib.sha256()
+                        have = 0
+                    while True:
+                        n = resp.readinto(view)
+                        if not n:
+                            break
+                        f.write(view[:n])
+                        digest.update(view[:n])
+                        have += n
+                        if progress is not None:
+                            progress(have, total)
+                    if resp.will_close:
+                        t.close()
+                except _RETRY_ERRORS:
+                    t.close()
+                    failures += 1
+                    if failures > retries:
+                        raise
+                    f.flush()
+        sha = digest.hexdigest()
+        if verify and info.get("sha256") and sha != info["sha256"]:
+            os.remove(part)
+            raise FileTransferError("sha256 mismatch after download", {"expected": info["sha256"], "got": sha})
+        os.replace(part, dest)
+        return {"path": dest, "size": total, "sha256": sha, "resumed_from": resumed_from}
+    finally:
+        t.close()
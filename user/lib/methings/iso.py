@@ -0,0 +1,376 @@
+"""
+KISO isochronous blob parsing and UVC payload reassembly.
+
+`usb.stream.start(mode="iso_in")` (and `/usb/iso_transfer`) deliver raw KISO blobs produced by the
+native usbfs path (docs/usb_iso_transfer.md):
+
+    u32le magic "KISO" (0x4F53494B), u32le num_packets, u32le payload_len,
+    num_packets * (i32le status, i32le actual_length),
+    payload bytes of every packet with actual_length > 0, concatenated.
+
+parse_kiso() decodes all packet descriptors of a blob at once (memoryview cast / array, or NumPy
+when available). UvcFrameAssembler strips UVC payload headers, follows the FID/EOF bits and yields
+complete MJPEG/YUY2 frames. Payload bytes are copied exactly once, into a reusable frame buffer.
+With NumPy and blobs of at least 96 packets, feed_kiso() reads every UVC header of a blob with one
+gather, finds the packets that end a frame, toggle FID or carry an error, and copies the packets
+between them with one strided copy per group of equally sized packets (headers skipped); only the
+boundary packets go through Python. Smaller blobs (the default is 32 packets per URB), where the
+fixed NumPy cost does not pay off, and installs without NumPy use a Python loop with one slice copy
+per packet.
+"""
+import array
+import itertools
+import struct
+import sys
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as _np
+except ImportError:  # NumPy is optional; the array/memoryview path is used without it.
+    _np = None
+
+
+KISO_MAGIC = 0x4F53494B
+
+_KISO_HEADER = struct.Struct("<III")
+# Packets per blob from which the NumPy feed_kiso() path beats the per-packet loop (about 64-96 on
+# a desktop; its fixed cost is some 20 NumPy calls per blob).
+_NUMPY_MIN_PACKETS = 96
+_LITTLE = sys.byteorder == "little"
+
+# UVC payload header bmHeaderInfo bits.
+UVC_FID = 0x01
+UVC_EOF = 0x02
+UVC_PTS = 0x04
+UVC_SCR = 0x08
+UVC_STI = 0x20
+UVC_ERR = 0x40
+UVC_EOH = 0x80
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class KisoPackets(NamedTuple):
+    """Decoded KISO blob. `offsets[i]` is packet i's start in `blob`, or -1 when it carried no data."""
+
+    count: int
+    statuses: Sequence[int]
+    lengths: Sequence[int]
+    offsets: Sequence[int]
+    blob: memoryview
+
+
+class KisoError(ValueError):
+    pass
+
+
+def has_numpy() -> bool:
+    return _np is not None
+
+
+def parse_kiso(blob: Buffer, *, use_numpy: Optional[bool] = None) -> KisoPackets:
+    """
+    Decode every packet descriptor of a KISO blob in one pass.
+
+    Returns lists (or NumPy int arrays with `use_numpy`) of statuses, lengths and data offsets.
+    Raises KisoError on a bad magic or a truncated blob.
+    """
+    mv = blob if isinstance(blob, memoryview) else memoryview(blob)
+    if mv.ndim != 1 or mv.itemsize != 1:
+        mv = mv.cast("B")
+    if len(mv) < _KISO_HEADER.size:
+        raise KisoError("kiso_truncated_header")
+    magic, count, payload_len = _KISO_HEADER.unpack_from(mv, 0)
+    if magic != KISO_MAGIC:
+        raise KisoError("kiso_bad_magic")
+    meta_len = _KISO_HEADER.size + count * 8
+    if len(mv) < meta_len + payload_len:
+        raise KisoError("kiso_truncated_payload")
+    desc = mv[_KISO_HEADER.size:meta_len]
+
+    if use_numpy is None:
+        use_numpy = _np is not None
+    if use_numpy:
+        if _np is None:
+            raise RuntimeError("numpy is not installed")
+        pairs = _np.frombuffer(desc, dtype="<i4").reshape(count, 2)
+        statuses = pairs[:, 0]
+        lengths = pairs[:, 1]
+        sizes = _np.maximum(lengths, 0)
+        ends = _np.cumsum(sizes, dtype=_np.int64)
+        if count and int(ends[-1]) > payload_len:
+            raise KisoError("kiso_length_mismatch")
+        ends += meta_len
+        offsets = _np.where(lengths > 0, ends - sizes, -1)
+        return KisoPackets(count, statuses, lengths, offsets, mv)
+
+    if _LITTLE:
+        flat = desc.cast("i")
+    else:
+        flat = array.array("i", desc)
+        flat.byteswap()
+    statuses = list(flat[0::2])
+    lengths = list(flat[1::2])
+    sizes = [n if n > 0 else 0 for n in lengths]
+    ends = list(itertools.accumulate(sizes, initial=meta_len))
+    if ends[-1] - meta_len > payload_len:
+        raise KisoError("kiso_length_mismatch")
+    offsets = [ends[i] if sizes[i] else -1 for i in range(count)]
+    return KisoPackets(count, statuses, lengths, offsets, mv)
+
+
+class UvcFrame(NamedTuple):
+    """One reassembled frame. `data` is a view of the assembler's frame buffer (see UvcFrameAssembler)."""
+
+    data: memoryview
+    fid: int
+    packets: int
+    complete: bool
+
+
+class UvcFrameAssembler:
+    """
+    Rebuilds video frames from UVC payloads (one payload per iso packet, or per bulk transfer).
+
+    - The UVC header (`bHeaderLength`, `bmHeaderInfo`) is stripped from every payload.
+    - A frame ends on EOF, or when FID toggles (cameras that never set EOF).
+    - Payloads with the ERR bit or a non-zero iso status mark the frame bad; bad, oversized or
+      (for YUY2 with known width/height) wrongly sized frames are dropped and counted.
+    - MJPEG frames must start with SOI (FF D8) and end with EOI (FF D9); bytes before SOI and
+      short padding after EOI are trimmed.
+
+    Frames are written into `buffers` preallocated bytearrays used round-robin, so a yielded
+    `UvcFrame.data` stays valid while the next `buffers - 1` frames are assembled; copy it
+    (`bytes(frame.data)`) to keep it longer. Consume frames as they are yielded rather than
+    collecting them with list().
+
+    `use_numpy`: None takes the NumPy path for KISO blobs of at least 96 packets, True forces it,
+    False never uses it.
+    """
+
+    def __init__(
+        self,
+        *,
+        fmt: str = "mjpeg",
+        width: int = 0,
+        height: int = 0,
+        max_frame_bytes: int = 0,
+        buffers: int = 3,
+        use_numpy: Optional[bool] = None,
+    ):
+        self.fmt = str(fmt).strip().lower()
+        if self.fmt not in ("mjpeg", "yuy2"):
+            raise ValueError("fmt must be 'mjpeg' or 'yuy2'")
+        self.expected_bytes = int(width) * int(height) * 2 if self.fmt == "yuy2" and width and height else 0
+        if max_frame_bytes <= 0:
+            max_frame_bytes = self.expected_bytes or 4 * 1024 * 1024
+        self.max_frame_bytes = int(max_frame_bytes)
+        self.use_numpy = use_numpy
+        self._bufs = [bytearray(self.max_frame_bytes) for _ in range(max(2, int(buffers)))]
+        self._views = [memoryview(b) for b in self._bufs]
+        self._cur = 0
+        self._len = 0
+        self._packets = 0
+        self._bad = False
+        self._started = self.fmt != "mjpeg"
+        self._fid = -1
+        self.frames = 0
+        self.dropped = 0
+        self.packets = 0
+        self.error_packets = 0
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "packets": self.packets,
+            "error_packets": self.error_packets,
+        }
+
+    def _reset(self) -> None:
+        self._len = 0
+        self._packets = 0
+        self._bad = False
+        self._started = self.fmt != "mjpeg"
+
+    def _finish(self, complete: bool) -> Optional[UvcFrame]:
+        n = self._len
+        view = self._views[self._cur]
+        ok = n > 0 and not self._bad
+        if ok and self.expected_bytes and n != self.expected_bytes:
+            ok = False
+        if ok and self.fmt == "mjpeg" and view[n - 2:n] != b"\xff\xd9":
+            # Tolerate a little padding after EOI; without EOI the frame is truncated.
+            eoi = bytes(view[max(0, n - 64):n]).rfind(b"\xff\xd9")
+            if eoi < 0:
+                ok = False
+            else:
+                n = max(0, n - 64) + eoi + 2
+        frame = None
+        if ok:
+            frame = UvcFrame(view[:n], self._fid, self._packets, complete)
+            self.frames += 1
+            self._cur = (self._cur + 1) % len(self._bufs)
+        elif n or self._bad:
+            self.dropped += 1
+        self._reset()
+        return frame
+
+    def _append(self, mv: memoryview, start: int, end: int) -> None:
+        if not self._started:
+            # MJPEG: wait for SOI at the start of a frame.
+            soi = bytes(mv[start:end]).find(b"\xff\xd8")
+            if soi < 0:
+                return
+            start += soi
+            self._started = True
+        n = end - start
+        if self._len + n > self.max_frame_bytes:
+            self._bad = True
+            return
+        self._views[self._cur][self._len:self._len + n] = mv[start:end]
+        self._len += n
+
+    def _payload(self, mv: memoryview, off: int, length: int, status: int, out: List[UvcFrame]) -> None:
+        if length < 2:
+            return
+        hlen = mv[off]
+        info = mv[off + 1]
+        if hlen < 2 or hlen > length:
+            self.error_packets += 1
+            return
+        fid = info & UVC_FID
+        if self._fid >= 0 and fid != self._fid and (self._len or self._bad):
+            # FID toggled before EOF: the previous frame is over.
+            frame = self._finish(False)
+            if frame is not None:
+                out.append(frame)
+        self._fid = fid
+        self._packets += 1
+        if status != 0 or info & UVC_ERR:
+            self.error_packets += 1
+            self._bad = True
+        elif length > hlen:
+            self._append(mv, off + hlen, off + length)
+        if info & UVC_EOF:
+            frame = self._finish(True)
+            if frame is not None:
+                out.append(frame)
+
+    def feed_payload(self, payload: Buffer) -> Iterator[UvcFrame]:
+        """Feed one UVC payload (header included), e.g. one bulk transfer. Yields finished frames."""
+        mv = payload if isinstance(payload, memoryview) else memoryview(payload)
+        out: List[UvcFrame] = []
+        self.packets += 1
+        self._payload(mv, 0, len(mv), 0, out)
+        yield from out
+
+    def feed_kiso(self, blob: Buffer) -> Iterator[UvcFrame]:
+        """
+        Feed one KISO blob (every packet is one UVC payload). Yields finished frames as they
+        complete, before the rest of the blob is written into the next frame buffer.
+        """
+        use_numpy = self.use_numpy
+        if use_numpy is None:
+            use_numpy = (
+                _np is not None
+                and len(blob) >= _KISO_HEADER.size
+                and _KISO_HEADER.unpack_from(blob, 0)[1] >= _NUMPY_MIN_PACKETS
+            )
+        pk = parse_kiso(blob, use_numpy=use_numpy)
+        self.packets += pk.count
+        if use_numpy:
+            yield from self._feed_kiso_numpy(pk)
+            return
+        out: List[UvcFrame] = []
+        statuses, lengths, offsets = pk.statuses, pk.lengths, pk.offsets
+        mv = pk.blob
+        slow_bits = UVC_ERR | UVC_EOF
+        limit = self.max_frame_bytes
+        for off, length, status in zip(offsets, lengths, statuses):
+            if off < 0:
+                continue
+            # Fast path: a clean mid-frame packet of the current frame is a single slice copy.
+            if status == 0 and length >= 2 and self._started and not self._bad:
+                hlen = mv[off]
+                info = mv[off + 1]
+                end = self._len + length - hlen
+                if not info & slow_bits and (info & UVC_FID) == self._fid and 2 <= hlen <= length and end <= limit:
+                    self._views[self._cur][self._len:end] = mv[off + hlen:off + length]
+                    self._len = end
+                    self._packets += 1
+                    continue
+            self._payload(mv, off, length, status, out)
+            if out:
+                yield from out
+                out.clear()
+
+    def _feed_kiso_numpy(self, pk: KisoPackets) -> Iterator[UvcFrame]:
+        np = _np
+        assert np is not None
+        n = pk.count
+        if not n:
+            return
+        offs, lens, stats = pk.offsets, pk.lengths, pk.statuses
+        mv = pk.blob
+        src = np.frombuffer(mv, dtype=np.uint8)
+        # Both UVC header bytes of every packet, one gather each (empty packets read a dummy byte).
+        hlen = src[offs]
+        info = src[np.minimum(offs + 1, len(src) - 1)]
+        # Packets that need the per-packet path: empty/short, bad header, iso error, ERR or EOF.
+        slow = (stats != 0) | (lens < 2) | (hlen < 2) | (hlen > lens) | ((info & (UVC_ERR | UVC_EOF)) != 0)
+        # Segments of neighbouring fast packets with the same length, header length and FID. The
+        # packets of a blob are contiguous, so a segment of k packets is a (k, length) block whose
+        # payload columns are copied with one strided assignment; a slow packet is a segment alone.
+        key = lens * 512 + hlen * 2 + (info & UVC_FID)
+        brk = np.empty(n, dtype=bool)
+        brk[0] = True
+        np.not_equal(key[1:], key[:-1], out=brk[1:])
+        brk |= slow
+        brk[1:] |= slow[:-1]
+        starts = np.flatnonzero(brk).tolist()
+        starts.append(n)
+        offs_l, lens_l, hlen_l, info_l, slow_l = offs.tolist(), lens.tolist(), hlen.tolist(), info.tolist(), slow.tolist()
+
+        out: List[UvcFrame] = []
+        limit = self.max_frame_bytes
+        for i, j in zip(starts, starts[1:]):
+            if slow_l[i]:
+                if offs_l[i] >= 0:
+                    self._payload(mv, offs_l[i], lens_l[i], int(stats[i]), out)
+                    if out:
+                        yield from out
+                        out.clear()
+                continue
+            fid = info_l[i] & UVC_FID
+            # Same condition as the per-packet fast path: the segment continues the current frame.
+            while i < j and not (self._started and not self._bad and fid == self._fid):
+                self._payload(mv, offs_l[i], lens_l[i], 0, out)
+                i += 1
+                if out:
+                    yield from out
+                    out.clear()
+            if i == j:
+                continue
+            length, h = lens_l[i], hlen_l[i]
+            count = j - i
+            self._packets += count
+            end = self._len + count * (length - h)
+            if end > limit:
+                self._bad = True
+            elif end > self._len:
+                dst = np.frombuffer(self._bufs[self._cur], dtype=np.uint8)
+                off = offs_l[i]
+                dst[self._len:end].reshape(count, length - h)[...] = src[off:off + count * length].reshape(count, length)[:, h:]
+                self._len = end
+
+    def iter_frames(self, frames: Iterable[Tuple[int, Buffer]]) -> Iterator[UvcFrame]:
+        """
+        Reassemble from a data-plane frame iterator such as `UsbStream.frames()`:
+        type 2 (iso_in) frames are KISO blobs, type 1 (bulk_in) frames are single UVC payloads.
+        """
+        for ftype, payload in frames:
+            if ftype == 2:
+                yield from self.feed_kiso(payload)
+            else:
+                yield from self.feed_payload(payload)
@@ -0,0 +1,265 @@
+"""
+Opt-in latency instrumentation for MethingsClient (MethingsClient(metrics=True)).
+
+Every request is recorded under its device_api action (or `METHOD /path` for plain requests)
+in log-linear histograms, one per phase:
+
+- `serialize`: encoding the JSON body
+- `connect`: opening a new connection (0 when a pooled one was reused)
+- `server`: the server's own time, from its `Server-Timing: app;dur=<ms>` response header
+- `wait`: request written until the response body was read, minus `server` (transfer, queueing)
+- `parse`: decoding the JSON response
+- `total`: the whole call as the caller saw it
+
+plus status counts (`200`, `404`, `error`, ...). `summary()` / `format_summary()` give
+p50/p95/p99 per action and phase; cache hits (MethingsClient(cache=...)) are not requests and
+are not recorded. Setting `METHINGS_METRICS=1` enables one shared instance for every client;
+`METHINGS_TRACE=<path>` also writes one Chrome trace event per request (open the file in
+chrome://tracing or https://ui.perfetto.dev).
+
+Histograms bucket microseconds with 128 linear sub-buckets per power of two, so quantiles
+are within 0.8% of the recorded value at any magnitude and recording is a couple of integer
+operations.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, IO, Iterable, List, Optional
+
+PHASES = ("total", "serialize", "connect", "server", "wait", "parse")
+
+_SUB_BITS = 8
+_SUB = 1 << _SUB_BITS
+
+
+def _bucket(us: int) -> int:
+    shift = us.bit_length() - _SUB_BITS
+    if shift <= 0:
+        return us
+    return (shift << _SUB_BITS) + (us >> shift)
+
+
+def _bucket_value(index: int) -> int:
+    """Upper edge of a bucket, in microseconds."""
+    shift, sub = divmod(index, _SUB)
+    return ((sub + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Log-linear (HDR-style) histogram of durations in seconds, stored as microseconds."""
+
+    __slots__ = ("counts", "count", "total_us", "min_us", "max_us")
+
+    def __init__(self) -> None:
+        self.counts: List[int] = []
+        self.count = 0
+        self.total_us = 0
+        self.min_us = 0
+        self.max_us = 0
+
+    def record(self, seconds: float) -> None:
+        us = int(seconds * 1e6) if seconds > 0 else 0
+        i = _bucket(us)
+        counts = self.counts
+        if i >= len(counts):
+            counts.extend([0] * (i + 1 - len(counts)))
+        counts[i] += 1
+        if not self.count or us < self.min_us:
+            self.min_us = us
+        if us > self.max_us:
+            self.max_us = us
+        self.count += 1
+        self.total_us += us
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        if other.count:
+            self.min_us = other.min_us if not self.count else min(self.min_us, other.min_us)
+            self.max_us = max(self.max_us, other.max_us)
+        self.count += other.count
+        self.total_us += other.total_us
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile `q` (0-1) in seconds; 0.0 when empty."""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(_bucket_value(i), self.max_us) / 1e6
+        return self.max_us / 1e6
+
+    def snapshot(self, quantiles: Iterable[float] = (0.5, 0.95, 0.99)) -> Dict[str, Any]:
+        """`count`, `mean_ms`, `min_ms`, `max_ms` and `p50_ms`-style keys for each quantile."""
+        out: Dict[str, Any] = {
+            "count": self.count,
+            "mean_ms": round(self.total_us / self.count / 1000.0, 3) if self.count else 0.0,
+            "min_ms": self.min_us / 1000.0,
+            "max_ms": self.max_us / 1000.0,
+        }
+        for q in quantiles:
+            out[f"p{q * 100:g}_ms"] = round(self.quantile(q) * 1000.0, 3)
+        return out
+
+
+class _ActionStats:
+    __slots__ = ("phases", "statuses")
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, LatencyHistogram] = {p: LatencyHistogram() for p in PHASES}
+        self.statuses: Dict[str, int] = {}
+
+
+class TraceWriter:
+    """
+    Appends Chrome trace "complete" events (`ph: X`) to a JSON array file, one line each.
+
+    The closing bracket is written by close() (registered with atexit); the trace viewers also
+    accept a file without it, so a crashed process still leaves a usable trace.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._f: Optional[IO[str]] = open(path, "w", encoding="utf-8", buffering=64 * 1024)
+        self._f.write("[\n")
+        self._first = True
+        self._pid = os.getpid()
+        atexit.register(self.close)
+
+    def span(self, name: str, start_s: float, dur_s: float, args: Dict[str, Any]) -> None:
+        event = {
+            "name": name,
+            "cat": "methings",
+            "ph": "X",
+            "ts": round(start_s * 1e6, 1),
+            "dur": round(dur_s * 1e6, 1),
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        line = json.dumps(event, separators=(",", ":"))
+        with self._lock:
+            if self._f is None:
+                return
+            self._f.write(line if self._first else ",\n" + line)
+            self._first = False
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._f.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            f, self._f = self._f, None
+        if f is not None:
+            f.write("\n]\n")
+            f.close()
+
+
+class ClientMetrics:
+    """Per-action phase histograms and status counts; thread-safe. See the module docstring."""
+
+    def __init__(self, *, trace_path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._actions: Dict[str, _ActionStats] = {}
+        self.trace: Optional[TraceWriter] = TraceWriter(trace_path) if trace_path else None
+        # Trace timestamps are perf_counter based; anchor them to wall-clock time.
+        self._epoch = time.time() - time.perf_counter()
+
+    @classmethod
+    def from_env(cls) -> Optional["ClientMetrics"]:
+        """
+        The process-wide ClientMetrics when METHINGS_METRICS or METHINGS_TRACE is set, else None.
+        Clients created this way share one set of histograms and one trace file.
+        """
+        global _env_metrics
+        trace = os.environ.get("METHINGS_TRACE", "").strip()
+        enabled = os.environ.get("METHINGS_METRICS", "").strip().lower() not in ("", "0", "false", "no")
+        if not trace and not enabled:
+            return None
+        with _env_lock:
+            if _env_metrics is None:
+                _env_metrics = cls(trace_path=trace or None)
+            return _env_metrics
+
+    def record(self, name: str, started: float, timing: Dict[str, float], status: str) -> None:
+        """
+        Record one request. `started` is its time.perf_counter() start, `timing` maps phase names
+        to seconds (missing phases count as 0) and must contain `total`.
+        """
+        with self._lock:
+            st = self._actions.get(name)
+            if st is None:
+                st = self._actions[name] = _ActionStats()
+            for phase, hist in st.phases.items():
+                hist.record(timing.get(phase, 0.0))
+            st.statuses[status] = st.statuses.get(status, 0) + 1
+        if self.trace is not None:
+            args: Dict[str, Any] = {p: round(v * 1000.0, 3) for p, v in timing.items() if p != "total"}
+            args["status"] = status
+            self.trace.span(name, self._epoch + started, timing["total"], args)
+
+    def summary(self, quantiles: Iterable[float] = (0.5, 0.95, 0.99)) -> Dict[str, Dict[str, Any]]:
+        """`{action: {count, errors, statuses, phases: {phase: LatencyHistogram.snapshot()}}}`."""
+        qs = tuple(quantiles)
+        with self._lock:
+            out: Dict[str, Dict[str, Any]] = {}
+            for name, st in self._actions.items():
+                errors = sum(n for s, n in st.statuses.items() if not s.startswith("2"))
+                out[name] = {
+                    "count": st.phases["total"].count,
+                    "errors": errors,
+                    "statuses": dict(st.statuses),
+                    "phases": {p: h.snapshot(qs) for p, h in st.phases.items()},
+                }
+        return out
+
+    def format_summary(self, *, sort_by: str = "p99_ms", phase: str = "total") -> str:
+        """Text table, one row per action, slowest `phase` tail first."""
+        rows = sorted(self.summary().items(), key=lambda kv: -kv[1]["phases"][phase].get(sort_by, 0.0))
+        head = f"{'action':<36} {'count':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  server p99  wait p99"
+        lines = [head]
+        for name, s in rows:
+            t = s["phases"][phase]
+            lines.append(
+                f"{name[:36]:<36} {s['count']:>6} {s['errors']:>4} {t['p50_ms']:>8.2f} {t['p95_ms']:>8.2f} "
+                f"{t['p99_ms']:>8.2f} {t['max_ms']:>8.2f}  {s['phases']['server']['p99_ms']:>10.2f}"
+                f"  {s['phases']['wait']['p99_ms']:>8.2f}"
+            )
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._actions.clear()
+
+    def close(self) -> None:
+        if self.trace is not None:
+            self.trace.close()
+
+
+_env_lock = threading.Lock()
+_env_metrics: Optional[ClientMetrics] = None
+
+
+def parse_server_timing(value: Optional[str]) -> float:
+    """Seconds from a `Server-Timing: app;dur=<ms>` header (0.0 when absent or malformed)."""
+    if not value:
+        return 0.0
+    for metric in value.split(","):
+        for part in metric.split(";")[1:]:
+            key, _, v = part.strip().partition("=")
+            if key == "dur":
+                try:
+                    return float(v) / 1000.0
+                except ValueError:
+                    return 0.0
+    return 0.0
@@ -0,0 +1,499 @@
+"""
+MicroPython file deployment over `mcu.micropython.exec` (raw REPL, see user/docs/api/mcu.md).
+
+deploy() pushes a local directory (or a {remote_path: bytes} mapping) to a board and sends only
+what changed:
+
+- one exec asks the board for the size and SHA-256 of every target file and whether it can
+  inflate (`deflate.DeflateIO`, or `zlib.DecompIO` on older firmware); identical files are skipped
+- changed files are zlib-compressed (1 KiB window, so the board needs little RAM to inflate)
+  when that makes them smaller, staged next to the target and renamed into place once the
+  board-side SHA-256 matches
+- chunks are written at explicit offsets, several files per exec, and the chunk size grows
+  while measured REPL throughput keeps improving (it halves again after a failed exec)
+
+    k = MethingsClient()
+    h = k.device_api("serial.open", {"handle": usb_handle})["json"]["serial_handle"]
+    r = deploy(k, "firmware_app/", serial_handle=h)
+    print(r["bytes_sent"], r["bytes_skipped"], r["throughput_bps"])
+
+MicroPythonSession keeps the board in raw REPL between calls (`mcu.micropython.session.*`), so
+tight polling loops do not pay the enter/exit handshake on every exec:
+
+    with MicroPythonSession(k, serial_handle=h) as s:
+        s.exec("import machine; adc = machine.ADC(machine.Pin(34))")
+        for _ in range(100):
+            print(s.exec("print(adc.read())").strip())
+        for ev in s.stream("for i in range(5): print(i)"):
+            print(ev)
+"""
+import base64
+import fnmatch
+import hashlib
+import json
+import os
+import time
+import urllib.parse
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from .client import MethingsClient, _KeepAliveConnection
+
+
+DEFAULT_EXCLUDE: Tuple[str, ...] = ("__pycache__", "*.pyc", ".git", ".DS_Store")
+# zlib window used for on-board inflation: 2**10 bytes of RAM instead of 32 KiB.
+DEFLATE_WBITS = 10
+_MARKER = "@MT"
+_STAGE_SUFFIX = ".~mt"
+
+Progress = Callable[[int, int], None]
+
+
+class MicroPythonError(RuntimeError):
+    def __init__(self, message: str, response: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.response = response or {}
+
+
+# Board-side helpers (MicroPython). Kept short: they are resent with every exec.
+_HASH = """import os,json,binascii
+try:
+ from hashlib import sha256 as _H
+except ImportError:
+ _H=None
+def _h(p):
+ try:
+  n=os.stat(p)[6]
+ except OSError:
+  return None
+ if _H is None:
+  return [n,'']
+ d=_H();b=bytearray(512);m=memoryview(b)
+ with open(p,'rb') as f:
+  while True:
+   k=f.readinto(b)
+   if not k:
+    break
+   d.update(m[:k])
+ return [n,binascii.hexlify(d.digest()).decode()]
+z=0
+try:
+ import deflate;z=2
+except ImportError:
+ try:
+  import zlib;zlib.DecompIO;z=1
+ except (ImportError,AttributeError):
+  pass
+"""
+
+_WRITE = """from binascii import a2b_base64 as _b
+def _w(p,o,d):
+ f=open(p,'r+b' if o else 'wb');f.seek(o);f.write(_b(d));f.close()
+"""
+
+_FINISH = """import os
+def _mk(p):
+ q=''
+ for s in p.split('/')[:-1]:
+  q+=s+'/'
+  if s:
+   try:
+    os.mkdir(q[:-1])
+   except OSError:
+    pass
+def _fin(t,p,z):
+ _mk(p)
+ if z:
+  s=open(t,'rb')
+  if z==2:
+   import deflate;r=deflate.DeflateIO(s,deflate.ZLIB)
+  else:
+   import zlib;r=zlib.DecompIO(s,%d)
+  o=open(p+'.~new','wb')
+  while True:
+   b=r.read(512)
+   if not b:
+    break
+   o.write(b)
+  o.close();s.close();os.remove(t);t=p+'.~new'
+ try:
+  os.remove(p)
+ except OSError:
+  pass
+ os.rename(t,p)
+ return _h(p)
+""" % DEFLATE_WBITS
+
+
+def _excluded(rel: str, exclude: Sequence[str]) -> bool:
+    return any(fnmatch.fnmatch(part, pat) for part in rel.split("/") for pat in exclude)
+
+
+def _collect(source: Union[str, Mapping[str, Any]], remote_root: str, exclude: Sequence[str]) -> Dict[str, bytes]:
+    """{remote path: content} from a local directory or a {remote path: bytes | local path} mapping."""
+    root = remote_root.strip().rstrip("/")
+    out: Dict[str, bytes] = {}
+    if isinstance(source, (str, os.PathLike)):
+        base = os.fspath(source)
+        if not os.path.isdir(base):
+            raise MicroPythonError(f"not a directory: {base}")
+        for dirpath, dirnames, filenames in os.walk(base):
+            rel_dir = os.path.relpath(dirpath, base).replace(os.sep, "/")
+            rel_dir = "" if rel_dir == "." else rel_dir + "/"
+            dirnames[:] = [d for d in dirnames if not _excluded(rel_dir + d, exclude)]
+            for name in sorted(filenames):
+                rel = rel_dir + name
+                if not _excluded(rel, exclude):
+                    with open(os.path.join(dirpath, name), "rb") as f:
+                        out[f"{root}/{rel}" if root else rel] = f.read()
+        return out
+    for path, value in source.items():
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            data = bytes(value)
+        elif isinstance(value, str) and not os.path.isfile(value):
+            data = value.encode("utf-8")
+        else:
+            with open(value, "rb") as f:
+                data = f.read()
+        rel = str(path).strip().lstrip("/") if root else str(path).strip()
+        out[f"{root}/{rel}" if root else rel] = data
+    return out
+
+
+def _parse_marked(result: Dict[str, Any]) -> Any:
+    if not result.get("ok"):
+        raise MicroPythonError(f"mcu.micropython.exec failed: {result.get('error') or result.get('json')}", result)
+    body = result.get("json") or {}
+    stdout = str(body.get("stdout") or "")
+    stderr = str(body.get("stderr") or "").strip()
+    if stderr:
+        raise MicroPythonError(f"board error: {stderr}", result)
+    idx = stdout.rfind(_MARKER)
+    if idx < 0:
+        raise MicroPythonError(f"unexpected board output: {stdout[:200]!r}", result)
+    return json.loads(stdout[idx + len(_MARKER):].strip().splitlines()[0])
+
+
+class _Piece:
+    __slots__ = ("path", "offset", "data")
+
+    def __init__(self, path: str, offset: int, data: bytes):
+        self.path = path
+        self.offset = offset
+        self.data = data
+
+
+class _ChunkSizer:
+    """Grows the per-exec payload while the measured rate improves; halves after a failure."""
+
+    def __init__(self, start: int, lo: int, hi: int):
+        self.size = max(lo, min(start, hi))
+        self.lo = lo
+        self.hi = hi
+        self.best_rate = 0.0
+        self.settled = False
+
+    def observe(self, nbytes: int, elapsed_s: float) -> None:
+        rate = nbytes / elapsed_s if elapsed_s > 0 else 0.0
+        if self.settled or nbytes < self.size // 2:
+            return  # tail execs are smaller than the budget and say little about the link
+        if rate > self.best_rate * 1.05:
+            self.best_rate = rate
+            if self.size < self.hi:
+                self.size = min(self.hi, self.size * 2)
+                return
+        self.settled = True
+
+    def failed(self) -> None:
+        self.size = max(self.lo, self.size // 2)
+        self.settled = True
+
+
+def deploy(
+    client: MethingsClient,
+    source: Union[str, Mapping[str, Any]],
+    *,
+    remote_root: str = "",
+    serial_handle: str = "",
+    handle: str = "",
+    model: str = "esp32",
+    port_index: int = 0,
+    baud_rate: int = 115200,
+    compress: bool = True,
+    force: bool = False,
+    min_chunk: int = 256,
+    max_chunk: int = 8192,
+    start_chunk: int = 1024,
+    retries: int = 2,
+    exclude: Sequence[str] = DEFAULT_EXCLUDE,
+    timeout_ms: int = 60000,
+    progress: Optional[Progress] = None,
+    session: Optional["MicroPythonSession"] = None,
+) -> Dict[str, Any]:
+    """
+    Deploy `source` to the board, skipping files whose size and SHA-256 already match.
+
+    Prefer `serial_handle` (from `serial.open`) over `handle`: every exec with `handle` opens
+    a new serial session. With an open `session`, execs run in its raw REPL instead. `progress(bytes_sent, bytes_to_send)` is called after each exec.
+    Returns counts and byte totals (`bytes_sent` is on the wire before base64, `bytes_skipped`
+    the size of unchanged files), `elapsed_s`, `throughput_bps` and the chunk sizes used.
+    """
+    t0 = time.perf_counter()
+    files = _collect(source, remote_root, exclude)
+    stats: Dict[str, Any] = {"execs": 0, "wire_bytes": 0, "chunk_sizes": []}
+
+    def run(code: str) -> Tuple[Dict[str, Any], float]:
+        t = time.perf_counter()
+        if session is not None:
+            r = client.mcu_micropython_session_exec(session_id=session.session_id, code=code, timeout_ms=timeout_ms)
+        else:
+            r = client.mcu_micropython_exec(
+                code=code, model=model, serial_handle=serial_handle, handle=handle,
+                port_index=port_index, baud_rate=baud_rate, timeout_ms=timeout_ms,
+            )
+        stats["execs"] += 1
+        stats["wire_bytes"] += len(code)
+        return r, time.perf_counter() - t
+
+    paths = sorted(files)
+    r, _ = run(f"{_HASH}P={json.dumps(paths)}\nprint('{_MARKER}'+json.dumps({{'z':z,'f':{{p:_h(p) for p in P}}}}))\n")
+    probe = _parse_marked(r)
+    inflate = int(probe.get("z") or 0) if compress else 0
+    remote = probe.get("f") or {}
+
+    changed: List[str] = []
+    skipped = 0
+    for p in paths:
+        have = remote.get(p)
+        digest = hashlib.sha256(files[p]).hexdigest()
+        if not force and have and have[0] == len(files[p]) and have[1] == digest:
+            skipped += len(files[p])
+        else:
+            changed.append(p)
+
+    # Stage every changed file (compressed when that helps and the board can inflate it).
+    staged: Dict[str, Tuple[bytes, int]] = {}
+    for p in changed:
+        raw = files[p]
+        if inflate:
+            c = zlib.compressobj(9, zlib.DEFLATED, DEFLATE_WBITS)
+            packed = c.compress(raw) + c.flush()
+            if len(packed) < len(raw) * 0.9:
+                staged[p] = (packed, inflate)
+                continue
+        staged[p] = (raw, 0)
+    to_send = sum(len(d) for d, _ in staged.values())
+
+    sizer = _ChunkSizer(start_chunk, min_chunk, max_chunk)
+    queue: List[_Piece] = []
+    for p in changed:
+        data = staged[p][0]
+        queue.append(_Piece(p + _STAGE_SUFFIX, 0, data))
+    sent = 0
+    failures = 0
+    while queue:
+        budget = sizer.size
+        batch: List[_Piece] = []
+        while queue and budget > 0:
+            piece = queue[0]
+            take = piece.data[:budget]
+            batch.append(_Piece(piece.path, piece.offset, take))
+            budget -= len(take)
+            if len(take) == len(piece.data):
+                queue.pop(0)
+            else:
+                queue[0] = _Piece(piece.path, piece.offset + len(take), piece.data[len(take):])
+            if not take:
+                break
+        lines = [_WRITE] + [
+            f"_w({json.dumps(b.path)},{b.offset},'{base64.b64encode(b.data).decode('ascii')}')" for b in batch
+        ]
+        lines.append(f"print('{_MARKER}1')")
+        nbytes = sum(len(b.data) for b in batch)
+        r, dt = run("\n".join(lines) + "\n")
+        try:
+            _parse_marked(r)
+        except MicroPythonError:
+            failures += 1
+            if failures > retries:
+                raise
+            # Writes are at explicit offsets, so resending the same pieces is safe.
+            queue = _merge(batch + queue)
+            sizer.failed()
+            continue
+        stats["chunk_sizes"].append(sizer.size)
+        sizer.observe(nbytes, dt)
+        sent += nbytes
+        if progress is not None:
+            progress(sent, to_send)
+
+    results: Dict[str, Any] = {}
+    if changed:
+        calls = "\n".join(
+            f"R[{json.dumps(p)}]=_fin({json.dumps(p + _STAGE_SUFFIX)},{json.dumps(p)},{staged[p][1]})" for p in changed
+        )
+        code = f"{_HASH}{_FINISH}R={{}}\n{calls}\nprint('{_MARKER}'+json.dumps(R))\n"
+        r, _ = run(code)
+        results = _parse_marked(r)
+    mismatched = [
+        p for p in changed
+        if not results.get(p) or results[p][0] != len(files[p])
+        or (results[p][1] and results[p][1] != hashlib.sha256(files[p]).hexdigest())
+    ]
+    if mismatched:
+        raise MicroPythonError(f"verification failed for {', '.join(mismatched)}", {"results": results})
+
+    elapsed = time.perf_counter() - t0
+    changed_raw = sum(len(files[p]) for p in changed)
+    return {
+        "files": len(paths),
+        "files_changed": len(changed),
+        "files_skipped": len(paths) - len(changed),
+        "changed": changed,
+        "bytes_total": sum(len(d) for d in files.values()),
+        "bytes_changed": changed_raw,
+        "bytes_sent": to_send,
+        "bytes_skipped": skipped,
+        "compression": "deflate" if inflate == 2 else ("zlib" if inflate == 1 else "none"),
+        "verified": all(results[p][1] for p in changed) if changed else True,
+        "execs": stats["execs"],
+        "wire_bytes": stats["wire_bytes"],
+        "chunk_sizes": sorted(set(stats["chunk_sizes"])),
+        "elapsed_s": elapsed,
+        # Raw bytes made current on the board per second (unchanged files count as delivered).
+        "throughput_bps": (changed_raw + skipped) / elapsed if elapsed > 0 else 0.0,
+        "wire_bps": stats["wire_bytes"] / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def _merge(batch: List[_Piece]) -> List[_Piece]:
+    """Re-join consecutive pieces of the same file so a retry can be re-split at a new size."""
+    out: List[_Piece] = []
+    for b in batch:
+        if out and out[-1].path == b.path and out[-1].offset + len(out[-1].data) == b.offset:
+            out[-1] = _Piece(b.path, out[-1].offset, out[-1].data + b.data)
+        else:
+            out.append(b)
+    return out
+
+
+class MicroPythonSession:
+    """
+    Raw-REPL session on one board (`mcu.micropython.session.open/exec/close`).
+
+    exec() returns stdout and raises MicroPythonError when the snippet wrote to stderr (an
+    uncaught exception); exec_many() sends several snippets in one exchange; stream() yields
+    `output` / `snippet` / `done` events while the board is still running.
+    """
+
+    def __init__(
+        self,
+        client: MethingsClient,
+        *,
+        serial_handle: str = "",
+        handle: str = "",
+        model: str = "esp32",
+        port_index: int = 0,
+        baud_rate: int = 115200,
+        raw_paste: bool = True,
+        timeout_s: float = 10.0,
+        idle_timeout_s: Optional[float] = None,
+    ):
+        self.client = client
+        self.serial_handle = serial_handle
+        self.handle = handle
+        self.model = model
+        self.port_index = int(port_index)
+        self.baud_rate = int(baud_rate)
+        self.raw_paste = bool(raw_paste)
+        self.timeout_s = float(timeout_s)
+        self.idle_timeout_s = idle_timeout_s
+        self.session_id = ""
+        self.info: Dict[str, Any] = {}
+
+    def open(self) -> Dict[str, Any]:
+        if self.session_id:
+            return self.info
+        r = self.client.mcu_micropython_session_open(
+            model=self.model, serial_handle=self.serial_handle, handle=self.handle,
+            port_index=self.port_index, baud_rate=self.baud_rate, raw_paste=self.raw_paste,
+            idle_timeout_ms=None if self.idle_timeout_s is None else int(1000 * self.idle_timeout_s),
+        )
+        if not r.get("ok"):
+            raise MicroPythonError(f"mcu.micropython.session.open failed: {r.get('error') or r.get('json')}", r)
+        self.info = r["json"]
+        self.session_id = str(self.info.get("session_id") or "")
+        return self.info
+
+    def _timeout_ms(self, timeout_s: Optional[float]) -> int:
+        return int(1000 * (self.timeout_s if timeout_s is None else timeout_s))
+
+    def exec_many(
+        self, snippets: Sequence[str], *, stop_on_error: bool = True, timeout_s: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Run `snippets` in order in one exchange; returns `{index, stdout, stderr, elapsed_ms}` per snippet run."""
+        self.open()
+        r = self.client.mcu_micropython_session_exec(
+            session_id=self.session_id, snippets=list(snippets), stop_on_error=stop_on_error,
+            timeout_ms=self._timeout_ms(timeout_s),
+        )
+        if not r.get("ok"):
+            raise MicroPythonError(f"mcu.micropython.session.exec failed: {r.get('error') or r.get('json')}", r)
+        return list(r["json"].get("results") or [])
+
+    def exec(self, code: str, *, timeout_s: Optional[float] = None, check: bool = True) -> str:
+        result = self.exec_many([code], timeout_s=timeout_s)[0]
+        if check and result.get("stderr"):
+            raise MicroPythonError(f"board error: {str(result['stderr']).strip()}", result)
+        return str(result.get("stdout") or "")
+
+    def stream(
+        self, code: Union[str, Sequence[str]], *, stop_on_error: bool = True, timeout_s: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Run code (or a list of snippets) and yield events as NDJSON lines arrive:
+        `{"event": "output", "index", "stream", "data"}`, `{"event": "snippet", ...}` and a
+        final `{"event": "done", ...}` carrying the same result as exec_many.
+        """
+        self.open()
+        snippets = [code] if isinstance(code, str) else list(code)
+        parts = urllib.parse.urlsplit(self.client.base_url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError("streaming supports plain http:// base URLs only")
+        body = json.dumps({
+            "session_id": self.session_id,
+            "snippets": snippets,
+            "stop_on_error": bool(stop_on_error),
+            "timeout_ms": self._timeout_ms(timeout_s),
+        }).encode("utf-8")
+        headers = {"Content-Type": "application/json; charset=utf-8", "Accept": "application/x-ndjson"}
+        if self.client.identity:
+            headers["X-Methings-Identity"] = self.client.identity
+        wait_s = (self.timeout_s if timeout_s is None else timeout_s) * max(1, len(snippets)) + 30.0
+        conn = _KeepAliveConnection(parts.hostname, parts.port or 80, timeout=wait_s)
+        try:
+            conn.request("POST", parts.path.rstrip("/") + "/mcu/micropython/session/exec?stream=1", body=body, headers=headers)
+            resp = conn.getresponse()
+            if resp.status != 200:
+                raw = resp.read().decode("utf-8", "replace")
+                raise MicroPythonError(f"mcu.micropython.session.exec stream failed ({resp.status}): {raw[:200]}")
+            while True:
+                line = resp.readline()
+                if not line:
+                    break
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        session_id, self.session_id = self.session_id, ""
+        if session_id:
+            self.client.mcu_micropython_session_close(session_id=session_id)
+
+    def __enter__(self) -> "MicroPythonSession":
+        self.open()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,557 @@
+"""
+Single-thread multiplexer for many concurrent streams (`selectors`, i.e. epoll on Linux/Android).
+
+A blocking reader per stream costs a thread each, and with 8 USB streams plus serial and sensor
+WebSockets most of the CPU goes to waking them up. StreamMux owns the sockets of all of them
+instead and serves them from one loop:
+
+- `/usb/stream` (and `uvc.mjpeg.session`) TCP data planes: UsbStream, UvcSession or a connected
+  socket. Frames are parsed incrementally by the stream's own FrameReader (`fill()` +
+  `buffered_frame()`), so they stay zero-copy and Recorder taps keep working
+- `/ws/...` WebSockets: a connected WebSocket (e.g. `/ws/serial/{handle}` after its hello) or a
+  SensorStream. Messages are parsed incrementally from one receive buffer per connection; pings
+  are answered, fragments joined, `send()` is flushed by the loop
+- each readable socket gets one `recv` per loop round, after which every complete frame in its
+  buffer is dispatched, so one fast stream cannot starve the others
+
+Each stream delivers either to a callback `on_frame(channel, kind, payload)` (`kind` is the frame
+type for TCP streams, the opcode for WebSockets), run on the loop thread with a memoryview that
+is only valid during the call, or, without a callback, to a queue read with `MuxChannel.get()` or
+by iterating the channel. Backpressure is per stream: once a queue holds `max_queued_bytes`, that
+socket is not read again until the consumer drained it to half, so TCP flow control slows down
+that stream alone. Callbacks get the same with `channel.pause()` / `channel.resume()`.
+
+    with StreamMux() as mux:
+        for h in handles:
+            mux.add_usb(UsbStream(k, handle=h, endpoint_address=0x81), on_frame=on_usb)
+        ss = SensorStream(sensors="a,g", rate_hz=400)
+        sensors = mux.add_websocket(ss)
+        mux.start()
+        for op, msg in sensors:
+            batches = decode_packed(msg, ss.packed_sensors)
+"""
+import collections
+import selectors
+import socket
+import struct
+import threading
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .usb_stream import FrameReader, StreamCounters
+from .ws import OP_BINARY, OP_CLOSE, OP_CONT, OP_PING, OP_PONG, OP_TEXT, WebSocket, _client_frame, _mask
+
+
+FrameCallback = Callable[["MuxChannel", int, memoryview], None]
+
+_U16 = struct.Struct("!H")
+_U64 = struct.Struct("!Q")
+
+
+class MuxChannel:
+    """One stream of a StreamMux; created by `StreamMux.add_usb()` / `add_websocket()`."""
+
+    kind = ""
+
+    def __init__(
+        self,
+        mux: "StreamMux",
+        name: str,
+        sock: socket.socket,
+        owner: Any,
+        on_frame: Optional[FrameCallback],
+        max_queued_bytes: int,
+    ):
+        self.mux = mux
+        self.name = name
+        self.sock = sock
+        self.owner = owner
+        self.on_frame = on_frame
+        self.max_queued_bytes = max(1, int(max_queued_bytes))
+        self.counters = StreamCounters()
+        self.closed = False
+        self.error: Optional[BaseException] = None
+        self.pauses = 0
+        self.queued_high_water = 0
+        self._queue: Deque[Tuple[int, bytes]] = collections.deque()
+        self._queued = 0
+        self._out = bytearray()
+        self._cond = threading.Condition()
+        self._paused = False  # pause() from the consumer
+        self._full = False  # queue reached max_queued_bytes
+        self._events = 0
+        self._detached = threading.Event()
+
+    # -------- loop side (overridden per transport) --------
+    def _drain(self) -> bool:
+        """Dispatch every complete buffered frame; False when delivery stopped early."""
+        raise NotImplementedError
+
+    def _fill(self) -> int:
+        raise NotImplementedError
+
+    def _deliver(self, kind: int, payload: memoryview) -> bool:
+        if self.on_frame is not None:
+            self.on_frame(self, kind, payload)
+            return not self._paused
+        with self._cond:
+            self._queue.append((kind, bytes(payload)))
+            self._queued += len(payload)
+            self.queued_high_water = max(self.queued_high_water, self._queued)
+            self._cond.notify()
+            if self._queued >= self.max_queued_bytes:
+                self._full = True
+                self.pauses += 1
+                return False
+        return True
+
+    def _flush(self) -> None:
+        with self._cond:
+            if self._out:
+                n = self.sock.send(self._out)
+                del self._out[:n]
+
+    def _want(self) -> int:
+        if self.closed:
+            return 0
+        events = 0 if self._paused or self._full else selectors.EVENT_READ
+        return events | (selectors.EVENT_WRITE if self._out else 0)
+
+    def _send(self, data: bytes) -> None:
+        with self._cond:
+            if self.closed:
+                raise ConnectionError(f"{self.name}: stream is closed")
+            self._out += data
+        self.mux._call(self._sync)
+
+    def _sync(self) -> None:
+        self.mux._sync(self)
+
+    def _finish(self, error: Optional[BaseException] = None) -> None:
+        if error is not None and self.error is None:
+            self.error = error
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    # -------- consumer side --------
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[int, bytes]]:
+        """
+        The next queued `(kind, payload)`. Returns None on timeout, or once the stream ended and
+        its queue is empty (`closed` is then True).
+        """
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._cond.wait_for(lambda: self._queue or self.closed, timeout)
+            if not self._queue:
+                return None
+            kind, data = self._queue.popleft()
+            self._queued -= len(data)
+            resume = self._full and self._queued <= self.max_queued_bytes // 2
+            if resume:
+                self._full = False
+        if resume:
+            self.mux._call(self._resume)
+        return kind, data
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        while True:
+            item = self.get()
+            if item is None:
+                return
+            yield item
+
+    def pause(self) -> None:
+        """Stop reading this stream (its socket buffer fills and the sender slows down)."""
+        self._paused = True
+        self.mux._call(self._sync)
+
+    def resume(self) -> None:
+        self._paused = False
+        self.mux._call(self._resume)
+
+    def _resume(self) -> None:
+        # Frames buffered before the pause are dispatched first; the socket may not become
+        # readable again if they were the last ones.
+        self.mux._service(self, read=False)
+
+    def close(self) -> None:
+        """Remove the stream from the mux and close it (UsbStream.close() also stops the stream)."""
+        if self.mux._loop_elsewhere():
+            self.mux._call(lambda: self.mux._detach(self))
+            self._detached.wait(timeout=10)
+        elif not self._detached.is_set():
+            self.mux._detach(self)
+        close = getattr(self.owner, "close", None)
+        if close is not None:
+            try:
+                close()
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = self._queued
+        out: Dict[str, Any] = dict(self.counters.snapshot())
+        out.update({
+            "name": self.name,
+            "kind": self.kind,
+            "queued_bytes": queued,
+            "queued_high_water": self.queued_high_water,
+            "backpressure": queued / self.max_queued_bytes,
+            "pauses": self.pauses,
+            "paused": self._paused or self._full,
+            "closed": self.closed,
+            "error": str(self.error) if self.error else None,
+        })
+        return out
+
+
+class _TcpChannel(MuxChannel):
+    kind = "tcp"
+
+    def __init__(self, *args: Any, reader: FrameReader, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.reader = reader
+        self.counters = reader.counters
+
+    def _drain(self) -> bool:
+        while True:
+            frame = self.reader.buffered_frame()
+            if frame is None:
+                return True
+            if not self._deliver(frame[0], frame[1]):
+                return False
+
+    def _fill(self) -> int:
+        return self.reader.fill()
+
+
+class _WsChannel(MuxChannel):
+    kind = "ws"
+
+    def __init__(self, *args: Any, ws: WebSocket, buffer_size: int, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.ws = ws
+        self.close_code = 0
+        self.close_reason = ""
+        self._buf = bytearray(max(int(buffer_size), 64 * 1024))
+        self._mv = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        self._need = 2
+        self._frag = bytearray()
+        self._frag_op = OP_BINARY
+        # The blocking handshake (and a hello read with recv()) may have buffered bytes past
+        # what it consumed; they are the start of this channel's input.
+        ahead = ws._rfile.peek(len(self._buf))
+        if ahead:
+            ws._rfile.read(len(ahead))
+            self._ensure(len(ahead))
+            self._mv[:len(ahead)] = ahead
+            self._end = len(ahead)
+
+    def _ensure(self, need: int) -> None:
+        """Make room for a frame of `need` bytes starting at the unparsed data."""
+        tail = self._end - self._start
+        if len(self._buf) - self._start >= need:
+            return
+        if len(self._buf) < need:
+            # Views handed out earlier may still exist, so grow into a new buffer.
+            buf = bytearray(max(need, 2 * len(self._buf)))
+            buf[:tail] = self._mv[self._start:self._end]
+            self._buf, self._mv = buf, memoryview(buf)
+        elif tail:
+            self._mv[:tail] = bytes(self._mv[self._start:self._end])
+        self._start, self._end = 0, tail
+
+    def _drain(self) -> bool:
+        buf = self._buf
+        while True:
+            s = self._start
+            avail = self._end - s
+            if avail < 2:
+                self._need = 2
+                return True
+            b0, b1 = buf[s], buf[s + 1]
+            n = b1 & 0x7F
+            head = 2
+            if n == 126:
+                head = 4
+                if avail < head:
+                    self._need = head
+                    return True
+                n = _U16.unpack_from(buf, s + 2)[0]
+            elif n == 127:
+                head = 10
+                if avail < head:
+                    self._need = head
+                    return True
+                n = _U64.unpack_from(buf, s + 2)[0]
+            if b1 & 0x80:
+                head += 4
+            if avail < head + n:
+                self._need = head + n
+                return True
+            begin = s + head
+            self._start = begin + n
+            payload = self._mv[begin:begin + n]
+            if b1 & 0x80:
+                payload = memoryview(_mask(bytes(payload), bytes(buf[begin - 4:begin])))
+            op = b0 & 0x0F
+            if op >= OP_CLOSE:
+                self._control(op, payload)
+                if self.closed:
+                    return True
+                continue
+            if op == OP_CONT or not b0 & 0x80:
+                if op != OP_CONT:
+                    self._frag_op = op
+                self._frag += payload
+                if not b0 & 0x80:
+                    continue
+                op, payload = self._frag_op, memoryview(bytes(self._frag))
+                self._frag.clear()
+            self.counters.add(len(payload))
+            if not self._deliver(op, payload):
+                return False
+
+    def _fill(self) -> int:
+        if self._start == self._end:
+            self._start = self._end = 0
+        self._ensure(self._need)
+        n = self.sock.recv_into(self._mv[self._end:])
+        if n == 0 and self._end > self._start:
+            raise EOFError("websocket closed mid-frame")
+        self._end += n
+        return n
+
+    def _control(self, op: int, payload: memoryview) -> None:
+        if op == OP_PING:
+            with self._cond:
+                self._out += _client_frame(OP_PONG, bytes(payload))
+        elif op == OP_CLOSE:
+            self.close_code = _U16.unpack_from(payload)[0] if len(payload) >= 2 else 1005
+            self.close_reason = bytes(payload[2:]).decode("utf-8", "replace")
+            # Answer the close right away; WebSocket.close() later only closes the socket.
+            self.ws.closed = True
+            with self._cond:
+                self._out += _client_frame(OP_CLOSE, bytes(payload[:2]))
+            try:
+                self._flush()
+            except OSError:
+                pass
+            self.mux._detach(self)
+
+    def send(self, data: bytes, *, text: bool = False) -> None:
+        """Send a message on this WebSocket (e.g. serial output); written by the loop thread."""
+        self._send(_client_frame(OP_TEXT if text else OP_BINARY, bytes(data)))
+
+    def stats(self) -> Dict[str, Any]:
+        out = super().stats()
+        if self.closed:
+            out.update({"close_code": self.close_code, "close_reason": self.close_reason})
+        return out
+
+
+class StreamMux:
+    """
+    Serves many TCP/WebSocket streams from one thread. Use start() for a background loop
+    thread, or call poll() from a thread of your own.
+    """
+
+    def __init__(self) -> None:
+        self.channels: List[MuxChannel] = []
+        self.rounds = 0
+        self._sel = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._calls: Deque[Callable[[], None]] = collections.deque()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._closed = False
+
+    # -------- adding streams --------
+    def add_usb(
+        self,
+        stream: Any,
+        on_frame: Optional[FrameCallback] = None,
+        *,
+        name: str = "",
+        max_queued_bytes: int = 16 * 1024 * 1024,
+    ) -> MuxChannel:
+        """
+        Add a TCP data plane: a UsbStream or UvcSession (connected here if needed, closed with
+        the channel) or a connected socket.
+        """
+        if isinstance(stream, socket.socket):
+            sock, reader = stream, FrameReader(stream)
+        else:
+            reader = stream.reader or stream.connect()
+            sock = stream.sock
+            name = name or str(getattr(stream, "stream_id", "") or getattr(stream, "session_id", ""))
+        sock.setblocking(False)
+        ch = _TcpChannel(
+            self, name or f"tcp-{sock.fileno()}", sock, stream, on_frame, max_queued_bytes, reader=reader
+        )
+        return self._add(ch)
+
+    def add_websocket(
+        self,
+        ws: Any,
+        on_message: Optional[FrameCallback] = None,
+        *,
+        name: str = "",
+        max_queued_bytes: int = 16 * 1024 * 1024,
+        buffer_size: int = 256 * 1024,
+    ) -> MuxChannel:
+        """
+        Add a connected WebSocket, or a stream object owning one (SensorStream; connected here
+        if needed, hello read as usual). Its blocking recv() must not be used afterwards.
+        """
+        owner = ws
+        if not hasattr(ws, "sock"):
+            if ws.ws is None:
+                ws.connect()
+            name = name or str(getattr(ws, "url", "")).split("?")[0].rsplit("/", 1)[-1]
+            ws = ws.ws
+        ws.sock.setblocking(False)
+        ch = _WsChannel(
+            self, name or f"ws-{ws.sock.fileno()}", ws.sock, owner, on_message, max_queued_bytes,
+            ws=ws, buffer_size=buffer_size,
+        )
+        return self._add(ch)
+
+    def _add(self, ch: MuxChannel) -> MuxChannel:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("mux is closed")
+            self.channels.append(ch)
+        # Bytes that arrived with the handshake are dispatched without waiting for the socket.
+        self._call(lambda: self._service(ch, read=False))
+        return ch
+
+    # -------- loop --------
+    def _call(self, fn: Callable[[], None]) -> None:
+        """Run `fn` on the loop thread (all selector changes happen there)."""
+        with self._lock:
+            self._calls.append(fn)
+        try:
+            self._wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # a wakeup is already pending
+
+    def _loop_elsewhere(self) -> bool:
+        t = self._thread
+        return t is not None and t.is_alive() and t is not threading.current_thread()
+
+    def _sync(self, ch: MuxChannel) -> None:
+        events = ch._want()
+        if events == ch._events:
+            return
+        if not ch._events:
+            self._sel.register(ch.sock, events, ch)
+        elif not events:
+            self._sel.unregister(ch.sock)
+        else:
+            self._sel.modify(ch.sock, events, ch)
+        ch._events = events
+
+    def _detach(self, ch: MuxChannel, error: Optional[BaseException] = None) -> None:
+        if ch._events:
+            try:
+                self._sel.unregister(ch.sock)
+            except (KeyError, ValueError, OSError):
+                pass
+            ch._events = 0
+        ch._finish(error)
+        ch._detached.set()
+
+    def _service(self, ch: MuxChannel, *, read: bool) -> None:
+        if ch.closed:
+            return
+        try:
+            if ch._drain() and read and not ch.closed:
+                if ch._fill() == 0:
+                    self._detach(ch)
+                    return
+                ch._drain()
+            if ch._out:
+                ch._flush()
+        except BlockingIOError:
+            pass
+        except Exception as ex:  # a failing stream (or callback) must not stop the others
+            self._detach(ch, ex)
+            return
+        if not ch.closed:
+            self._sync(ch)
+
+    def poll(self, timeout: Optional[float] = None) -> int:
+        """One loop round: wait up to `timeout` and serve every ready stream. Returns their count."""
+        served = 0
+        for key, mask in self._sel.select(timeout):
+            ch = key.data
+            if ch is None:
+                try:
+                    while self._wake_r.recv(4096):
+                        pass
+                except BlockingIOError:
+                    pass
+                continue
+            served += 1
+            if mask & selectors.EVENT_WRITE:
+                try:
+                    ch._flush()
+                except BlockingIOError:
+                    pass
+                except OSError as ex:
+                    self._detach(ch, ex)
+                    continue
+                self._sync(ch)
+            if mask & selectors.EVENT_READ:
+                self._service(ch, read=True)
+        while True:
+            with self._lock:
+                if not self._calls:
+                    break
+                fn = self._calls.popleft()
+            fn()
+        self.rounds += 1
+        return served
+
+    def run(self) -> None:
+        """Serve streams on the calling thread until close()."""
+        while not self._stopping.is_set():
+            self.poll(0.5)
+
+    def start(self) -> "StreamMux":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="methings-stream-mux", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop the loop and close every stream."""
+        with self._lock:
+            self._closed = True
+        self._stopping.set()
+        self._call(lambda: None)
+        t, self._thread = self._thread, None
+        if t is not None and t is not threading.current_thread():
+            t.join(timeout=10)
+        for ch in list(self.channels):
+            ch.close()
+        self._sel.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rounds": self.rounds, "channels": [ch.stats() for ch in self.channels]}
+
+    def __enter__(self) -> "StreamMux":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,694 @@
+"""
+Record device traffic once, replay it without the device.
+
+Recorder writes one indexed binary log per session:
+
+- control calls made through `Recorder.client()` (a MethingsClient): method, path, JSON request
+  (binary bodies by length and `X-Methings-*` headers), status, JSON response and elapsed time
+- data-plane messages of streams passed to `Recorder.attach()`: UsbStream and UvcSession frames
+  (the `usb.stream.start` TCP framing) and SensorStream messages (`/ws/sensors`), plus any
+  WebSocket opened with `Recorder.websocket()` (e.g. `/ws/camera/preview` JPEGs)
+
+    with Recorder("session.mtrc") as rec:
+        k = rec.client()
+        with rec.attach(UsbStream(k, handle=h, endpoint_address=0x81)) as st:
+            for ftype, payload in st.frames():
+                ...
+
+ReplayServer (or `python -m methings.replay serve session.mtrc`) serves the log back on a local
+port: control calls are answered with the recorded responses (per action, in recorded order),
+stream start responses point at the server's own data-plane sockets, and frames go out at the
+recorded timing (`speed=1.0`), scaled (`speed=2.0`), or as fast as the client reads (`speed=0`).
+The unmodified client classes connect to it as they would to the device. CaptureLog reads a log
+directly (mmap, zero-copy payload views) for decoder benchmarks without any sockets.
+
+Log layout (little-endian): file header `4s magic "MTR1", u16 version, u16 flags, u64
+start_unix_ns`; records `u8 kind, u8 op, u16 channel, u32 length, u64 t_ns` + payload, with
+`t_ns` relative to the start of the recording and `op` the USB frame type or WebSocket opcode;
+then an index of `u64 offset, u64 t_ns, u16 channel, u8 kind, u8 op` per record and a trailer
+`u64 index_offset, u32 count, 4s "MTRX"`. A log without trailer (recorder killed) is still
+readable; its index is rebuilt by scanning.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .client import MethingsClient, _metric_name
+from .standin import _WS_GUID, _ws_frame
+from .ws import OP_BINARY, OP_CLOSE, OP_TEXT, WebSocket, WebSocketClosed
+
+MAGIC = b"MTR1"
+TRAILER_MAGIC = b"MTRX"
+VERSION = 1
+
+KIND_CONTROL = 1
+KIND_CHANNEL = 2
+KIND_DATA = 3
+
+_FILE_HEADER = struct.Struct("<4sHHQ")
+_RECORD = struct.Struct("<BBHIQ")
+_INDEX_ENTRY = struct.Struct("<QQHBB")
+_TRAILER = struct.Struct("<QI4s")
+_USB_HEADER = struct.Struct("<BI")
+
+
+class CaptureFormatError(ValueError):
+    pass
+
+
+# -------- recording --------
+class Recorder:
+    """Thread-safe writer of one capture log; see the module docstring."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._f = open(path, "wb", buffering=1024 * 1024)
+        self._f.write(_FILE_HEADER.pack(MAGIC, VERSION, 0, time.time_ns()))
+        self._offset = _FILE_HEADER.size
+        self._index = bytearray()
+        self._count = 0
+        self._t0 = time.perf_counter_ns()
+        self._channels = 0
+        self.closed = False
+
+    def now_ns(self) -> int:
+        return time.perf_counter_ns() - self._t0
+
+    def write(self, kind: int, op: int, channel: int, payload: Any, t_ns: Optional[int] = None) -> None:
+        t = self.now_ns() if t_ns is None else t_ns
+        n = len(payload)
+        with self._lock:
+            if self.closed:
+                return
+            self._f.write(_RECORD.pack(kind, op, channel, n, t))
+            self._f.write(payload)
+            self._index += _INDEX_ENTRY.pack(self._offset, t, channel, kind, op)
+            self._offset += _RECORD.size + n
+            self._count += 1
+
+    def control(self, entry: Dict[str, Any], t_ns: int) -> None:
+        self.write(KIND_CONTROL, 0, 0, json.dumps(entry, separators=(",", ":"), default=str).encode("utf-8"), t_ns)
+
+    def open_channel(self, info: Dict[str, Any]) -> int:
+        """Register a data-plane channel (`type` "tcp" or "ws" plus identifying fields); returns its number."""
+        with self._lock:
+            self._channels += 1
+            ch = self._channels
+        self.write(KIND_CHANNEL, 0, ch, json.dumps(dict(info, channel=ch)).encode("utf-8"))
+        return ch
+
+    def client(self, base_url: str = "http://127.0.0.1:33389", **kwargs: Any) -> "RecordingClient":
+        return RecordingClient(self, base_url, **kwargs)
+
+    def attach(self, stream: Any) -> Any:
+        """
+        Record the data plane of a UsbStream, UvcSession or SensorStream (connected now or later)
+        and return it. Its control calls are recorded when it uses a RecordingClient.
+        """
+        connect = stream.connect
+
+        def tapped_connect(*args: Any, **kwargs: Any) -> Any:
+            out = connect(*args, **kwargs)
+            self._tap(stream)
+            return out
+
+        stream.connect = tapped_connect
+        if getattr(stream, "reader", None) is not None or getattr(stream, "ws", None) is not None:
+            self._tap(stream)
+        return stream
+
+    def _tap(self, stream: Any) -> None:
+        if getattr(stream, "reader", None) is not None and not isinstance(stream.reader, _TappedFrameReader):
+            info = {
+                "type": "tcp",
+                "source": type(stream).__name__,
+                "id": getattr(stream, "stream_id", "") or getattr(stream, "session_id", ""),
+                "info": getattr(stream, "info", {}),
+            }
+            stream.reader = _TappedFrameReader(stream.reader, self, self.open_channel(info))
+        elif getattr(stream, "ws", None) is not None and not isinstance(stream.ws, _TappedWebSocket):
+            # SensorStream reads its hello inside connect(); it is kept with the channel and sent
+            # once before the recorded messages on replay.
+            info = {"type": "ws", "source": type(stream).__name__, "url": stream.url}
+            if getattr(stream, "hello", None):
+                info["hello"] = stream.hello
+            stream.ws = _TappedWebSocket(stream.ws, self, self.open_channel(info))
+
+    def websocket(self, url: str, **kwargs: Any) -> "_TappedWebSocket":
+        """WebSocket.connect(url) with every received message recorded."""
+        ws = WebSocket.connect(url, **kwargs)
+        return _TappedWebSocket(ws, self, self.open_channel({"type": "ws", "source": "WebSocket", "url": url}))
+
+    def close(self) -> None:
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._f.write(self._index)
+            self._f.write(_TRAILER.pack(self._offset, self._count, TRAILER_MAGIC))
+            self._f.close()
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class RecordingClient(MethingsClient):
+    """MethingsClient that records every request it sends (cache hits are not requests)."""
+
+    def __init__(self, recorder: Recorder, base_url: str = "http://127.0.0.1:33389", **kwargs: Any):
+        super().__init__(base_url, **kwargs)
+        self.recorder = recorder
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        data: Any,
+        headers: Dict[str, str],
+        timeout_s: float,
+        timing: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        t_ns = self.recorder.now_ns()
+        t0 = time.perf_counter()
+        r = super()._send(method, path, data, headers, timeout_s, timing)
+        elapsed = time.perf_counter() - t0
+        entry: Dict[str, Any] = {"method": method, "path": path, "elapsed_s": round(elapsed, 6)}
+        if data is not None and "json" in headers.get("Content-Type", ""):
+            entry["request"] = json.loads(bytes(data))
+        elif data is not None:
+            entry["request_bytes"] = len(data)
+            entry["headers"] = {k: v for k, v in headers.items() if k.startswith("X-Methings-")}
+        entry["status"] = r.get("status", 0)
+        entry["response"] = r.get("json")
+        if r.get("error"):
+            entry["error"] = r["error"]
+        self.recorder.control(entry, t_ns)
+        return r
+
+
+class _TappedFrameReader:
+    """FrameReader proxy that records each frame it returns."""
+
+    def __init__(self, reader: Any, recorder: Recorder, channel: int):
+        self._reader = reader
+        self._rec = recorder
+        self.channel = channel
+
+    def read_frame(self) -> Optional[Tuple[int, memoryview]]:
+        fr = self._reader.read_frame()
+        if fr is not None:
+            self._rec.write(KIND_DATA, fr[0], self.channel, fr[1])
+        return fr
+
+    def buffered_frame(self) -> Optional[Tuple[int, memoryview]]:
+        fr = self._reader.buffered_frame()
+        if fr is not None:
+            self._rec.write(KIND_DATA, fr[0], self.channel, fr[1])
+        return fr
+
+    def __iter__(self) -> Iterator[Tuple[int, memoryview]]:
+        while True:
+            frame = self.read_frame()
+            if frame is None:
+                return
+            yield frame
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._reader, name)
+
+
+class _TappedWebSocket:
+    """WebSocket proxy that records each received message."""
+
+    def __init__(self, ws: WebSocket, recorder: Recorder, channel: int):
+        self._ws = ws
+        self._rec = recorder
+        self.channel = channel
+
+    def recv(self) -> Tuple[int, bytes]:
+        op, data = self._ws.recv()
+        self._rec.write(KIND_DATA, op, self.channel, data)
+        return op, data
+
+    def recv_into(self, buf: bytearray) -> Tuple[int, int]:
+        op, n = self._ws.recv_into(buf)
+        with memoryview(buf) as mv:
+            self._rec.write(KIND_DATA, op, self.channel, mv[:n])
+        return op, n
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        while True:
+            try:
+                yield self.recv()
+            except WebSocketClosed:
+                return
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._ws, name)
+
+    def __enter__(self) -> "_TappedWebSocket":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._ws.close()
+
+
+# -------- reading --------
+class Record(NamedTuple):
+    offset: int
+    t_ns: int
+    channel: int
+    kind: int
+    op: int
+
+
+class CaptureLog:
+    """
+    Read-only view of a capture log. Payloads are memoryviews into an mmap of the file, valid
+    until close().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        if size < _FILE_HEADER.size:
+            self._f.close()
+            raise CaptureFormatError("capture_truncated_header")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mv = memoryview(self._mm)
+        magic, version, _flags, self.start_unix_ns = _FILE_HEADER.unpack_from(self._mv, 0)
+        if magic != MAGIC or version > VERSION:
+            self.close()
+            raise CaptureFormatError("capture_bad_magic")
+        self.complete = False
+        self._index: Any = None
+        if size >= _FILE_HEADER.size + _TRAILER.size:
+            index_off, count, tmagic = _TRAILER.unpack_from(self._mv, size - _TRAILER.size)
+            if tmagic == TRAILER_MAGIC and index_off + count * _INDEX_ENTRY.size == size - _TRAILER.size:
+                self._index = self._mv[index_off:index_off + count * _INDEX_ENTRY.size]
+                self.complete = True
+        if self._index is None:
+            self._index = self._scan(size)
+        self.channels: Dict[int, Dict[str, Any]] = {}
+        for rec in self.records(kind=KIND_CHANNEL):
+            self.channels[rec.channel] = json.loads(bytes(self.payload(rec)))
+
+    def _scan(self, size: int) -> bytearray:
+        index = bytearray()
+        off = _FILE_HEADER.size
+        while off + _RECORD.size <= size:
+            kind, op, ch, n, t = _RECORD.unpack_from(self._mv, off)
+            if kind not in (KIND_CONTROL, KIND_CHANNEL, KIND_DATA) or off + _RECORD.size + n > size:
+                break
+            index += _INDEX_ENTRY.pack(off, t, ch, kind, op)
+            off += _RECORD.size + n
+        return index
+
+    def __len__(self) -> int:
+        return len(self._index) // _INDEX_ENTRY.size
+
+    def records(self, *, kind: Optional[int] = None, channel: Optional[int] = None) -> Iterator[Record]:
+        for entry in _INDEX_ENTRY.iter_unpack(self._index):
+            if (kind is None or entry[3] == kind) and (channel is None or entry[2] == channel):
+                yield Record(*entry)
+
+    def payload(self, rec: Record) -> memoryview:
+        n = _RECORD.unpack_from(self._mv, rec.offset)[3]
+        begin = rec.offset + _RECORD.size
+        return self._mv[begin:begin + n]
+
+    def controls(self) -> Iterator[Dict[str, Any]]:
+        """Recorded control calls in order, each with its start time as `t_ns`."""
+        for rec in self.records(kind=KIND_CONTROL):
+            entry = json.loads(bytes(self.payload(rec)))
+            entry["t_ns"] = rec.t_ns
+            yield entry
+
+    def frames(self, channel: int) -> Iterator[Tuple[int, int, memoryview]]:
+        """`(t_ns, op, payload)` per data message of one channel, in recorded order."""
+        for rec in self.records(kind=KIND_DATA, channel=channel):
+            yield rec.t_ns, rec.op, self.payload(rec)
+
+    def summary(self) -> Dict[str, Any]:
+        controls: Dict[str, int] = {}
+        for entry in self.controls():
+            name = _metric_name(entry["method"], entry["path"], entry.get("request"))
+            controls[name] = controls.get(name, 0) + 1
+        chans: Dict[int, Dict[str, Any]] = {ch: {"frames": 0, "bytes": 0, "first_ns": None, "last_ns": 0}
+                                            for ch in self.channels}
+        end = 0
+        for rec in self.records():
+            end = max(end, rec.t_ns)
+            if rec.kind != KIND_DATA or rec.channel not in chans:
+                continue
+            c = chans[rec.channel]
+            c["frames"] += 1
+            c["bytes"] += len(self.payload(rec))
+            if c["first_ns"] is None:
+                c["first_ns"] = rec.t_ns
+            c["last_ns"] = rec.t_ns
+        channels = []
+        for ch, c in chans.items():
+            info = self.channels[ch]
+            span = (c["last_ns"] - (c["first_ns"] or 0)) / 1e9
+            channels.append({
+                "channel": ch,
+                "type": info.get("type"),
+                "source": info.get("source"),
+                "target": info.get("id") or urllib.parse.urlsplit(info.get("url", "")).path,
+                "frames": c["frames"],
+                "bytes": c["bytes"],
+                "duration_s": span,
+                "frames_per_s": c["frames"] / span if span > 0 else 0.0,
+            })
+        return {
+            "path": self.path,
+            "complete": self.complete,
+            "records": len(self),
+            "duration_s": end / 1e9,
+            "controls": controls,
+            "channels": channels,
+        }
+
+    def close(self) -> None:
+        self._index = b""
+        self._mv.release()
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # payload views are still held; the mapping goes away with the last of them
+        self._f.close()
+
+    def __enter__(self) -> "CaptureLog":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+# -------- replay --------
+class _Pacer:
+    """Schedules message `t_ns` at its recorded offset divided by `speed` (0: everything is due now)."""
+
+    def __init__(self, speed: float):
+        self.speed = speed
+        self.base: Optional[int] = None
+        self.start = 0.0
+
+    def ahead(self, t_ns: int) -> float:
+        """Seconds until `t_ns` is due (<= 0 when it is)."""
+        if self.speed <= 0:
+            return 0.0
+        if self.base is None:
+            self.base, self.start = t_ns, time.perf_counter()
+        return self.start + (t_ns - self.base) / 1e9 / self.speed - time.perf_counter()
+
+    def due(self, t_ns: int) -> None:
+        delay = self.ahead(t_ns)
+        if delay > 0:
+            time.sleep(delay)
+
+    def rebase(self, end_ns: int) -> None:
+        """Start another pass: its first message is due when the previous pass ended (`end_ns`)."""
+        if self.base is not None and self.speed > 0:
+            self.start += (end_ns - self.base) / 1e9 / self.speed
+
+
+def _channel_end(log: CaptureLog, channel: int) -> int:
+    last = 0
+    for rec in log.records(kind=KIND_DATA, channel=channel):
+        last = rec.t_ns
+    return last
+
+
+class _TcpChannel:
+    """Replays one recorded `usb.stream.start` / `uvc.mjpeg.session.start` data plane."""
+
+    def __init__(self, log: CaptureLog, channel: int, cfg: Dict[str, Any]):
+        self.log = log
+        self.channel = channel
+        self.cfg = cfg
+        self.srv = socket.socket()
+        self.srv.bind((cfg["host"], 0))
+        self.srv.listen(1)
+        self.port = self.srv.getsockname()[1]
+        threading.Thread(target=self._run, name=f"replay-tcp-{channel}", daemon=True).start()
+
+    def _run(self) -> None:
+        self.srv.settimeout(60.0)
+        try:
+            conn, _ = self.srv.accept()
+        except OSError:
+            return
+        finally:
+            self.srv.close()
+        pacer = _Pacer(self.cfg["speed"])
+        end = _channel_end(self.log, self.channel)
+        buf = bytearray()
+        with conn:
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1024 * 1024)
+            try:
+                for n in range(self.cfg["loops"]):
+                    if n:
+                        pacer.rebase(end)
+                    for t_ns, op, payload in self.log.frames(self.channel):
+                        # Coalesce as-fast-as-possible frames; paced ones go out when due.
+                        if buf and (len(buf) >= 256 * 1024 or pacer.ahead(t_ns) > 0):
+                            conn.sendall(buf)
+                            buf.clear()
+                        pacer.due(t_ns)
+                        buf += _USB_HEADER.pack(op, len(payload))
+                        buf += payload
+                if buf:
+                    conn.sendall(buf)
+            except OSError:
+                pass
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    log: Optional[CaptureLog] = None
+    cfg: Dict[str, Any] = {}
+    lock = threading.Lock()
+    # (method, name) -> recorded calls and the position of the next one
+    calls: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    cursor: Dict[Tuple[str, str], int] = {}
+    tcp: Dict[str, int] = {}  # stream/session id -> channel
+    ws: Dict[str, List[int]] = {}  # path -> channels
+    ws_next: Dict[str, int] = {}
+
+    @classmethod
+    def load(cls, log: CaptureLog, cfg: Dict[str, Any]) -> None:
+        cls.log, cls.cfg = log, cfg
+        for entry in log.controls():
+            key = (entry["method"], _metric_name(entry["method"], entry["path"], entry.get("request")))
+            cls.calls.setdefault(key, []).append(entry)
+        for ch, info in log.channels.items():
+            if info.get("type") == "tcp" and info.get("id"):
+                cls.tcp[str(info["id"])] = ch
+            elif info.get("type") == "ws":
+                cls.ws.setdefault(urllib.parse.urlsplit(info.get("url", "")).path, []).append(ch)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+    def _reply(self, obj: Any, t0: float, code: int = 200) -> None:
+        out = json.dumps(obj).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.send_header("Server-Timing", f"app;dur={(time.perf_counter() - t0) * 1000:.2f}")
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _next_call(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        cls = _ReplayHandler
+        with cls.lock:
+            calls = cls.calls.get(key)
+            if not calls:
+                return None
+            i = cls.cursor.get(key, 0)
+            # Past the end, keep answering with the last recorded response.
+            cls.cursor[key] = i + 1
+            return calls[min(i, len(calls) - 1)]
+
+    def _control(self, method: str, body: Any) -> None:
+        t0 = time.perf_counter()
+        name = _metric_name(method, self.path, body)
+        call = self._next_call((method, name))
+        if call is None:
+            return self._reply({"status": "error", "error": "not_recorded", "call": name}, t0, 404)
+        speed = _ReplayHandler.cfg["speed"]
+        if speed > 0:
+            time.sleep(max(0.0, float(call.get("elapsed_s") or 0.0) / speed))
+        resp = call.get("response")
+        status = int(call.get("status") or 0)
+        if not status:
+            return self._reply({"status": "error", "error": call.get("error") or "recorded_transport_error"}, t0, 502)
+        if isinstance(resp, dict) and resp.get("tcp_port"):
+            ch = _ReplayHandler.tcp.get(str(resp.get("stream_id") or resp.get("session_id") or ""))
+            if ch is not None:
+                resp = dict(resp, tcp_host=_ReplayHandler.cfg["host"],
+                            tcp_port=_TcpChannel(_ReplayHandler.log, ch, _ReplayHandler.cfg).port)
+        self._reply(resp if resp is not None else {}, t0, status)
+
+    def do_POST(self) -> None:
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n)
+        body = None
+        if "json" in (self.headers.get("Content-Type") or ""):
+            try:
+                body = json.loads(raw or b"{}")
+            except ValueError:
+                body = None
+        self._control("POST", body)
+
+    def do_GET(self) -> None:
+        path = urllib.parse.urlsplit(self.path).path
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            return self._websocket(path)
+        self._control("GET", None)
+
+    def _websocket(self, path: str) -> None:
+        cls = _ReplayHandler
+        with cls.lock:
+            chans = cls.ws.get(path) or []
+            i = cls.ws_next.get(path, 0)
+            cls.ws_next[path] = i + 1
+        if not chans:
+            return self._reply({"status": "error", "error": "not_recorded", "call": f"GET {path}"}, time.perf_counter(), 404)
+        ch = chans[i % len(chans)]
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        self.close_connection = True
+        sock = self.connection
+        log = cls.log
+        assert log is not None
+        pacer = _Pacer(cls.cfg["speed"])
+        end = _channel_end(log, ch)
+        try:
+            sock.sendall(
+                f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1")
+            )
+            hello = log.channels[ch].get("hello")
+            if hello is not None:
+                sock.sendall(_ws_frame(OP_TEXT, json.dumps(hello).encode("utf-8")))
+            for n in range(cls.cfg["loops"]):
+                if n:
+                    pacer.rebase(end)
+                for t_ns, op, payload in log.frames(ch):
+                    pacer.due(t_ns)
+                    sock.sendall(_ws_frame(op if op in (OP_TEXT, OP_BINARY) else OP_BINARY, bytes(payload)))
+            sock.sendall(_ws_frame(OP_CLOSE, struct.pack("!H", 1000)))
+        except OSError:
+            pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def _serve(port_q: Any, path: str, cfg: Dict[str, Any]) -> None:
+    _ReplayHandler.load(CaptureLog(path), cfg)
+    srv = _Server((cfg["host"], int(cfg.get("port") or 0)), _ReplayHandler)
+    if port_q is not None:
+        port_q.put(srv.server_address[1])
+    srv.serve_forever()
+
+
+class ReplayServer:
+    """
+    Serves a capture log from a child process (so it does not compete with the client under test
+    for the GIL); `base_url` is valid between start() and stop(). `speed=0` sends data as fast as
+    the client reads it and answers control calls immediately; `loops` repeats each stream.
+    """
+
+    def __init__(self, path: str, *, speed: float = 1.0, loops: int = 1, host: str = "127.0.0.1"):
+        self.path = path
+        self.config: Dict[str, Any] = {"speed": max(0.0, float(speed)), "loops": max(1, int(loops)), "host": host}
+        self.base_url = ""
+        self._proc: Optional[multiprocessing.Process] = None
+
+    def start(self) -> str:
+        CaptureLog(self.path).close()  # fail here, not in the child, on a bad file
+        q: Any = multiprocessing.Queue()
+        self._proc = multiprocessing.Process(target=_serve, args=(q, self.path, dict(self.config)), daemon=True)
+        self._proc.start()
+        self.base_url = f"http://{self.config['host']}:{q.get(timeout=10)}"
+        return self.base_url
+
+    def stop(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None:
+            proc.terminate()
+            proc.join(5)
+        self.base_url = ""
+
+    def __enter__(self) -> "ReplayServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m methings.replay", description="Inspect or serve a capture log.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_info = sub.add_parser("info", help="summarize a capture log")
+    p_info.add_argument("path")
+    p_info.add_argument("--json", action="store_true")
+    p_serve = sub.add_parser("serve", help="serve a capture log like the device would")
+    p_serve.add_argument("path")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=33389)
+    p_serve.add_argument("--speed", type=float, default=1.0, help="1 = recorded timing, 0 = as fast as possible")
+    p_serve.add_argument("--loops", type=int, default=1, help="times each stream is replayed")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "info":
+        with CaptureLog(args.path) as log:
+            s = log.summary()
+        if args.json:
+            print(json.dumps(s, indent=2))
+            return 0
+        state = "complete" if s["complete"] else "no index (recovered by scan)"
+        print(f"{s['path']}: {s['records']} records over {s['duration_s']:.2f} s, {state}")
+        for name, n in sorted(s["controls"].items(), key=lambda kv: -kv[1]):
+            print(f"  control  {name:<40} x{n}")
+        for c in s["channels"]:
+            print(f"  channel {c['channel']:<2} {c['type']:<3} {str(c['source']):<13} {str(c['target']):<24} "
+                  f"{c['frames']:>8} msgs {c['bytes'] / 1e6:>9.2f} MB {c['frames_per_s']:>9.1f}/s")
+        return 0
+
+    cfg = {"speed": max(0.0, args.speed), "loops": max(1, args.loops), "host": args.host, "port": args.port}
+    print(f"replaying {args.path} on http://{args.host}:{args.port} (speed {cfg['speed']:g}, loops {cfg['loops']})", flush=True)
+    try:
+        _serve(None, args.path, cfg)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""
+Windowed feature extraction over `/ws/sensors` batches (see methings.sensors).
+
+WindowAggregator keeps one preallocated ring buffer of `window` samples per sensor, so memory
+stays bounded no matter how long the stream runs. Every `hop` samples (hop == window: fixed
+windows, hop < window: sliding windows) it computes, per sensor:
+
+- `mean`, `rms`, `min`, `max`: one value per axis
+- `magnitude_mean`, `magnitude_rms`, `magnitude_max`: over the per-sample vector norm
+- `band_energy`: optional FFT band energies of the (mean-removed, Hann-windowed) magnitude,
+  for `bands=[(lo_hz, hi_hz), ...]`; `window` must then be a power of two
+
+Features are computed with NumPy when it is installed, otherwise with `array`/`math` over the
+ring buffer. Gaps in the stream-wide `seq` (e.g. samples dropped by `backpressure=drop_old`)
+are counted and reported as `drop_rate` by stats(); windows assume uniform sampling.
+"""
+import array
+import cmath
+import math
+import operator
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .sensors import SensorBatch
+
+try:
+    import numpy as _np
+except ImportError:  # NumPy is optional; the array/math path is used without it.
+    _np = None
+
+
+class WindowResult(NamedTuple):
+    sensor: str
+    t_start_ns: int
+    t_end_ns: int
+    count: int
+    features: Dict[str, Any]
+
+
+class SeqGapTracker:
+    """Counts samples missing from a stream-wide `seq` sequence (order within a message may vary)."""
+
+    def __init__(self) -> None:
+        self.first = -1
+        self.last = -1
+        self.received = 0
+
+    def update(self, seqs: Sequence[int]) -> None:
+        if not len(seqs):
+            return
+        lo = int(min(seqs))
+        hi = int(max(seqs))
+        if self.first < 0 or lo < self.first:
+            self.first = lo
+        if hi > self.last:
+            self.last = hi
+        self.received += len(seqs)
+
+    @property
+    def expected(self) -> int:
+        return self.last - self.first + 1 if self.first >= 0 else 0
+
+    @property
+    def dropped(self) -> int:
+        return max(0, self.expected - self.received)
+
+    @property
+    def drop_rate(self) -> float:
+        return self.dropped / self.expected if self.expected else 0.0
+
+
+def _fft(x: List[complex]) -> List[complex]:
+    # Iterative radix-2 FFT; len(x) must be a power of two.
+    n = len(x)
+    a = list(x)
+    j = 0
+    for i in range(1, n):
+        bit = n >> 1
+        while j & bit:
+            j ^= bit
+            bit >>= 1
+        j |= bit
+        if i < j:
+            a[i], a[j] = a[j], a[i]
+    size = 2
+    while size <= n:
+        w = cmath.exp(-2j * math.pi / size)
+        half = size // 2
+        for start in range(0, n, size):
+            wk = 1 + 0j
+            for k in range(start, start + half):
+                u = a[k]
+                v = a[k + half] * wk
+                a[k] = u + v
+                a[k + half] = u - v
+                wk *= w
+        size *= 2
+    return a
+
+
+class _Ring:
+    def __init__(self, window: int, dims: int, use_numpy: bool):
+        self.window = window
+        self.dims = dims
+        self.use_numpy = use_numpy
+        if use_numpy:
+            self.values = _np.zeros((window, dims), dtype=_np.float64)
+            self.t = _np.zeros(window, dtype=_np.int64)
+        else:
+            self.values = array.array("f", bytes(4 * window * dims))
+            self.t = array.array("q", bytes(8 * window))
+        self.pos = 0
+        self.filled = 0
+        self.until_emit = window
+
+    def put(self, t: Any, values: Any, start: int, n: int) -> None:
+        p = self.pos
+        if self.use_numpy:
+            self.t[p:p + n] = t[start:start + n]
+            self.values[p:p + n] = values[start:start + n]
+        else:
+            d = self.dims
+            self.t[p:p + n] = t[start:start + n]
+            self.values[p * d:(p + n) * d] = values[start * d:(start + n) * d]
+        self.pos = (p + n) % self.window
+        self.filled = min(self.window, self.filled + n)
+
+    def ordered_t(self) -> Tuple[int, int]:
+        oldest = self.t[self.pos % self.window]
+        newest = self.t[(self.pos - 1) % self.window]
+        return int(oldest), int(newest)
+
+
+class WindowAggregator:
+    """
+    Per-sensor fixed or sliding windows with vectorized features.
+
+        agg = WindowAggregator(window=1024, hop=512, bands=[(0, 50), (50, 200)])
+        with SensorStream(sensors="a,g", rate_hz=1000) as st:
+            for result in agg.run(st):
+                print(result.sensor, result.features["rms"], agg.stats()["drop_rate"])
+    """
+
+    def __init__(
+        self,
+        window: int = 1024,
+        hop: Optional[int] = None,
+        *,
+        bands: Optional[Iterable[Tuple[float, float]]] = None,
+        rate_hz: Optional[float] = None,
+        sensors: Optional[Iterable[str]] = None,
+        use_numpy: Optional[bool] = None,
+    ):
+        self.window = int(window)
+        self.hop = int(hop) if hop else self.window
+        if self.window < 2 or not 1 <= self.hop <= self.window:
+            raise ValueError("window must be >= 2 and 1 <= hop <= window")
+        self.bands = [(float(lo), float(hi)) for lo, hi in (bands or [])]
+        if self.bands and self.window & (self.window - 1):
+            raise ValueError("window must be a power of two when bands are requested")
+        self.rate_hz = float(rate_hz) if rate_hz else None
+        self.only = set(sensors) if sensors else None
+        if use_numpy is None:
+            use_numpy = _np is not None
+        if use_numpy and _np is None:
+            raise RuntimeError("numpy is not installed")
+        self.use_numpy = bool(use_numpy)
+        self.gaps = SeqGapTracker()
+        self.samples = 0
+        self.windows = 0
+        self.server_dropped = 0
+        self._rings: Dict[str, _Ring] = {}
+        self._hann: Any = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "windows": self.windows,
+            "expected": self.gaps.expected,
+            "dropped": self.gaps.dropped,
+            "drop_rate": self.gaps.drop_rate,
+            "server_dropped": self.server_dropped,
+        }
+
+    def feed(self, batch: SensorBatch) -> List[WindowResult]:
+        """Add one batch; returns the windows it completed."""
+        self.gaps.update(batch.seq)
+        n = batch.count
+        if not n or (self.only is not None and batch.sensor not in self.only):
+            return []
+        self.samples += n
+        ring = self._rings.get(batch.sensor)
+        if ring is None or ring.dims != batch.dims:
+            ring = self._rings[batch.sensor] = _Ring(self.window, batch.dims, self.use_numpy)
+        t_ns, values = batch.t_ns, batch.values
+        if self.use_numpy:
+            values = _np.asarray(values, dtype=_np.float64).reshape(n, batch.dims)
+        elif not isinstance(values, array.array):
+            # NumPy batch fed to the array path.
+            t_ns = array.array("q", _np.asarray(t_ns, dtype="=i8").tobytes())
+            values = array.array("f", _np.asarray(values, dtype="=f4").tobytes())
+        out: List[WindowResult] = []
+        i = 0
+        while i < n:
+            take = min(n - i, ring.until_emit, self.window - ring.pos)
+            ring.put(t_ns, values, i, take)
+            ring.until_emit -= take
+            i += take
+            if ring.until_emit == 0:
+                ring.until_emit = self.hop
+                if ring.filled == self.window:
+                    out.append(self._result(batch.sensor, ring))
+        return out
+
+    def run(self, stream: Any) -> Iterator[WindowResult]:
+        """Aggregate a SensorStream (or any iterable of SensorBatch) and yield window results."""
+        batches = stream.batches() if hasattr(stream, "batches") else stream
+        for batch in batches:
+            yield from self.feed(batch)
+            dropped = getattr(stream, "dropped", None)
+            if dropped is not None:
+                self.server_dropped = dropped
+
+    def _rate(self, t0: int, t1: int) -> float:
+        if self.rate_hz:
+            return self.rate_hz
+        span = (t1 - t0) / 1e9
+        return (self.window - 1) / span if span > 0 else 0.0
+
+    def _result(self, sensor: str, ring: _Ring) -> WindowResult:
+        self.windows += 1
+        t0, t1 = ring.ordered_t()
+        if self.use_numpy:
+            features = self._features_numpy(ring, t0, t1)
+        else:
+            features = self._features_array(ring, t0, t1)
+        return WindowResult(sensor, t0, t1, self.window, features)
+
+    def _band_energy(self, mags: Any, t0: int, t1: int) -> Dict[str, float]:
+        rate = self._rate(t0, t1)
+        n = self.window
+        out: Dict[str, float] = {}
+        if self.use_numpy:
+            if self._hann is None:
+                self._hann = _np.hanning(n)
+            spec = _np.abs(_np.fft.rfft((mags - mags.mean()) * self._hann)) ** 2 / n
+            freqs = _np.fft.rfftfreq(n, d=1.0 / rate) if rate > 0 else _np.zeros(len(spec))
+            for lo, hi in self.bands:
+                out[f"{lo:g}-{hi:g}"] = float(spec[(freqs >= lo) & (freqs < hi)].sum())
+            return out
+        if self._hann is None:
+            self._hann = [0.5 - 0.5 * math.cos(2 * math.pi * k / (n - 1)) for k in range(n)]
+        mean = math.fsum(mags) / n
+        spec = _fft([complex((m - mean) * h) for m, h in zip(mags, self._hann)])
+        step = rate / n if rate > 0 else 0.0
+        power = [abs(c) ** 2 / n for c in spec[: n // 2 + 1]]
+        for lo, hi in self.bands:
+            out[f"{lo:g}-{hi:g}"] = math.fsum(p for k, p in enumerate(power) if lo <= k * step < hi)
+        return out
+
+    def _features_numpy(self, ring: _Ring, t0: int, t1: int) -> Dict[str, Any]:
+        w = ring.values
+        mags = _np.sqrt(_np.einsum("ij,ij->i", w, w))
+        features: Dict[str, Any] = {
+            "mean": w.mean(axis=0).tolist(),
+            "rms": _np.sqrt((w * w).mean(axis=0)).tolist(),
+            "min": w.min(axis=0).tolist(),
+            "max": w.max(axis=0).tolist(),
+            "magnitude_mean": float(mags.mean()),
+            "magnitude_rms": float(_np.sqrt((mags * mags).mean())),
+            "magnitude_max": float(mags.max()),
+        }
+        if self.bands:
+            p = ring.pos
+            ordered = _np.concatenate((mags[p:], mags[:p])) if p else mags
+            features["band_energy"] = self._band_energy(ordered, t0, t1)
+        return features
+
+    def _features_array(self, ring: _Ring, t0: int, t1: int) -> Dict[str, Any]:
+        n = self.window
+        d = ring.dims
+        cols = [ring.values[k::d] for k in range(d)]
+        sq = [math.fsum(map(operator.mul, c, c)) for c in cols]
+        mags = list(map(math.hypot, *cols)) if d else []
+        mag_sq = math.fsum(map(operator.mul, mags, mags))
+        features: Dict[str, Any] = {
+            "mean": [math.fsum(c) / n for c in cols],
+            "rms": [math.sqrt(s / n) for s in sq],
+            "min": [min(c) for c in cols],
+            "max": [max(c) for c in cols],
+            "magnitude_mean": math.fsum(mags) / n if mags else 0.0,
+            "magnitude_rms": math.sqrt(mag_sq / n),
+            "magnitude_max": max(mags) if mags else 0.0,
+        }
+        if self.bands:
+            p = ring.pos
+            features["band_energy"] = self._band_energy(mags[p:] + mags[:p], t0, t1)
+        return features
@@ -0,0 +1,213 @@
+"""
+Consumer for the `/ws/sensors` realtime stream (see user/docs/api/sensors.md).
+
+With `format=packed` the server batches samples for `batch_ms` and sends one binary message per
+window with, per sensor, packed columns (little-endian):
+
+    header (16 bytes): u32 magic "SPK1", u16 block_count, u16 flags (bit0: unix timestamps),
+                       u32 dropped, u32 reserved
+    per sensor block:  u8 sensor_index, u8 dims, u16 reserved, u32 count,
+                       i64[count] t_ns, u32[count] seq, f32[count * dims] values,
+                       zero padding to a multiple of 8 bytes
+
+`sensor_index` refers to `packed_sensors` in the hello message. decode_packed() turns each block
+into `array` columns (or NumPy arrays when available) without per-sample Python objects.
+"""
+import array
+import json
+import struct
+import sys
+import urllib.parse
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from .ws import OP_TEXT, WebSocket
+
+try:
+    import numpy as _np
+except ImportError:  # NumPy is optional; array columns are used without it.
+    _np = None
+
+
+PACKED_MAGIC = 0x314B5053  # "SPK1"
+FLAG_UNIX_TIME = 0x1
+
+_HEADER = struct.Struct("<IHHII")
+_BLOCK = struct.Struct("<BBHI")
+_LITTLE = sys.byteorder == "little"
+
+
+class SensorBatch(NamedTuple):
+    """
+    Samples of one sensor. `t_ns`, `seq` are 1-D columns; `values` is flat (`count * dims`,
+    sample-major) for `array`, or shaped `(count, dims)` for NumPy.
+    """
+
+    sensor: str
+    t_ns: Any
+    seq: Any
+    values: Any
+    dims: int
+
+    @property
+    def count(self) -> int:
+        return len(self.t_ns)
+
+
+class PackedFormatError(ValueError):
+    pass
+
+
+def _column(typecode: str, mv: memoryview) -> array.array:
+    col = array.array(typecode)
+    col.frombytes(mv)
+    if not _LITTLE:
+        col.byteswap()
+    return col
+
+
+def decode_packed(msg: Any, sensors: Sequence[str], *, use_numpy: Optional[bool] = None) -> List[SensorBatch]:
+    """Decode one packed message; `sensors` is the hello message's `packed_sensors` list."""
+    mv = msg if isinstance(msg, memoryview) else memoryview(msg)
+    if len(mv) < _HEADER.size:
+        raise PackedFormatError("packed_truncated_header")
+    magic, blocks, _flags, _dropped, _ = _HEADER.unpack_from(mv, 0)
+    if magic != PACKED_MAGIC:
+        raise PackedFormatError("packed_bad_magic")
+    if use_numpy is None:
+        use_numpy = _np is not None
+    if use_numpy and _np is None:
+        raise RuntimeError("numpy is not installed")
+    out: List[SensorBatch] = []
+    off = _HEADER.size
+    for _ in range(blocks):
+        if off + _BLOCK.size > len(mv):
+            raise PackedFormatError("packed_truncated_block")
+        index, dims, _, n = _BLOCK.unpack_from(mv, off)
+        t_off = off + _BLOCK.size
+        seq_off = t_off + 8 * n
+        v_off = seq_off + 4 * n
+        end = v_off + 4 * n * dims
+        if end > len(mv):
+            raise PackedFormatError("packed_truncated_block")
+        name = sensors[index] if index < len(sensors) else str(index)
+        if use_numpy:
+            t = _np.frombuffer(mv[t_off:seq_off], dtype="<i8")
+            seq = _np.frombuffer(mv[seq_off:v_off], dtype="<u4")
+            values = _np.frombuffer(mv[v_off:end], dtype="<f4").reshape(n, dims)
+        else:
+            t = _column("q", mv[t_off:seq_off])
+            seq = _column("I", mv[seq_off:v_off])
+            values = _column("f", mv[v_off:end])
+        out.append(SensorBatch(name, t, seq, values, dims))
+        off = (end + 7) & ~7
+    return out
+
+
+def packed_info(msg: Any) -> Dict[str, int]:
+    """Header fields of a packed message: `blocks`, `flags`, `dropped`."""
+    _, blocks, flags, dropped, _ = _HEADER.unpack_from(msg, 0)
+    return {"blocks": blocks, "flags": flags, "dropped": dropped}
+
+
+class SensorStream:
+    """
+    Opens `/ws/sensors` and yields SensorBatch objects.
+
+        with SensorStream(sensors="a,g,m", rate_hz=1000) as st:
+            for batch in st.batches():
+                ...
+
+    `format="packed"` (default) receives binary batches; `format="json"` is also accepted and
+    yields one single-sample batch per JSON message.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://127.0.0.1:33389",
+        *,
+        sensors: Any,
+        rate_hz: int = 200,
+        format: str = "packed",
+        batch_ms: int = 50,
+        latency: str = "realtime",
+        timestamp: str = "mono",
+        identity: Optional[str] = None,
+        permission_id: str = "",
+        use_numpy: Optional[bool] = None,
+    ):
+        names = sensors.split(",") if isinstance(sensors, str) else list(sensors)
+        self.sensors = [str(s).strip() for s in names if str(s).strip()]
+        query: Dict[str, Any] = {
+            "sensors": ",".join(self.sensors),
+            "rate_hz": int(rate_hz),
+            "format": str(format).strip().lower(),
+            "batch_ms": int(batch_ms),
+            "latency": latency,
+            "timestamp": timestamp,
+        }
+        if identity:
+            query["identity"] = identity
+        if permission_id:
+            query["permission_id"] = permission_id
+        u = urllib.parse.urlsplit(base_url.rstrip("/"))
+        self.url = f"ws://{u.netloc}/ws/sensors?{urllib.parse.urlencode(query)}"
+        self.format = query["format"]
+        self.use_numpy = use_numpy
+        self.hello: Dict[str, Any] = {}
+        self.packed_sensors: List[str] = []
+        self.dropped = 0
+        self.ws: Optional[WebSocket] = None
+
+    def connect(self) -> Dict[str, Any]:
+        self.ws = WebSocket.connect(self.url, rcvbuf_bytes=1024 * 1024)
+        op, data = self.ws.recv()
+        msg = json.loads(data.decode("utf-8")) if op == OP_TEXT else {}
+        if msg.get("type") != "hello":
+            self.close()
+            raise ConnectionError(f"sensors stream refused: {msg}")
+        self.hello = msg
+        self.packed_sensors = list(msg.get("packed_sensors") or [])
+        return msg
+
+    def batches(self) -> Iterator[SensorBatch]:
+        if self.ws is None:
+            self.connect()
+        assert self.ws is not None
+        for op, data in self.ws:
+            if op == OP_TEXT:
+                msg = json.loads(data.decode("utf-8"))
+                if msg.get("type") != "sample":
+                    continue
+                v = msg.get("v") or []
+                t_ns = int(round(float(msg.get("t", 0.0)) * 1e9))
+                if self.use_numpy or (self.use_numpy is None and _np is not None):
+                    yield SensorBatch(
+                        str(msg.get("sensor", "")),
+                        _np.array([t_ns], dtype="<i8"),
+                        _np.array([int(msg.get("seq", 0))], dtype="<u4"),
+                        _np.array([v], dtype="<f4"),
+                        len(v),
+                    )
+                else:
+                    yield SensorBatch(
+                        str(msg.get("sensor", "")),
+                        array.array("q", [t_ns]),
+                        array.array("I", [int(msg.get("seq", 0)) & 0xFFFFFFFF]),
+                        array.array("f", v),
+                        len(v),
+                    )
+                continue
+            self.dropped = packed_info(data)["dropped"]
+            yield from decode_packed(data, self.packed_sensors, use_numpy=self.use_numpy)
+
+    def close(self) -> None:
+        ws, self.ws = self.ws, None
+        if ws is not None:
+            ws.close()
+
+    def __enter__(self) -> "SensorStream":
+        self.connect()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,321 @@
+"""
+Continuous serial capture over the `/ws/serial/{serial_handle}` WebSocket (user/docs/api/serial.md).
+
+Polling `mcu_serial_monitor` loses whatever arrives between calls and caps each window at
+`max_dump_bytes`. SerialCapture keeps the WebSocket open instead and splits the work in two
+threads so a slow disk never stalls the socket (which would stall the device's serial read loop
+and overflow the USB-serial buffer):
+
+- the receiver reads binary frames into one reusable buffer (`WebSocket.recv_into`) and appends
+  them to a pending buffer; the writer swaps that buffer out and works on it
+- the writer counts and splits lines with `bytearray.find` on the swapped buffer (a partial last
+  line is carried over), appends the bytes to rotating spool files and to a bounded in-memory
+  tail; lines are only materialized for `on_line` and `tail()`
+- `stats()` reports throughput (StreamCounters) and back-pressure: bytes waiting for the writer,
+  their high-water mark, `backpressure` (pending / max_pending_bytes) and `overflow_bytes`,
+  which are only non-zero when the writer fell further behind than `max_pending_bytes`
+
+    k = MethingsClient()
+    h = k.device_api("serial.open", {"handle": usb_handle, "baud_rate": 921600})["json"]["serial_handle"]
+    with SerialCapture(k, h, spool_dir="logs/mcu") as cap:
+        time.sleep(60)
+        print(cap.stats(), cap.tail(5))
+"""
+import json
+import os
+import socket
+import threading
+import time
+import urllib.parse
+from typing import Any, Callable, Dict, List, Optional
+
+from .client import MethingsClient
+from .usb_stream import StreamCounters
+from .ws import OP_BINARY, OP_TEXT, WebSocket, WebSocketError
+
+
+class SerialCaptureError(ConnectionError):
+    pass
+
+
+class _Spool:
+    """Append-only rotating files `<prefix>-<n>.log`; keeps the newest `max_files`."""
+
+    def __init__(self, directory: str, prefix: str, max_file_bytes: int, max_files: int):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.max_file_bytes = max(4096, int(max_file_bytes))
+        self.max_files = max(1, int(max_files))
+        self.files: List[str] = []
+        self.rotations = 0
+        self._f: Optional[Any] = None
+        self._size = 0
+        self._seq = 0
+
+    def _open(self) -> None:
+        self._seq += 1
+        path = os.path.join(self.directory, f"{self.prefix}-{self._seq:05d}.log")
+        self._f = open(path, "ab", buffering=1024 * 1024)
+        self._size = 0
+        self.files.append(path)
+        while len(self.files) > self.max_files:
+            old = self.files.pop(0)
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def write(self, data: bytearray) -> None:
+        """Append `data`, rotating at the last line break that still fits in the current file."""
+        if self._f is None:
+            self._open()
+        start = 0
+        with memoryview(data) as mv:
+            while len(data) - start > self.max_file_bytes - self._size:
+                room = self.max_file_bytes - self._size
+                cut = data.rfind(b"\n", start, start + room) + 1
+                if cut <= start and not self._size:
+                    cut = start + room  # a single line longer than a whole file
+                if cut > start:
+                    self._f.write(mv[start:cut])
+                    start = cut
+                self._rotate()
+            self._f.write(mv[start:])
+        self._size += len(data) - start
+
+    def _rotate(self) -> None:
+        self.close()
+        self.rotations += 1
+        self._open()
+
+    def flush(self) -> None:
+        if self._f is not None:
+            self._f.flush()
+
+    def close(self) -> None:
+        f, self._f = self._f, None
+        if f is not None:
+            f.close()
+
+    @property
+    def current(self) -> str:
+        return self.files[-1] if self.files else ""
+
+
+class SerialCapture:
+    """
+    Capture everything a serial session receives until stop().
+
+    `spool_dir` (optional) receives rotating `serial-<handle>-<n>.log` files of `max_file_bytes`,
+    the newest `max_files` kept. `tail_bytes` of the most recent output stay in memory for
+    `tail()`. `on_line(bytes)` is called from the writer thread for every complete line.
+    """
+
+    def __init__(
+        self,
+        client: MethingsClient,
+        serial_handle: str,
+        *,
+        spool_dir: Optional[str] = None,
+        max_file_bytes: int = 64 * 1024 * 1024,
+        max_files: int = 8,
+        tail_bytes: int = 256 * 1024,
+        max_pending_bytes: int = 64 * 1024 * 1024,
+        on_line: Optional[Callable[[bytes], None]] = None,
+        read_timeout_ms: int = 20,
+        max_read_bytes: int = 16384,
+        flush_interval_s: float = 0.5,
+        permission_id: str = "",
+    ):
+        self.client = client
+        self.serial_handle = str(serial_handle).strip()
+        query: Dict[str, Any] = {"read_timeout_ms": int(read_timeout_ms), "max_read_bytes": int(max_read_bytes)}
+        if client.identity:
+            query["identity"] = client.identity
+        if permission_id:
+            query["permission_id"] = permission_id
+        u = urllib.parse.urlsplit(client.base_url.rstrip("/"))
+        self.url = f"ws://{u.netloc}/ws/serial/{urllib.parse.quote(self.serial_handle)}?{urllib.parse.urlencode(query)}"
+        self.spool = (
+            _Spool(spool_dir, f"serial-{self.serial_handle}", max_file_bytes, max_files) if spool_dir else None
+        )
+        self.tail_bytes = max(0, int(tail_bytes))
+        self.max_pending_bytes = max(1, int(max_pending_bytes))
+        self.on_line = on_line
+        self.flush_interval_s = float(flush_interval_s)
+        self.counters = StreamCounters()
+        self.hello: Dict[str, Any] = {}
+        self.error: Optional[BaseException] = None
+        self.lines = 0
+        self.pending_high_water = 0
+        self.overflow_bytes = 0
+        self.messages: List[Dict[str, Any]] = []
+        self.ws: Optional[WebSocket] = None
+        self._pending = bytearray()
+        self._spare = bytearray()
+        self._partial = bytearray()
+        self._tail = bytearray()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._recv_done = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    # -------- lifecycle --------
+    def start(self) -> Dict[str, Any]:
+        self.ws = WebSocket.connect(self.url, rcvbuf_bytes=1024 * 1024)
+        op, data = self.ws.recv()
+        msg = json.loads(data.decode("utf-8")) if op == OP_TEXT else {}
+        if msg.get("type") != "hello":
+            self.ws.close()
+            self.ws = None
+            raise SerialCaptureError(f"serial websocket refused: {msg}")
+        self.hello = msg
+        for target, name in ((self._receive, "recv"), (self._write, "spool")):
+            t = threading.Thread(target=target, name=f"serial-capture-{name}-{self.serial_handle}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return msg
+
+    def stop(self) -> Dict[str, Any]:
+        """Close the WebSocket, drain what was received to disk and return final stats()."""
+        self._stop.set()
+        ws, self.ws = self.ws, None
+        if ws is not None:
+            # Wake the receiver blocked in recv_into; the close frame can still be sent after.
+            try:
+                ws.sock.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=10)
+        self._threads = []
+        if ws is not None:
+            ws.close()
+        if self.spool is not None:
+            self.spool.close()
+        return self.stats()
+
+    def __enter__(self) -> "SerialCapture":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    # -------- threads --------
+    def _receive(self) -> None:
+        ws = self.ws
+        assert ws is not None
+        buf = bytearray(64 * 1024)
+        try:
+            while not self._stop.is_set():
+                op, n = ws.recv_into(buf)
+                if op == OP_TEXT:
+                    # write_ack / error / lines_ack from the server.
+                    self.messages.append(json.loads(bytes(buf[:n]).decode("utf-8", "replace")))
+                    continue
+                if op != OP_BINARY or not n:
+                    continue
+                self.counters.add(n)
+                with self._cond:
+                    if len(self._pending) + n > self.max_pending_bytes:
+                        self.overflow_bytes += n
+                    else:
+                        self._pending += memoryview(buf)[:n]
+                        self.pending_high_water = max(self.pending_high_water, len(self._pending))
+                    self._cond.notify()
+        except (WebSocketError, OSError, ValueError) as ex:
+            if not self._stop.is_set():
+                self.error = ex
+        finally:
+            self._recv_done.set()
+            with self._cond:
+                self._cond.notify_all()
+
+    def _write(self) -> None:
+        last_flush = time.monotonic()
+        while True:
+            with self._cond:
+                if not self._pending and not self._recv_done.is_set():
+                    self._cond.wait(timeout=self.flush_interval_s)
+                # Swap buffers: the receiver keeps appending while this batch is written.
+                batch, self._pending, self._spare = self._pending, self._spare, bytearray()
+                done = self._recv_done.is_set() and not self._pending
+            if batch:
+                self._consume(batch)
+                batch.clear()
+                with self._cond:
+                    self._spare = batch
+            now = time.monotonic()
+            if self.spool is not None and (done or now - last_flush >= self.flush_interval_s):
+                self.spool.flush()
+                last_flush = now
+            if done:
+                if self._partial and self.on_line is not None:
+                    self.on_line(bytes(self._partial))
+                return
+
+    def _consume(self, data: bytearray) -> None:
+        last_nl = data.rfind(b"\n")
+        self.lines += data.count(b"\n")
+        with memoryview(data) as mv:
+            if self.spool is not None:
+                self.spool.write(data)
+            if self.tail_bytes:
+                self._tail += mv[-self.tail_bytes:]
+                if len(self._tail) > self.tail_bytes:
+                    del self._tail[:len(self._tail) - self.tail_bytes]
+        if self.on_line is None:
+            return
+        start = 0
+        if self._partial:
+            if last_nl < 0:
+                self._partial += data
+                return
+            first = data.find(b"\n")
+            self._partial += data[:first + 1]
+            self.on_line(bytes(self._partial))
+            self._partial.clear()
+            start = first + 1
+        while True:
+            nl = data.find(b"\n", start)
+            if nl < 0:
+                break
+            self.on_line(bytes(data[start:nl + 1]))
+            start = nl + 1
+        if start < len(data):
+            self._partial += data[start:]
+
+    # -------- inspection --------
+    def send(self, data: bytes) -> None:
+        """Write raw bytes to the serial port through the same WebSocket."""
+        if self.ws is None:
+            raise SerialCaptureError("capture is not running")
+        self.ws.send_binary(data)
+
+    def tail(self, lines: int = 20) -> List[str]:
+        """The last `lines` lines of the in-memory tail, decoded as UTF-8 (newlines stripped)."""
+        text = bytes(self._tail).decode("utf-8", "replace")
+        out = text.splitlines()
+        return out[-lines:] if lines > 0 else out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._pending)
+        out: Dict[str, Any] = dict(self.counters.snapshot())
+        out.update({
+            "lines": self.lines,
+            "pending_bytes": pending,
+            "pending_high_water": self.pending_high_water,
+            "backpressure": pending / self.max_pending_bytes,
+            "overflow_bytes": self.overflow_bytes,
+            "running": bool(self._threads) and not self._recv_done.is_set(),
+            "error": str(self.error) if self.error else None,
+        })
+        if self.spool is not None:
+            out.update({"spool_file": self.spool.current, "spool_files": list(self.spool.files),
+                        "spool_rotations": self.spool.rotations})
+        return out
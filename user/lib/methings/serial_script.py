@@ -0,0 +1,137 @@
+"""
+Pipelined command scripts over an open serial session (`serial.exchange.script`, user/docs/api/serial.md).
+
+`serial.exchange` ends every command on an idle timeout, so a 200-command AT sequence costs
+200 HTTP round-trips plus 200 idle waits. A script is sent once and run on the device: each
+command finishes as soon as a line matches its `expect` regex (default: the AT final result
+codes `OK`, `ERROR`, `+CME ERROR: ...`, ...), and with `pipeline_depth > 1` the next commands
+are written before the previous responses have arrived.
+
+    k = MethingsClient()
+    results = run_script(k, serial_handle, ["AT", "ATI", "AT+CSQ",
+                                            {"send": 'AT+CMGS="123"', "expect": "^> ?$"},
+                                            {"send_b64": "aGkaDQ=="}])   # "hi" + Ctrl-Z
+    for ev in stream_script(k, serial_handle, commands):   # one `result` event per command
+        ...
+
+Commands are strings (sent with `line_ending` appended) or dicts with `send` / `send_b64` and
+optional per-command `expect`, `error`, `timeout_ms`, `idle_timeout_ms` and `max_lines`; an
+empty `expect` falls back to the idle timeout for that command.
+"""
+import json
+import urllib.parse
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+from .client import MethingsClient, _KeepAliveConnection
+
+Command = Union[str, Dict[str, Any]]
+
+
+class SerialScriptError(RuntimeError):
+    def __init__(self, message: str, result: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.result = result or {}
+
+
+def _payload(
+    serial_handle: str,
+    commands: Sequence[Command],
+    *,
+    line_ending: str,
+    expect: Optional[str],
+    error: Optional[str],
+    timeout_ms: int,
+    stop_on_error: bool,
+    pipeline_depth: int,
+    total_timeout_ms: int,
+) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "serial_handle": str(serial_handle).strip(),
+        "commands": [c if isinstance(c, dict) else {"send": str(c)} for c in commands],
+        "line_ending": str(line_ending),
+        "timeout_ms": int(timeout_ms),
+        "stop_on_error": bool(stop_on_error),
+        "pipeline_depth": int(pipeline_depth),
+        "total_timeout_ms": int(total_timeout_ms),
+    }
+    if expect is not None:
+        payload["expect"] = str(expect)
+    if error is not None:
+        payload["error"] = str(error)
+    return payload
+
+
+def run_script(
+    client: MethingsClient,
+    serial_handle: str,
+    commands: Sequence[Command],
+    *,
+    line_ending: str = "\r",
+    expect: Optional[str] = None,
+    error: Optional[str] = None,
+    timeout_ms: int = 5000,
+    stop_on_error: bool = True,
+    pipeline_depth: int = 1,
+    total_timeout_ms: int = 120000,
+    check: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Run `commands` in one call and return `{index, send, status, ok, lines, matched, elapsed_ms}`
+    per command run. `status` is `ok`, `error`, `timeout` or `max_lines`. With `check`, a
+    command that did not end in `ok` raises SerialScriptError.
+    """
+    p = _payload(serial_handle, commands, line_ending=line_ending, expect=expect, error=error, timeout_ms=timeout_ms,
+                 stop_on_error=stop_on_error, pipeline_depth=pipeline_depth, total_timeout_ms=total_timeout_ms)
+    r = client.serial_exchange_script(**p)
+    if not r.get("ok"):
+        raise SerialScriptError(f"serial.exchange.script failed: {r.get('error') or r.get('json')}", r)
+    results = list(r["json"].get("results") or [])
+    if check:
+        for item in results:
+            if not item.get("ok"):
+                raise SerialScriptError(f"command {item.get('index')} ({item.get('send')!r}) ended with {item.get('status')}", item)
+    return results
+
+
+def stream_script(
+    client: MethingsClient,
+    serial_handle: str,
+    commands: Sequence[Command],
+    *,
+    line_ending: str = "\r",
+    expect: Optional[str] = None,
+    error: Optional[str] = None,
+    timeout_ms: int = 5000,
+    stop_on_error: bool = True,
+    pipeline_depth: int = 1,
+    total_timeout_ms: int = 120000,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Like run_script, but yield `{"event": "result", ...}` as each command finishes and a final
+    `{"event": "done", ...}` carrying the whole script result.
+    """
+    parts = urllib.parse.urlsplit(client.base_url)
+    if parts.scheme != "http" or not parts.hostname:
+        raise ValueError("streaming supports plain http:// base URLs only")
+    body = json.dumps(
+        _payload(serial_handle, commands, line_ending=line_ending, expect=expect, error=error, timeout_ms=timeout_ms,
+                 stop_on_error=stop_on_error, pipeline_depth=pipeline_depth, total_timeout_ms=total_timeout_ms)
+    ).encode("utf-8")
+    headers = {"Content-Type": "application/json; charset=utf-8", "Accept": "application/x-ndjson"}
+    if client.identity:
+        headers["X-Methings-Identity"] = client.identity
+    conn = _KeepAliveConnection(parts.hostname, parts.port or 80, timeout=total_timeout_ms / 1000.0 + 30.0)
+    try:
+        conn.request("POST", parts.path.rstrip("/") + "/serial/exchange/script?stream=1", body=body, headers=headers)
+        resp = conn.getresponse()
+        if resp.status != 200:
+            raw = resp.read().decode("utf-8", "replace")
+            raise SerialScriptError(f"serial.exchange.script stream failed ({resp.status}): {raw[:200]}")
+        while True:
+            line = resp.readline()
+            if not line:
+                break
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        conn.close()
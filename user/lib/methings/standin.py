@@ -0,0 +1,324 @@
+"""
+Local stand-in for the on-device server, for running methings.bench (and client experiments) on
+a plain Linux box. It implements the wire formats the client library depends on, not the
+devices behind them:
+
+- `POST /tools/device_api/invoke`: `bench.noop`, `usb.status`, `sensor.list`,
+  `usb.stream.start` / `usb.stream.stop` / `usb.stream.status`; other actions get
+  `404 unknown_action`. Each call waits `latency_ms` (+ up to `jitter_ms`).
+- the `usb.stream.start` TCP data plane: `u8 type + u32le length + payload` frames of
+  `chunk_size` bytes, sent as fast as the socket takes them until the stream is stopped
+- `GET /ws/sensors`: hello message, then `format=packed` (SPK1) or JSON sample messages for
+  `rate_hz` / `batch_ms`, sent back to back (the stand-in does not pace them in real time)
+- `/vision/model/load`, `/vision/frame/put` (application/octet-stream RGBA), `/vision/run`
+  (stored `frame_id` or a binary body), `/vision/frame/delete`; a run takes `infer_ms`
+
+Every HTTP response carries `Server-Timing: app;dur=<ms>` like the app. The server runs in a
+child process so it does not compete with the client for the GIL:
+
+    with StandinServer(latency_ms=0.5) as srv:
+        k = MethingsClient(srv.base_url)
+"""
+import array
+import base64
+import hashlib
+import json
+import math
+import multiprocessing
+import random
+import socket
+import struct
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from .sensors import PACKED_MAGIC
+from .usb_stream import FRAME_BULK_IN, FRAME_ISO_IN
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_SENSOR_DIMS = {"a": 3, "g": 3, "m": 3, "l": 1, "p": 1}
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    n = len(payload)
+    if n < 126:
+        return struct.pack("!BB", 0x80 | opcode, n) + payload
+    if n < 1 << 16:
+        return struct.pack("!BBH", 0x80 | opcode, 126, n) + payload
+    return struct.pack("!BBQ", 0x80 | opcode, 127, n) + payload
+
+
+def _packed_message(sensors: List[str], per_sensor: int, t0_ns: int, step_ns: int, seq0: int) -> bytes:
+    body = [struct.pack("<IHHII", PACKED_MAGIC, len(sensors), 0, 0, 0)]
+    for idx, name in enumerate(sensors):
+        dims = _SENSOR_DIMS.get(name, 3)
+        t = array.array("q", (t0_ns + i * step_ns for i in range(per_sensor)))
+        seq = array.array("I", ((seq0 + i) & 0xFFFFFFFF for i in range(per_sensor)))
+        v = array.array("f", (math.sin((seq0 + i) * 0.01 + d) for i in range(per_sensor) for d in range(dims)))
+        block = struct.pack("<BBHI", idx, dims, 0, per_sensor) + t.tobytes() + seq.tobytes() + v.tobytes()
+        body.append(block + bytes(-len(block) % 8))
+    return b"".join(body)
+
+
+class _UsbStream:
+    """One `usb.stream.start` data plane: a listening socket that streams frames to its client."""
+
+    def __init__(self, mode: str, chunk_size: int):
+        self.stream_id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.chunk_size = max(1, int(chunk_size))
+        self.stop = threading.Event()
+        self.bytes_sent = 0
+        self.srv = socket.socket()
+        self.srv.bind(("127.0.0.1", 0))
+        self.srv.listen(1)
+        self.port = self.srv.getsockname()[1]
+        threading.Thread(target=self._run, name=f"standin-usb-{self.stream_id}", daemon=True).start()
+
+    def _run(self) -> None:
+        self.srv.settimeout(30.0)
+        try:
+            conn, _ = self.srv.accept()
+        except OSError:
+            return
+        finally:
+            self.srv.close()
+        ftype = FRAME_ISO_IN if self.mode == "iso_in" else FRAME_BULK_IN
+        frame = struct.pack("<BI", ftype, self.chunk_size) + bytes(self.chunk_size)
+        # Several frames per sendall so small chunk sizes are not limited by syscall count.
+        block = frame * max(1, (256 * 1024) // len(frame))
+        with conn:
+            try:
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1024 * 1024)
+                while not self.stop.is_set():
+                    conn.sendall(block)
+                    self.bytes_sent += len(block)
+            except OSError:
+                pass
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    cfg: Dict[str, Any] = {}
+    lock = threading.Lock()
+    streams: Dict[str, _UsbStream] = {}
+    frames: Dict[str, bytes] = {}
+    models: Dict[str, Dict[str, Any]] = {}
+    rng = random.Random(1)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+    # -------- helpers --------
+    def _reply(self, obj: Dict[str, Any], t0: float, code: int = 200) -> None:
+        out = json.dumps(obj).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.send_header("Server-Timing", f"app;dur={(time.perf_counter() - t0) * 1000:.2f}")
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _latency(self) -> None:
+        cfg = _Handler.cfg
+        delay = cfg["latency_ms"] + (_Handler.rng.random() * cfg["jitter_ms"] if cfg["jitter_ms"] else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    # -------- HTTP --------
+    def do_GET(self) -> None:
+        t0 = time.perf_counter()
+        path = urllib.parse.urlsplit(self.path).path
+        if path == "/ws/sensors":
+            return self._sensors_ws()
+        if path == "/health":
+            return self._reply({"status": "ok", "service": "methings-standin"}, t0)
+        self._reply({"status": "error", "error": "not_found"}, t0, 404)
+
+    def do_POST(self) -> None:
+        t0 = time.perf_counter()
+        n = int(self.headers.get("Content-Length") or 0)
+        path = urllib.parse.urlsplit(self.path).path
+        if path == "/vision/frame/put" or (path == "/vision/run" and "octet-stream" in (self.headers.get("Content-Type") or "")):
+            body = bytearray(n)
+            self.rfile.readinto(body)
+            return self._vision_binary(path, bytes(body), t0)
+        try:
+            body = json.loads(self.rfile.read(n) or b"{}")
+        except ValueError:
+            return self._reply({"status": "error", "error": "invalid_json"}, t0, 400)
+        if path == "/tools/device_api/invoke":
+            args = body.get("args") or body
+            self._latency()
+            obj, code = self._action(str(args.get("action") or ""), args.get("payload") or {})
+            return self._reply(obj, t0, code)
+        if path.startswith("/vision/"):
+            obj, code = self._vision_json(path, body)
+            return self._reply(obj, t0, code)
+        self._reply({"status": "error", "error": "not_found"}, t0, 404)
+
+    # -------- device_api --------
+    def _action(self, action: str, p: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        cls = _Handler
+        if action == "bench.noop":
+            return {"status": "ok"}, 200
+        if action == "usb.status":
+            return {"status": "ok", "devices": [], "streams": len(cls.streams)}, 200
+        if action == "sensor.list":
+            return {"status": "ok", "sensors": [{"key": k, "dims": d} for k, d in _SENSOR_DIMS.items()]}, 200
+        if action == "usb.stream.start":
+            st = _UsbStream(str(p.get("mode") or "bulk_in"), int(p.get("chunk_size") or 16384))
+            with cls.lock:
+                cls.streams[st.stream_id] = st
+            return {"status": "ok", "stream_id": st.stream_id, "tcp_host": "127.0.0.1", "tcp_port": st.port,
+                    "mode": st.mode, "chunk_size": st.chunk_size}, 200
+        if action == "usb.stream.stop":
+            with cls.lock:
+                st = cls.streams.pop(str(p.get("stream_id") or ""), None)
+            if st is None:
+                return {"status": "error", "error": "stream_not_found"}, 404
+            st.stop.set()
+            return {"status": "ok", "stopped": True, "bytes_sent": st.bytes_sent}, 200
+        if action == "usb.stream.status":
+            with cls.lock:
+                items = [{"stream_id": s.stream_id, "mode": s.mode, "chunk_size": s.chunk_size, "tcp_port": s.port}
+                         for s in cls.streams.values()]
+            return {"status": "ok", "streams": items}, 200
+        return {"status": "error", "error": "unknown_action", "action": action}, 404
+
+    # -------- vision --------
+    def _infer(self, model: str) -> Dict[str, Any]:
+        ms = _Handler.cfg["infer_ms"]
+        if ms > 0:
+            time.sleep(ms / 1000.0)
+        return {"status": "ok", "model": model, "outputs": [[0.1, 0.9]], "inference_ms": ms}
+
+    def _vision_binary(self, path: str, body: bytes, t0: float) -> None:
+        try:
+            w, h = int(self.headers.get("X-Methings-Width") or 0), int(self.headers.get("X-Methings-Height") or 0)
+        except ValueError:
+            w = h = 0
+        if w <= 0 or h <= 0 or len(body) != w * h * 4:
+            return self._reply({"status": "error", "error": "invalid_frame_size"}, t0, 400)
+        if path == "/vision/frame/put":
+            fid = (self.headers.get("X-Methings-Frame-Id") or "").strip() or uuid.uuid4().hex[:12]
+            with _Handler.lock:
+                _Handler.frames[fid] = body
+            return self._reply({"status": "ok", "frame_id": fid, "width": w, "height": h}, t0)
+        model = (self.headers.get("X-Methings-Model") or "").strip()
+        if not model:
+            return self._reply({"status": "error", "error": "model_required"}, t0, 400)
+        self._reply(self._infer(model), t0)
+
+    def _vision_json(self, path: str, body: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        cls = _Handler
+        if path == "/vision/model/load":
+            name = str(body.get("name") or "")
+            cls.models[name] = {"name": name, "path": body.get("path")}
+            return {"status": "ok", "name": name}, 200
+        if path == "/vision/run":
+            with cls.lock:
+                known = str(body.get("frame_id") or "") in cls.frames
+            if not known:
+                return {"status": "error", "error": "frame_not_found"}, 404
+            return self._infer(str(body.get("model") or "")), 200
+        if path == "/vision/frame/delete":
+            with cls.lock:
+                deleted = cls.frames.pop(str(body.get("frame_id") or ""), None) is not None
+            return {"status": "ok", "deleted": deleted}, 200
+        return {"status": "error", "error": "not_found"}, 404
+
+    # -------- /ws/sensors --------
+    def _sensors_ws(self) -> None:
+        q = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        sensors = [s for s in (q.get("sensors", ["a"])[0]).split(",") if s]
+        rate = max(1, int(q.get("rate_hz", ["200"])[0]))
+        fmt = q.get("format", ["json"])[0]
+        batch_ms = max(1, int(q.get("batch_ms", ["50"])[0]))
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        self.close_connection = True
+        self.wfile.write(
+            f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1")
+        )
+        hello: Dict[str, Any] = {"type": "hello", "stream_id": "standin", "sensors": sensors, "rate_hz": rate, "format": fmt}
+        if fmt == "packed":
+            hello.update({"packed_sensors": sensors, "batch_ms": batch_ms, "t_unit": "ns"})
+        self.wfile.write(_ws_frame(0x1, json.dumps(hello).encode()))
+        self.wfile.flush()
+        # Pre-encode a few windows of data and cycle through them so the client is the bottleneck.
+        step = 1_000_000_000 // rate
+        per_batch = max(1, rate * batch_ms // 1000)
+        msgs: List[bytes] = []
+        for b in range(8):
+            if fmt == "packed":
+                msgs.append(_ws_frame(0x2, _packed_message(sensors, per_batch, b * per_batch * step, step, b * per_batch)))
+                continue
+            window = []
+            for i in range(per_batch):
+                for s in sensors:
+                    dims = _SENSOR_DIMS.get(s, 3)
+                    sample = {"type": "sample", "stream_id": "standin", "sensor": s, "t": (b * per_batch + i) * step / 1e9,
+                              "v": [math.sin(i * 0.01 + d) for d in range(dims)], "seq": b * per_batch + i}
+                    window.append(_ws_frame(0x1, json.dumps(sample).encode()))
+            msgs.append(b"".join(window))
+        sock = self.connection
+        try:
+            while True:
+                for m in msgs:
+                    sock.sendall(m)
+        except OSError:
+            pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 resets connections when a high-concurrency case opens its pool.
+    request_queue_size = 128
+
+
+def _serve(port_q: Any, cfg: Dict[str, Any]) -> None:
+    _Handler.cfg = cfg
+    srv = _Server((cfg["host"], 0), _Handler)
+    port_q.put(srv.server_address[1])
+    srv.serve_forever()
+
+
+class StandinServer:
+    """Runs the stand-in in a child process; `base_url` is valid between start() and stop()."""
+
+    def __init__(self, *, latency_ms: float = 0.0, jitter_ms: float = 0.0, infer_ms: float = 5.0, host: str = "127.0.0.1"):
+        self.config: Dict[str, Any] = {
+            "latency_ms": float(latency_ms),
+            "jitter_ms": float(jitter_ms),
+            "infer_ms": float(infer_ms),
+            "host": host,
+        }
+        self.base_url = ""
+        self._proc: Optional[multiprocessing.Process] = None
+
+    def start(self) -> str:
+        q: Any = multiprocessing.Queue()
+        self._proc = multiprocessing.Process(target=_serve, args=(q, dict(self.config)), daemon=True)
+        self._proc.start()
+        self.base_url = f"http://{self.config['host']}:{q.get(timeout=10)}"
+        return self.base_url
+
+    def stop(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None:
+            proc.terminate()
+            proc.join(5)
+        self.base_url = ""
+
+    def __enter__(self) -> "StandinServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
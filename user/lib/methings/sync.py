@@ -0,0 +1,411 @@
+"""
+Incremental sync of a local directory to the user root (`/user/write`, `/user/list`, `/user/file/info`).
+
+Both sides are described by a manifest in the me.sync v4 style (docs/me_sync_v4_streaming_protocol.md):
+`{schema_version: 4, entries: [{path, kind, size, sha256, mtime_ms}], entry_count, total_bytes,
+manifest_sha256}`. Only files whose size or SHA-256 differ are uploaded, several at a time, so a
+deploy costs roughly the size of the change rather than the size of the bundle:
+
+- local hashes are computed in a process pool and cached by (size, mtime), so unchanged files
+  are not re-read on the next run
+- the device manifest comes from `/user/list` (size, mtime) plus `files.info?sha256=1`, asked
+  only for files whose size matches and whose remote (size, mtime) changed since the last sync
+
+    k = MethingsClient()
+    r = sync_dir(k, "bundle/", "apps/detector")
+    print(len(r["uploaded"]), r["bytes_uploaded"])
+
+CLI: `python -m methings.sync bundle/ apps/detector [--dry-run] [--jobs 4]`
+"""
+import argparse
+import concurrent.futures
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+import time
+import urllib.parse
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .client import MethingsClient
+from .files import upload_file
+
+
+SCHEMA_VERSION = 4
+DEFAULT_EXCLUDE: Tuple[str, ...] = ("__pycache__", "*.pyc", ".git", ".DS_Store")
+# Files up to this size go out as one pooled request; larger ones use files.upload_file.
+SMALL_FILE_BYTES = 1024 * 1024
+_HASH_BLOCK_BYTES = 1024 * 1024
+# Hash tasks are grouped so a bundle of small files is not one IPC round trip per file.
+_HASH_TASK_BYTES = 32 * 1024 * 1024
+_HASH_TASK_FILES = 64
+
+Progress = Callable[[str, int, int], None]
+
+
+class SyncError(RuntimeError):
+    def __init__(self, message: str, response: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.response = response or {}
+
+
+# -------- local manifest --------
+def _hash_paths(paths: Sequence[str]) -> List[str]:
+    """SHA-256 hex of each file (runs in a worker process)."""
+    out = []
+    for p in paths:
+        h = hashlib.sha256()
+        with open(p, "rb") as f:
+            while True:
+                block = f.read(_HASH_BLOCK_BYTES)
+                if not block:
+                    break
+                h.update(block)
+        out.append(h.hexdigest())
+    return out
+
+
+def _excluded(rel: str, exclude: Iterable[str]) -> bool:
+    return any(fnmatch.fnmatch(part, pat) for part in rel.split("/") for pat in exclude)
+
+
+def _walk(root: str, exclude: Sequence[str]) -> List[Tuple[str, int, int]]:
+    """(relative path, size, mtime_ns) of every regular file under root, sorted by path."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        rel_dir = "" if rel_dir == "." else rel_dir + "/"
+        dirnames[:] = [d for d in dirnames if not _excluded(rel_dir + d, exclude)]
+        for name in filenames:
+            rel = rel_dir + name
+            if _excluded(rel, exclude):
+                continue
+            st = os.stat(os.path.join(dirpath, name))
+            found.append((rel, st.st_size, st.st_mtime_ns))
+    found.sort()
+    return found
+
+
+def _cache_file(key: str) -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(base, "methings", "sync", f"{name}.json")
+
+
+def _load_json(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_json(path: str, data: Dict[str, Any]) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError:
+        pass  # the cache is an optimisation only
+
+
+def _hash_pool(workers: int) -> concurrent.futures.Executor:
+    if workers > 1:
+        try:
+            return concurrent.futures.ProcessPoolExecutor(workers)
+        except (OSError, ImportError, NotImplementedError):
+            pass  # no multiprocessing support (e.g. sandboxed interpreters): hashlib releases the GIL
+    return concurrent.futures.ThreadPoolExecutor(max(1, workers))
+
+
+def _finish_manifest(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    canonical = json.dumps(
+        [[e["path"], e["size"], e["sha256"]] for e in entries], separators=(",", ":")
+    ).encode("utf-8")
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "entries": entries,
+        "entry_count": len(entries),
+        "total_bytes": sum(e["size"] for e in entries),
+        "manifest_sha256": hashlib.sha256(canonical).hexdigest(),
+    }
+
+
+def build_manifest(
+    root: str,
+    *,
+    workers: Optional[int] = None,
+    cache: bool = True,
+    exclude: Sequence[str] = DEFAULT_EXCLUDE,
+) -> Dict[str, Any]:
+    """
+    v4 manifest of the files under `root`. Files whose (size, mtime) match the hash cache are
+    not read; the rest are hashed by `workers` processes (default: CPU count). The returned
+    manifest also carries `hashed` (number of files actually read).
+    """
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        raise SyncError(f"not a directory: {root}")
+    files = _walk(root, exclude)
+    cache_path = _cache_file("local|" + root)
+    cached = _load_json(cache_path).get("files", {}) if cache else {}
+    digests: Dict[str, str] = {}
+    todo: List[Tuple[str, int]] = []
+    for rel, size, mtime_ns in files:
+        hit = cached.get(rel)
+        if hit and hit[0] == size and hit[1] == mtime_ns:
+            digests[rel] = hit[2]
+        else:
+            todo.append((rel, size))
+
+    if todo:
+        tasks: List[List[str]] = []
+        group: List[str] = []
+        group_bytes = 0
+        for rel, size in todo:
+            if group and (group_bytes + size > _HASH_TASK_BYTES or len(group) >= _HASH_TASK_FILES):
+                tasks.append(group)
+                group, group_bytes = [], 0
+            group.append(rel)
+            group_bytes += size
+        tasks.append(group)
+        n = workers if workers is not None else (os.cpu_count() or 1)
+        with _hash_pool(min(max(1, n), len(tasks))) as pool:
+            futures = {pool.submit(_hash_paths, [os.path.join(root, r) for r in t]): t for t in tasks}
+            for fut in concurrent.futures.as_completed(futures):
+                for rel, digest in zip(futures[fut], fut.result()):
+                    digests[rel] = digest
+
+    entries = [
+        {"path": rel, "kind": "file", "size": size, "sha256": digests[rel], "mtime_ms": mtime_ns // 1_000_000}
+        for rel, size, mtime_ns in files
+    ]
+    if cache:
+        _save_json(cache_path, {"files": {rel: [size, mtime_ns, digests[rel]] for rel, size, mtime_ns in files}})
+    manifest = _finish_manifest(entries)
+    manifest["hashed"] = len(todo)
+    return manifest
+
+
+# -------- remote manifest --------
+def _remote_path(remote_dir: str, rel: str) -> str:
+    base = remote_dir.strip().strip("/")
+    return f"{base}/{rel}" if base else rel
+
+
+def _quote(path: str) -> str:
+    return urllib.parse.quote(path, safe="/")
+
+
+def _list_dir(client: MethingsClient, remote: str, timeout_s: float) -> Optional[List[Dict[str, Any]]]:
+    route = f"/user/list/{_quote(remote)}" if remote else "/user/list"
+    r = client.request_json("GET", route, timeout_s=timeout_s)
+    if r.get("status") == 404:
+        return None
+    if not r.get("ok"):
+        raise SyncError(f"list {remote or '.'} failed: {r.get('error') or r.get('json')}", r)
+    return list(r["json"].get("items") or [])
+
+
+def _remote_info(client: MethingsClient, remote: str, *, sha256: bool, timeout_s: float) -> Dict[str, Any]:
+    route = f"/user/file/info/{_quote(remote)}" + ("?sha256=1" if sha256 else "")
+    r = client.request_json("GET", route, timeout_s=timeout_s)
+    if not r.get("ok"):
+        raise SyncError(f"file info {remote} failed: {r.get('error') or r.get('json')}", r)
+    return r["json"]
+
+
+def _state_key(client: MethingsClient, remote_dir: str) -> str:
+    return f"remote|{client.base_url}|{remote_dir.strip().strip('/')}"
+
+
+def remote_manifest(
+    client: MethingsClient,
+    remote_dir: str,
+    *,
+    local: Optional[Dict[str, Any]] = None,
+    jobs: int = 8,
+    rehash: bool = False,
+    exclude: Sequence[str] = DEFAULT_EXCLUDE,
+    timeout_s: float = 120.0,
+) -> Dict[str, Any]:
+    """
+    v4 manifest of `remote_dir` as the device sees it. Directories are listed concurrently. The
+    device hashes a file (`files.info?sha256=1`) only when it has a local counterpart of the same
+    size (`local` manifest) and its (size, mtime) changed since the last sync recorded it, unless
+    `rehash`. Entries that were not hashed have `sha256: ""`.
+    """
+    listed: List[Dict[str, Any]] = []
+    with concurrent.futures.ThreadPoolExecutor(max(1, jobs), thread_name_prefix="sync-list") as pool:
+        pending = {pool.submit(_list_dir, client, _remote_path(remote_dir, ""), timeout_s): ""}
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in done:
+                rel_dir = pending.pop(fut)
+                for item in fut.result() or []:
+                    rel = rel_dir + str(item.get("name") or "")
+                    if not item.get("name") or _excluded(rel, exclude):
+                        continue
+                    if item.get("is_dir"):
+                        pending[pool.submit(_list_dir, client, _remote_path(remote_dir, rel), timeout_s)] = rel + "/"
+                    else:
+                        listed.append({"path": rel, "kind": "file", "size": int(item.get("size") or 0),
+                                       "sha256": "", "mtime_ms": int(item.get("mtime_ms") or 0)})
+        listed.sort(key=lambda e: e["path"])
+
+        local_sizes = {e["path"]: e["size"] for e in (local or {}).get("entries", [])}
+        state = {} if rehash else _load_json(_cache_file(_state_key(client, remote_dir))).get("files", {})
+        to_hash = []
+        for e in listed:
+            if local is not None and local_sizes.get(e["path"]) != e["size"]:
+                continue  # missing locally or a different size: no hash needed to decide
+            known = state.get(e["path"])
+            if known and known[0] == e["size"] and known[1] == e["mtime_ms"]:
+                e["sha256"] = known[2]
+            else:
+                to_hash.append(e)
+        futures = {
+            pool.submit(_remote_info, client, _remote_path(remote_dir, e["path"]), sha256=True, timeout_s=timeout_s): e
+            for e in to_hash
+        }
+        for fut in concurrent.futures.as_completed(futures):
+            futures[fut]["sha256"] = str(fut.result().get("sha256") or "")
+    manifest = _finish_manifest(listed)
+    manifest["hashed"] = len(to_hash)
+    return manifest
+
+
+def diff_manifests(local: Dict[str, Any], remote: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """Split local entries into `upload` / `unchanged`, and list remote-only entries as `extra`."""
+    theirs = {e["path"]: e for e in remote.get("entries", [])}
+    upload, unchanged = [], []
+    for e in local.get("entries", []):
+        r = theirs.pop(e["path"], None)
+        same = r is not None and r["size"] == e["size"] and r.get("sha256") == e["sha256"]
+        (unchanged if same else upload).append(e)
+    return {"upload": upload, "unchanged": unchanged, "extra": sorted(theirs.values(), key=lambda e: e["path"])}
+
+
+# -------- sync --------
+def _push(client: MethingsClient, local_root: str, remote: str, entry: Dict[str, Any], timeout_s: float) -> int:
+    path = os.path.join(local_root, *entry["path"].split("/"))
+    if entry["size"] <= SMALL_FILE_BYTES:
+        with open(path, "rb") as f:
+            data = f.read()
+        r = client.request_bytes("POST", f"/user/write/{_quote(remote)}?sha256=1", data, timeout_s=timeout_s)
+        if not r.get("ok"):
+            raise SyncError(f"write {remote} failed: {r.get('error') or r.get('json')}", r)
+        digest = str(r["json"].get("sha256") or "")
+    else:
+        digest = upload_file(client, path, remote, resume=False, timeout_s=timeout_s)["sha256"]
+    if digest != entry["sha256"]:
+        raise SyncError(f"{remote} changed while syncing (sha256 {digest} != {entry['sha256']})")
+    # Record the remote (size, mtime) so the next sync can trust this hash without asking the device.
+    return int(_remote_info(client, remote, sha256=False, timeout_s=timeout_s).get("mtime_ms") or 0)
+
+
+def sync_dir(
+    client: MethingsClient,
+    local_dir: str,
+    remote_dir: str,
+    *,
+    jobs: int = 4,
+    workers: Optional[int] = None,
+    dry_run: bool = False,
+    rehash: bool = False,
+    cache: bool = True,
+    exclude: Sequence[str] = DEFAULT_EXCLUDE,
+    timeout_s: float = 120.0,
+    progress: Optional[Progress] = None,
+) -> Dict[str, Any]:
+    """
+    Make `remote_dir` (under the user root) contain the files of `local_dir`, uploading only
+    what changed, `jobs` files at a time. Remote files that do not exist locally are reported
+    in `extra` and left alone. `progress(path, done, total)` is called after each upload.
+    """
+    local_root = os.path.abspath(local_dir)
+    t0 = time.perf_counter()
+    local = build_manifest(local_root, workers=workers, cache=cache, exclude=exclude)
+    t1 = time.perf_counter()
+    remote = remote_manifest(client, remote_dir, local=local, jobs=max(jobs, 8), rehash=rehash or not cache,
+                             exclude=exclude, timeout_s=timeout_s)
+    t2 = time.perf_counter()
+    diff = diff_manifests(local, remote)
+
+    state_path = _cache_file(_state_key(client, remote_dir))
+    state = {e["path"]: [e["size"], e["mtime_ms"], e["sha256"]] for e in remote["entries"] if e["sha256"]}
+    uploaded: List[str] = []
+    if not dry_run and diff["upload"]:
+        with concurrent.futures.ThreadPoolExecutor(max(1, jobs), thread_name_prefix="sync-upload") as pool:
+            futures = {
+                pool.submit(_push, client, local_root, _remote_path(remote_dir, e["path"]), e, timeout_s): e
+                for e in diff["upload"]
+            }
+            try:
+                for fut in concurrent.futures.as_completed(futures):
+                    e = futures[fut]
+                    state[e["path"]] = [e["size"], fut.result(), e["sha256"]]
+                    uploaded.append(e["path"])
+                    if progress is not None:
+                        progress(e["path"], len(uploaded), len(futures))
+            except BaseException:
+                for f in futures:
+                    f.cancel()
+                raise
+            finally:
+                if cache:
+                    _save_json(state_path, {"files": state})
+        uploaded.sort()
+    elif cache and not dry_run:
+        _save_json(state_path, {"files": state})
+    t3 = time.perf_counter()
+
+    return {
+        "local_dir": local_root,
+        "remote_dir": remote_dir.strip().strip("/"),
+        "dry_run": dry_run,
+        "files": local["entry_count"],
+        "total_bytes": local["total_bytes"],
+        "manifest_sha256": local["manifest_sha256"],
+        "uploaded": uploaded if not dry_run else [e["path"] for e in diff["upload"]],
+        "bytes_uploaded": sum(e["size"] for e in diff["upload"]),
+        "unchanged": len(diff["unchanged"]),
+        "extra": [e["path"] for e in diff["extra"]],
+        "hashed_local": local["hashed"],
+        "hashed_remote": remote["hashed"],
+        "timings_s": {"local_manifest": t1 - t0, "remote_manifest": t2 - t1, "upload": t3 - t2, "total": t3 - t0},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m methings.sync", description="Upload only changed files to the user root.")
+    ap.add_argument("local_dir")
+    ap.add_argument("remote_dir", help="directory under the user root")
+    ap.add_argument("--base-url", default=os.environ.get("METHINGS_BASE_URL", "http://127.0.0.1:33389"))
+    ap.add_argument("--jobs", type=int, default=4, help="concurrent uploads")
+    ap.add_argument("--workers", type=int, default=None, help="hashing processes (default: CPU count)")
+    ap.add_argument("--dry-run", action="store_true", help="only report what would be uploaded")
+    ap.add_argument("--rehash", action="store_true", help="ask the device to hash every candidate file")
+    ap.add_argument("--no-cache", action="store_true", help="ignore and do not write the hash caches")
+    ap.add_argument("--json", action="store_true", help="print the full result as JSON")
+    args = ap.parse_args(argv)
+
+    with MethingsClient(args.base_url, pool_size=max(4, args.jobs)) as k:
+        r = sync_dir(k, args.local_dir, args.remote_dir, jobs=args.jobs, workers=args.workers,
+                     dry_run=args.dry_run, rehash=args.rehash, cache=not args.no_cache)
+    if args.json:
+        print(json.dumps(r, indent=2))
+    else:
+        verb = "would upload" if args.dry_run else "uploaded"
+        print(f"{r['files']} files ({r['total_bytes']} bytes): {verb} {len(r['uploaded'])} "
+              f"({r['bytes_uploaded']} bytes), unchanged {r['unchanged']}, remote-only {len(r['extra'])} "
+              f"in {r['timings_s']['total']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Reader for the `/usb/stream/start` TCP data plane (see docs/usb_streaming.md).
+
+Each frame on the wire is `u8 type` + `u32le length` + `length` payload bytes. FrameReader
+receives with `recv_into` into a small ring of preallocated buffers and yields `memoryview`
+slices of those buffers, so steady-state reading allocates nothing per frame.
+"""
+import socket
+import struct
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .client import MethingsClient
+
+
+FRAME_BULK_IN = 1
+FRAME_ISO_IN = 2
+FRAME_UVC_MJPEG = 3  # uvc.mjpeg.session.start data plane (see methings.uvc)
+
+_HEADER = struct.Struct("<BI")
+_GROW_FRAMES = 8
+
+
+class UsbStreamError(RuntimeError):
+    """A usb.stream.* control call failed; `response` holds the device_api result."""
+
+    def __init__(self, message: str, response: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.response = response or {}
+
+
+class StreamCounters:
+    """Frame/byte counters with overall and since-last-call rates."""
+
+    def __init__(self) -> None:
+        self.frames = 0
+        self.bytes = 0
+        self.started_at = time.monotonic()
+        self._mark = (self.started_at, 0, 0)
+
+    def add(self, nbytes: int) -> None:
+        self.frames += 1
+        self.bytes += nbytes
+
+    def snapshot(self) -> Dict[str, float]:
+        now = time.monotonic()
+        t0, f0, b0 = self._mark
+        self._mark = (now, self.frames, self.bytes)
+        elapsed = max(now - self.started_at, 1e-9)
+        window = max(now - t0, 1e-9)
+        return {
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "elapsed_s": elapsed,
+            "frames_per_s": self.frames / elapsed,
+            "bytes_per_s": self.bytes / elapsed,
+            "recent_frames_per_s": (self.frames - f0) / window,
+            "recent_bytes_per_s": (self.bytes - b0) / window,
+        }
+
+
+class FrameReader:
+    """
+    Zero-copy framed reader over a connected socket.
+
+    Bytes are received straight into ring slot buffers; complete frames are returned as
+    `(type, memoryview)` slices of the slot. Only a frame straddling the end of a slot is moved
+    (its received prefix is copied to the start of the next slot). A returned view stays valid
+    until the reader wraps around the ring back to the same slot, i.e. for at least
+    `ring_slots - 1` slot rotations; copy it (`bytes(view)`) to keep it longer.
+    The default ring (4 x 128 KiB, eight 16 KiB bulk frames per slot) is kept small enough to
+    stay in cache; with 1 MiB slots 16 KiB frames could read slower than a plain recv loop. A slot
+    that must hold a larger frame grows to `_GROW_FRAMES` such frames.
+    """
+
+    def __init__(self, sock: socket.socket, *, ring_slots: int = 4, slot_size: int = 128 * 1024):
+        if ring_slots < 2:
+            raise ValueError("ring_slots must be >= 2")
+        self.sock = sock
+        self._slots: List[bytearray] = [bytearray(max(int(slot_size), _HEADER.size)) for _ in range(ring_slots)]
+        self._views: List[memoryview] = [memoryview(b) for b in self._slots]
+        self._slot = 0
+        self._start = 0
+        self._end = 0
+        self.counters = StreamCounters()
+
+    def _rotate(self, need: int) -> None:
+        # Continue in the next slot, carrying over the unparsed tail of the current one.
+        nxt = (self._slot + 1) % len(self._slots)
+        tail = self._end - self._start
+        if len(self._slots[nxt]) < need:
+            self._slots[nxt] = bytearray(need * _GROW_FRAMES)
+            self._views[nxt] = memoryview(self._slots[nxt])
+        if tail:
+            self._views[nxt][:tail] = self._views[self._slot][self._start:self._end]
+        self._slot = nxt
+        self._start = 0
+        self._end = tail
+
+    def read_frame(self) -> Optional[Tuple[int, memoryview]]:
+        """Return the next `(type, payload_view)`, or None on a clean EOF between frames."""
+        while True:
+            buf = self._slots[self._slot]
+            avail = self._end - self._start
+            need = _HEADER.size
+            if avail >= _HEADER.size:
+                ftype, length = _HEADER.unpack_from(buf, self._start)
+                need = _HEADER.size + length
+                if avail >= need:
+                    begin = self._start + _HEADER.size
+                    self._start += need
+                    self.counters.add(length)
+                    return ftype, self._views[self._slot][begin:begin + length]
+            if len(buf) - self._start < need:
+                self._rotate(need)
+                continue
+            n = self.sock.recv_into(self._views[self._slot][self._end:])
+            if n == 0:
+                if avail:
+                    raise EOFError("socket closed mid-frame")
+                return None
+            self._end += n
+
+    def __iter__(self) -> Iterator[Tuple[int, memoryview]]:
+        while True:
+            frame = self.read_frame()
+            if frame is None:
+                return
+            yield frame
+
+    # Non-blocking use (methings.mux): drain buffered_frame() until None, then fill() once.
+    def buffered_frame(self) -> Optional[Tuple[int, memoryview]]:
+        """The next complete frame already received, without touching the socket; None if none is."""
+        avail = self._end - self._start
+        if avail < _HEADER.size:
+            return None
+        ftype, length = _HEADER.unpack_from(self._slots[self._slot], self._start)
+        if avail < _HEADER.size + length:
+            return None
+        begin = self._start + _HEADER.size
+        self._start = begin + length
+        self.counters.add(length)
+        return ftype, self._views[self._slot][begin:begin + length]
+
+    def fill(self) -> int:
+        """
+        One `recv_into` after buffered_frame() returned None: bytes received, 0 on a clean EOF.
+        A non-blocking socket's BlockingIOError propagates with the reader state unchanged.
+        """
+        avail = self._end - self._start
+        need = _HEADER.size
+        if avail >= _HEADER.size:
+            need += _HEADER.unpack_from(self._slots[self._slot], self._start)[1]
+        if len(self._slots[self._slot]) - self._start < need:
+            self._rotate(need)
+        n = self.sock.recv_into(self._views[self._slot][self._end:])
+        if n == 0 and avail:
+            raise EOFError("socket closed mid-frame")
+        self._end += n
+        return n
+
+    def stats(self) -> Dict[str, float]:
+        return self.counters.snapshot()
+
+
+class UsbStream:
+    """
+    Owns one USB stream: `usb.stream.start` → TCP connect → read frames → `usb.stream.stop`.
+
+        with UsbStream(MethingsClient(), handle=h, endpoint_address=0x81) as st:
+            for ftype, payload in st.frames():
+                ...
+            print(st.stats())
+
+    Payload views follow the FrameReader lifetime rules.
+    """
+
+    def __init__(
+        self,
+        client: MethingsClient,
+        *,
+        handle: str,
+        endpoint_address: int,
+        mode: str = "bulk_in",
+        chunk_size: int = 16384,
+        timeout_ms: int = 200,
+        interval_ms: int = 0,
+        packet_size: Optional[int] = None,
+        num_packets: Optional[int] = None,
+        host: Optional[str] = None,
+        connect_timeout_s: float = 5.0,
+        ring_slots: int = 4,
+        slot_size: int = 128 * 1024,
+        rcvbuf_bytes: int = 1024 * 1024,
+    ):
+        self.client = client
+        self.payload: Dict[str, Any] = {
+            "handle": str(handle).strip(),
+            "mode": str(mode).strip(),
+            "endpoint_address": int(endpoint_address),
+            "chunk_size": int(chunk_size),
+            "timeout_ms": int(timeout_ms),
+            "interval_ms": int(interval_ms),
+        }
+        if packet_size is not None:
+            self.payload["packet_size"] = int(packet_size)
+        if num_packets is not None:
+            self.payload["num_packets"] = int(num_packets)
+        self.host = host
+        self.connect_timeout_s = float(connect_timeout_s)
+        self.ring_slots = int(ring_slots)
+        self.slot_size = int(slot_size)
+        self.rcvbuf_bytes = int(rcvbuf_bytes)
+        self.stream_id = ""
+        self.tcp_port = 0
+        self.info: Dict[str, Any] = {}
+        self.sock: Optional[socket.socket] = None
+        self.reader: Optional[FrameReader] = None
+
+    def start(self) -> Dict[str, Any]:
+        r = self.client.device_api("usb.stream.start", dict(self.payload), detail="USB stream start")
+        info = r.get("json") or {}
+        if not r.get("ok") or not info.get("stream_id") or int(info.get("tcp_port") or 0) <= 0:
+            raise UsbStreamError(f"usb.stream.start failed: {r.get('error') or info}", r)
+        self.info = info
+        self.stream_id = str(info["stream_id"])
+        self.tcp_port = int(info["tcp_port"])
+        return info
+
+    def connect(self) -> FrameReader:
+        if not self.stream_id:
+            self.start()
+        host = self.host or str(self.info.get("tcp_host") or "127.0.0.1")
+        sock = socket.create_connection((host, self.tcp_port), timeout=self.connect_timeout_s)
+        sock.settimeout(None)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf_bytes)
+        except OSError:
+            pass
+        self.sock = sock
+        self.reader = FrameReader(sock, ring_slots=self.ring_slots, slot_size=self.slot_size)
+        return self.reader
+
+    def frames(self) -> Iterator[Tuple[int, memoryview]]:
+        reader = self.reader or self.connect()
+        return iter(reader)
+
+    def stats(self) -> Dict[str, float]:
+        if self.reader is None:
+            return StreamCounters().snapshot()
+        return self.reader.stats()
+
+    def stop(self) -> Dict[str, Any]:
+        if not self.stream_id:
+            return {"ok": True, "status": 0, "json": {}}
+        r = self.client.device_api("usb.stream.stop", {"stream_id": self.stream_id}, detail="USB stream stop")
+        self.stream_id = ""
+        return r
+
+    def close(self) -> None:
+        sock, self.sock = self.sock, None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self.stop()
+
+    def __enter__(self) -> "UsbStream":
+        self.connect()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
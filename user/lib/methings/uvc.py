@@ -0,0 +1,171 @@
+"""
+Continuous MJPEG capture from a UVC webcam via `uvc.mjpeg.session.start` (see user/docs/api/uvc.md).
+
+The session keeps the camera negotiated and streaming; complete JPEG frames are pushed over the
+USB-stream TCP framing (`u8 type=3` + `u32le length` + payload) with a latest-frame-only policy,
+so a slow reader skips frames instead of building up latency. Each payload starts with a 16-byte
+header: `u32le seq`, `u32le flags` (1=EOI present, 2=EOI appended), `u64le capture_unix_us`.
+"""
+import socket
+import struct
+import time
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from .client import MethingsClient
+from .usb_stream import FRAME_UVC_MJPEG, FrameReader, UsbStreamError
+
+
+_FRAME_META = struct.Struct("<IIQ")
+
+FLAG_HAS_EOI = 0x1
+FLAG_EOI_APPENDED = 0x2
+
+
+class UvcJpegFrame(NamedTuple):
+    """
+    One JPEG frame. `jpeg` is a view into the reader's ring buffer (valid until the ring wraps;
+    `bytes(frame.jpeg)` to keep it). `latency_s` is capture-to-receive time on the device clock.
+    `skipped` counts frames dropped for this reader since the previous one.
+    """
+
+    seq: int
+    jpeg: memoryview
+    captured_at: float
+    latency_s: float
+    skipped: int
+    flags: int
+
+
+class UvcSession:
+    """
+    Owns one capture session: `uvc.mjpeg.session.start` → TCP connect → frames → stop.
+
+        with UvcSession(MethingsClient(), handle=h, width=1280, height=720, fps=30) as cam:
+            for frame in cam.frames():
+                handle_jpeg(frame.jpeg)
+            print(cam.stats())
+    """
+
+    def __init__(
+        self,
+        client: MethingsClient,
+        *,
+        handle: str,
+        width: int = 1280,
+        height: int = 720,
+        fps: int = 30,
+        max_frame_bytes: int = 0,
+        host: Optional[str] = None,
+        connect_timeout_s: float = 5.0,
+        ring_slots: int = 4,
+        slot_size: int = 4 * 1024 * 1024,
+    ):
+        self.client = client
+        self.handle = str(handle).strip()
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = int(fps)
+        self.max_frame_bytes = int(max_frame_bytes)
+        self.host = host
+        self.connect_timeout_s = float(connect_timeout_s)
+        self.ring_slots = int(ring_slots)
+        self.slot_size = int(slot_size)
+        self.session_id = ""
+        self.info: Dict[str, Any] = {}
+        self.sock: Optional[socket.socket] = None
+        self.reader: Optional[FrameReader] = None
+        self._last_seq = 0
+        self._skipped = 0
+        self._latencies: List[float] = []
+
+    def start(self) -> Dict[str, Any]:
+        r = self.client.uvc_mjpeg_session_start(
+            handle=self.handle,
+            width=self.width,
+            height=self.height,
+            fps=self.fps,
+            max_frame_bytes=self.max_frame_bytes,
+        )
+        info = r.get("json") or {}
+        if not r.get("ok") or not info.get("session_id") or int(info.get("tcp_port") or 0) <= 0:
+            raise UsbStreamError(f"uvc.mjpeg.session.start failed: {r.get('error') or info}", r)
+        self.info = info
+        self.session_id = str(info["session_id"])
+        return info
+
+    def connect(self) -> FrameReader:
+        if not self.session_id:
+            self.start()
+        host = self.host or str(self.info.get("tcp_host") or "127.0.0.1")
+        sock = socket.create_connection((host, int(self.info["tcp_port"])), timeout=self.connect_timeout_s)
+        sock.settimeout(None)
+        self.sock = sock
+        self.reader = FrameReader(sock, ring_slots=self.ring_slots, slot_size=self.slot_size)
+        return self.reader
+
+    def frames(self, *, max_frames: Optional[int] = None) -> Iterator[UvcJpegFrame]:
+        reader = self.reader or self.connect()
+        n = 0
+        for ftype, payload in reader:
+            if ftype != FRAME_UVC_MJPEG or len(payload) < _FRAME_META.size:
+                continue
+            seq, flags, captured_us = _FRAME_META.unpack_from(payload, 0)
+            latency = max(0.0, time.time() - captured_us / 1e6)
+            skipped = seq - self._last_seq - 1 if self._last_seq else 0
+            self._last_seq = seq
+            self._skipped += max(0, skipped)
+            self._latencies.append(latency)
+            if len(self._latencies) > 1024:
+                del self._latencies[:512]
+            yield UvcJpegFrame(seq, payload[_FRAME_META.size:], captured_us / 1e6, latency, max(0, skipped), flags)
+            n += 1
+            if max_frames is not None and n >= max_frames:
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.reader.stats()) if self.reader is not None else {}
+        out["skipped"] = self._skipped
+        lat = sorted(self._latencies)
+        if lat:
+            out["latency_p50_s"] = lat[len(lat) // 2]
+            out["latency_p95_s"] = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+            out["latency_max_s"] = lat[-1]
+        return out
+
+    def stop(self) -> Dict[str, Any]:
+        if not self.session_id:
+            return {"ok": True, "status": 0, "json": {}}
+        r = self.client.uvc_mjpeg_session_stop(session_id=self.session_id)
+        self.session_id = ""
+        return r
+
+    def close(self) -> None:
+        sock, self.sock = self.sock, None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self.reader = None
+        self.stop()
+
+    def __enter__(self) -> "UvcSession":
+        self.connect()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def mjpeg_frames(
+    client: MethingsClient,
+    *,
+    handle: str,
+    width: int = 1280,
+    height: int = 720,
+    fps: int = 30,
+    max_frames: Optional[int] = None,
+) -> Iterator[UvcJpegFrame]:
+    """Yield frames from a capture session that is stopped when the iterator finishes or is closed."""
+    with UvcSession(client, handle=handle, width=width, height=height, fps=fps) as cam:
+        yield from cam.frames(max_frames=max_frames)
@@ -0,0 +1,244 @@
+"""
+Pipelined on-device inference over the vision routes (see user/docs/api/vision.md).
+
+Pipeline runs the `vision.frame.put` → `vision.run` flow for a stream of RGBA8888 frames:
+
+- frame N+1 is uploaded (binary, via MethingsClient.vision_put_frame) while frame N is inferred
+- uploads overwrite a fixed pool of `slots` frame_ids, so the device frame store never grows;
+  the ids are deleted on close()
+- with several models, each one runs on the same stored frame concurrently
+
+Results come back in frame order, with per-stage timings; stats() reports latency percentiles
+per stage and end-to-end fps.
+"""
+import collections
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .client import MethingsClient
+
+
+class VisionError(RuntimeError):
+    def __init__(self, message: str, response: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.response = response or {}
+
+
+class PipelineResult(NamedTuple):
+    """
+    Outputs of every model for one frame. `outputs` maps model name to the `vision.run` JSON;
+    `upload_s`/`infer_s` are client-side round-trip times and `latency_s` covers submit → done.
+    """
+
+    index: int
+    frame_id: str
+    outputs: Dict[str, Dict[str, Any]]
+    upload_s: float
+    infer_s: Dict[str, float]
+    latency_s: float
+
+
+class _InFlight(NamedTuple):
+    index: int
+    slot: str
+    submitted: float
+    upload: "Future[float]"
+    runs: Dict[str, "Future[Tuple[Dict[str, Any], float]]"]
+
+
+def _percentiles(values: Sequence[float]) -> Dict[str, float]:
+    s = sorted(values)
+    if not s:
+        return {}
+    return {
+        "p50_ms": 1000.0 * s[len(s) // 2],
+        "p95_ms": 1000.0 * s[min(len(s) - 1, int(len(s) * 0.95))],
+        "max_ms": 1000.0 * s[-1],
+    }
+
+
+class Pipeline:
+    """
+    Overlaps upload and inference for a stream of frames.
+
+        k = MethingsClient()
+        with Pipeline(k, models=["det", "cls"], width=640, height=480, permission_id=pid) as p:
+            for r in p.run(frames):
+                print(r.index, r.outputs["det"], r.latency_s)
+            print(p.stats())
+
+    Models must already be loaded (`vision.model.load`, or load_model()). A buffer passed to
+    run() must not be modified until its result has been yielded. `slots` is the pipeline depth:
+    how many frames can be stored on the device at once.
+    """
+
+    def __init__(
+        self,
+        client: MethingsClient,
+        *,
+        models: Any,
+        width: int,
+        height: int,
+        slots: int = 2,
+        normalize: bool = True,
+        mean: Optional[List[float]] = None,
+        std: Optional[List[float]] = None,
+        permission_id: str = "",
+        timeout_s: float = 75.0,
+        window: int = 1024,
+    ):
+        names = models.split(",") if isinstance(models, str) else list(models)
+        self.models = [str(m).strip() for m in names if str(m).strip()]
+        if not self.models:
+            raise ValueError("at least one model is required")
+        self.client = client
+        self.width = int(width)
+        self.height = int(height)
+        self.slots = max(1, int(slots))
+        self.normalize = bool(normalize)
+        self.mean = list(mean) if mean is not None else None
+        self.std = list(std) if std is not None else None
+        self.permission_id = str(permission_id).strip()
+        self.timeout_s = float(timeout_s)
+        prefix = f"pipe-{uuid.uuid4().hex[:12]}"
+        self.slot_ids = [f"{prefix}-{i}" for i in range(self.slots)]
+        self._used: set = set()
+        self._upload_pool: Optional[ThreadPoolExecutor] = None
+        self._run_pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._upload_s: Deque[float] = collections.deque(maxlen=window)
+        self._infer_s: Dict[str, Deque[float]] = {m: collections.deque(maxlen=window) for m in self.models}
+        self._server_ms: Dict[str, Deque[float]] = {m: collections.deque(maxlen=window) for m in self.models}
+        self._latency_s: Deque[float] = collections.deque(maxlen=window)
+        self._frames = 0
+        self._started = 0.0
+        self._finished = 0.0
+
+    # -------- setup --------
+    def load_model(self, name: str, path: str, *, delegate: str = "none", num_threads: int = 1) -> Dict[str, Any]:
+        r = self.client.request_json(
+            "POST",
+            "/vision/model/load",
+            self._payload({"name": name, "path": path, "delegate": delegate, "num_threads": int(num_threads)}),
+            timeout_s=self.timeout_s,
+        )
+        if not r.get("ok"):
+            raise VisionError(f"vision.model.load failed: {r.get('error') or r.get('json')}", r)
+        return r["json"]
+
+    def _payload(self, extra: Dict[str, Any]) -> Dict[str, Any]:
+        if self.permission_id:
+            extra["permission_id"] = self.permission_id
+        return extra
+
+    # -------- stages --------
+    def _upload(self, slot: str, buffer: Any) -> float:
+        t0 = time.perf_counter()
+        r = self.client.vision_put_frame(
+            buffer,
+            width=self.width,
+            height=self.height,
+            frame_id=slot,
+            permission_id=self.permission_id,
+            timeout_s=self.timeout_s,
+        )
+        if not r.get("ok"):
+            raise VisionError(f"vision.frame.put failed: {r.get('error') or r.get('json')}", r)
+        with self._lock:
+            self._used.add(slot)
+        return time.perf_counter() - t0
+
+    def _run(self, model: str, slot: str, upload: "Future[float]") -> Tuple[Dict[str, Any], float]:
+        upload.result()
+        payload: Dict[str, Any] = {"model": model, "frame_id": slot, "normalize": self.normalize}
+        if self.mean is not None:
+            payload["mean"] = self.mean
+        if self.std is not None:
+            payload["std"] = self.std
+        t0 = time.perf_counter()
+        r = self.client.request_json("POST", "/vision/run", self._payload(payload), timeout_s=self.timeout_s)
+        if not r.get("ok"):
+            raise VisionError(f"vision.run ({model}) failed: {r.get('error') or r.get('json')}", r)
+        return r["json"], time.perf_counter() - t0
+
+    def _finish(self, item: _InFlight) -> PipelineResult:
+        upload_s = item.upload.result()
+        outputs: Dict[str, Dict[str, Any]] = {}
+        infer_s: Dict[str, float] = {}
+        for model, fut in item.runs.items():
+            outputs[model], infer_s[model] = fut.result()
+        latency = time.perf_counter() - item.submitted
+        self._upload_s.append(upload_s)
+        for model, dt in infer_s.items():
+            self._infer_s[model].append(dt)
+            server_ms = outputs[model].get("inference_ms")
+            if isinstance(server_ms, (int, float)):
+                self._server_ms[model].append(float(server_ms) / 1000.0)
+        self._latency_s.append(latency)
+        self._frames += 1
+        self._finished = time.perf_counter()
+        return PipelineResult(item.index, item.slot, outputs, upload_s, infer_s, latency)
+
+    # -------- running --------
+    def run(self, frames: Iterable[Any]) -> Iterator[PipelineResult]:
+        """Push RGBA8888 buffers through the pipeline and yield results in input order."""
+        if self._upload_pool is None:
+            self._upload_pool = ThreadPoolExecutor(1, thread_name_prefix="vision-upload")
+            # Run tasks wait on their frame's upload, so every in-flight (frame, model) needs a worker.
+            self._run_pool = ThreadPoolExecutor(self.slots * len(self.models), thread_name_prefix="vision-run")
+        assert self._run_pool is not None
+        inflight: Deque[_InFlight] = collections.deque()
+        if not self._started:
+            self._started = time.perf_counter()
+        try:
+            for index, buffer in enumerate(frames):
+                # A slot is reused only after every model has finished with its previous frame.
+                while len(inflight) >= self.slots:
+                    yield self._finish(inflight.popleft())
+                slot = self.slot_ids[index % self.slots]
+                submitted = time.perf_counter()
+                upload = self._upload_pool.submit(self._upload, slot, buffer)
+                runs = {m: self._run_pool.submit(self._run, m, slot, upload) for m in self.models}
+                inflight.append(_InFlight(index, slot, submitted, upload, runs))
+            while inflight:
+                yield self._finish(inflight.popleft())
+        finally:
+            for item in inflight:
+                for fut in item.runs.values():
+                    fut.cancel()
+                item.upload.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = self._finished - self._started if self._frames else 0.0
+        out: Dict[str, Any] = {
+            "frames": self._frames,
+            "fps": self._frames / elapsed if elapsed > 0 else 0.0,
+            "slots": self.slots,
+            "upload": _percentiles(self._upload_s),
+            "infer": {m: _percentiles(v) for m, v in self._infer_s.items()},
+            "end_to_end": _percentiles(self._latency_s),
+        }
+        server = {m: _percentiles(v) for m, v in self._server_ms.items() if v}
+        if server:
+            out["server_inference"] = server
+        return out
+
+    def close(self) -> None:
+        """Stop the worker threads and delete the recycled frame_ids on the device."""
+        for pool in (self._upload_pool, self._run_pool):
+            if pool is not None:
+                pool.shutdown(wait=True)
+        self._upload_pool = self._run_pool = None
+        with self._lock:
+            used, self._used = sorted(self._used), set()
+        for slot in used:
+            self.client.request_json("POST", "/vision/frame/delete", self._payload({"frame_id": slot}), timeout_s=self.timeout_s)
+
+    def __enter__(self) -> "Pipeline":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,232 @@
+"""
+Minimal blocking WebSocket client (RFC 6455) for the local methings server's `/ws/...` endpoints.
+
+Only what the local streams need: `ws://` URLs, text/binary messages, fragmentation, ping/pong
+and close. No extensions (permessage-deflate) and no TLS.
+"""
+import base64
+import os
+import socket
+import struct
+import urllib.parse
+from typing import Dict, Iterator, Optional, Tuple
+
+
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class WebSocketError(ConnectionError):
+    pass
+
+
+class WebSocketClosed(WebSocketError):
+    """The server closed the connection; `code`/`reason` come from its close frame (1005 if none)."""
+
+    def __init__(self, code: int = 1005, reason: str = ""):
+        super().__init__(f"websocket closed ({code}) {reason}".strip())
+        self.code = code
+        self.reason = reason
+
+
+def _mask(data: bytes, key: bytes) -> bytes:
+    n = len(data)
+    if not n:
+        return b""
+    k = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "little") ^ int.from_bytes(k, "little")).to_bytes(n, "little")
+
+
+def _client_frame(opcode: int, payload: bytes) -> bytes:
+    """One masked, unfragmented client-to-server frame."""
+    n = len(payload)
+    if n < 126:
+        head = struct.pack("!BB", 0x80 | opcode, 0x80 | n)
+    elif n < 1 << 16:
+        head = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, n)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, n)
+    key = os.urandom(4)
+    return head + key + _mask(payload, key)
+
+
+class WebSocket:
+    def __init__(self, sock: socket.socket, *, read_buffer: int = 256 * 1024):
+        self.sock = sock
+        self._rfile = sock.makefile("rb", buffering=read_buffer)
+        self.closed = False
+
+    @classmethod
+    def connect(
+        cls,
+        url: str,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        timeout_s: float = 10.0,
+        rcvbuf_bytes: int = 0,
+    ) -> "WebSocket":
+        u = urllib.parse.urlsplit(url)
+        if u.scheme not in ("ws", "http"):
+            raise ValueError(f"unsupported websocket url: {url}")
+        host = u.hostname or "127.0.0.1"
+        port = u.port or 80
+        path = (u.path or "/") + (f"?{u.query}" if u.query else "")
+        sock = socket.create_connection((host, port), timeout=timeout_s)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if rcvbuf_bytes > 0:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, int(rcvbuf_bytes))
+            except OSError:
+                pass
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        lines = [
+            f"GET {path} HTTP/1.1",
+            f"Host: {host}:{port}",
+            "Upgrade: websocket",
+            "Connection: Upgrade",
+            f"Sec-WebSocket-Key: {key}",
+            "Sec-WebSocket-Version: 13",
+        ]
+        for k, v in (headers or {}).items():
+            lines.append(f"{k}: {v}")
+        sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        ws = cls(sock)
+        status = ws._rfile.readline().decode("latin-1").strip()
+        while True:
+            line = ws._rfile.readline()
+            if not line or line in (b"\r\n", b"\n"):
+                break
+        if " 101 " not in f"{status} ":
+            ws.close_socket()
+            raise WebSocketError(f"websocket handshake failed: {status or 'no response'}")
+        sock.settimeout(None)
+        return ws
+
+    def _read_exact(self, n: int) -> bytes:
+        data = self._rfile.read(n)
+        if data is None or len(data) < n:
+            self.closed = True
+            raise WebSocketClosed(1006, "connection lost")
+        return data
+
+    def _send_frame(self, opcode: int, payload: bytes) -> None:
+        self.sock.sendall(_client_frame(opcode, payload))
+
+    def send_text(self, text: str) -> None:
+        self._send_frame(OP_TEXT, text.encode("utf-8"))
+
+    def send_binary(self, data: bytes) -> None:
+        self._send_frame(OP_BINARY, bytes(data))
+
+    def _read_into(self, mv: memoryview) -> None:
+        got = 0
+        while got < len(mv):
+            n = self._rfile.readinto(mv[got:])
+            if not n:
+                self.closed = True
+                raise WebSocketClosed(1006, "connection lost")
+            got += n
+
+    def _read_header(self) -> Tuple[int, int, int, bytes]:
+        b0, b1 = self._read_exact(2)
+        n = b1 & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", self._read_exact(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", self._read_exact(8))[0]
+        key = self._read_exact(4) if b1 & 0x80 else b""
+        return b0 & 0x80, b0 & 0x0F, n, key
+
+    def _control(self, op: int, payload: bytes) -> None:
+        if op == OP_PING:
+            self._send_frame(OP_PONG, payload)
+        elif op == OP_CLOSE:
+            code = struct.unpack("!H", payload[:2])[0] if len(payload) >= 2 else 1005
+            reason = payload[2:].decode("utf-8", "replace")
+            self.close(code)
+            raise WebSocketClosed(code, reason)
+
+    def recv(self) -> Tuple[int, bytes]:
+        """
+        Return the next `(OP_TEXT|OP_BINARY, payload)` message. Pings are answered, fragments
+        joined; a close frame raises WebSocketClosed.
+        """
+        parts = []
+        msg_op = None
+        while True:
+            fin, op, n, key = self._read_header()
+            payload = self._read_exact(n) if n else b""
+            if key:
+                payload = _mask(payload, key)
+            if op >= OP_CLOSE:
+                self._control(op, payload)
+                continue
+            if op != OP_CONT:
+                msg_op = op
+            parts.append(payload)
+            if fin:
+                return (msg_op or OP_BINARY), (parts[0] if len(parts) == 1 else b"".join(parts))
+
+    def recv_into(self, buf: bytearray) -> Tuple[int, int]:
+        """
+        Like recv(), but read the payload straight into `buf` and return `(opcode, length)`; the
+        message is `buf[:length]`. `buf` is grown when a message does not fit, so one buffer can
+        be reused for a whole stream without allocating per message.
+        """
+        length = 0
+        msg_op = None
+        while True:
+            fin, op, n, key = self._read_header()
+            if op >= OP_CLOSE:
+                payload = self._read_exact(n) if n else b""
+                self._control(op, _mask(payload, key) if key else payload)
+                continue
+            if op != OP_CONT:
+                msg_op = op
+            end = length + n
+            if len(buf) < end:
+                buf.extend(bytes(end - len(buf)))
+            if n:
+                with memoryview(buf) as mv:
+                    self._read_into(mv[length:end])
+                if key:
+                    buf[length:end] = _mask(bytes(buf[length:end]), key)
+            length = end
+            if fin:
+                return (msg_op or OP_BINARY), length
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        while True:
+            try:
+                yield self.recv()
+            except WebSocketClosed:
+                return
+
+    def close(self, code: int = 1000) -> None:
+        if not self.closed:
+            self.closed = True
+            try:
+                self._send_frame(OP_CLOSE, struct.pack("!H", code))
+            except OSError:
+                pass
+        self.close_socket()
+
+    def close_socket(self) -> None:
+        try:
+            self._rfile.close()
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self) -> "WebSocket":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()